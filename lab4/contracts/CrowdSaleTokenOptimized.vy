@@ -0,0 +1,328 @@
+# @version ^0.4.3
+"""
+@title Gas-optimized CrowdSaleToken
+@notice Same ABI and sale rules as CrowdSaleToken_22520542, but:
+        - values fixed at deployment are immutables or constants (read from
+          bytecode instead of storage)
+        - storage values used more than once per call are read into locals
+        - "closed" and "goal reached" are derived from block.timestamp and
+          amountRaised, so no finalizing transaction is needed before
+          safeWithdrawal
+"""
+
+import merkle_proof
+from ethereum.ercs import IERC20
+from ethereum.ercs import IERC20Detailed
+
+implements: IERC20
+implements: IERC20Detailed
+
+event Transfer:
+    sender: indexed(address)
+    receiver: indexed(address)
+    value: uint256
+
+event Approval:
+    owner: indexed(address)
+    spender: indexed(address)
+    value: uint256
+
+event Payment:
+    buyer: indexed(address)
+    value: uint256
+
+event RefundFailed:
+    buyer: indexed(address)
+    value: uint256
+
+name: public(immutable(String[32]))
+symbol: public(immutable(String[32]))
+decimals: public(immutable(uint8))
+
+balanceOf: public(HashMap[address, uint256])
+allowance: public(HashMap[address, HashMap[address, uint256]])
+totalSupply: public(uint256)
+
+ethBalances: public(HashMap[address, uint256])
+
+# Every distinct buyer in purchase order, walked by refundBatch
+buyers: public(HashMap[uint256, address])
+buyerCount: public(uint256)
+refundCursor: public(uint256)
+MAX_REFUND_BATCH: constant(uint256) = 100
+REFUND_CALL_GAS: constant(uint256) = 30000
+
+# EIP-2612 permit
+nonces: public(HashMap[address, uint256])
+EIP712_DOMAIN_TYPEHASH: constant(bytes32) = keccak256("EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+PERMIT_TYPEHASH: constant(bytes32) = keccak256("Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)")
+EIP712_VERSION: constant(String[1]) = "1"
+MAX_S: constant(uint256) = 57896044618658097711785492504343953926418782139537452191302581570759080747168 # secp256k1n / 2
+# The domain separator is cached at deployment and rebuilt only after a chain fork
+CACHED_DOMAIN_SEPARATOR: immutable(bytes32)
+CACHED_CHAIN_ID: immutable(uint256)
+
+# Merkle allowlist: while a root is set, only buyers with a proof of their
+# (address, cap) leaf can buy, through buyAllowlisted
+allowlistRoot: public(bytes32)
+
+beneficiary: public(immutable(address))
+minFundingGoal: public(constant(uint256)) = as_wei_value(30, "ether")
+maxFundingGoal: public(constant(uint256)) = as_wei_value(50, "ether")
+amountRaised: public(uint256)
+deadline: public(immutable(uint256))
+price: public(constant(uint256)) = as_wei_value(1, "ether") // 100
+MIN_PURCHASE: constant(uint256) = as_wei_value(0.01, "ether")
+
+@deploy
+def __init__(_name: String[32], _symbol: String[32], _decimals: uint8, _supply: uint256):
+    init_supply: uint256 = _supply * 10 ** convert(_decimals, uint256)
+    name = _name
+    symbol = _symbol
+    decimals = _decimals
+    self.balanceOf[msg.sender] = init_supply
+    self.totalSupply = init_supply
+    log Transfer(sender=empty(address), receiver=msg.sender, value=init_supply)
+
+    beneficiary = msg.sender
+    deadline = block.timestamp + 3600 * 24 * 100 # 100 days
+
+    CACHED_CHAIN_ID = chain.id
+    CACHED_DOMAIN_SEPARATOR = self._buildDomainSeparator()
+
+@view
+@internal
+def _closed() -> bool:
+    return block.timestamp > deadline
+
+@view
+@external
+def crowdsaleClosed() -> bool:
+    return self._closed()
+
+@view
+@external
+def fundingGoalReached() -> bool:
+    return self._closed() and self.amountRaised >= minFundingGoal
+
+@external
+@payable
+def __default__():
+    assert self.allowlistRoot == empty(bytes32)
+    self._buy(msg.sender, msg.value, self.ethBalances[msg.sender])
+
+@external
+@payable
+def buyAllowlisted(_cap: uint256, _proof: DynArray[bytes32, merkle_proof.MAX_PROOF_LENGTH]):
+    """
+    @dev Buy tokens as a member of the allowlist. The leaf is
+         keccak256(keccak256(abi_encode(buyer, cap))), and proofs hash sorted pairs.
+    @param _cap Most ETH (in wei) the buyer may contribute in total.
+    @param _proof Sibling hashes from the buyer's leaf up to allowlistRoot.
+    """
+    leaf: bytes32 = keccak256(keccak256(abi_encode(msg.sender, _cap)))
+    assert merkle_proof.verify(_proof, self.allowlistRoot, leaf)
+    paid: uint256 = self.ethBalances[msg.sender]
+    assert paid + msg.value <= _cap
+    self._buy(msg.sender, msg.value, paid)
+
+@external
+def setAllowlistRoot(_root: bytes32):
+    """
+    @dev Restrict purchases to the allowlist with this Merkle root; the empty root opens the sale to everyone.
+    """
+    assert msg.sender == beneficiary
+    self.allowlistRoot = _root
+
+@internal
+def _buy(_buyer: address, _value: uint256, _paid: uint256):
+    """
+    @dev _paid is ethBalances[_buyer], already read by the caller
+    """
+    assert _buyer != beneficiary
+    assert not self._closed()
+    raised: uint256 = self.amountRaised + _value
+    assert raised <= maxFundingGoal
+    assert _value >= MIN_PURCHASE
+
+    # Update ETH balances and amount raised
+    if _paid == 0:
+        count: uint256 = self.buyerCount
+        self.buyers[count] = _buyer
+        self.buyerCount = count + 1
+    self.ethBalances[_buyer] = _paid + _value
+    self.amountRaised = raised
+
+    # Calculate tokens to give (1 ETH = 100 tokens, so token_amount = _value // price)
+    token_amount: uint256 = _value // price
+
+    # Transfer tokens from beneficiary to buyer
+    available: uint256 = self.balanceOf[beneficiary]
+    assert available >= token_amount
+    self.balanceOf[beneficiary] = available - token_amount
+    self.balanceOf[_buyer] += token_amount
+
+    # Log events
+    log Transfer(sender=beneficiary, receiver=_buyer, value=token_amount)
+    log Payment(buyer=_buyer, value=_value)
+
+@external
+def checkGoalReached():
+    """
+    @dev Kept for interface compatibility; the outcome is computed on demand,
+         so this only checks that the deadline has passed.
+    """
+    assert self._closed()
+
+@external
+def safeWithdrawal():
+    assert self._closed()
+
+    if self.amountRaised >= minFundingGoal:
+        # If funding goal reached, beneficiary can withdraw all ETH
+        if msg.sender == beneficiary:
+            send(beneficiary, self.balance)
+    else:
+        # If funding goal not reached, buyers can get refund
+        amount: uint256 = self.ethBalances[msg.sender]
+        assert amount > 0
+        self.ethBalances[msg.sender] = 0
+
+        # Return tokens back to beneficiary
+        token_amount: uint256 = amount // price
+        self.balanceOf[msg.sender] -= token_amount
+        self.balanceOf[beneficiary] += token_amount
+
+        # Refund ETH to buyer
+        send(msg.sender, amount)
+        log Transfer(sender=msg.sender, receiver=beneficiary, value=token_amount)
+
+@external
+@nonreentrant
+def refundBatch(_count: uint256) -> uint256:
+    """
+    @dev Refund the next `_count` buyers (at most MAX_REFUND_BATCH) of a sale that missed
+         its goal. Anyone can call it, the ETH only goes back to buyers. A buyer who no
+         longer holds the purchased tokens, or whose address rejects the payment, is
+         skipped with a RefundFailed event and can still use safeWithdrawal.
+    @param _count Number of buyers to process in this transaction.
+    @return Index of the next buyer; equals buyerCount once every buyer was processed.
+    """
+    assert self._closed()
+    assert self.amountRaised < minFundingGoal
+    assert _count <= MAX_REFUND_BATCH
+
+    start: uint256 = self.refundCursor
+    end: uint256 = min(start + _count, self.buyerCount)
+    for i: uint256 in range(start, end, bound=MAX_REFUND_BATCH):
+        buyer: address = self.buyers[i]
+        amount: uint256 = self.ethBalances[buyer]
+        if amount == 0:
+            continue  # Already refunded through safeWithdrawal
+
+        token_amount: uint256 = amount // price
+        if self.balanceOf[buyer] < token_amount:
+            log RefundFailed(buyer=buyer, value=amount)
+            continue
+
+        # Settle before paying out; undone below if the payment fails
+        self.ethBalances[buyer] = 0
+        self.balanceOf[buyer] -= token_amount
+        self.balanceOf[beneficiary] += token_amount
+        if raw_call(buyer, b"", value=amount, gas=REFUND_CALL_GAS, revert_on_failure=False):
+            log Transfer(sender=buyer, receiver=beneficiary, value=token_amount)
+        else:
+            self.ethBalances[buyer] = amount
+            self.balanceOf[buyer] += token_amount
+            self.balanceOf[beneficiary] -= token_amount
+            log RefundFailed(buyer=buyer, value=amount)
+
+    self.refundCursor = end
+    return end
+
+@external
+def transfer(_to : address, _value : uint256) -> bool:
+    """
+    @dev Transfer token for a specified address
+    @param _to The address to transfer to.
+    @param _value The amount to be transferred.
+    """
+    self.balanceOf[msg.sender] -= _value
+    self.balanceOf[_to] += _value
+    log Transfer(sender=msg.sender, receiver=_to, value=_value)
+    return True
+
+
+@external
+def transferFrom(_from : address, _to : address, _value : uint256) -> bool:
+    """
+     @dev Transfer tokens from one address to another.
+     @param _from address The address which you want to send tokens from
+     @param _to address The address which you want to transfer to
+     @param _value uint256 the amount of tokens to be transferred
+    """
+    self.balanceOf[_from] -= _value
+    self.balanceOf[_to] += _value
+    self.allowance[_from][msg.sender] -= _value
+    log Transfer(sender=_from, receiver=_to, value=_value)
+    return True
+
+
+@external
+def approve(_spender : address, _value : uint256) -> bool:
+    """
+    @dev Approve the passed address to spend the specified amount of tokens on behalf of msg.sender.
+         Beware that changing an allowance with this method brings the risk that someone may use both the old
+         and the new allowance by unfortunate transaction ordering. One possible solution to mitigate this
+         race condition is to first reduce the spender's allowance to 0 and set the desired value afterwards:
+         https://github.com/ethereum/EIPs/issues/20#issuecomment-263524729
+    @param _spender The address which will spend the funds.
+    @param _value The amount of tokens to be spent.
+    """
+    self.allowance[msg.sender][_spender] = _value
+    log Approval(owner=msg.sender, spender=_spender, value=_value)
+    return True
+
+
+@view
+@internal
+def _buildDomainSeparator() -> bytes32:
+    return keccak256(abi_encode(EIP712_DOMAIN_TYPEHASH, keccak256(name), keccak256(EIP712_VERSION), chain.id, self))
+
+
+@view
+@internal
+def _domainSeparator() -> bytes32:
+    if chain.id == CACHED_CHAIN_ID:
+        return CACHED_DOMAIN_SEPARATOR
+    return self._buildDomainSeparator()
+
+
+@view
+@external
+def DOMAIN_SEPARATOR() -> bytes32:
+    return self._domainSeparator()
+
+
+@external
+def permit(_owner: address, _spender: address, _value: uint256, _deadline: uint256, _v: uint8, _r: bytes32, _s: bytes32):
+    """
+    @dev EIP-2612: set an allowance from the owner's signature, so the spender can
+         submit it right before transferFrom instead of waiting for an approve.
+    @param _owner The address whose tokens may be spent.
+    @param _spender The address which will spend the funds.
+    @param _value The amount of tokens to be spent.
+    @param _deadline Last timestamp at which the permit can be used.
+    """
+    assert block.timestamp <= _deadline
+    assert _owner != empty(address)
+    assert convert(_s, uint256) <= MAX_S
+
+    nonce: uint256 = self.nonces[_owner]
+    struct_hash: bytes32 = keccak256(abi_encode(PERMIT_TYPEHASH, _owner, _spender, _value, nonce, _deadline))
+    digest: bytes32 = keccak256(concat(b"\x19\x01", self._domainSeparator(), struct_hash))
+    assert ecrecover(digest, _v, _r, _s) == _owner
+
+    self.nonces[_owner] = nonce + 1
+    self.allowance[_owner][_spender] = _value
+    log Approval(owner=_owner, spender=_spender, value=_value)
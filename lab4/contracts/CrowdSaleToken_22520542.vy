@@ -1,4 +1,5 @@
 # @version ^0.4.3
+import merkle_proof
 from ethereum.ercs import IERC20
 from ethereum.ercs import IERC20Detailed
 
@@ -19,6 +20,10 @@ event Payment:
     buyer: indexed(address)
     value: uint256
 
+event RefundFailed:
+    buyer: indexed(address)
+    value: uint256
+
 name: public(String[32])
 symbol: public(String[32])
 decimals: public(uint8)
@@ -29,6 +34,24 @@ totalSupply: public(uint256)
 
 ethBalances: public(HashMap[address, uint256])
 
+# Every distinct buyer in purchase order, walked by refundBatch
+buyers: public(HashMap[uint256, address])
+buyerCount: public(uint256)
+refundCursor: public(uint256)
+MAX_REFUND_BATCH: constant(uint256) = 100
+REFUND_CALL_GAS: constant(uint256) = 30000
+
+# EIP-2612 permit
+nonces: public(HashMap[address, uint256])
+EIP712_DOMAIN_TYPEHASH: constant(bytes32) = keccak256("EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+PERMIT_TYPEHASH: constant(bytes32) = keccak256("Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)")
+EIP712_VERSION: constant(String[1]) = "1"
+MAX_S: constant(uint256) = 57896044618658097711785492504343953926418782139537452191302581570759080747168 # secp256k1n / 2
+
+# Merkle allowlist: while a root is set, only buyers with a proof of their
+# (address, cap) leaf can buy, through buyAllowlisted
+allowlistRoot: public(bytes32)
+
 beneficiary: public(address)
 minFundingGoal: public(uint256)
 maxFundingGoal: public(uint256)
@@ -59,26 +82,56 @@ def __init__(_name: String[32], _symbol: String[32], _decimals: uint8, _supply:
 @external
 @payable
 def __default__():
-    assert msg.sender != self.beneficiary
+    assert self.allowlistRoot == empty(bytes32)
+    self._buy(msg.sender, msg.value)
+
+@external
+@payable
+def buyAllowlisted(_cap: uint256, _proof: DynArray[bytes32, merkle_proof.MAX_PROOF_LENGTH]):
+    """
+    @dev Buy tokens as a member of the allowlist. The leaf is
+         keccak256(keccak256(abi_encode(buyer, cap))), and proofs hash sorted pairs.
+    @param _cap Most ETH (in wei) the buyer may contribute in total.
+    @param _proof Sibling hashes from the buyer's leaf up to allowlistRoot.
+    """
+    leaf: bytes32 = keccak256(keccak256(abi_encode(msg.sender, _cap)))
+    assert merkle_proof.verify(_proof, self.allowlistRoot, leaf)
+    assert self.ethBalances[msg.sender] + msg.value <= _cap
+    self._buy(msg.sender, msg.value)
+
+@external
+def setAllowlistRoot(_root: bytes32):
+    """
+    @dev Restrict purchases to the allowlist with this Merkle root; the empty root opens the sale to everyone.
+    """
+    assert msg.sender == self.beneficiary
+    self.allowlistRoot = _root
+
+@internal
+def _buy(_buyer: address, _value: uint256):
+    assert _buyer != self.beneficiary
     assert self.crowdsaleClosed == False
-    assert self.amountRaised + msg.value <= self.maxFundingGoal
-    assert msg.value >= as_wei_value(0.01, "ether")
+    assert self.amountRaised + _value <= self.maxFundingGoal
+    assert _value >= as_wei_value(0.01, "ether")
 
     # Update ETH balances and amount raised
-    self.ethBalances[msg.sender] += msg.value
-    self.amountRaised += msg.value
+    if self.ethBalances[_buyer] == 0:
+        self.buyers[self.buyerCount] = _buyer
+        self.buyerCount += 1
+    self.ethBalances[_buyer] += _value
+    self.amountRaised += _value
 
-    # Calculate tokens to give (1 ETH = 100 tokens, so token_amount = msg.value // price)
-    token_amount: uint256 = msg.value // self.price
+    # Calculate tokens to give (1 ETH = 100 tokens, so token_amount = _value // price)
+    token_amount: uint256 = _value // self.price
 
     # Transfer tokens from beneficiary to buyer
     assert self.balanceOf[self.beneficiary] >= token_amount
     self.balanceOf[self.beneficiary] -= token_amount
-    self.balanceOf[msg.sender] += token_amount
+    self.balanceOf[_buyer] += token_amount
 
     # Log events
-    log Transfer(sender=self.beneficiary, receiver=msg.sender, value=token_amount)
-    log Payment(buyer=msg.sender, value=msg.value)
+    log Transfer(sender=self.beneficiary, receiver=_buyer, value=token_amount)
+    log Payment(buyer=_buyer, value=_value)
 
 @external
 def checkGoalReached():
@@ -111,6 +164,49 @@ def safeWithdrawal():
         send(msg.sender, amount)
         log Transfer(sender=msg.sender, receiver=self.beneficiary, value=token_amount)
 
+@external
+@nonreentrant
+def refundBatch(_count: uint256) -> uint256:
+    """
+    @dev Refund the next `_count` buyers (at most MAX_REFUND_BATCH) of a sale that missed
+         its goal. Anyone can call it, the ETH only goes back to buyers. A buyer who no
+         longer holds the purchased tokens, or whose address rejects the payment, is
+         skipped with a RefundFailed event and can still use safeWithdrawal.
+    @param _count Number of buyers to process in this transaction.
+    @return Index of the next buyer; equals buyerCount once every buyer was processed.
+    """
+    assert self.crowdsaleClosed == True
+    assert self.fundingGoalReached == False
+    assert _count <= MAX_REFUND_BATCH
+
+    start: uint256 = self.refundCursor
+    end: uint256 = min(start + _count, self.buyerCount)
+    for i: uint256 in range(start, end, bound=MAX_REFUND_BATCH):
+        buyer: address = self.buyers[i]
+        amount: uint256 = self.ethBalances[buyer]
+        if amount == 0:
+            continue  # Already refunded through safeWithdrawal
+
+        token_amount: uint256 = amount // self.price
+        if self.balanceOf[buyer] < token_amount:
+            log RefundFailed(buyer=buyer, value=amount)
+            continue
+
+        # Settle before paying out; undone below if the payment fails
+        self.ethBalances[buyer] = 0
+        self.balanceOf[buyer] -= token_amount
+        self.balanceOf[self.beneficiary] += token_amount
+        if raw_call(buyer, b"", value=amount, gas=REFUND_CALL_GAS, revert_on_failure=False):
+            log Transfer(sender=buyer, receiver=self.beneficiary, value=token_amount)
+        else:
+            self.ethBalances[buyer] = amount
+            self.balanceOf[buyer] += token_amount
+            self.balanceOf[self.beneficiary] -= token_amount
+            log RefundFailed(buyer=buyer, value=amount)
+
+    self.refundCursor = end
+    return end
+
 @external
 def transfer(_to : address, _value : uint256) -> bool:
     """
@@ -153,3 +249,39 @@ def approve(_spender : address, _value : uint256) -> bool:
     self.allowance[msg.sender][_spender] = _value
     log Approval(owner=msg.sender, spender=_spender, value=_value)
     return True
+
+
+@view
+@internal
+def _domainSeparator() -> bytes32:
+    return keccak256(abi_encode(EIP712_DOMAIN_TYPEHASH, keccak256(self.name), keccak256(EIP712_VERSION), chain.id, self))
+
+
+@view
+@external
+def DOMAIN_SEPARATOR() -> bytes32:
+    return self._domainSeparator()
+
+
+@external
+def permit(_owner: address, _spender: address, _value: uint256, _deadline: uint256, _v: uint8, _r: bytes32, _s: bytes32):
+    """
+    @dev EIP-2612: set an allowance from the owner's signature, so the spender can
+         submit it right before transferFrom instead of waiting for an approve.
+    @param _owner The address whose tokens may be spent.
+    @param _spender The address which will spend the funds.
+    @param _value The amount of tokens to be spent.
+    @param _deadline Last timestamp at which the permit can be used.
+    """
+    assert block.timestamp <= _deadline
+    assert _owner != empty(address)
+    assert convert(_s, uint256) <= MAX_S
+
+    nonce: uint256 = self.nonces[_owner]
+    struct_hash: bytes32 = keccak256(abi_encode(PERMIT_TYPEHASH, _owner, _spender, _value, nonce, _deadline))
+    digest: bytes32 = keccak256(concat(b"\x19\x01", self._domainSeparator(), struct_hash))
+    assert ecrecover(digest, _v, _r, _s) == _owner
+
+    self.nonces[_owner] = nonce + 1
+    self.allowance[_owner][_spender] = _value
+    log Approval(owner=_owner, spender=_spender, value=_value)
@@ -0,0 +1,21 @@
+# @version ^0.4.3
+"""
+@title Merkle proofs for the CrowdSaleToken allowlist
+@notice Imported by both CrowdSaleToken variants, so they verify proofs with
+        the same code. Leaves are hashed up with each sibling, the smaller
+        hash first, as OpenZeppelin's MerkleProof does.
+"""
+
+MAX_PROOF_LENGTH: constant(uint256) = 32
+
+
+@pure
+@internal
+def verify(_proof: DynArray[bytes32, MAX_PROOF_LENGTH], _root: bytes32, _leaf: bytes32) -> bool:
+    node: bytes32 = _leaf
+    for sibling: bytes32 in _proof:
+        if convert(node, uint256) < convert(sibling, uint256):
+            node = keccak256(concat(node, sibling))
+        else:
+            node = keccak256(concat(sibling, node))
+    return _root != empty(bytes32) and node == _root
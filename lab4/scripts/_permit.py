@@ -0,0 +1,74 @@
+"""
+EIP-2612 permits for CrowdSaleToken
+
+The owner signs an allowance off chain; the spender submits the permit and the
+transferFrom it enables with consecutive nonces, back to back, so the transfer
+does not wait for a separate approve transaction to confirm.
+"""
+import json
+import sys
+from pathlib import Path
+
+from eth_account.messages import encode_typed_data
+from eth_utils import to_hex
+
+# The EIP-712 domain and back-to-back sending are shared with lab5 through
+# testkit/ at the repository root
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from testkit.eip712 import build_typed_data  # noqa: E402
+from testkit.send import send_together  # noqa: E402
+
+
+PERMIT = [
+    {"name": "owner", "type": "address"},
+    {"name": "spender", "type": "address"},
+    {"name": "value", "type": "uint256"},
+    {"name": "nonce", "type": "uint256"},
+    {"name": "deadline", "type": "uint256"},
+]
+
+
+def permit_data(token, owner, spender, value, deadline):
+    """EIP-712 data for ``permit`` at the owner's current nonce"""
+    return build_typed_data(token, "Permit", PERMIT, {
+        "owner": owner,
+        "spender": spender,
+        "value": value,
+        "nonce": token.nonces(owner),
+        "deadline": deadline,
+    })
+
+
+def sign_permit(account, typed_data):
+    """``(v, r, s)`` of the permit, or ``None`` if signing was declined"""
+    signature = account.sign_message(encode_typed_data(full_message=typed_data))
+    return (signature.v, to_hex(signature.r), to_hex(signature.s)) if signature else None
+
+
+def save_permit(path, typed_data, vrs):
+    v, r, s = vrs
+    Path(path).write_text(json.dumps({"typedData": typed_data, "v": v, "r": r, "s": s}, indent=2))
+
+
+def load_permit(path):
+    """``(typed_data, (v, r, s))`` from a file written by ``save_permit``"""
+    permit = json.loads(Path(path).read_text())
+    return permit["typedData"], (permit["v"], permit["r"], permit["s"])
+
+
+def submit_with_transfer(token, spender, typed_data, vrs, recipient=None, amount=None):
+    """
+    Send the permit and, with a ``recipient``, ``transferFrom(owner, recipient, amount)``
+    from ``spender`` without waiting for the permit to confirm first
+
+    Each is estimated against the pending block, so the transfer sees the permit.
+
+    @return Receipts in the order sent
+    """
+    message = typed_data["message"]
+    calls = [(token.permit, (message["owner"], message["spender"], message["value"],
+                             message["deadline"], *vrs))]
+    if recipient:
+        calls.append((token.transferFrom, (message["owner"], recipient, amount or message["value"])))
+
+    return send_together(spender, calls)
@@ -0,0 +1,75 @@
+"""
+Batched refunds for a CrowdSaleToken that missed its funding goal
+
+``refundBatch`` keeps its cursor on chain, so a run that stops part way picks
+up where it left off the next time ``refund_all`` is called.
+"""
+from dataclasses import dataclass, field
+
+from ape import chain
+
+
+MAX_REFUND_BATCH = 100  # Same cap as the contract
+
+
+@dataclass
+class RefundSummary:
+    """What one ``refund_all`` run sent"""
+
+    batches: int = 0
+    gas_used: int = 0
+    failed: list = field(default_factory=list)  # Buyers left to safeWithdrawal
+
+
+class RefundError(Exception):
+    """The sale cannot be refunded"""
+
+
+def close_sale(contract, sender):
+    """
+    Close a sale whose deadline has passed
+
+    @return True if this call closed it, False if it was already closed
+    @raise RefundError While the sale is open, or if it reached its goal
+    """
+    if chain.pending_timestamp <= contract.deadline():
+        raise RefundError("The sale is still open")
+
+    closed_now = not contract.crowdsaleClosed()
+    if closed_now:
+        contract.checkGoalReached(sender=sender)
+    if contract.fundingGoalReached():
+        raise RefundError("The funding goal was reached; there is nothing to refund")
+
+    return closed_now
+
+
+def pick_batch_size(contract, sender, gas_budget):
+    """Largest batch (halving from the cap) whose estimate fits in ``gas_budget``"""
+    size = MAX_REFUND_BATCH
+    while size > 1 and contract.refundBatch.estimate_gas_cost(size, sender=sender) > gas_budget:
+        size //= 2
+
+    return size
+
+
+def refund_all(contract, sender, batch_size, on_batch=None):
+    """
+    Send ``refundBatch(batch_size)`` until the cursor reaches ``buyerCount``
+
+    @param on_batch Optional callback(cursor, total) after every batch
+    @return RefundSummary
+    """
+    summary = RefundSummary()
+    total = contract.buyerCount()
+    cursor = contract.refundCursor()
+    while cursor < total:
+        receipt = contract.refundBatch(batch_size, sender=sender)
+        summary.failed.extend(log.buyer for log in receipt.decode_logs(contract.RefundFailed))
+        summary.gas_used += receipt.gas_used
+        summary.batches += 1
+        cursor = contract.refundCursor()
+        if on_batch:
+            on_batch(cursor, total)
+
+    return summary
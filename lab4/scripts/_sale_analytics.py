@@ -0,0 +1,298 @@
+"""
+Crowdsale analytics built from Payment and Transfer logs
+
+Logs are fetched as raw ``eth_getLogs`` pages and decoded straight into NumPy
+arrays, skipping ape's per-log ABI decoding. ``SaleAnalytics`` keeps the arrays and
+running per-address totals up to date page by page; summaries (per block and
+hour, histogram, top contributors, goal projection) are computed from them with
+vectorized reductions.
+"""
+import csv
+import json
+from pathlib import Path
+
+import numpy as np
+from ape import chain
+from ape.utils import ZERO_ADDRESS
+from eth_utils import keccak, to_checksum_address, to_hex
+
+
+WEI_PER_ETH = 10**18
+PAYMENT_TOPIC = to_hex(keccak(text="Payment(address,uint256)"))
+TRANSFER_TOPIC = to_hex(keccak(text="Transfer(address,address,uint256)"))
+
+
+# ========== Fetching ==========
+
+def _hex(value):
+    return to_hex(value) if isinstance(value, (bytes, bytearray)) else value
+
+
+def _int(value):
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def fetch_logs(address, start_block, stop_block):
+    """Raw Payment and Transfer logs of ``address`` in an inclusive block range, in chain order"""
+    logs = chain.provider.web3.eth.get_logs({
+        "address": address,
+        "fromBlock": start_block,
+        "toBlock": stop_block,
+        "topics": [[PAYMENT_TOPIC, TRANSFER_TOPIC]],
+    })
+    logs = [
+        (_int(log["blockNumber"]), _int(log["logIndex"]), [_hex(topic) for topic in log["topics"]],
+         _hex(log["data"]))
+        for log in logs
+    ]
+    logs.sort(key=lambda log: (log[0], log[1]))
+    return logs
+
+
+def block_timestamps(numbers):
+    """Timestamp of every block in ``numbers``, batched where the provider allows it"""
+    web3 = chain.provider.web3
+    try:
+        with web3.batch_requests() as batch:
+            for number in numbers:
+                batch.add(web3.eth.get_block(number))
+            blocks = batch.execute()
+    except Exception:
+        blocks = [web3.eth.get_block(number) for number in numbers]
+
+    return {number: block["timestamp"] for number, block in zip(numbers, blocks)}
+
+
+def _topic_address(topic):
+    """Lowercase address from an indexed topic (checksummed only for output)"""
+    return "0x" + topic[-40:].lower()
+
+
+# ========== Aggregates ==========
+
+class _Column:
+    """Append-only NumPy array with amortized growth"""
+
+    def __init__(self, dtype):
+        self.data = np.empty(1024, dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        end = self.size + len(values)
+        if end > len(self.data):
+            grown = np.empty(max(end, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    @property
+    def values(self):
+        return self.data[:self.size]
+
+
+class SaleAnalytics:
+    """Incremental aggregates of one CrowdSaleToken sale"""
+
+    def __init__(self, beneficiary, min_goal, max_goal, deadline):
+        """
+        @param beneficiary Sale beneficiary (its token balance is not "circulating")
+        @param min_goal minFundingGoal in wei
+        @param max_goal maxFundingGoal in wei
+        @param deadline Sale deadline (unix timestamp)
+        """
+        self.beneficiary = beneficiary.lower()
+        self.min_goal = min_goal
+        self.max_goal = max_goal
+        self.deadline = deadline
+
+        # One row per Payment, in chain order
+        self.blocks = _Column(np.int64)
+        self.timestamps = _Column(np.int64)
+        self.buyers = _Column(np.int32)   # index into self.addresses
+        self.values = _Column(np.float64)  # ETH
+
+        # Running totals per address index
+        self.addresses = []
+        self._index = {}
+        self.contributed = np.zeros(0)      # ETH paid
+        self.token_balances = np.zeros(0)   # tokens received from the sale and transfers
+
+        self.raised_wei = 0
+        self.transfer_count = 0
+        self.last_block = None
+
+    def _address_indices(self, addresses):
+        indices = np.empty(len(addresses), dtype=np.int32)
+        for position, address in enumerate(addresses):
+            index = self._index.get(address)
+            if index is None:
+                index = self._index[address] = len(self.addresses)
+                self.addresses.append(address)
+            indices[position] = index
+
+        missing = len(self.addresses) - len(self.contributed)
+        if missing > 0:
+            self.contributed = np.concatenate([self.contributed, np.zeros(missing)])
+            self.token_balances = np.concatenate([self.token_balances, np.zeros(missing)])
+        return indices
+
+    def ingest(self, logs, timestamps, stop_block):
+        """
+        Add one page of raw logs (as returned by ``fetch_logs``)
+
+        @param timestamps Block number -> timestamp for every block in ``logs``
+        @param stop_block Last block the page covers
+        """
+        payments = [log for log in logs if log[2][0] == PAYMENT_TOPIC]
+        transfers = [log for log in logs if log[2][0] == TRANSFER_TOPIC]
+
+        if payments:
+            wei = [int(data, 16) for _, _, _, data in payments]
+            self.raised_wei += sum(wei)
+            buyers = self._address_indices([_topic_address(topics[1]) for _, _, topics, _ in payments])
+            eth = np.array(wei, dtype=np.float64) / WEI_PER_ETH
+
+            self.blocks.extend([block for block, _, _, _ in payments])
+            self.timestamps.extend([timestamps[block] for block, _, _, _ in payments])
+            self.buyers.extend(buyers)
+            self.values.extend(eth)
+            np.add.at(self.contributed, buyers, eth)
+
+        if transfers:
+            senders = self._address_indices([_topic_address(topics[1]) for _, _, topics, _ in transfers])
+            receivers = self._address_indices([_topic_address(topics[2]) for _, _, topics, _ in transfers])
+            amounts = np.array([int(data, 16) for _, _, _, data in transfers], dtype=np.float64)
+            np.subtract.at(self.token_balances, senders, amounts)
+            np.add.at(self.token_balances, receivers, amounts)
+            self.transfer_count += len(transfers)
+
+        self.last_block = stop_block
+
+    def sync(self, address, start_block, stop_block, page_size=5000):
+        """
+        Fetch and ingest the logs of ``address`` in an inclusive block range, page by page
+
+        @return The next block to read
+        """
+        for page_start in range(start_block, stop_block + 1, page_size):
+            page_stop = min(stop_block, page_start + page_size - 1)
+            logs = fetch_logs(address, page_start, page_stop)
+            self.ingest(logs, block_timestamps(sorted({log[0] for log in logs})), page_stop)
+
+        return max(start_block, stop_block + 1)
+
+    # ========== Summaries ==========
+
+    @staticmethod
+    def _group_sums(keys, values):
+        """Sums of ``values`` per run of equal, sorted ``keys``"""
+        if not len(keys):
+            return keys, values
+
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        return keys[starts], np.add.reduceat(values, starts)
+
+    def raised_per_block(self):
+        return self._group_sums(self.blocks.values, self.values.values)
+
+    def raised_per_hour(self):
+        """(hour start timestamps, ETH raised in each hour with payments)"""
+        hours, raised = self._group_sums(self.timestamps.values // 3600, self.values.values)
+        return hours * 3600, raised
+
+    def histogram(self, bins=12):
+        """Payment sizes on log-spaced bins from the smallest payment to maxFundingGoal"""
+        values = self.values.values
+        low = max(values.min(), 1e-9) if len(values) else 0.01
+        edges = np.geomspace(low, max(self.max_goal / WEI_PER_ETH, low * 2), bins + 1)
+        counts, edges = np.histogram(values, bins=edges)
+        return edges, counts
+
+    def top_contributors(self, count=10):
+        """[(address, ETH)] of the largest buyers, largest first"""
+        paid = self.contributed
+        count = min(count, int(np.count_nonzero(paid)))
+        if count == 0:
+            return []
+
+        top = np.argpartition(-paid, count - 1)[:count]
+        top = top[np.argsort(-paid[top], kind="stable")]
+        return [(to_checksum_address(self.addresses[index]), float(paid[index])) for index in top]
+
+    def projection(self, now, window=24 * 3600):
+        """
+        When minFundingGoal and maxFundingGoal will be reached at the recent pace
+
+        The pace is the ETH raised per second over the last ``window`` seconds.
+        ETAs are ``None`` if there was no recent payment, and a goal that is
+        already reached has ETA ``now``.
+        """
+        timestamps, values = self.timestamps.values, self.values.values
+        recent = values[timestamps > now - window].sum()
+        rate = recent / window
+        raised = self.raised_wei / WEI_PER_ETH
+
+        def eta(goal_wei):
+            missing = goal_wei / WEI_PER_ETH - raised
+            if missing <= 0:
+                return now
+            return int(now + missing / rate) if rate > 0 else None
+
+        eta_min, eta_max = eta(self.min_goal), eta(self.max_goal)
+        return {
+            "eth_per_hour": rate * 3600,
+            "min_goal_eta": eta_min,
+            "max_goal_eta": eta_max,
+            "min_goal_before_deadline": eta_min is not None and eta_min <= self.deadline,
+        }
+
+    def summary(self, now, top=10):
+        """Everything above as plain JSON-ready values"""
+        hours, hourly = self.raised_per_hour()
+        edges, counts = self.histogram()
+        circulating = self.token_balances.copy()
+        if self.beneficiary in self._index:
+            circulating[self._index[self.beneficiary]] = 0
+        if ZERO_ADDRESS in self._index:
+            circulating[self._index[ZERO_ADDRESS]] = 0
+
+        return {
+            "last_block": self.last_block,
+            "payments": self.values.size,
+            "raised_eth": self.raised_wei / WEI_PER_ETH,
+            "min_goal_eth": self.min_goal / WEI_PER_ETH,
+            "max_goal_eth": self.max_goal / WEI_PER_ETH,
+            "unique_buyers": int(np.count_nonzero(self.contributed)),
+            "transfers": self.transfer_count,
+            "token_holders": int(np.count_nonzero(circulating > 0)),
+            "tokens_circulating": float(circulating[circulating > 0].sum()),
+            "raised_per_hour": [[int(hour), float(eth)] for hour, eth in zip(hours, hourly)],
+            "histogram": [[float(low), float(high), int(count)]
+                          for low, high, count in zip(edges[:-1], edges[1:], counts)],
+            "top_contributors": [[address, eth] for address, eth in self.top_contributors(top)],
+            "projection": self.projection(now),
+        }
+
+    # ========== Export ==========
+
+    def write_json(self, path, now, top=10):
+        Path(path).write_text(json.dumps(self.summary(now, top), indent=2) + "\n")
+
+    def write_csv(self, directory, top=10):
+        """Write per_block.csv, per_hour.csv, histogram.csv and top_contributors.csv"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        def write(name, header, rows):
+            with open(directory / name, "w", newline="", encoding="utf8") as output:
+                writer = csv.writer(output)
+                writer.writerow(header)
+                writer.writerows(rows)
+
+        write("per_block.csv", ["block", "raised_eth"], zip(*map(np.ndarray.tolist, self.raised_per_block())))
+        write("per_hour.csv", ["hour_start", "raised_eth"], zip(*map(np.ndarray.tolist, self.raised_per_hour())))
+        edges, counts = self.histogram()
+        write("histogram.csv", ["min_eth", "max_eth", "payments"],
+              zip(edges[:-1].tolist(), edges[1:].tolist(), counts.tolist()))
+        write("top_contributors.csv", ["address", "contributed_eth"], self.top_contributors(top))
@@ -0,0 +1,63 @@
+"""
+Sign CrowdSaleToken allowances off-chain and spend them in one submission
+"""
+import click
+from ape import accounts, chain, project
+from ape.cli import ConnectedProviderCommand
+
+from scripts._permit import load_permit, permit_data, save_permit, sign_permit, submit_with_transfer
+
+
+def load_account(alias):
+    account = accounts.load(alias)
+    if hasattr(account, "set_autosign"):
+        account.set_autosign(True)
+    return account
+
+
+@click.group()
+def cli():
+    """Gasless approvals for CrowdSaleToken (EIP-2612 permits)"""
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.option("--contract", "contract_address", required=True, help="CrowdSaleToken address (either variant)")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Token owner account alias that signs")
+@click.option("--spender", required=True, help="Address allowed to spend")
+@click.option("--value", type=int, required=True, help="Allowance in the token's smallest unit")
+@click.option("--expires", default=3600, show_default=True, help="Seconds until the permit expires")
+@click.option("--output", default="permit.json", show_default=True, help="File to write the permit to")
+def sign(contract_address, account_alias, spender, value, expires, output):
+    """Sign a permit; no transaction is sent"""
+    token = project.CrowdSaleToken_22520542.at(contract_address)
+    owner = load_account(account_alias)
+    deadline = chain.pending_timestamp + expires
+
+    typed_data = permit_data(token, owner.address, spender, value, deadline)
+    vrs = sign_permit(owner, typed_data)
+    if vrs is None:
+        raise click.ClickException("Signing was declined")
+
+    save_permit(output, typed_data, vrs)
+    print(f"✅ Permit written to {output}")
+    print(f"Nonce: {typed_data['message']['nonce']}  Deadline: {deadline}")
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.argument("permit", type=click.Path(exists=True, dir_okay=False))
+@click.option("--contract", "contract_address", required=True, help="CrowdSaleToken address (either variant)")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Spender account alias that submits")
+@click.option("--to", "recipient", default=None, help="Also transferFrom the owner to this address")
+@click.option("--amount", type=int, default=None, help="Amount to transfer (defaults to the full allowance)")
+def submit(permit, contract_address, account_alias, recipient, amount):
+    """Submit PERMIT, followed by transferFrom when --to is given"""
+    token = project.CrowdSaleToken_22520542.at(contract_address)
+    spender = load_account(account_alias)
+    typed_data, vrs = load_permit(permit)
+
+    receipts = submit_with_transfer(token, spender, typed_data, vrs, recipient, amount)
+    for name, receipt in zip(("permit", "transferFrom"), receipts):
+        status = "✅" if not receipt.failed else "❌"
+        print(f"{status} {name}: {receipt.txn_hash} (gas {receipt.gas_used:,})")
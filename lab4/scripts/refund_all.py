@@ -0,0 +1,55 @@
+"""
+Refund every buyer of a crowdsale that missed its funding goal, in batches
+"""
+import click
+from ape import accounts, chain, project
+from ape.cli import ConnectedProviderCommand
+
+from scripts._refunds import MAX_REFUND_BATCH, RefundError, close_sale, pick_batch_size, refund_all
+
+
+def progress(cursor, total):
+    print(f"\rProcessed: {cursor}/{total}", end="", flush=True)
+
+
+@click.command(cls=ConnectedProviderCommand)
+@click.option("--contract", "contract_address", required=True,
+              help="CrowdSaleToken address (either variant)")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Account alias that sends the batches (anyone can)")
+@click.option("--batch-size", type=click.IntRange(1, MAX_REFUND_BATCH), default=None,
+              help="Buyers per transaction (picked from --gas-fraction if omitted)")
+@click.option("--gas-fraction", type=click.FloatRange(0, 1, min_open=True), default=0.5,
+              show_default=True, help="Largest share of the block gas limit one batch may use")
+def cli(contract_address, account_alias, batch_size, gas_fraction):
+    """Run refundBatch until every buyer has been processed"""
+    contract = project.CrowdSaleToken_22520542.at(contract_address)
+    sender = accounts.load(account_alias)
+    if hasattr(sender, "set_autosign"):
+        # Unlock once instead of prompting for every batch
+        sender.set_autosign(True)
+
+    try:
+        if close_sale(contract, sender):
+            print("Closed the sale")
+    except RefundError as err:
+        raise click.ClickException(str(err))
+
+    total = contract.buyerCount()
+    cursor = contract.refundCursor()
+    if batch_size is None:
+        gas_budget = int(chain.blocks.head.gas_limit * gas_fraction)
+        batch_size = pick_batch_size(contract, sender, gas_budget)
+    print(f"{total - cursor} of {total} buyer(s) left, {batch_size} per batch")
+
+    summary = refund_all(contract, sender, batch_size, on_batch=progress)
+
+    print(f"\n\n📊 Refund Summary:")
+    print(f"Batches: {summary.batches}")
+    print(f"Gas used: {summary.gas_used:,}")
+    if summary.failed:
+        print(f"⚠️  {len(summary.failed)} buyer(s) could not be refunded in a batch and must call safeWithdrawal:")
+        for buyer in summary.failed:
+            print(f"  {buyer}")
+    else:
+        print("✅ All buyers refunded")
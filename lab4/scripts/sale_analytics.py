@@ -0,0 +1,78 @@
+"""
+Stream a crowdsale's Payment/Transfer logs into running analytics
+"""
+import time
+from datetime import datetime, timezone
+
+import click
+from ape import chain, project
+from ape.cli import ConnectedProviderCommand
+
+from scripts._sale_analytics import SaleAnalytics
+
+
+def fmt_time(timestamp):
+    if timestamp is None:
+        return "never at the current pace"
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+
+
+def print_summary(summary):
+    print(f"\n📊 Crowdsale Analytics (block {summary['last_block']}):")
+    print(f"Raised: {summary['raised_eth']:.4f} ETH "
+          f"(goal {summary['min_goal_eth']:g}, cap {summary['max_goal_eth']:g})")
+    print(f"Payments: {summary['payments']}  Unique buyers: {summary['unique_buyers']}")
+    print(f"Transfers: {summary['transfers']}  Token holders: {summary['token_holders']}")
+
+    projection = summary["projection"]
+    print(f"Pace (last 24h): {projection['eth_per_hour']:.4f} ETH/hour")
+    print(f"Goal reached: {fmt_time(projection['min_goal_eta'])}  "
+          f"Cap reached: {fmt_time(projection['max_goal_eta'])}")
+    if not projection["min_goal_before_deadline"]:
+        print("⚠️  At this pace the goal is not reached before the deadline")
+
+    print("\nPayment sizes (ETH):")
+    for low, high, count in summary["histogram"]:
+        if count:
+            print(f"  {low:>10.4f} - {high:<10.4f} {count}")
+
+    print("\nTop contributors:")
+    for address, eth in summary["top_contributors"]:
+        print(f"  {address}  {eth:.4f} ETH")
+
+
+@click.command(cls=ConnectedProviderCommand)
+@click.option("--contract", "contract_address", required=True, help="CrowdSaleToken address")
+@click.option("--from-block", type=int, default=0, show_default=True, help="First block to read")
+@click.option("--page-size", default=5000, show_default=True, help="Blocks per eth_getLogs query")
+@click.option("--follow", is_flag=True, help="Keep polling for new blocks and refresh the summary")
+@click.option("--interval", default=10.0, show_default=True, help="Seconds between polls with --follow")
+@click.option("--top", default=10, show_default=True, help="Number of top contributors")
+@click.option("--json", "json_path", type=click.Path(dir_okay=False), default=None,
+              help="Write the summary as JSON")
+@click.option("--csv-dir", type=click.Path(file_okay=False), default=None,
+              help="Write per-block, per-hour, histogram and top-contributor CSV files")
+def cli(contract_address, from_block, page_size, follow, interval, top, json_path, csv_dir):
+    """Summarize (and optionally follow) a crowdsale from its event logs"""
+    contract = project.CrowdSaleToken_22520542.at(contract_address)
+    analytics = SaleAnalytics(
+        contract.beneficiary(), contract.minFundingGoal(), contract.maxFundingGoal(), contract.deadline()
+    )
+
+    next_block = from_block
+    while True:
+        head = chain.blocks.height
+        started = time.time()
+        next_block = analytics.sync(contract.address, next_block, head, page_size)
+
+        now = chain.blocks.head.timestamp
+        print_summary(analytics.summary(now, top))
+        print(f"\n(updated in {time.time() - started:.2f}s)")
+        if json_path:
+            analytics.write_json(json_path, now, top)
+        if csv_dir:
+            analytics.write_csv(csv_dir, top)
+
+        if not follow:
+            break
+        time.sleep(interval)
@@ -1,9 +1,84 @@
+"""
+Deployments are session-scoped: ape reverts the chain to a snapshot after
+every test, so each test still starts from a freshly deployed state.
+"""
+import sys
+from pathlib import Path
+
 import pytest
 
-@pytest.fixture
+
+# The tests of the scripts' helpers import them as ``scripts._<name>``, like ``ape run`` does;
+# helpers shared with lab5's suite live in testkit/ at the repository root
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from testkit.eip712 import sign_typed_data  # noqa: E402
+from testkit.gas_baseline import GasBaseline  # noqa: E402
+from testkit.merkle import allowlist  # noqa: E402
+
+
+# Gas regression baseline (see test_gas.py and testkit/gas_baseline.py)
+GAS_BASELINE_FILE = Path(__file__).parent / "gas_baseline.json"
+
+
+@pytest.fixture(scope="session")
 def deployer(accounts):
     return accounts[0]
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def contract(deployer, project):
     return deployer.deploy(project.VerySimpleToken)
+
+# CrowdSaleToken variants sharing one ABI; every crowdsale test runs against each
+CROWD_SALE_VARIANTS = ["CrowdSaleToken_22520542", "CrowdSaleTokenOptimized"]
+
+@pytest.fixture(scope="session", params=CROWD_SALE_VARIANTS)
+def crowd_sale_variant(request):
+    return request.param
+
+@pytest.fixture(scope="session")
+def crowd_sale_token(deployer, project, crowd_sale_variant):
+    return deployer.deploy(getattr(project, crowd_sale_variant), "CrowdSale", "CS", 18, 1000)
+
+@pytest.fixture
+def optimized_crowd_sale_token(crowd_sale_token, crowd_sale_variant):
+    """crowd_sale_token, for tests of behaviour only the optimized variant has"""
+    if crowd_sale_variant != "CrowdSaleTokenOptimized":
+        pytest.skip("CrowdSaleTokenOptimized only")
+    return crowd_sale_token
+
+
+PERMIT_FIELDS = [
+    {"name": "owner", "type": "address"},
+    {"name": "spender", "type": "address"},
+    {"name": "value", "type": "uint256"},
+    {"name": "nonce", "type": "uint256"},
+    {"name": "deadline", "type": "uint256"},
+]
+
+@pytest.fixture(scope="session")
+def sign_permit():
+    """sign(token, owner, spender, value, deadline) -> EIP-2612 (v, r, s) at the owner's nonce"""
+
+    def sign(token, owner, spender, value, deadline):
+        signature = sign_typed_data(token, owner, "Permit", PERMIT_FIELDS, {
+            "owner": owner.address, "spender": spender.address, "value": value,
+            "nonce": token.nonces(owner), "deadline": deadline,
+        })
+        return signature.v, signature.r, signature.s
+
+    return sign
+
+
+@pytest.fixture(scope="session")
+def merkle_allowlist():
+    """allowlist([(address, cap), ...]) -> (root, {address: proof}), built the way buyAllowlisted verifies it"""
+    return allowlist
+
+
+@pytest.fixture(scope="session")
+def gas_baseline():
+    """Session-wide gas recorder; set GAS_BASELINE_UPDATE=1 to rewrite the baseline"""
+    baseline = GasBaseline(GAS_BASELINE_FILE)
+    yield baseline
+    baseline.save()
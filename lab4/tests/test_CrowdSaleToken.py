@@ -1,9 +1,5 @@
 import pytest
-from ape import accounts, project
-
-@pytest.fixture
-def crowd_sale_token(deployer):
-    return deployer.deploy(project.CrowdSaleToken_22520542, "CrowdSale", "CS", 18, 1000)
+from ape import accounts, chain
 
 def test_initial_setup(crowd_sale_token, deployer):
     """Test initial contract setup"""
@@ -111,3 +107,176 @@ def test_safe_withdrawal_refund(crowd_sale_token, accounts, chain):
     assert buyer.balance > initial_balance
     assert crowd_sale_token.balanceOf(buyer.address) == 0
     assert crowd_sale_token.ethBalances(buyer.address) == 0
+
+def test_withdrawal_without_finalizing(optimized_crowd_sale_token, deployer, accounts, chain):
+    """Closed and goal reached follow from the deadline, no checkGoalReached needed"""
+    token = optimized_crowd_sale_token
+    for i in range(1, 4):
+        accounts[i].transfer(token.address, 10 * 10**18)
+    assert token.crowdsaleClosed() == False
+    assert token.fundingGoalReached() == False
+
+    chain.pending_timestamp += 3600 * 24 * 101
+    chain.mine()
+    assert token.crowdsaleClosed() == True
+    assert token.fundingGoalReached() == True
+
+    initial_balance = deployer.balance
+    token.safeWithdrawal(sender=deployer)
+    assert deployer.balance > initial_balance
+
+def test_purchase_after_deadline(optimized_crowd_sale_token, accounts, chain):
+    """Purchases stop at the deadline even though nothing was finalized"""
+    chain.pending_timestamp += 3600 * 24 * 101
+    chain.mine()
+
+    with pytest.raises(Exception):
+        accounts[1].transfer(optimized_crowd_sale_token.address, 10**17)
+
+def missed_goal(token, accounts, chain, buyers=4):
+    """Purchases from accounts 1..buyers that stay under minFundingGoal, then close the sale"""
+    for i in range(1, buyers + 1):
+        accounts[i].transfer(token.address, i * 10**17)
+    chain.pending_timestamp += 3600 * 24 * 101
+    chain.mine()
+    token.checkGoalReached(sender=accounts[0])
+
+def test_buyers_are_listed_once(crowd_sale_token, accounts):
+    """Repeat purchases do not add a buyer twice"""
+    accounts[1].transfer(crowd_sale_token.address, 10**17)
+    accounts[2].transfer(crowd_sale_token.address, 10**17)
+    accounts[1].transfer(crowd_sale_token.address, 10**17)
+
+    assert crowd_sale_token.buyerCount() == 2
+    assert crowd_sale_token.buyers(0) == accounts[1].address
+    assert crowd_sale_token.buyers(1) == accounts[2].address
+
+def test_refund_batch(crowd_sale_token, deployer, accounts, chain):
+    """Batches walk the buyer list from a stored cursor until everyone is refunded"""
+    missed_goal(crowd_sale_token, accounts, chain)
+    before = [accounts[i].balance for i in range(1, 5)]
+
+    crowd_sale_token.refundBatch(3, sender=deployer)
+    assert crowd_sale_token.refundCursor() == 3
+    crowd_sale_token.refundBatch(3, sender=deployer)
+    assert crowd_sale_token.refundCursor() == 4
+
+    for i in range(1, 5):
+        assert accounts[i].balance == before[i - 1] + i * 10**17
+        assert crowd_sale_token.ethBalances(accounts[i].address) == 0
+        assert crowd_sale_token.balanceOf(accounts[i].address) == 0
+    assert crowd_sale_token.balanceOf(deployer.address) == crowd_sale_token.totalSupply()
+
+def test_refund_batch_skips_moved_tokens(crowd_sale_token, deployer, accounts, chain):
+    """A buyer who gave the tokens away is skipped instead of blocking the batch"""
+    missed_goal(crowd_sale_token, accounts, chain, buyers=2)
+    crowd_sale_token.transfer(accounts[5], 1, sender=accounts[1])
+
+    receipt = crowd_sale_token.refundBatch(10, sender=accounts[5])
+    failed = list(receipt.decode_logs(crowd_sale_token.RefundFailed))
+    assert [log.buyer for log in failed] == [accounts[1].address]
+    assert crowd_sale_token.ethBalances(accounts[1].address) == 10**17
+    assert crowd_sale_token.ethBalances(accounts[2].address) == 0
+    assert crowd_sale_token.refundCursor() == 2
+
+def test_refund_batch_restrictions(crowd_sale_token, deployer, accounts, chain):
+    """No batch refunds while the sale is open, after it succeeded, or above the batch cap"""
+    accounts[1].transfer(crowd_sale_token.address, 10**17)
+    with pytest.raises(Exception):
+        crowd_sale_token.refundBatch(1, sender=deployer)
+
+    chain.pending_timestamp += 3600 * 24 * 101
+    chain.mine()
+    crowd_sale_token.checkGoalReached(sender=deployer)
+    with pytest.raises(Exception):
+        crowd_sale_token.refundBatch(101, sender=deployer)
+
+def test_refund_batch_after_goal_reached(crowd_sale_token, deployer, accounts, chain):
+    for i in range(1, 4):
+        accounts[i].transfer(crowd_sale_token.address, 10 * 10**18)
+    chain.pending_timestamp += 3600 * 24 * 101
+    chain.mine()
+    crowd_sale_token.checkGoalReached(sender=deployer)
+
+    with pytest.raises(Exception):
+        crowd_sale_token.refundBatch(10, sender=deployer)
+
+def test_permit(crowd_sale_token, deployer, accounts, sign_permit):
+    """Test a spender uses a signed allowance without an approve transaction"""
+    spender = accounts[1]
+    deadline = chain.pending_timestamp + 3600
+    v, r, s = sign_permit(crowd_sale_token, deployer, spender, 100, deadline)
+
+    crowd_sale_token.permit(deployer, spender, 100, deadline, v, r, s, sender=spender)
+    assert crowd_sale_token.allowance(deployer, spender) == 100
+    assert crowd_sale_token.nonces(deployer) == 1
+
+    crowd_sale_token.transferFrom(deployer, accounts[2], 100, sender=spender)
+    assert crowd_sale_token.balanceOf(accounts[2]) == 100
+
+    # The nonce moved on, so the same signature cannot be used again
+    with pytest.raises(Exception):
+        crowd_sale_token.permit(deployer, spender, 100, deadline, v, r, s, sender=spender)
+
+def test_permit_rejected(crowd_sale_token, deployer, accounts, sign_permit):
+    """Test permits with a wrong signer, a changed value or a past deadline"""
+    spender = accounts[1]
+    deadline = chain.pending_timestamp + 3600
+    v, r, s = sign_permit(crowd_sale_token, accounts[3], spender, 100, deadline)
+    with pytest.raises(Exception):
+        crowd_sale_token.permit(deployer, spender, 100, deadline, v, r, s, sender=spender)
+
+    v, r, s = sign_permit(crowd_sale_token, deployer, spender, 100, deadline)
+    with pytest.raises(Exception):
+        crowd_sale_token.permit(deployer, spender, 1000, deadline, v, r, s, sender=spender)
+
+    chain.pending_timestamp += 7200
+    with pytest.raises(Exception):
+        crowd_sale_token.permit(deployer, spender, 100, deadline, v, r, s, sender=spender)
+
+def test_allowlist_purchase(crowd_sale_token, deployer, accounts, merkle_allowlist):
+    """Members buy up to their cap with a proof; plain purchases stop while a root is set"""
+    caps = [(accounts[i].address, i * 10**18) for i in range(1, 6)]
+    root, proofs = merkle_allowlist(caps)
+    crowd_sale_token.setAllowlistRoot(root, sender=deployer)
+    assert crowd_sale_token.allowlistRoot() == root
+
+    buyer = accounts[2]  # cap 2 ETH
+    crowd_sale_token.buyAllowlisted(2 * 10**18, proofs[buyer.address], sender=buyer, value=10**18)
+    crowd_sale_token.buyAllowlisted(2 * 10**18, proofs[buyer.address], sender=buyer, value=10**18)
+    assert crowd_sale_token.ethBalances(buyer) == 2 * 10**18
+    assert crowd_sale_token.balanceOf(buyer) == 200
+
+    # The cap covers everything the buyer paid
+    with pytest.raises(Exception):
+        crowd_sale_token.buyAllowlisted(2 * 10**18, proofs[buyer.address], sender=buyer, value=10**16)
+    with pytest.raises(Exception):
+        accounts[3].transfer(crowd_sale_token.address, 10**17)
+
+def test_allowlist_rejects_bad_proofs(crowd_sale_token, deployer, accounts, merkle_allowlist):
+    """Proofs only work for their own address and cap"""
+    root, proofs = merkle_allowlist([(accounts[i].address, 10**18) for i in range(1, 4)])
+    crowd_sale_token.setAllowlistRoot(root, sender=deployer)
+
+    with pytest.raises(Exception):
+        crowd_sale_token.buyAllowlisted(10**18, proofs[accounts[1].address], sender=accounts[2], value=10**17)
+    with pytest.raises(Exception):
+        crowd_sale_token.buyAllowlisted(10 * 10**18, proofs[accounts[1].address], sender=accounts[1], value=10**17)
+    with pytest.raises(Exception):
+        crowd_sale_token.buyAllowlisted(10**18, [], sender=accounts[5], value=10**17)
+
+def test_allowlist_root_restrictions(crowd_sale_token, deployer, accounts, merkle_allowlist):
+    """Only the beneficiary sets the root, and the empty root reopens the sale"""
+    root, proofs = merkle_allowlist([(accounts[1].address, 10**18)])
+    with pytest.raises(Exception):
+        crowd_sale_token.setAllowlistRoot(root, sender=accounts[1])
+
+    # Without a root there is nothing to prove membership of
+    with pytest.raises(Exception):
+        crowd_sale_token.buyAllowlisted(10**18, proofs[accounts[1].address], sender=accounts[1], value=10**17)
+
+    crowd_sale_token.setAllowlistRoot(root, sender=deployer)
+    crowd_sale_token.buyAllowlisted(10**18, proofs[accounts[1].address], sender=accounts[1], value=10**17)
+    crowd_sale_token.setAllowlistRoot(b"\x00" * 32, sender=deployer)
+    accounts[2].transfer(crowd_sale_token.address, 10**17)
+    assert crowd_sale_token.buyerCount() == 2
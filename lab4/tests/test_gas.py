@@ -0,0 +1,128 @@
+"""
+Gas regression benchmarks for CrowdSaleToken
+
+Gas per call is compared against tests/gas_baseline.json; a test fails when it
+grows by more than GAS_REGRESSION_THRESHOLD percent (default 5). Run with
+GAS_BASELINE_UPDATE=1 to accept new numbers.
+
+Every benchmark runs against both variants; CrowdSaleTokenOptimized entries are
+recorded with an "optimized:" prefix so the baseline lists them side by side.
+"""
+import pytest
+
+ONE_ETH = 10**18
+
+
+@pytest.fixture
+def record_gas(gas_baseline, crowd_sale_variant):
+    """check(name, gas) under the baseline key of the variant being tested"""
+    prefix = "optimized:" if crowd_sale_variant == "CrowdSaleTokenOptimized" else ""
+
+    def check(name, gas):
+        gas_baseline.check(prefix + name, gas)
+
+    return check
+
+
+def close_sale(chain):
+    chain.pending_timestamp += 3600 * 24 * 101
+    chain.mine()
+
+
+PURCHASES = {"min": ONE_ETH // 100, "10eth": 10 * ONE_ETH}
+
+
+@pytest.mark.parametrize("purchase", PURCHASES)
+def test_gas_default_first_purchase(crowd_sale_token, accounts, record_gas, purchase):
+    """First purchase by a buyer (fresh ethBalances / balanceOf slots)"""
+    receipt = accounts[1].transfer(crowd_sale_token.address, PURCHASES[purchase])
+    record_gas(f"__default__[first,{purchase}]", receipt.gas_used)
+
+def test_gas_default_new_buyer(crowd_sale_token, accounts, record_gas):
+    """First purchase of a buyer when others have bought already (buyer list is non-empty)"""
+    accounts[1].transfer(crowd_sale_token.address, ONE_ETH)
+    receipt = accounts[2].transfer(crowd_sale_token.address, ONE_ETH)
+    record_gas("__default__[new buyer]", receipt.gas_used)
+
+def test_gas_default_repeat_purchase(crowd_sale_token, accounts, record_gas):
+    """Second purchase by the same buyer"""
+    accounts[1].transfer(crowd_sale_token.address, ONE_ETH)
+    receipt = accounts[1].transfer(crowd_sale_token.address, ONE_ETH)
+    record_gas("__default__[repeat]", receipt.gas_used)
+
+@pytest.mark.parametrize("members", [8, 1024])
+def test_gas_buyAllowlisted(crowd_sale_token, deployer, accounts, merkle_allowlist, record_gas, members):
+    """First purchase of an allowlisted buyer; the proof grows with log2(members)"""
+    entries = [(accounts[1].address, ONE_ETH)] + [
+        ("0x" + (i + 1).to_bytes(20, "big").hex(), ONE_ETH) for i in range(members - 1)
+    ]
+    root, proofs = merkle_allowlist(entries)
+    crowd_sale_token.setAllowlistRoot(root, sender=deployer)
+    receipt = crowd_sale_token.buyAllowlisted(ONE_ETH, proofs[accounts[1].address],
+                                              sender=accounts[1], value=ONE_ETH)
+    record_gas(f"buyAllowlisted[{members} members]", receipt.gas_used)
+
+def test_gas_checkGoalReached(crowd_sale_token, accounts, chain, record_gas):
+    for i in range(1, 4):
+        accounts[i].transfer(crowd_sale_token.address, 10 * ONE_ETH)
+    close_sale(chain)
+    receipt = crowd_sale_token.checkGoalReached(sender=accounts[0])
+    record_gas("checkGoalReached", receipt.gas_used)
+
+def test_gas_safeWithdrawal_beneficiary(crowd_sale_token, deployer, accounts, chain, record_gas):
+    for i in range(1, 4):
+        accounts[i].transfer(crowd_sale_token.address, 10 * ONE_ETH)
+    close_sale(chain)
+    crowd_sale_token.checkGoalReached(sender=deployer)
+    receipt = crowd_sale_token.safeWithdrawal(sender=deployer)
+    record_gas("safeWithdrawal[beneficiary]", receipt.gas_used)
+
+def test_gas_safeWithdrawal_refund(crowd_sale_token, accounts, chain, record_gas):
+    accounts[1].transfer(crowd_sale_token.address, ONE_ETH)
+    close_sale(chain)
+    crowd_sale_token.checkGoalReached(sender=accounts[0])
+    receipt = crowd_sale_token.safeWithdrawal(sender=accounts[1])
+    record_gas("safeWithdrawal[refund]", receipt.gas_used)
+
+def test_gas_safeWithdrawal_unfinalized(optimized_crowd_sale_token, deployer, accounts, chain, record_gas):
+    """Beneficiary withdrawal straight after the deadline, with no checkGoalReached"""
+    for i in range(1, 4):
+        accounts[i].transfer(optimized_crowd_sale_token.address, 10 * ONE_ETH)
+    close_sale(chain)
+    receipt = optimized_crowd_sale_token.safeWithdrawal(sender=deployer)
+    record_gas("safeWithdrawal[beneficiary,unfinalized]", receipt.gas_used)
+
+@pytest.mark.parametrize("size", [1, 8])
+def test_gas_refundBatch(crowd_sale_token, accounts, chain, record_gas, size):
+    """One refundBatch paying ``size`` buyers"""
+    for i in range(1, size + 1):
+        accounts[i].transfer(crowd_sale_token.address, ONE_ETH // 10)
+    close_sale(chain)
+    crowd_sale_token.checkGoalReached(sender=accounts[0])
+    receipt = crowd_sale_token.refundBatch(size, sender=accounts[0])
+    record_gas(f"refundBatch[{size}]", receipt.gas_used)
+
+def test_gas_transfer_new_holder(crowd_sale_token, deployer, accounts, record_gas):
+    receipt = crowd_sale_token.transfer(accounts[1], 100, sender=deployer)
+    record_gas("transfer[new holder]", receipt.gas_used)
+
+def test_gas_transfer_existing_holder(crowd_sale_token, deployer, accounts, record_gas):
+    crowd_sale_token.transfer(accounts[1], 100, sender=deployer)
+    receipt = crowd_sale_token.transfer(accounts[1], 100, sender=deployer)
+    record_gas("transfer[existing holder]", receipt.gas_used)
+
+def test_gas_approve(crowd_sale_token, deployer, accounts, record_gas):
+    receipt = crowd_sale_token.approve(accounts[1], 100, sender=deployer)
+    record_gas("approve", receipt.gas_used)
+
+def test_gas_permit(crowd_sale_token, deployer, accounts, chain, sign_permit, record_gas):
+    """Signed allowance submitted by the spender (first use of the owner's nonce)"""
+    deadline = chain.pending_timestamp + 3600
+    v, r, s = sign_permit(crowd_sale_token, deployer, accounts[1], 100, deadline)
+    receipt = crowd_sale_token.permit(deployer, accounts[1], 100, deadline, v, r, s, sender=accounts[1])
+    record_gas("permit", receipt.gas_used)
+
+def test_gas_transferFrom(crowd_sale_token, deployer, accounts, record_gas):
+    crowd_sale_token.approve(accounts[1], 100, sender=deployer)
+    receipt = crowd_sale_token.transferFrom(deployer, accounts[2], 100, sender=accounts[1])
+    record_gas("transferFrom", receipt.gas_used)
@@ -0,0 +1,32 @@
+"""
+Permit files and back-to-back submission (scripts/_permit.py) against both
+crowdsale variants
+"""
+from ape import chain
+from scripts._permit import load_permit, permit_data, save_permit, sign_permit, submit_with_transfer
+
+
+def test_permit_file_round_trip(tmp_path, crowd_sale_token, deployer, accounts):
+    deadline = chain.pending_timestamp + 3600
+    typed_data = permit_data(crowd_sale_token, deployer.address, accounts[1].address, 100, deadline)
+    vrs = sign_permit(deployer, typed_data)
+
+    save_permit(tmp_path / "permit.json", typed_data, vrs)
+
+    assert load_permit(tmp_path / "permit.json") == (typed_data, vrs)
+    assert typed_data["domain"]["verifyingContract"] == crowd_sale_token.address
+
+def test_submit_with_transfer(crowd_sale_token, deployer, accounts):
+    """The transferFrom goes out right behind the permit it depends on"""
+    spender = accounts[1]
+    deadline = chain.pending_timestamp + 3600
+    typed_data = permit_data(crowd_sale_token, deployer.address, spender.address, 100, deadline)
+    nonce = spender.nonce
+
+    receipts = submit_with_transfer(crowd_sale_token, spender, typed_data, sign_permit(deployer, typed_data),
+                                    accounts[2].address, 60)
+
+    assert [receipt.transaction.nonce for receipt in receipts] == [nonce, nonce + 1]
+    assert not any(receipt.failed for receipt in receipts)
+    assert crowd_sale_token.balanceOf(accounts[2]) == 60
+    assert crowd_sale_token.allowance(deployer, spender) == 40
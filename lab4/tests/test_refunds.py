@@ -0,0 +1,82 @@
+"""
+refund_all driver (scripts/_refunds.py) against both crowdsale variants
+"""
+import pytest
+from ape import chain
+from scripts._refunds import RefundError, close_sale, pick_batch_size, refund_all
+
+
+def past_deadline(token, accounts, buyers):
+    """Purchases from accounts 1..buyers that stay under minFundingGoal, then the deadline passes"""
+    for i in range(1, buyers + 1):
+        accounts[i].transfer(token.address, 10**17)
+    chain.pending_timestamp += 3600 * 24 * 101
+    chain.mine()
+
+def test_close_sale(crowd_sale_token, deployer, accounts):
+    accounts[1].transfer(crowd_sale_token.address, 10**17)
+    with pytest.raises(RefundError, match="still open"):
+        close_sale(crowd_sale_token, deployer)
+
+    chain.pending_timestamp += 3600 * 24 * 101
+    chain.mine()
+    close_sale(crowd_sale_token, deployer)
+    assert crowd_sale_token.crowdsaleClosed()
+    assert not close_sale(crowd_sale_token, deployer)  # Nothing left to close
+
+def test_close_sale_after_goal_reached(crowd_sale_token, deployer, accounts):
+    for i in range(1, 4):
+        accounts[i].transfer(crowd_sale_token.address, 10 * 10**18)
+    chain.pending_timestamp += 3600 * 24 * 101
+    chain.mine()
+
+    with pytest.raises(RefundError, match="goal was reached"):
+        close_sale(crowd_sale_token, deployer)
+
+def test_refund_all(crowd_sale_token, deployer, accounts):
+    """Every buyer is refunded, two per batch"""
+    past_deadline(crowd_sale_token, accounts, buyers=5)
+    close_sale(crowd_sale_token, deployer)
+    before = [accounts[i].balance for i in range(1, 6)]
+    progress = []
+
+    summary = refund_all(crowd_sale_token, accounts[6], 2, on_batch=lambda *args: progress.append(args))
+
+    assert progress == [(2, 5), (4, 5), (5, 5)]
+    assert (summary.batches, summary.failed) == (3, [])
+    assert summary.gas_used > 0
+    for i in range(1, 6):
+        assert accounts[i].balance == before[i - 1] + 10**17
+        assert crowd_sale_token.ethBalances(accounts[i]) == 0
+
+def test_refund_all_resumes_from_the_cursor(crowd_sale_token, deployer, accounts):
+    """A run that stopped part way continues from refundCursor on chain"""
+    past_deadline(crowd_sale_token, accounts, buyers=5)
+    close_sale(crowd_sale_token, deployer)
+    crowd_sale_token.refundBatch(3, sender=deployer)
+
+    assert refund_all(crowd_sale_token, deployer, 2).batches == 1
+    assert crowd_sale_token.refundCursor() == 5
+    assert refund_all(crowd_sale_token, deployer, 2).batches == 0
+
+def test_refund_all_reports_failed_buyers(crowd_sale_token, deployer, accounts):
+    past_deadline(crowd_sale_token, accounts, buyers=3)
+    crowd_sale_token.transfer(accounts[5], 1, sender=accounts[2])
+    close_sale(crowd_sale_token, deployer)
+
+    summary = refund_all(crowd_sale_token, deployer, 10)
+
+    assert summary.failed == [accounts[2].address]
+    assert crowd_sale_token.ethBalances(accounts[2]) == 10**17
+    assert crowd_sale_token.ethBalances(accounts[3]) == 0
+
+def test_pick_batch_size(crowd_sale_token, deployer, accounts):
+    """Halves from the cap until the estimate fits"""
+    past_deadline(crowd_sale_token, accounts, buyers=5)
+    close_sale(crowd_sale_token, deployer)
+    estimate = crowd_sale_token.refundBatch.estimate_gas_cost
+
+    assert pick_batch_size(crowd_sale_token, deployer, chain.blocks.head.gas_limit) == 100
+    # 100, 50, 25, 12 and 6 all cover the five buyers
+    assert pick_batch_size(crowd_sale_token, deployer, estimate(4, sender=deployer)) == 3
+    assert pick_batch_size(crowd_sale_token, deployer, 0) == 1
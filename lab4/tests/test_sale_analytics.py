@@ -0,0 +1,100 @@
+"""
+Sale analytics (scripts/_sale_analytics.py) built from the logs of both
+crowdsale variants and checked against the contract's own state
+"""
+import csv
+import json
+
+import pytest
+from ape import chain
+from scripts._sale_analytics import SaleAnalytics, block_timestamps
+
+HOUR = 3600
+
+
+@pytest.fixture
+def analytics(crowd_sale_token):
+    return SaleAnalytics(crowd_sale_token.beneficiary(), crowd_sale_token.minFundingGoal(),
+                         crowd_sale_token.maxFundingGoal(), crowd_sale_token.deadline())
+
+
+def buy(token, accounts):
+    """Three buyers, one buying twice, and one passing tokens on"""
+    for i, value in ((1, 10**18), (2, 5 * 10**17), (1, 2 * 10**17), (3, 2 * 10**18)):
+        accounts[i].transfer(token.address, value)
+    token.transfer(accounts[4], 10, sender=accounts[3])
+
+def test_block_timestamps(accounts):
+    accounts[1].transfer(accounts[2], 1)
+    numbers = [chain.blocks.height - 1, chain.blocks.height]
+
+    assert block_timestamps(numbers) == {number: chain.blocks[number].timestamp for number in numbers}
+
+@pytest.mark.parametrize("page_size", [1, 5000])
+def test_summary_matches_the_contract(crowd_sale_token, analytics, accounts, page_size):
+    buy(crowd_sale_token, accounts)
+
+    assert analytics.sync(crowd_sale_token.address, 0, chain.blocks.height, page_size) == chain.blocks.height + 1
+    summary = analytics.summary(chain.blocks.head.timestamp)
+
+    assert summary["last_block"] == chain.blocks.height
+    assert summary["payments"] == 4
+    assert summary["raised_eth"] == crowd_sale_token.amountRaised() / 10**18 == 3.7
+    assert summary["unique_buyers"] == 3
+    assert summary["transfers"] == 6  # The initial supply, four purchases and one transfer
+    assert summary["token_holders"] == 4
+    assert summary["tokens_circulating"] == sum(crowd_sale_token.balanceOf(accounts[i]) for i in range(1, 5))
+    assert summary["top_contributors"] == [
+        [accounts[3].address, 2.0], [accounts[1].address, 1.2], [accounts[2].address, 0.5]]
+    assert sum(count for _, _, count in summary["histogram"]) == 4
+
+    blocks, raised = analytics.raised_per_block()
+    assert len(set(blocks.tolist())) == 4
+    assert raised.sum() == pytest.approx(3.7)
+
+def test_sync_is_incremental(crowd_sale_token, analytics, accounts):
+    accounts[1].transfer(crowd_sale_token.address, 10**18)
+    next_block = analytics.sync(crowd_sale_token.address, 0, chain.blocks.height)
+    buy(crowd_sale_token, accounts)
+
+    next_block = analytics.sync(crowd_sale_token.address, next_block, chain.blocks.height)
+    assert analytics.sync(crowd_sale_token.address, next_block, chain.blocks.height) == next_block  # No new blocks
+
+    full = SaleAnalytics(crowd_sale_token.beneficiary(), crowd_sale_token.minFundingGoal(),
+                         crowd_sale_token.maxFundingGoal(), crowd_sale_token.deadline())
+    full.sync(crowd_sale_token.address, 0, chain.blocks.height)
+    now = chain.blocks.head.timestamp
+    assert analytics.summary(now) == full.summary(now)
+    assert analytics.summary(now)["payments"] == 5
+
+def test_projection_follows_the_recent_pace(crowd_sale_token, analytics, accounts):
+    assert analytics.projection(chain.blocks.head.timestamp)["min_goal_eta"] is None  # No payments yet
+
+    accounts[1].transfer(crowd_sale_token.address, 10 * 10**18)
+    chain.pending_timestamp += HOUR
+    accounts[2].transfer(crowd_sale_token.address, 5 * 10**18)
+    analytics.sync(crowd_sale_token.address, 0, chain.blocks.height)
+    now = chain.blocks.head.timestamp
+
+    projection = analytics.projection(now)
+    assert projection["eth_per_hour"] == pytest.approx(15 / 24)  # Over the last 24 hours
+    assert projection["min_goal_eta"] == now + 24 * HOUR  # 15 ETH to go at 15 ETH per day
+    assert projection["max_goal_eta"] == pytest.approx(now + 35 * 24 * HOUR / 15, abs=1)
+    assert projection["min_goal_before_deadline"]
+
+    assert analytics.projection(now + 25 * HOUR)["min_goal_eta"] is None  # Payments left the window
+
+def test_exports(tmp_path, crowd_sale_token, analytics, accounts):
+    buy(crowd_sale_token, accounts)
+    analytics.sync(crowd_sale_token.address, 0, chain.blocks.height)
+    now = chain.blocks.head.timestamp
+
+    analytics.write_json(tmp_path / "summary.json", now, top=2)
+    analytics.write_csv(tmp_path / "analytics", top=2)
+
+    assert json.loads((tmp_path / "summary.json").read_text()) == analytics.summary(now, top=2)
+    with open(tmp_path / "analytics" / "top_contributors.csv", newline="") as rows:
+        assert list(csv.reader(rows)) == [["address", "contributed_eth"],
+                                          [accounts[3].address, "2.0"], [accounts[1].address, "1.2"]]
+    for name in ("per_block.csv", "per_hour.csv", "histogram.csv"):
+        assert (tmp_path / "analytics" / name).read_text().count("\n") > 1
@@ -21,6 +21,11 @@ event Minted:
     _tokenId: indexed(uint256)
     _name: String[100]
 
+event MintedWithContentHash:
+    _to: indexed(address)
+    _tokenId: indexed(uint256)
+    _contentHash: bytes32
+
 # State variables
 name: public(String[100])
 symbol: public(String[100])
@@ -40,6 +45,56 @@ characterName: public(HashMap[uint256, String[100]])
 characterDescription: public(HashMap[uint256, String[500]])
 characterImageURI: public(HashMap[uint256, String[200]])
 
+# Content-addressed metadata: keccak256 of the token's off-chain JSON metadata.
+# Tokens minted this way store one slot instead of the three strings above.
+contentHash: public(HashMap[uint256, bytes32])
+
+# Enumeration (ERC-721 Enumerable). Lists are stored as index -> token ID maps
+# whose lengths are balanceOf / totalSupply; removal swaps in the last entry.
+_ownedTokens: HashMap[address, HashMap[uint256, uint256]]
+_ownedTokensIndex: HashMap[uint256, uint256]
+_allTokens: HashMap[uint256, uint256]
+_allTokensIndex: HashMap[uint256, uint256]
+
+# Largest page returned by tokensOfOwner / allTokens
+MAX_PAGE_SIZE: constant(uint256) = 500
+
+# Most tokens moved by one batchTransferFrom
+MAX_BATCH_TRANSFER: constant(uint256) = 500
+
+# Signed approvals (EIP-4494 permit for one token, permitForAll for operators).
+# A token's nonce advances when a permit is used and on every transfer or burn,
+# so a permit never outlives the ownership it was signed under; the deadline
+# bounds the lifetime of a permit that is never submitted.
+nonces: public(HashMap[uint256, uint256])
+operatorNonces: public(HashMap[address, uint256])
+
+EIP712_DOMAIN_TYPEHASH: constant(bytes32) = keccak256(
+    "EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
+)
+PERMIT_TYPEHASH: constant(bytes32) = keccak256(
+    "Permit(address spender,uint256 tokenId,uint256 nonce,uint256 deadline)"
+)
+PERMIT_FOR_ALL_TYPEHASH: constant(bytes32) = keccak256(
+    "PermitForAll(address owner,address operator,bool approved,uint256 nonce,uint256 deadline)"
+)
+MINT_VOUCHER_TYPEHASH: constant(bytes32) = keccak256(
+    "MintVoucher(address recipient,uint256 tokenId,bytes32 contentHash,uint256 expiry)"
+)
+EIP712_VERSION: constant(String[1]) = "1"
+# Upper bound of s in non-malleable signatures (secp256k1n / 2)
+MAX_S: constant(uint256) = 57896044618658097711785492504343953926418782139537452191302581570759080747168
+
+# Lazy minting: struct hashes of the minter's vouchers that were already redeemed.
+# A voucher stays spent after its token is burned.
+redeemedVouchers: public(HashMap[bytes32, bool])
+
+# Allowlist claims: Merkle root of (address, cap) leaves and how many tokens
+# each address claimed. Counts carry over when the root changes.
+allowlistRoot: public(bytes32)
+allowlistClaimed: public(HashMap[address, uint256])
+MAX_PROOF_LENGTH: constant(uint256) = 32
+
 # Access control
 minter: public(address)
 
@@ -80,7 +135,132 @@ def supportsInterface(_interfaceId: bytes4) -> bool:
     @param _interfaceId Interface identifier
     @return True if interface is supported
     """
-    return _interfaceId == 0x01ffc9a7 or _interfaceId == 0x80ac58cd or _interfaceId == 0x5b5e139f
+    return _interfaceId == 0x01ffc9a7 or _interfaceId == 0x80ac58cd or _interfaceId == 0x5b5e139f or _interfaceId == 0x780e9d63 or _interfaceId == 0x5604e225
+
+
+# Enumeration helpers
+
+@internal
+def _addTokenToOwnerEnumeration(_to: address, _tokenId: uint256, _length: uint256):
+    """
+    @dev Append to the owner's list, whose current length is _length
+    """
+    self._ownedTokens[_to][_length] = _tokenId
+    self._ownedTokensIndex[_tokenId] = _length
+
+
+@internal
+def _removeTokenFromOwnerEnumeration(_from: address, _tokenId: uint256, _length: uint256):
+    """
+    @dev Move the owner's last token into the gap; _length is the list's length before removal
+    """
+    lastIndex: uint256 = _length - 1
+    index: uint256 = self._ownedTokensIndex[_tokenId]
+
+    if index != lastIndex:
+        lastTokenId: uint256 = self._ownedTokens[_from][lastIndex]
+        self._ownedTokens[_from][index] = lastTokenId
+        self._ownedTokensIndex[lastTokenId] = index
+
+    self._ownedTokens[_from][lastIndex] = 0
+    self._ownedTokensIndex[_tokenId] = 0
+
+
+@internal
+def _addTokenToAllTokensEnumeration(_tokenId: uint256):
+    """
+    @dev Append to the global list; call before totalSupply is incremented
+    """
+    index: uint256 = self.totalSupply
+    self._allTokens[index] = _tokenId
+    self._allTokensIndex[_tokenId] = index
+
+
+@internal
+def _removeTokenFromAllTokensEnumeration(_tokenId: uint256):
+    """
+    @dev Move the last token into the gap; call before totalSupply is decremented
+    """
+    lastIndex: uint256 = self.totalSupply - 1
+    index: uint256 = self._allTokensIndex[_tokenId]
+
+    if index != lastIndex:
+        lastTokenId: uint256 = self._allTokens[lastIndex]
+        self._allTokens[index] = lastTokenId
+        self._allTokensIndex[lastTokenId] = index
+
+    self._allTokens[lastIndex] = 0
+    self._allTokensIndex[_tokenId] = 0
+
+
+# Enumeration views
+
+@view
+@external
+def tokenOfOwnerByIndex(_owner: address, _index: uint256) -> uint256:
+    """
+    @notice Get a token ID from an owner's token list
+    @param _owner Owner address
+    @param _index Position in the owner's list (below balanceOf)
+    @return Token ID at that position
+    """
+    assert _index < self.balanceOf[_owner], "Owner index out of bounds"
+    return self._ownedTokens[_owner][_index]
+
+
+@view
+@external
+def tokenByIndex(_index: uint256) -> uint256:
+    """
+    @notice Get a token ID from the list of all tokens
+    @param _index Position in the list (below totalSupply)
+    @return Token ID at that position
+    """
+    assert _index < self.totalSupply, "Global index out of bounds"
+    return self._allTokens[_index]
+
+
+@view
+@external
+def tokensOfOwner(_owner: address, _offset: uint256, _limit: uint256) -> DynArray[uint256, MAX_PAGE_SIZE]:
+    """
+    @notice List a page of an owner's tokens in one call
+    @param _owner Owner address
+    @param _offset Position of the first token to return
+    @param _limit Maximum number of tokens to return (capped at MAX_PAGE_SIZE)
+    @return Token IDs at positions [_offset, _offset + _limit) of the owner's list
+    """
+    tokens: DynArray[uint256, MAX_PAGE_SIZE] = []
+    balance: uint256 = self.balanceOf[_owner]
+    if _offset >= balance:
+        return tokens
+
+    end: uint256 = min(balance, _offset + min(_limit, MAX_PAGE_SIZE))
+    for i: uint256 in range(_offset, end, bound=MAX_PAGE_SIZE):
+        tokens.append(self._ownedTokens[_owner][i])
+
+    return tokens
+
+
+@view
+@external
+def allTokens(_offset: uint256, _limit: uint256) -> DynArray[uint256, MAX_PAGE_SIZE]:
+    """
+    @notice List a page of all existing tokens in one call
+    @param _offset Position of the first token to return
+    @param _limit Maximum number of tokens to return (capped at MAX_PAGE_SIZE)
+    @return Token IDs at positions [_offset, _offset + _limit) of the global list
+    """
+    tokens: DynArray[uint256, MAX_PAGE_SIZE] = []
+    supply: uint256 = self.totalSupply
+    if _offset >= supply:
+        return tokens
+
+    end: uint256 = min(supply, _offset + min(_limit, MAX_PAGE_SIZE))
+    for i: uint256 in range(_offset, end, bound=MAX_PAGE_SIZE):
+        tokens.append(self._allTokens[i])
+
+    return tokens
 
 
 @view
@@ -88,11 +268,16 @@ def supportsInterface(_interfaceId: bytes4) -> bool:
 def tokenURI(_tokenId: uint256) -> String[850]:
     """
     @notice Returns the metadata URI for a given token ID as JSON metadata string
+    @dev Tokens minted with mintWithContentHash return baseURI + tokenId instead
     @param _tokenId The token ID to query
-    @return JSON metadata string
+    @return JSON metadata string, or the metadata URL for content-addressed tokens
     """
     assert self._ownerOf[_tokenId] != empty(address), "Token does not exist"
 
+    # Content-addressed tokens resolve their metadata off-chain from baseURI
+    if self.contentHash[_tokenId] != empty(bytes32):
+        return concat(self.baseURI, uint2str(_tokenId))
+
     # Build JSON metadata
     name_str: String[100] = self.characterName[_tokenId]
     desc_str: String[500] = self.characterDescription[_tokenId]
@@ -127,6 +312,8 @@ def mint(_to: address, _tokenId: uint256, _name: String[100], _description: Stri
     assert _to != empty(address), "Cannot mint to zero address"
 
     # Set ownership
+    self._addTokenToOwnerEnumeration(_to, _tokenId, self.balanceOf[_to])
+    self._addTokenToAllTokensEnumeration(_tokenId)
     self._ownerOf[_tokenId] = _to
     self.balanceOf[_to] += 1
     self.totalSupply += 1
@@ -141,6 +328,43 @@ def mint(_to: address, _tokenId: uint256, _name: String[100], _description: Stri
     log Minted(_to=_to, _tokenId=_tokenId, _name=_name)
 
 
+@external
+def mintWithContentHash(_to: address, _tokenId: uint256, _contentHash: bytes32):
+    """
+    @notice Mint a new NFT character whose metadata lives off-chain (only minter can mint)
+    @dev Only the 32-byte hash of the metadata JSON is stored; tokenURI returns baseURI + tokenId
+    @param _to Address to receive the NFT
+    @param _tokenId Unique token ID for the character
+    @param _contentHash keccak256 of the character's JSON metadata
+    """
+    assert msg.sender == self.minter, "Only minter can mint"
+    self._mintWithContentHash(_to, _tokenId, _contentHash)
+
+
+@internal
+def _mintWithContentHash(_to: address, _tokenId: uint256, _contentHash: bytes32):
+    """
+    @dev Mint a content-addressed token; the caller checks who may mint
+    """
+    assert self._ownerOf[_tokenId] == empty(address), "Token already exists"
+    assert _to != empty(address), "Cannot mint to zero address"
+    assert _contentHash != empty(bytes32), "Content hash required"
+
+    # Set ownership
+    self._addTokenToOwnerEnumeration(_to, _tokenId, self.balanceOf[_to])
+    self._addTokenToAllTokensEnumeration(_tokenId)
+    self._ownerOf[_tokenId] = _to
+    self.balanceOf[_to] += 1
+    self.totalSupply += 1
+
+    # Store the metadata hash only
+    self.contentHash[_tokenId] = _contentHash
+
+    # Emit events
+    log Transfer(_from=empty(address), _to=_to, _tokenId=_tokenId)
+    log MintedWithContentHash(_to=_to, _tokenId=_tokenId, _contentHash=_contentHash)
+
+
 @external
 def burn(_tokenId: uint256):
     """
@@ -151,19 +375,25 @@ def burn(_tokenId: uint256):
     assert owner != empty(address), "Token does not exist"
     assert owner == msg.sender or self.getApproved[_tokenId] == msg.sender or self.isApprovedForAll[owner][msg.sender], "Not authorized"
 
-    # Clear approvals
+    # Clear approvals, including unused permits
     if self.getApproved[_tokenId] != empty(address):
         self.getApproved[_tokenId] = empty(address)
+    self.nonces[_tokenId] += 1
 
     # Update balances
+    self._removeTokenFromOwnerEnumeration(owner, _tokenId, self.balanceOf[owner])
+    self._removeTokenFromAllTokensEnumeration(_tokenId)
     self.balanceOf[owner] -= 1
     self._ownerOf[_tokenId] = empty(address)
     self.totalSupply -= 1
 
     # Clear metadata
-    self.characterName[_tokenId] = ""
-    self.characterDescription[_tokenId] = ""
-    self.characterImageURI[_tokenId] = ""
+    if self.contentHash[_tokenId] != empty(bytes32):
+        self.contentHash[_tokenId] = empty(bytes32)
+    else:
+        self.characterName[_tokenId] = ""
+        self.characterDescription[_tokenId] = ""
+        self.characterImageURI[_tokenId] = ""
 
     # Emit Transfer event to zero address (ERC-721 standard for burn)
     log Transfer(_from=owner, _to=empty(address), _tokenId=_tokenId)
@@ -195,6 +425,162 @@ def setApprovalForAll(_operator: address, _approved: bool):
     log ApprovalForAll(_owner=msg.sender, _operator=_operator, _approved=_approved)
 
 
+# Signed approvals
+
+@view
+@internal
+def _domainSeparator() -> bytes32:
+    return keccak256(abi_encode(
+        EIP712_DOMAIN_TYPEHASH, keccak256(self.name), keccak256(EIP712_VERSION), chain.id, self
+    ))
+
+
+@view
+@external
+def DOMAIN_SEPARATOR() -> bytes32:
+    """
+    @notice EIP-712 domain separator used by permit and permitForAll
+    """
+    return self._domainSeparator()
+
+
+@view
+@internal
+def _recoverSigner(_structHash: bytes32, _signature: Bytes[65]) -> address:
+    """
+    @dev Signer of an EIP-712 struct given as a 65-byte r || s || v signature
+    """
+    assert len(_signature) == 65, "Invalid signature"
+    r: bytes32 = extract32(_signature, 0)
+    s: bytes32 = extract32(_signature, 32)
+    v: uint8 = convert(slice(_signature, 64, 1), uint8)
+    assert convert(s, uint256) <= MAX_S, "Invalid signature"
+
+    digest: bytes32 = keccak256(concat(b"\x19\x01", self._domainSeparator(), _structHash))
+    signer: address = ecrecover(digest, v, r, s)
+    assert signer != empty(address), "Invalid signature"
+    return signer
+
+
+@external
+def permit(spender: address, tokenId: uint256, deadline: uint256, sig: Bytes[65]):
+    """
+    @notice Approve `spender` for a token with the owner's (or an operator's) signature
+    @dev EIP-4494. Anyone can submit the permit, e.g. the spender right before transferFrom.
+    @param spender Address to approve
+    @param tokenId Token ID to approve
+    @param deadline Last timestamp at which the permit can be used
+    @param sig 65-byte signature of Permit(spender, tokenId, nonces(tokenId), deadline)
+    """
+    assert block.timestamp <= deadline, "Permit expired"
+    owner: address = self._ownerOf[tokenId]
+    assert owner != empty(address), "Token does not exist"
+
+    nonce: uint256 = self.nonces[tokenId]
+    signer: address = self._recoverSigner(
+        keccak256(abi_encode(PERMIT_TYPEHASH, spender, tokenId, nonce, deadline)), sig
+    )
+    assert signer == owner or self.isApprovedForAll[owner][signer], "Invalid signature"
+
+    self.nonces[tokenId] = nonce + 1
+    self.getApproved[tokenId] = spender
+    log Approval(_owner=owner, _approved=spender, _tokenId=tokenId)
+
+
+@external
+def permitForAll(owner: address, operator: address, approved: bool, deadline: uint256, sig: Bytes[65]):
+    """
+    @notice setApprovalForAll on behalf of `owner` with their signature
+    @param owner Address granting (or revoking) the approval
+    @param operator Address to approve/revoke
+    @param approved True to approve, False to revoke
+    @param deadline Last timestamp at which the permit can be used
+    @param sig 65-byte signature of PermitForAll(owner, operator, approved, operatorNonces(owner), deadline)
+    """
+    assert block.timestamp <= deadline, "Permit expired"
+
+    nonce: uint256 = self.operatorNonces[owner]
+    signer: address = self._recoverSigner(
+        keccak256(abi_encode(PERMIT_FOR_ALL_TYPEHASH, owner, operator, approved, nonce, deadline)), sig
+    )
+    assert signer == owner, "Invalid signature"
+
+    self.operatorNonces[owner] = nonce + 1
+    self.isApprovedForAll[owner][operator] = approved
+    log ApprovalForAll(_owner=owner, _operator=operator, _approved=approved)
+
+
+# Lazy minting
+
+@external
+def redeem(recipient: address, tokenId: uint256, contentHash: bytes32, expiry: uint256, sig: Bytes[65]):
+    """
+    @notice Mint a token from a voucher the minter signed off-chain
+    @dev Anyone can submit a voucher, usually its recipient, who also pays the gas.
+         Tokens are content-addressed like mintWithContentHash.
+    @param recipient Address receiving the token
+    @param tokenId Token ID to mint
+    @param contentHash keccak256 of the character's JSON metadata
+    @param expiry Last timestamp at which the voucher can be redeemed
+    @param sig 65-byte signature of MintVoucher(recipient, tokenId, contentHash, expiry) by the minter
+    """
+    assert block.timestamp <= expiry, "Voucher expired"
+
+    structHash: bytes32 = keccak256(abi_encode(MINT_VOUCHER_TYPEHASH, recipient, tokenId, contentHash, expiry))
+    assert not self.redeemedVouchers[structHash], "Voucher already redeemed"
+    assert self._recoverSigner(structHash, sig) == self.minter, "Invalid signature"
+
+    self.redeemedVouchers[structHash] = True
+    self._mintWithContentHash(recipient, tokenId, contentHash)
+
+
+# Allowlist claims
+
+@external
+def setAllowlistRoot(root: bytes32):
+    """
+    @notice Set the Merkle root of the claim allowlist (only minter); the empty root stops claims
+    @param root Root over keccak256(keccak256(abi_encode(address, cap))) leaves, hashing sorted pairs
+    """
+    assert msg.sender == self.minter, "Only minter can set the allowlist"
+    self.allowlistRoot = root
+
+
+@external
+def claim(tokenId: uint256, contentHash: bytes32, cap: uint256, proof: DynArray[bytes32, MAX_PROOF_LENGTH]):
+    """
+    @notice Mint a content-addressed token to the caller as a member of the allowlist
+    @param tokenId Token ID to mint
+    @param contentHash keccak256 of the character's JSON metadata
+    @param cap Most tokens the caller may claim, as in their leaf
+    @param proof Sibling hashes from the caller's leaf up to allowlistRoot
+    """
+    root: bytes32 = self.allowlistRoot
+    assert root != empty(bytes32), "Allowlist not set"
+    leaf: bytes32 = keccak256(keccak256(abi_encode(msg.sender, cap)))
+    assert self._verifyProof(proof, root, leaf), "Not on the allowlist"
+
+    claimed: uint256 = self.allowlistClaimed[msg.sender]
+    assert claimed < cap, "Claim limit reached"
+    self.allowlistClaimed[msg.sender] = claimed + 1
+    self._mintWithContentHash(msg.sender, tokenId, contentHash)
+
+
+@pure
+@internal
+def _verifyProof(proof: DynArray[bytes32, MAX_PROOF_LENGTH], root: bytes32, leaf: bytes32) -> bool:
+    """
+    @dev Hash the leaf up with each sibling, smaller hash first, and compare with the root
+    """
+    node: bytes32 = leaf
+    for sibling: bytes32 in proof:
+        if convert(node, uint256) < convert(sibling, uint256):
+            node = keccak256(concat(node, sibling))
+        else:
+            node = keccak256(concat(sibling, node))
+    return node == root
+
+
 @external
 def transferFrom(sender: address, receiver: address, tokenId: uint256):
     """
@@ -211,13 +597,16 @@ def transferFrom(sender: address, receiver: address, tokenId: uint256):
            msg.sender == self.getApproved[tokenId] or \
            self.isApprovedForAll[sender][msg.sender], "Not authorized"
 
-    # Clear approval for this token
+    # Clear approval for this token and invalidate its unused permits
     if self.getApproved[tokenId] != empty(address):
         self.getApproved[tokenId] = empty(address)
+    self.nonces[tokenId] += 1
 
-    # Update ownership
+    # Update ownership; the sender's list shrinks first so self-transfers stay consistent
     self._ownerOf[tokenId] = receiver
+    self._removeTokenFromOwnerEnumeration(sender, tokenId, self.balanceOf[sender])
     self.balanceOf[sender] -= 1
+    self._addTokenToOwnerEnumeration(receiver, tokenId, self.balanceOf[receiver])
     self.balanceOf[receiver] += 1
 
     log Transfer(_from=sender, _to=receiver, _tokenId=tokenId)
@@ -241,16 +630,61 @@ def safeTransferFrom(sender: address, receiver: address, tokenId: uint256, data:
            msg.sender == self.getApproved[tokenId] or \
            self.isApprovedForAll[sender][msg.sender], "Not authorized"
 
-    # Clear approval for this token
+    # Clear approval for this token and invalidate its unused permits
     if self.getApproved[tokenId] != empty(address):
         self.getApproved[tokenId] = empty(address)
+    self.nonces[tokenId] += 1
 
-    # Update ownership
+    # Update ownership; the sender's list shrinks first so self-transfers stay consistent
     self._ownerOf[tokenId] = receiver
+    self._removeTokenFromOwnerEnumeration(sender, tokenId, self.balanceOf[sender])
     self.balanceOf[sender] -= 1
+    self._addTokenToOwnerEnumeration(receiver, tokenId, self.balanceOf[receiver])
     self.balanceOf[receiver] += 1
 
     log Transfer(_from=sender, _to=receiver, _tokenId=tokenId)
     # In a full implementation, we would check if receiver is a contract and call onERC721Received
     # For simplicity, we'll skip that check here
 
+
+@external
+def batchTransferFrom(sender: address, receiver: address, tokenIds: DynArray[uint256, MAX_BATCH_TRANSFER]):
+    """
+    @notice Transfer several tokens from one address to another in one transaction
+    @dev Same result as calling transferFrom for each token in order, but the
+         operator check runs once and each balance is written once at the end
+    @param sender Address to transfer from
+    @param receiver Address to transfer to
+    @param tokenIds Token IDs to transfer
+    """
+    assert receiver != empty(address), "Cannot transfer to zero address"
+
+    isOperator: bool = msg.sender == sender or self.isApprovedForAll[sender][msg.sender]
+    senderCount: uint256 = self.balanceOf[sender]
+    receiverCount: uint256 = self.balanceOf[receiver]
+
+    for tokenId: uint256 in tokenIds:
+        assert self._ownerOf[tokenId] == sender, "Token not owned by from address"
+
+        approved: address = self.getApproved[tokenId]
+        assert isOperator or msg.sender == approved, "Not authorized"
+        if approved != empty(address):
+            self.getApproved[tokenId] = empty(address)
+        self.nonces[tokenId] += 1
+
+        # A self-transfer moves the token to the end of the same list
+        self._ownerOf[tokenId] = receiver
+        self._removeTokenFromOwnerEnumeration(sender, tokenId, senderCount)
+        if sender == receiver:
+            self._addTokenToOwnerEnumeration(receiver, tokenId, senderCount - 1)
+        else:
+            self._addTokenToOwnerEnumeration(receiver, tokenId, receiverCount)
+            senderCount -= 1
+            receiverCount += 1
+
+        log Transfer(_from=sender, _to=receiver, _tokenId=tokenId)
+
+    if sender != receiver:
+        self.balanceOf[sender] = senderCount
+        self.balanceOf[receiver] = receiverCount
+
@@ -0,0 +1,165 @@
+"""
+Concurrent JSON-RPC reads for collection-wide scans
+
+The query scripts read one value per round trip, so scanning a whole
+collection takes latency x N. ``AsyncQueryEngine`` groups calls into JSON-RPC
+batches, keeps a bounded number of them in flight against the node at once,
+retries transient failures with exponential backoff and yields results as
+each batch completes.
+"""
+import asyncio
+import random
+
+import aiohttp
+from eth_utils import to_hex
+
+from scripts._rpc import RPCError, _unpack, decode_call_result, to_block_param
+
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 0.25
+DEFAULT_TIMEOUT = 30
+
+# HTTP statuses and JSON-RPC error codes that mean "slow down and try again"
+RETRY_STATUSES = {429, 502, 503, 504}
+RETRY_ERROR_CODES = {429, -32005}
+
+
+class RetryableError(Exception):
+    """The node asked us to back off"""
+
+
+class AsyncQueryEngine:
+    """Bounded-concurrency JSON-RPC client for one HTTP node"""
+
+    def __init__(self, uri, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT):
+        """
+        @param uri HTTP JSON-RPC endpoint, e.g. http://127.0.0.1:8545
+        @param concurrency Maximum HTTP requests in flight at once
+        @param batch_size Calls sent per HTTP request
+        @param retries Attempts after the first before giving up on a call
+        @param backoff Base delay in seconds, doubled after every failed attempt
+        @param timeout Seconds before an HTTP request is abandoned and retried
+        """
+        self.uri = uri
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    # ========== Requests ==========
+
+    def _delay(self, attempt):
+        # Jitter keeps concurrent retries from hitting the node in lockstep
+        return self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+    async def _post(self, payload):
+        async with self._semaphore:
+            async with self._session.post(self.uri, json=payload) as response:
+                if response.status in RETRY_STATUSES:
+                    raise RetryableError(f"HTTP {response.status}")
+
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+    async def batch(self, requests):
+        """
+        Send ``[(method, params), ...]`` as one JSON-RPC batch
+
+        Requests that fail with a rate-limit error are retried on their own;
+        other errors (such as reverts) are returned immediately.
+
+        @return A list with one entry per request: the result, or an ``RPCError``
+        """
+        results = [None] * len(requests)
+        pending = list(range(len(requests)))
+        last_error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self._delay(attempt))
+
+            payload = [
+                {"jsonrpc": "2.0", "id": index, "method": requests[index][0], "params": requests[index][1]}
+                for index in pending
+            ]
+            try:
+                responses = await self._post(payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError, RetryableError) as err:
+                last_error = RPCError(str(err) or type(err).__name__)
+                continue
+
+            if isinstance(responses, dict):
+                # The node answered the whole batch with a single error
+                responses = [{**responses, "id": index} for index in pending]
+
+            answered = set()
+            for response in responses:
+                error = response.get("error")
+                if isinstance(error, dict) and error.get("code") in RETRY_ERROR_CODES:
+                    last_error = _unpack(response)
+                    continue
+
+                results[response["id"]] = _unpack(response)
+                answered.add(response["id"])
+
+            pending = [index for index in pending if index not in answered]
+            if not pending:
+                return results
+
+        for index in pending:
+            results[index] = last_error
+
+        return results
+
+    # ========== Contract calls ==========
+
+    async def _call_batch(self, calls, block):
+        requests = [
+            ("eth_call", [{"to": address, "data": to_hex(calldata)}, block])
+            for _, (address, _, calldata) in calls
+        ]
+        results = []
+        for (key, (_, abi, _)), result in zip(calls, await self.batch(requests)):
+            if not isinstance(result, RPCError):
+                result = decode_call_result(abi, result)
+
+            results.append((key, result))
+
+        return results
+
+    async def stream_calls(self, calls, block_id="latest"):
+        """
+        Run many ``eth_call``s and yield ``(key, result)`` as they complete
+
+        @param calls Iterable of ``(key, encode_call(method, *args))``
+        @param block_id Block every call is pinned to
+        """
+        block = to_block_param(block_id)
+        calls = list(calls)
+        tasks = [
+            asyncio.ensure_future(self._call_batch(calls[start:start + self.batch_size], block))
+            for start in range(0, len(calls), self.batch_size)
+        ]
+        try:
+            for next_batch in asyncio.as_completed(tasks):
+                for item in await next_batch:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
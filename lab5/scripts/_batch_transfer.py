@@ -0,0 +1,79 @@
+"""
+Multi-token transfers with MyCollectibleNFT.batchTransferFrom
+
+Token IDs are given as a list with ranges ("1,4,10-20"). Ownership is checked
+in one batched read, and the owned tokens are split into chunks whose
+estimated gas fits a share of the block gas limit.
+"""
+from ape import chain
+
+from scripts._rpc import ReadBatch, RPCError
+
+
+# Must match MAX_BATCH_TRANSFER in MyCollectibleNFT.vy
+MAX_BATCH_TRANSFER = 500
+
+
+def parse_token_ids(text):
+    """
+    ``"1,4,10-12"`` -> ``[1, 4, 10, 11, 12]``; order is kept, duplicates are dropped
+    """
+    token_ids = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            first, last = (int(bound) for bound in part.split("-", 1))
+            if last < first:
+                raise ValueError(f"Empty range: {part}")
+            token_ids.extend(range(first, last + 1))
+        else:
+            token_ids.append(int(part))
+
+    return list(dict.fromkeys(token_ids))
+
+
+def split_by_owner(contract, token_ids, owner):
+    """
+    ``(owned, others)`` where ``others`` maps each remaining token to its owner,
+    or to ``None`` if it does not exist
+    """
+    batch = ReadBatch()
+    for token_id in token_ids:
+        batch.add(contract.ownerOf, token_id)
+
+    owned, others = [], {}
+    for token_id, result in zip(token_ids, batch.execute()):
+        if isinstance(result, RPCError):
+            others[token_id] = None
+        elif result == owner:
+            owned.append(token_id)
+        else:
+            others[token_id] = result
+
+    return owned, others
+
+
+def chunk_size(contract, sender, receiver, token_ids, gas_fraction=0.5):
+    """
+    Largest chunk, halving from ``MAX_BATCH_TRANSFER``, whose estimated gas fits
+    ``gas_fraction`` of the block gas limit
+
+    Every token costs about the same to move, so the first chunk's size is used
+    for the rest.
+    """
+    budget = int(chain.blocks.head.gas_limit * gas_fraction)
+    size = min(len(token_ids), MAX_BATCH_TRANSFER)
+    while size > 1:
+        gas = contract.batchTransferFrom.estimate_gas_cost(
+            sender.address, receiver, token_ids[:size], sender=sender
+        )
+        if gas <= budget:
+            break
+        size //= 2
+
+    return max(size, 1)
+
+
+def chunked(token_ids, size):
+    return [token_ids[start:start + size] for start in range(0, len(token_ids), size)]
@@ -0,0 +1,389 @@
+"""
+Pipelined bulk execution of MyCollectibleNFT operations
+
+Instead of sending one transaction and waiting for its receipt before the
+next, the executor takes nonces from a ``NonceSource``, signs and submits transactions
+back to back and follows their receipts with one ``ConfirmationTracker``.
+Fees come from a ``FeeEngine``, re-sampled as the run goes on, and a
+transaction that stays unmined for a few blocks is replaced with bumped fees.
+Every submission and confirmation is appended to a checkpoint journal so an
+interrupted run can be resumed without repeating work. A transaction is
+journaled with its hash, nonce and signed bytes before it is broadcast, so a
+crash in between is recovered by re-broadcasting it (or re-signing it at the
+same nonce), never by sending the operation a second time.
+"""
+import csv
+import json
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ape import chain
+from eth_utils import to_hex
+
+from scripts._fees import FeeEngine
+from scripts._preflight import NonceSource
+from scripts._rpc import RPCError, batch_request
+from scripts._tracker import ConfirmationTracker
+
+
+# Gas limits used instead of per-transaction estimation. Estimating against
+# the latest block would fail for operations that depend on transactions
+# that are still in flight (e.g. transferring a token minted in this run).
+DEFAULT_GAS_LIMITS = {
+    "mint": 1_000_000,
+    "mintWithContentHash": 200_000,
+    "transferFrom": 150_000,
+    "approve": 100_000,
+    "setApprovalForAll": 100_000,
+    "burn": 250_000,
+}
+
+# Manifest fields passed to each contract method, in argument order
+OPERATION_ARGS = {
+    "mint": ("to", "tokenId", "name", "description", "imageURI"),
+    "mintWithContentHash": ("to", "tokenId", "contentHash"),
+    "transferFrom": ("from", "to", "tokenId"),
+    "approve": ("approved", "tokenId"),
+    "setApprovalForAll": ("operator", "approved"),
+    "burn": ("tokenId",),
+}
+
+INTEGER_FIELDS = {"tokenId"}
+BOOLEAN_FIELDS = {"approved"}
+
+
+@dataclass
+class Operation:
+    """One manifest entry"""
+
+    line: int
+    op: str
+    fields: dict = field(default_factory=dict)
+
+    @property
+    def args(self):
+        return tuple(self.fields[name] for name in OPERATION_ARGS[self.op])
+
+
+def _parse_operation(line, record):
+    op = record.get("op")
+    if op not in OPERATION_ARGS:
+        raise ValueError(f"Line {line}: unknown operation {op!r}")
+
+    fields = {}
+    for name in OPERATION_ARGS[op]:
+        value = record.get(name)
+        if value is None or value == "":
+            if op == "mint" and name in ("description", "imageURI"):
+                value = ""
+            else:
+                raise ValueError(f"Line {line}: '{op}' needs a '{name}' field")
+
+        if name in INTEGER_FIELDS:
+            value = int(value)
+        elif name in BOOLEAN_FIELDS and op == "setApprovalForAll":
+            value = value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+
+        fields[name] = value
+
+    return Operation(line=line, op=op, fields=fields)
+
+
+def read_manifest(path):
+    """Read a JSONL or CSV manifest into a list of operations"""
+    path = Path(path)
+    operations = []
+    with path.open(newline="", encoding="utf8") as manifest:
+        if path.suffix.lower() == ".csv":
+            for line, row in enumerate(csv.DictReader(manifest), start=2):
+                operations.append(_parse_operation(line, row))
+        else:
+            for line, text in enumerate(manifest, start=1):
+                if text.strip():
+                    operations.append(_parse_operation(line, json.loads(text)))
+
+    return operations
+
+
+class Checkpoint:
+    """Append-only journal of submitted and confirmed operations"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.submitted = {}                # line -> latest {"hash": ..., "nonce": ..., "raw": ...}
+        self.hashes = defaultdict(list)    # line -> every hash journaled for it, replacements included
+        self.finished = {}                 # line -> {"status": ..., "block": ...}
+
+        if self.path.exists():
+            with self.path.open(encoding="utf8") as journal:
+                for text in journal:
+                    if not text.strip():
+                        continue
+                    try:
+                        entry = json.loads(text)
+                    except json.JSONDecodeError:
+                        break  # Torn final write from a crash
+
+                    if "status" in entry:
+                        self.finished[entry["line"]] = entry
+                    else:
+                        self.submitted[entry["line"]] = entry
+                        self.hashes[entry["line"]].append(entry["hash"])
+
+        self._file = self.path.open("a", encoding="utf8")
+        self._lock = threading.Lock()
+
+    def _write(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def record_submitted(self, line, txn_hash, nonce, raw=None):
+        """Journal a signed transaction; called before it is broadcast"""
+        entry = {"line": line, "hash": txn_hash, "nonce": nonce, "raw": raw}
+        self.submitted[line] = entry
+        self.hashes[line].append(txn_hash)
+        self._write(entry)
+
+    def forget(self, line):
+        """Drop the submissions of ``line`` so it is signed again with a fresh nonce"""
+        self.submitted.pop(line, None)
+        self.hashes.pop(line, None)
+
+    def record_finished(self, line, txn_hash, status, block):
+        entry = {"line": line, "hash": txn_hash, "status": status, "block": block}
+        self.finished[line] = entry
+        self._write(entry)
+
+    def close(self):
+        self._file.close()
+
+
+class BulkExecutor:
+    """Submit many operations from one account without waiting on receipts"""
+
+    def __init__(self, contract, sender, checkpoint_path, gas_limits=None,
+                 max_in_flight=500, confirmations=1, poll_interval=1.0, fees=None, stuck_blocks=3,
+                 nonces=None):
+        """
+        @param contract MyCollectibleNFT contract instance
+        @param sender Account that signs every transaction
+        @param checkpoint_path Journal file used to resume interrupted runs
+        @param gas_limits Per-operation gas limit overrides
+        @param max_in_flight Pause submitting while this many are unconfirmed
+        @param confirmations Blocks on top of the receipt before an op is done
+        @param poll_interval Seconds between receipt polls
+        @param fees ``FeeEngine`` pricing the transactions (``normal`` policy if ``None``)
+        @param stuck_blocks Blocks without a receipt before a transaction is re-priced
+        @param nonces ``NonceSource`` of ``sender``, shared with anything else sending from it
+        """
+        self.contract = contract
+        self.sender = sender
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.gas_limits = {**DEFAULT_GAS_LIMITS, **(gas_limits or {})}
+        self.max_in_flight = max_in_flight
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.fees = fees or FeeEngine()
+        self.nonces = nonces or NonceSource(sender.address)
+
+        self._pending = set()  # lines of unconfirmed operations
+        self._lines = {}       # txn hash -> operation line
+        self._error = None     # Why the tracker gave up on a transaction
+        self._condition = threading.Condition()
+        self._tracker = ConfirmationTracker(
+            confirmations, poll_interval, on_stuck=self._replace, stuck_blocks=stuck_blocks
+        )
+
+    # ========== Transactions ==========
+
+    def _build(self, operation, nonce, fees):
+        method = getattr(self.contract, operation.op)
+        txn = chain.provider.network.ecosystem.create_transaction(
+            chain_id=chain.chain_id,
+            type=2,
+            sender=self.sender.address,
+            receiver=self.contract.address,
+            data=method.encode_input(*operation.args),
+            nonce=nonce,
+            gas=self.gas_limits[operation.op],
+            **fees,
+        )
+        signed = self.sender.sign_transaction(txn)
+        if signed is None:
+            raise RuntimeError(f"Line {operation.line}: signing was declined")
+
+        return txn, signed
+
+    def _submit(self, operation, nonce):
+        """Sign ``operation`` at ``nonce``, journal it, then broadcast it"""
+        # Cached for a couple of seconds, so long runs follow the base fee
+        _, signed = self._build(operation, nonce, self.fees.quote().options())
+        txn_hash = to_hex(signed.txn_hash)
+        raw = to_hex(signed.serialize_transaction())
+        self.checkpoint.record_submitted(operation.line, txn_hash, nonce, raw)
+        self._send(raw)
+        self.fees.record(txn_hash, signed)
+        self._track(txn_hash, operation.line)
+
+    def _send(self, raw):
+        return to_hex(chain.provider.web3.eth.send_raw_transaction(raw))
+
+    # ========== Resume ==========
+
+    def _recover(self, operations):
+        """
+        Settle the journaled-but-unfinished submissions of an interrupted run
+
+        An operation whose transaction (or one of its replacements) the node
+        knows is followed as is. One the node never saw is re-broadcast from
+        the journal while its nonce is unused, or re-signed at that nonce if
+        the node refuses the old bytes (e.g. fees below the base fee by now).
+        Only when another transaction took its nonce is it signed again from
+        scratch: then none of its own transactions can ever be mined.
+        """
+        lines = [
+            op.line for op in operations
+            if op.line in self.checkpoint.submitted and op.line not in self.checkpoint.finished
+        ]
+        if not lines:
+            return
+
+        by_line = {op.line: op for op in operations}
+        hashes = [(line, txn_hash) for line in lines for txn_hash in self.checkpoint.hashes[line]]
+        receipts = batch_request([("eth_getTransactionReceipt", [txn_hash]) for _, txn_hash in hashes])
+        lookups = batch_request([("eth_getTransactionByHash", [txn_hash]) for _, txn_hash in hashes])
+
+        mined, known = {}, {}
+        for (line, txn_hash), receipt, txn in zip(hashes, receipts, lookups):
+            if receipt and not isinstance(receipt, RPCError):
+                mined[line] = txn_hash
+            elif txn and not isinstance(txn, RPCError):
+                known[line] = txn_hash  # The latest one the node still has
+
+        unseen = []
+        for line in lines:
+            if line in mined or line in known:
+                self._track(mined.get(line) or known[line], line)
+            else:
+                unseen.append(self.checkpoint.submitted[line])
+        if not unseen:
+            return
+
+        next_nonce = chain.provider.web3.eth.get_transaction_count(self.sender.address, "latest")
+        for entry in sorted(unseen, key=lambda entry: entry["nonce"]):
+            line = entry["line"]
+            if entry["nonce"] < next_nonce:
+                # Taken by a transaction outside this run: sign it again with a fresh nonce
+                self.checkpoint.forget(line)
+                continue
+            try:
+                if not entry.get("raw"):
+                    raise ValueError("not journaled")
+                self._send(entry["raw"])
+                self._track(entry["hash"], line)
+            except Exception:
+                self._submit(by_line[line], entry["nonce"])
+
+    # ========== Confirmations ==========
+
+    def _track(self, txn_hash, line):
+        with self._condition:
+            self._pending.add(line)
+            self._lines[txn_hash] = line
+        future = self._tracker.track(txn_hash)
+        future.add_done_callback(lambda done: self._done(line, done))
+
+    def _replace(self, txn_hash):
+        """Re-price a stuck transaction; journaled before it is sent so a resumed run follows it"""
+        line = self._lines.get(txn_hash)
+        signed = self.fees.replacement(self.sender, txn_hash)
+        if signed is None or line is None:
+            return None
+
+        self.checkpoint.record_submitted(
+            line, to_hex(signed.txn_hash), signed.nonce, to_hex(signed.serialize_transaction())
+        )
+        new_hash = self.fees.send_replacement(txn_hash, signed)
+        if new_hash is not None:
+            with self._condition:
+                self._lines[new_hash] = line
+        return new_hash
+
+    def _done(self, line, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            with self._condition:
+                self._error = future.exception()
+                self._condition.notify_all()
+            return
+
+        confirmation = future.result()
+        self.checkpoint.record_finished(
+            line, confirmation.txn_hash, confirmation.status, confirmation.block_number
+        )
+        with self._condition:
+            self._pending.discard(line)
+            self._condition.notify_all()
+
+    def _wait(self):
+        """Wait for a confirmation (up to one poll interval); raise if there will be none"""
+        self._condition.wait(self.poll_interval)
+        if self._error is not None:
+            raise RuntimeError(f"Confirmations stopped: {self._error}") from self._error
+        if not self._tracker.running:
+            raise RuntimeError("Confirmations stopped: the tracker thread is not running")
+
+    # ========== Run ==========
+
+    def run(self, operations, on_progress=None):
+        """
+        Submit every operation that the checkpoint has not already covered
+
+        @param operations Operations from ``read_manifest``
+        @param on_progress Optional callback(submitted, confirmed, total)
+        @return Summary dict with submitted / confirmed / failed counts
+        """
+        started = time.time()
+        submitted = 0
+        self._tracker.start()
+        try:
+            self._recover(operations)
+            # Re-broadcast transactions now count towards the pending nonce
+            self.nonces.reset()
+            todo = [op for op in operations if op.line not in self.checkpoint.submitted]
+
+            for operation in todo:
+                with self._condition:
+                    while len(self._pending) >= self.max_in_flight:
+                        self._wait()
+
+                with self.nonces.reserve() as nonce:
+                    self._submit(operation, nonce)
+                submitted += 1
+                if on_progress:
+                    on_progress(submitted, len(self.checkpoint.finished), len(operations))
+
+            with self._condition:
+                while self._pending:
+                    self._wait()
+                    if on_progress:
+                        on_progress(submitted, len(self.checkpoint.finished), len(operations))
+        finally:
+            self._tracker.stop()
+            self.checkpoint.close()
+
+        return {
+            "total": len(operations),
+            "submitted": submitted,
+            "confirmed": len(self.checkpoint.finished),
+            "failed": sorted(
+                line for line, entry in self.checkpoint.finished.items() if entry["status"] != 1
+            ),
+            "seconds": time.time() - started,
+            "fees": self.fees.metrics(),
+        }
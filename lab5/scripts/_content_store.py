@@ -0,0 +1,73 @@
+"""
+Local content-addressed store for off-chain character metadata
+
+Tokens minted with ``mintWithContentHash`` keep only the keccak256 hash of
+their metadata JSON on-chain. The JSON itself is written here, under a file
+named after that hash, so any script can resolve and verify it.
+"""
+import json
+from pathlib import Path
+
+from ape import project
+from eth_utils import keccak, to_hex
+from hexbytes import HexBytes
+
+
+ZERO_HASH = HexBytes(b"\x00" * 32)
+
+
+def canonical_metadata(name, description, image_uri):
+    """
+    Encode metadata exactly like the on-chain ``tokenURI`` JSON
+
+    The same three fields in the same order and without whitespace, so a
+    token's hash does not depend on how the JSON happened to be formatted.
+    """
+    metadata = {"name": name, "description": description, "image": image_uri}
+    return json.dumps(metadata, separators=(",", ":"), ensure_ascii=False).encode("utf8")
+
+
+def content_hash(data):
+    """keccak256 of the encoded metadata, as stored on-chain"""
+    return HexBytes(keccak(data))
+
+
+def is_content_addressed(value):
+    return value is not None and HexBytes(value) != ZERO_HASH
+
+
+class ContentStore:
+    """Directory of metadata files named by their keccak256 hash"""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else project.path / "metadata"
+
+    def path_for(self, digest):
+        return self.root / f"{to_hex(HexBytes(digest))}.json"
+
+    def put(self, name, description, image_uri):
+        """Store a character's metadata and return its content hash"""
+        data = canonical_metadata(name, description, image_uri)
+        digest = content_hash(data)
+        path = self.path_for(digest)
+        if not path.exists():
+            self.root.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+
+        return digest
+
+    def get(self, digest):
+        """
+        Return the metadata dict for ``digest``
+
+        @return ``None`` if the content is missing or does not match its hash
+        """
+        path = self.path_for(digest)
+        if not path.exists():
+            return None
+
+        data = path.read_bytes()
+        if content_hash(data) != HexBytes(digest):
+            return None
+
+        return json.loads(data)
@@ -0,0 +1,102 @@
+"""
+Shared helpers for reading MyCollectibleNFT event logs
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+
+from ape import chain
+from ape.types import LogFilter
+from eth_utils import encode_hex, keccak
+
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Number of blocks requested per eth_getLogs page (see ``block_ranges``)
+DEFAULT_PAGE_SIZE = 2000
+
+
+def event_abis(contract, *event_names):
+    """Return the event ABIs of ``contract`` matching ``event_names``"""
+    return [getattr(contract, event_name).abi for event_name in event_names]
+
+
+def contract_logs(contract, start_block, stop_block, *event_names):
+    """
+    Fetch the decoded logs of several events in one ``eth_getLogs`` query
+
+    Both ``start_block`` and ``stop_block`` are inclusive. Logs are yielded in
+    chain order (block number, then log index).
+    """
+    abis = event_abis(contract, *event_names)
+    selectors = [encode_hex(keccak(text=abi.selector)) for abi in abis]
+    log_filter = LogFilter(
+        addresses=[contract.address],
+        events=abis,
+        topic_filter=[selectors],
+        start_block=start_block,
+        stop_block=stop_block,
+    )
+    logs = list(chain.provider.get_contract_logs(log_filter))
+    logs.sort(key=lambda log: (log.block_number, log.log_index))
+    return logs
+
+
+def block_ranges(start_block, stop_block, page_size):
+    """Split an inclusive block range into inclusive pages"""
+    for page_start in range(start_block, stop_block + 1, page_size):
+        yield page_start, min(stop_block, page_start + page_size - 1)
+
+
+def creation_block(contract):
+    """Best-effort lookup of the block a contract was deployed in"""
+    try:
+        metadata = contract.creation_metadata
+    except Exception:
+        return 0
+
+    return metadata.block if metadata else 0
+
+
+@dataclass
+class StateChanges:
+    """
+    What a set of events did to the contract's state
+
+    Add these to values read before the transactions to get the state after
+    them without reading again.
+    """
+
+    supply_delta: int = 0
+    balance_deltas: Counter = field(default_factory=Counter)  # lowercase address -> change
+    owners: dict = field(default_factory=dict)                # token -> new owner, None once burned
+    approvals: dict = field(default_factory=dict)             # token -> approved address
+    operators: dict = field(default_factory=dict)             # (owner, operator) -> approved
+
+    def balance_delta(self, address):
+        return self.balance_deltas[str(address).lower()]
+
+
+def state_changes(logs):
+    """Fold decoded Transfer / Approval / ApprovalForAll logs into ``StateChanges`` in chain order"""
+    changes = StateChanges()
+    for log in sorted(logs, key=lambda log: (log.block_number, log.log_index)):
+        args = log.event_arguments
+        if log.event_name == "Transfer":
+            sender, receiver, token_id = args["_from"], args["_to"], args["_tokenId"]
+            if sender == ZERO_ADDRESS:
+                changes.supply_delta += 1
+            else:
+                changes.balance_deltas[sender.lower()] -= 1
+            if receiver == ZERO_ADDRESS:
+                changes.supply_delta -= 1
+                changes.owners[token_id] = None
+            else:
+                changes.balance_deltas[receiver.lower()] += 1
+                changes.owners[token_id] = receiver
+            changes.approvals[token_id] = ZERO_ADDRESS
+        elif log.event_name == "Approval":
+            changes.approvals[args["_tokenId"]] = args["_approved"]
+        elif log.event_name == "ApprovalForAll":
+            changes.operators[(args["_owner"], args["_operator"])] = args["_approved"]
+
+    return changes
@@ -0,0 +1,512 @@
+"""
+Resumable, incremental export of contract state rebuilt from event logs
+
+The ``Exporter`` replays a contract's logs page by page into a SQLite file in
+the export directory. Each page is applied in one transaction together with
+the block cursor, so an interrupted export resumes at the next page. Every
+row a page touches is marked dirty. Once the chain is caught up, the dirty
+rows are streamed out as a new partition:
+
+    <out>/blocks-000000001-000012345/tokens-00000.jsonl
+    <out>/blocks-000012346-000020000/tokens-00000.jsonl
+    <out>/manifest.json
+
+A partition holds the current state of every row that changed in its block
+range (``--full`` writes every row instead). Reading the partitions in
+manifest order and keeping the last row per key gives the state at the last
+exported block. A nightly re-export therefore only reads the blocks mined
+since the previous run. Rows are streamed from SQLite in small batches and
+written in fixed-size chunks, so memory use does not grow with the
+collection.
+"""
+import json
+import os
+import shutil
+import sqlite3
+from pathlib import Path
+
+from ape import chain
+from eth_utils import to_hex
+
+from scripts._content_store import ContentStore
+from scripts._events import DEFAULT_PAGE_SIZE, ZERO_ADDRESS, block_ranges, contract_logs, creation_block
+from scripts._rpc import RPCError, ReadBatch
+
+
+# Rows per output file
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Rows fetched from SQLite (and buffered per Parquet row group) at a time
+FETCH_ROWS = 1000
+
+META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirty (
+    dataset TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (dataset, key)
+);
+"""
+
+
+def _mark(db, dataset, key):
+    db.execute("INSERT OR IGNORE INTO dirty VALUES (?, ?)", (dataset, key))
+
+
+def _numeric_order(column):
+    # uint256 values are stored as decimal text
+    return f"length({column}), {column}"
+
+
+# ========== State models ==========
+
+class CollectionModel:
+    """Tokens (owner, approval, metadata) and operators of a MyCollectibleNFT"""
+
+    kind = "collection"
+    events = ("Transfer", "Approval", "ApprovalForAll", "Minted", "MintedWithContentHash")
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS tokens (
+        token_id TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        approved TEXT NOT NULL,
+        name TEXT NOT NULL DEFAULT '',
+        description TEXT NOT NULL DEFAULT '',
+        image TEXT NOT NULL DEFAULT '',
+        content_hash TEXT,
+        minted_block INTEGER NOT NULL,
+        updated_block INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS operators (
+        owner TEXT NOT NULL,
+        operator TEXT NOT NULL,
+        approved INTEGER NOT NULL,
+        updated_block INTEGER NOT NULL,
+        PRIMARY KEY (owner, operator)
+    );
+    """
+
+    # dataset -> (columns with their types, SELECT returning them, key expression, order)
+    datasets = {
+        "tokens": (
+            (("tokenId", "uint256"), ("owner", "address"), ("approved", "address"),
+             ("name", "string"), ("description", "string"), ("image", "string"),
+             ("contentHash", "string"), ("burned", "bool"), ("mintedBlock", "int"),
+             ("updatedBlock", "int")),
+            "SELECT token_id, owner, approved, name, description, image, content_hash, "
+            f"owner = '{ZERO_ADDRESS}', minted_block, updated_block FROM tokens",
+            "token_id",
+            _numeric_order("token_id"),
+        ),
+        "operators": (
+            (("owner", "address"), ("operator", "address"), ("approved", "bool"),
+             ("updatedBlock", "int")),
+            "SELECT owner, operator, approved, updated_block FROM operators",
+            "owner || ':' || operator",
+            "owner, operator",
+        ),
+    }
+
+    def __init__(self, contract, store=None):
+        self.contract = contract
+        self.store = store or ContentStore()
+
+    def apply(self, db, logs, block):
+        """Fold one page of logs into the tables; ``block`` is the page's last block"""
+        to_read = set()
+        for log in logs:
+            args, number = log.event_arguments, log.block_number
+            if log.event_name == "Transfer":
+                token_id = str(args["_tokenId"])
+                if args["_from"] == ZERO_ADDRESS:
+                    # A (re-)mint starts from a clean row
+                    db.execute(
+                        "INSERT OR REPLACE INTO tokens (token_id, owner, approved, minted_block, "
+                        "updated_block) VALUES (?, ?, ?, ?, ?)",
+                        (token_id, args["_to"].lower(), ZERO_ADDRESS, number, number),
+                    )
+                else:
+                    db.execute(
+                        "UPDATE tokens SET owner = ?, approved = ?, updated_block = ? WHERE token_id = ?",
+                        (args["_to"].lower(), ZERO_ADDRESS, number, token_id),
+                    )
+                _mark(db, "tokens", token_id)
+            elif log.event_name == "Approval":
+                token_id = str(args["_tokenId"])
+                db.execute(
+                    "UPDATE tokens SET approved = ?, updated_block = ? WHERE token_id = ?",
+                    (args["_approved"].lower(), number, token_id),
+                )
+                _mark(db, "tokens", token_id)
+            elif log.event_name == "ApprovalForAll":
+                owner, operator = args["_owner"].lower(), args["_operator"].lower()
+                db.execute(
+                    "INSERT OR REPLACE INTO operators VALUES (?, ?, ?, ?)",
+                    (owner, operator, int(args["_approved"]), number),
+                )
+                _mark(db, "operators", f"{owner}:{operator}")
+            elif log.event_name == "Minted":
+                to_read.add(args["_tokenId"])
+            else:
+                digest = args["_contentHash"]
+                metadata = self.store.get(digest) or {}
+                db.execute(
+                    "UPDATE tokens SET content_hash = ?, name = ?, description = ?, image = ? "
+                    "WHERE token_id = ?",
+                    (to_hex(digest), metadata.get("name", ""), metadata.get("description", ""),
+                     metadata.get("image", ""), str(args["_tokenId"])),
+                )
+
+        self._read_metadata(db, sorted(to_read), block)
+
+    def _read_metadata(self, db, token_ids, block):
+        # The events only carry the name: read the rest once, as of the page's last block
+        fields = ("characterName", "characterDescription", "characterImageURI")
+        for start in range(0, len(token_ids), FETCH_ROWS):
+            page = token_ids[start:start + FETCH_ROWS]
+            batch = ReadBatch(block_id=block)
+            for token_id in page:
+                for field in fields:
+                    batch.add(getattr(self.contract, field), token_id)
+            results = batch.execute()
+
+            for position, token_id in enumerate(page):
+                values = results[position * len(fields):(position + 1) * len(fields)]
+                if any(isinstance(value, RPCError) for value in values):
+                    continue  # Left empty rather than failing the page
+                db.execute(
+                    "UPDATE tokens SET name = ?, description = ?, image = ? WHERE token_id = ?",
+                    (*values, str(token_id)),
+                )
+
+
+class BalancesModel:
+    """Holder balances of an ERC-20 such as lab4's CrowdSaleToken"""
+
+    kind = "balances"
+    events = ("Transfer",)
+
+    schema = """
+    CREATE TABLE IF NOT EXISTS balances (
+        address TEXT PRIMARY KEY,
+        balance TEXT NOT NULL,
+        updated_block INTEGER NOT NULL
+    );
+    """
+
+    datasets = {
+        "balances": (
+            (("address", "address"), ("balance", "uint256"), ("updatedBlock", "int")),
+            "SELECT address, balance, updated_block FROM balances",
+            "address",
+            "address",
+        ),
+    }
+
+    def __init__(self, contract):
+        self.contract = contract
+
+    def apply(self, db, logs, block):
+        for log in logs:
+            args = log.event_arguments
+            value = args["value"]
+            if args["sender"] != ZERO_ADDRESS:
+                self._add(db, args["sender"].lower(), -value, log.block_number)
+            if args["receiver"] != ZERO_ADDRESS:
+                self._add(db, args["receiver"].lower(), value, log.block_number)
+
+    def _add(self, db, address, amount, number):
+        row = db.execute("SELECT balance FROM balances WHERE address = ?", (address,)).fetchone()
+        balance = (int(row[0]) if row else 0) + amount
+        db.execute("INSERT OR REPLACE INTO balances VALUES (?, ?, ?)", (address, str(balance), number))
+        _mark(db, "balances", address)
+
+
+# ========== Writers ==========
+
+def _convert(value, kind):
+    if value is None:
+        return None
+    if kind == "uint256":
+        return int(value)
+    if kind == "bool":
+        return bool(value)
+    return value
+
+
+class JsonlWriter:
+    suffix = ".jsonl"
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self._file = open(path, "w", encoding="utf8")
+
+    def write(self, row):
+        record = {name: _convert(value, kind) for (name, kind), value in zip(self.columns, row)}
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Parquet output needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+class ParquetWriter:
+    """Parquet chunk; uint256 columns are kept as decimal strings to stay exact"""
+
+    suffix = ".parquet"
+    TYPES = {"uint256": "string", "address": "string", "string": "string", "int": "int64", "bool": "bool_"}
+
+    def __init__(self, path, columns):
+        pyarrow = _import_pyarrow()
+        self._pa = pyarrow
+        self.columns = columns
+        self.schema = pyarrow.schema(
+            [(name, getattr(pyarrow, self.TYPES[kind])()) for name, kind in columns]
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self._rows = []
+
+    def write(self, row):
+        self._rows.append(tuple(
+            value if kind != "bool" or value is None else bool(value)
+            for (_, kind), value in zip(self.columns, row)
+        ))
+        if len(self._rows) >= FETCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            columns = list(zip(*self._rows))
+            self._writer.write_table(self._pa.Table.from_arrays(
+                [self._pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+                schema=self.schema,
+            ))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+def write_chunks(rows, directory, dataset, columns, writer_class, chunk_rows):
+    """
+    Stream ``rows`` into ``<dataset>-00000<suffix>``, ``-00001``, ... of ``chunk_rows`` each
+
+    @return ``(file names, row count)``
+    """
+    files, count, writer = [], 0, None
+    for row in rows:
+        if writer is None:
+            name = f"{dataset}-{len(files):05d}{writer_class.suffix}"
+            writer = writer_class(directory / name, columns)
+            files.append(name)
+        writer.write(row)
+        count += 1
+        if count % chunk_rows == 0:
+            writer.close()
+            writer = None
+
+    if writer is not None:
+        writer.close()
+    return files, count
+
+
+# ========== Export ==========
+
+class Exporter:
+    """Keeps an export directory in step with one contract"""
+
+    def __init__(self, model, out_dir, output_format="jsonl", page_size=DEFAULT_PAGE_SIZE,
+                 chunk_rows=DEFAULT_CHUNK_ROWS, confirmations=0):
+        """
+        @param model ``CollectionModel`` or ``BalancesModel`` of the contract
+        @param out_dir Export directory; holds the state database and the partitions
+        @param output_format ``jsonl`` or ``parquet``
+        @param page_size Blocks per eth_getLogs request and per checkpoint
+        @param chunk_rows Rows per output file
+        @param confirmations Blocks behind the head to stop at
+        """
+        if output_format == "parquet":
+            _import_pyarrow()  # Fail before syncing rather than at the first file
+
+        self.model = model
+        self.contract = model.contract
+        self.out_dir = Path(out_dir)
+        self.writer_class = WRITERS[output_format]
+        self.output_format = output_format
+        self.page_size = page_size
+        self.chunk_rows = chunk_rows
+        self.confirmations = confirmations
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.out_dir / "state.sqlite"))
+        self.db.executescript(META_SCHEMA + model.schema)
+        self._check_target()
+        self._reconcile()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ========== Checkpoints ==========
+
+    def _get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def cursor(self):
+        """Last block whose logs are applied to the state"""
+        return int(self._get_meta("cursor"))
+
+    @property
+    def exported(self):
+        """Last block covered by a written partition"""
+        return int(self._get_meta("exported"))
+
+    def _check_target(self):
+        target = f"{chain.chain_id}:{self.contract.address}:{self.model.kind}"
+        stored = self._get_meta("target")
+        if stored is None:
+            first_block = creation_block(self.contract)
+            self._set_meta("target", target)
+            self._set_meta("format", self.output_format)
+            self._set_meta("cursor", first_block - 1)
+            self._set_meta("exported", first_block - 1)
+            self.db.commit()
+        elif stored != target:
+            raise ValueError(f"{self.out_dir} holds an export of {stored}, not {target}")
+        elif self._get_meta("format") != self.output_format:
+            raise ValueError(f"{self.out_dir} is a {self._get_meta('format')} export")
+
+    def _reconcile(self):
+        """Finish bookkeeping a previous run was interrupted in"""
+        partitions = self.manifest()["partitions"]
+        published = {entry["name"] for entry in partitions}
+        for leftover in self.out_dir.glob("blocks-*"):
+            if leftover.is_dir() and leftover.name not in published:
+                shutil.rmtree(leftover)
+
+        if partitions and partitions[-1]["toBlock"] > self.exported:
+            # The partition was published but the dirty rows were not cleared yet
+            self._finish_partition(partitions[-1]["toBlock"])
+
+    def manifest(self):
+        path = self.out_dir / "manifest.json"
+        if not path.exists():
+            return {
+                "target": self._get_meta("target"),
+                "format": self.output_format,
+                "partitions": [],
+            }
+        return json.loads(path.read_text(encoding="utf8"))
+
+    def _write_manifest(self, manifest):
+        path = self.out_dir / "manifest.json"
+        temp = path.with_suffix(".json.part")
+        temp.write_text(json.dumps(manifest, indent=2), encoding="utf8")
+        os.replace(temp, path)
+
+    # ========== Syncing ==========
+
+    def sync(self, on_page=None):
+        """
+        Apply new logs up to ``confirmations`` blocks behind the head, one checkpointed page at a time
+
+        @param on_page Optional callback(page_start, page_stop, log_count)
+        @return Number of logs applied
+        """
+        head = chain.blocks.height - self.confirmations
+        applied = 0
+        for page_start, page_stop in block_ranges(self.cursor + 1, head, self.page_size):
+            logs = contract_logs(self.contract, page_start, page_stop, *self.model.events)
+            self.model.apply(self.db, logs, page_stop)
+            self._set_meta("cursor", page_stop)
+            self.db.commit()
+
+            applied += len(logs)
+            if on_page:
+                on_page(page_start, page_stop, len(logs))
+
+        return applied
+
+    # ========== Partitions ==========
+
+    def _rows(self, dataset, full):
+        _, query, key, order = self.model.datasets[dataset]
+        if not full:
+            query += f" WHERE {key} IN (SELECT key FROM dirty WHERE dataset = '{dataset}')"
+        cursor = self.db.execute(f"{query} ORDER BY {order}")
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                return
+            yield from rows
+
+    def write_partition(self, full=False):
+        """
+        Write the rows changed since the last partition (all rows if ``full``)
+
+        @return The manifest entry, or ``None`` if nothing changed
+        """
+        start, stop = self.exported + 1, self.cursor
+        changed = self.db.execute("SELECT COUNT(*) FROM dirty").fetchone()[0]
+        if stop < start or (not changed and not full):
+            self._finish_partition(stop)
+            return None
+
+        name = f"blocks-{start:09d}-{stop:09d}"
+        temp = self.out_dir / f"{name}.tmp"
+        temp.mkdir()
+
+        entry = {"name": name, "fromBlock": start, "toBlock": stop, "full": full, "datasets": {}}
+        for dataset, (columns, *_) in self.model.datasets.items():
+            files, count = write_chunks(
+                self._rows(dataset, full), temp, dataset, columns, self.writer_class, self.chunk_rows
+            )
+            entry["datasets"][dataset] = {"files": files, "rows": count}
+
+        # Publish atomically, then record it; _reconcile covers a crash in between
+        final = self.out_dir / name
+        if final.exists():
+            shutil.rmtree(final)
+        os.replace(temp, final)
+
+        manifest = self.manifest()
+        manifest["partitions"].append(entry)
+        self._write_manifest(manifest)
+        self._finish_partition(stop)
+        return entry
+
+    def _finish_partition(self, stop):
+        self.db.execute("DELETE FROM dirty")
+        self._set_meta("exported", stop)
+        self.db.commit()
+
+    def run(self, full=False, on_page=None):
+        """Sync and write one partition; ``(logs applied, manifest entry or None)``"""
+        applied = self.sync(on_page)
+        return applied, self.write_partition(full)
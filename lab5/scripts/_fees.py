@@ -0,0 +1,233 @@
+"""
+EIP-1559 fees from recent blocks
+
+``FeeEngine`` samples ``eth_feeHistory`` and prices transactions with one of
+the ``POLICIES``: the priority fee is a percentile of the tips recent blocks
+paid, and the fee cap leaves room for the base fee to rise before inclusion.
+It remembers what it priced, so a transaction that is still not mined after a
+few blocks can be re-signed with the same nonce and bumped fees, replacing it
+in the node's pool. ``metrics`` reports the fees chosen and the replacements.
+"""
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from ape import chain
+from eth_utils import to_hex
+
+from scripts._rpc import RPCError, batch_request, quantity
+
+
+# Environment variable the interactive scripts and nftd read the policy from
+FEE_POLICY_ENV = "NFT_FEE_POLICY"
+
+# Nodes only accept a replacement that raises both fees by at least 10%
+MIN_BUMP_PERCENT = 10
+
+# Unsigned transactions kept for replacement; the oldest are dropped first
+MAX_REPLACEABLE = 4096
+
+
+@dataclass(frozen=True)
+class FeePolicy:
+    """Tip percentile of recent blocks and headroom for base fee increases"""
+
+    percentile: int
+    base_fee_multiplier: float
+
+
+POLICIES = {
+    "cheap": FeePolicy(percentile=10, base_fee_multiplier=1.25),
+    "normal": FeePolicy(percentile=50, base_fee_multiplier=2),
+    "fast": FeePolicy(percentile=90, base_fee_multiplier=2),
+}
+
+
+@dataclass(frozen=True)
+class FeeQuote:
+    """Fees for the next transactions"""
+
+    policy: str
+    base_fee: int
+    max_priority_fee: int
+    max_fee: int
+
+    def options(self):
+        """Keyword arguments for ape's transaction calls"""
+        return {"max_fee": self.max_fee, "max_priority_fee": self.max_priority_fee}
+
+
+def default_policy():
+    return os.environ.get(FEE_POLICY_ENV, "normal")
+
+
+def gwei(wei):
+    return f"{wei / 1e9:,.2f} gwei"
+
+
+def format_metrics(metrics):
+    """One line summary of ``FeeEngine.metrics()``"""
+    if not metrics["quotes"]:
+        return f"⛽ Fees ({metrics['policy']}): provider defaults"
+
+    return (
+        f"⛽ Fees ({metrics['policy']}): base {gwei(metrics['base_fee'])}, "
+        f"tip {gwei(metrics['max_priority_fee'])}, cap {gwei(metrics['max_fee'])}, "
+        f"{metrics['replacements']} replacement(s)"
+    )
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) // 2
+
+
+def _bumped(value, percent):
+    return math.ceil(value * (100 + percent) / 100)
+
+
+class FeeEngine:
+    """Price transactions from ``eth_feeHistory`` and replace stuck ones"""
+
+    def __init__(self, policy="normal", blocks=20, max_age=2.0, bump_percent=12.5):
+        """
+        @param policy Name of one of the ``POLICIES``
+        @param blocks Recent blocks sampled per quote
+        @param max_age Seconds a quote is reused before sampling again
+        @param bump_percent Fee increase of each replacement (at least ``MIN_BUMP_PERCENT``)
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown fee policy '{policy}' (choose from {', '.join(POLICIES)})")
+
+        self.policy = policy
+        self.blocks = blocks
+        self.max_age = max_age
+        self.bump_percent = max(bump_percent, MIN_BUMP_PERCENT)
+
+        self._quote = None
+        self._quoted_at = 0.0
+        self._quotes = 0
+        self._replacements = 0
+        self._tip_total = 0
+        self._sent = {}  # txn hash -> unsigned transaction
+        self._lock = threading.Lock()
+
+    # ========== Quotes ==========
+
+    def quote(self, refresh=False):
+        """Fees for the next transaction, sampled at most every ``max_age`` seconds"""
+        with self._lock:
+            if refresh or self._quote is None or time.monotonic() - self._quoted_at > self.max_age:
+                self._quote = self._sample()
+                self._quoted_at = time.monotonic()
+                self._quotes += 1
+                self._tip_total += self._quote.max_priority_fee
+            return self._quote
+
+    def _sample(self):
+        policy = POLICIES[self.policy]
+        history, = batch_request([
+            ("eth_feeHistory", [hex(self.blocks), "pending", [policy.percentile]]),
+        ])
+
+        base_fees = [] if isinstance(history, RPCError) or not history else history["baseFeePerGas"]
+        if base_fees:
+            # The last entry is the base fee of the block after the newest one
+            base_fee = quantity(base_fees[-1])
+            # Empty blocks report a zero tip, which says nothing about the market
+            tips = [
+                quantity(reward[0])
+                for reward, used in zip(history["reward"], history["gasUsedRatio"])
+                if used > 0
+            ]
+            priority_fee = _median(tips) if tips else chain.provider.priority_fee
+        else:
+            # No fee history (e.g. the in-memory test chain): ask the provider
+            base_fee = chain.provider.base_fee
+            priority_fee = chain.provider.priority_fee
+
+        return FeeQuote(
+            policy=self.policy,
+            base_fee=base_fee,
+            max_priority_fee=priority_fee,
+            max_fee=int(base_fee * policy.base_fee_multiplier) + priority_fee,
+        )
+
+    # ========== Replacement ==========
+
+    def record(self, txn_hash, txn):
+        """Remember the unsigned ``txn`` behind ``txn_hash`` so it can be replaced"""
+        with self._lock:
+            self._sent[txn_hash] = txn
+            while len(self._sent) > MAX_REPLACEABLE:
+                del self._sent[next(iter(self._sent))]
+
+    def replacement(self, sender, txn_hash):
+        """
+        Sign, but do not send, a copy of ``txn_hash`` with the same nonce and bumped fees
+
+        Both fees rise by at least ``bump_percent``, or to the current quote
+        if the market moved further.
+
+        @return The signed replacement, or ``None`` if ``txn_hash`` is unknown or signing was declined
+        """
+        with self._lock:
+            txn = self._sent.get(txn_hash)
+        if txn is None:
+            return None
+
+        fresh = self.quote(refresh=True)
+        priority_fee = max(_bumped(txn.max_priority_fee, self.bump_percent), fresh.max_priority_fee)
+        max_fee = max(
+            _bumped(txn.max_fee, self.bump_percent),
+            fresh.max_fee - fresh.max_priority_fee + priority_fee,
+        )
+        replacement = txn.model_copy(update={"max_fee": max_fee, "max_priority_fee": priority_fee})
+        replacement.signature = None
+        return sender.sign_transaction(replacement)
+
+    def send_replacement(self, txn_hash, signed):
+        """
+        Send a ``replacement`` of ``txn_hash``
+
+        @return The replacement's hash, or ``None`` if the node refused it (e.g. the original was mined)
+        """
+        try:
+            new_hash = to_hex(chain.provider.web3.eth.send_raw_transaction(signed.serialize_transaction()))
+        except Exception:
+            return None
+
+        with self._lock:
+            self._sent.pop(txn_hash, None)
+            self._replacements += 1
+        self.record(new_hash, signed)
+        return new_hash
+
+    def replace(self, sender, txn_hash):
+        """
+        Re-send a stuck transaction with the same nonce and bumped fees
+
+        @return The replacement's hash, or ``None`` if ``txn_hash`` is unknown
+                or the node refused the replacement (e.g. the original was mined)
+        """
+        signed = self.replacement(sender, txn_hash)
+        return None if signed is None else self.send_replacement(txn_hash, signed)
+
+    # ========== Metrics ==========
+
+    def metrics(self):
+        """Chosen fees and replacement count, ready for printing or JSON"""
+        with self._lock:
+            quote = self._quote
+            return {
+                "policy": self.policy,
+                "quotes": self._quotes,
+                "replacements": self._replacements,
+                "base_fee": quote.base_fee if quote else None,
+                "max_priority_fee": quote.max_priority_fee if quote else None,
+                "max_fee": quote.max_fee if quote else None,
+                "mean_priority_fee": self._tip_total // self._quotes if self._quotes else None,
+            }
@@ -0,0 +1,319 @@
+"""
+Per-line gas profiles of the Vyper contracts from local debug traces
+
+``trace_transaction`` and ``trace_call`` fetch the opcode-level trace
+(``structLogs``) of a mined transaction or of a simulated call from a node
+that supports the ``debug_`` namespace (geth, anvil, hardhat). ``profile``
+walks it and charges every opcode's gas to the source line the compiler's pc
+map gives for its program counter, then groups the lines by the function that
+contains them. Calls into other contracts are charged to the callee's lines,
+so the call opcode itself only keeps its own overhead.
+
+The result reports per-line and per-function tables and writes the
+"collapsed stack" format that ``flamegraph.pl`` and speedscope read.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from hexbytes import HexBytes
+
+from scripts._rpc import RPCError, batch_request, quantity, to_block_param
+
+
+# Memory and storage snapshots are the bulk of a trace and are not needed
+TRACE_OPTIONS = {"enableMemory": False, "disableStorage": True, "enableReturnData": False}
+
+STORAGE_OPS = frozenset({"SLOAD", "SSTORE"})
+CALL_OPS = frozenset({"CALL", "CALLCODE", "DELEGATECALL", "STATICCALL"})
+
+# Frames for gas that is not spent on any source line
+DISPATCH = "(dispatch)"
+INTRINSIC = "(intrinsic)"
+
+
+class TraceError(Exception):
+    """The node could not trace the transaction (e.g. no debug_ namespace)"""
+
+
+# ========== Source maps ==========
+
+class SourceMap:
+    """Program counters of one compiled contract mapped to source lines and functions"""
+
+    def __init__(self, contract_type, source_path):
+        """
+        @param contract_type Compiled ``ContractType`` with ape-vyper's ``pcmap`` and AST
+        @param source_path The ``.vy`` file it was compiled from
+        """
+        self.name = contract_type.name
+        self.source_path = Path(source_path)
+        self.file_name = self.source_path.name
+        self.runtime_code = HexBytes(contract_type.runtime_bytecode.bytecode)
+        self.lines = self.source_path.read_text().splitlines()
+
+        # External entry points, including the fallback
+        self.external = {abi.name for abi in contract_type.abi if abi.type == "function"} | {"__default__"}
+
+        # Functions as sorted (first line, last line, name); public variables
+        # count as the getter the compiler generates for them
+        functions = []
+        for node in contract_type.ast.children:
+            if node.ast_type == "FunctionDef":
+                functions.append((node.lineno, node.end_lineno, node.name))
+            elif node.ast_type == "VariableDecl":
+                name = self.lines[node.lineno - 1].split(":", 1)[0].strip()
+                if name in self.external:
+                    functions.append((node.lineno, node.end_lineno, name))
+        self.functions = sorted(functions)
+        self._function_starts = [start for start, _, _ in self.functions]
+
+        # Statements, skipping the spans the compiler gives to the whole module
+        module_lines = (contract_type.ast.lineno, contract_type.ast.end_lineno)
+        items = contract_type.pcmap.parse()
+        offset = self._runtime_offset(contract_type, items)
+        self.pc_lines = {}
+        for pc, item in items.items():
+            if pc < offset or item.line_start is None:
+                continue
+            if (item.line_start, item.line_end) != module_lines:
+                self.pc_lines[pc - offset] = item.line_start
+
+
+    def _runtime_offset(self, contract_type, items):
+        """
+        Where the runtime code starts in the program counters of the pc map
+
+        Vyper 0.4's ``source_map`` output, which ape-vyper stores as the pc
+        map, covers the deployable bytecode: the constructor followed by the
+        runtime code. Older compilers map the runtime code alone.
+        """
+        if not items or max(items) < len(self.runtime_code):
+            return 0
+        offset = HexBytes(contract_type.deployment_bytecode.bytecode).find(self.runtime_code)
+        return max(offset, 0)
+
+    def line(self, pc):
+        """Source line of the statement at ``pc``, or ``None`` for compiler-generated code"""
+        return self.pc_lines.get(pc)
+
+    def function(self, line):
+        """Name of the function containing ``line``, or ``None`` outside any function"""
+        position = bisect_right(self._function_starts, line) - 1
+        if position < 0:
+            return None
+        start, end, name = self.functions[position]
+        return name if start <= line <= end else None
+
+    def text(self, line):
+        return self.lines[line - 1].strip() if 0 < line <= len(self.lines) else ""
+
+    def matches(self, code):
+        """Whether deployed ``code`` is this contract (immutables are appended after the runtime)"""
+        return bool(self.runtime_code) and HexBytes(code).startswith(self.runtime_code)
+
+
+def identify(addresses, source_maps, block_id="latest"):
+    """
+    Match each address to the ``SourceMap`` of the code deployed there
+
+    @return ``{lowercase address: SourceMap or None}``
+    """
+    addresses = sorted({address.lower() for address in addresses})
+    codes = batch_request([("eth_getCode", [address, to_block_param(block_id)]) for address in addresses])
+    return {
+        address: next(
+            (source_map for source_map in source_maps
+             if not isinstance(code, RPCError) and source_map.matches(code)),
+            None,
+        )
+        for address, code in zip(addresses, codes)
+    }
+
+
+# ========== Traces ==========
+
+def _request_trace(method, params):
+    result, = batch_request([(method, params)])
+    if isinstance(result, RPCError):
+        raise TraceError(f"{method} failed: {result.message}")
+    return result
+
+
+def trace_transaction(txn_hash):
+    """
+    ``debug_traceTransaction`` of a mined transaction
+
+    @return ``(struct_logs, gas_used, failed)``
+    """
+    result = _request_trace("debug_traceTransaction", [str(txn_hash), TRACE_OPTIONS])
+    return result["structLogs"], quantity(result["gas"]), result.get("failed", False)
+
+
+def trace_call(txn, block_id="latest"):
+    """
+    ``debug_traceCall`` of ``txn`` (``from``/``to``/``data``/``value``) on top of ``block_id``
+
+    @return ``(struct_logs, gas_used, failed)``
+    """
+    result = _request_trace("debug_traceCall", [txn, to_block_param(block_id), TRACE_OPTIONS])
+    return result["structLogs"], quantity(result["gas"]), result.get("failed", False)
+
+
+def _call_target(step):
+    """Address a call opcode sends to: the second stack item from the top"""
+    stack = step.get("stack") or []
+    if len(stack) < 2:
+        return None
+    return "0x" + HexBytes(quantity(stack[-2]).to_bytes(32, "big"))[-20:].hex()
+
+
+def called_addresses(struct_logs, to_address):
+    """``to_address`` and every address the trace calls into, for ``identify``"""
+    addresses = {to_address.lower()}
+    for step in struct_logs:
+        target = _call_target(step) if step["op"] in CALL_OPS else None
+        if target:
+            addresses.add(target)
+    return addresses
+
+
+# ========== Profiles ==========
+
+@dataclass
+class LineStats:
+    gas: int = 0
+    steps: int = 0
+    storage_ops: int = 0  # SLOADs and SSTOREs
+
+
+@dataclass
+class _Frame:
+    address: str
+    source_map: SourceMap | None  # None for code that is not one of ours
+    prefix: tuple                 # Collapsed stack of the caller, down to the calling line
+    entry: str | None = None      # External function the call entered
+    line: int | None = None       # Last line executed, carried over compiler-generated code
+    gas_inside: int = 0           # Everything spent in this frame and its callees
+
+
+@dataclass
+class GasProfile:
+    """Gas of one transaction or call, by source line, function and stack"""
+
+    gas_used: int
+    failed: bool = False
+    lines: dict = field(default_factory=lambda: defaultdict(LineStats))  # (SourceMap, line) -> stats
+    functions: dict = field(default_factory=lambda: defaultdict(int))    # "Contract.function" -> gas
+    stacks: dict = field(default_factory=lambda: defaultdict(int))       # collapsed stack -> gas
+
+    def top_lines(self, limit=None):
+        """``[(SourceMap, line, LineStats), ...]``, most expensive first"""
+        ranked = sorted(self.lines.items(), key=lambda item: item[1].gas, reverse=True)
+        return [(source_map, line, stats) for (source_map, line), stats in ranked[:limit]]
+
+    def top_functions(self, limit=None):
+        """``[("Contract.function", gas), ...]``, most expensive first"""
+        return sorted(self.functions.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def write_collapsed(self, path):
+        """Write ``frame;frame;... gas`` lines for flamegraph.pl, inferno or speedscope"""
+        with open(path, "w") as out:
+            for stack, gas in sorted(self.stacks.items()):
+                if gas > 0:
+                    out.write(f"{';'.join(stack)} {gas}\n")
+
+    def _locate(self, frame, step):
+        """
+        Collapsed stack of ``step`` and the function it is charged to
+
+        Frames are the external function, the internal function when the line
+        belongs to another one, and ``File.vy:line``.
+        """
+        source_map = frame.source_map
+        if source_map is None:
+            return frame.prefix + (frame.address,), frame.address
+
+        line = source_map.line(step["pc"])
+        if line is not None:
+            frame.line = line
+        line = frame.line
+        function = source_map.function(line) if line is not None else None
+        if frame.entry is None and function in source_map.external:
+            frame.entry = function
+
+        stack = frame.prefix + (f"{source_map.name}.{frame.entry or DISPATCH}",)
+        if function is not None and function != frame.entry:
+            stack += (f"{source_map.name}.{function}",)
+        if line is not None:
+            stack += (f"{source_map.file_name}:{line}",)
+        return stack, f"{source_map.name}.{function or frame.entry or DISPATCH}"
+
+    def _charge(self, frame, step, gas):
+        stack, function = self._locate(frame, step)
+        self.stacks[stack] += gas
+        self.functions[function] += gas
+        if frame.source_map is not None and frame.line is not None:
+            stats = self.lines[(frame.source_map, frame.line)]
+            stats.gas += gas
+            stats.steps += 1
+            stats.storage_ops += step["op"] in STORAGE_OPS
+
+
+def profile(struct_logs, gas_used, to_address, source_maps, failed=False):
+    """
+    Attribute the gas of a trace to source lines
+
+    Each opcode costs the gas it took off the counter before the next opcode
+    of the same call frame. A call opcode costs that minus everything spent
+    inside the callee, which is charged to the callee's own lines.
+
+    @param struct_logs ``structLogs`` of ``trace_transaction`` or ``trace_call``
+    @param gas_used Gas the transaction used; the part no opcode accounts for
+                    (base cost, calldata, refunds) is reported as ``(intrinsic)``
+    @param to_address Contract the transaction or call was sent to
+    @param source_maps ``{lowercase address: SourceMap or None}`` from ``identify``
+    """
+    result = GasProfile(gas_used=gas_used, failed=failed)
+    root = to_address.lower()
+    frames = [_Frame(root, source_maps.get(root), ())]
+    calls = []  # Call steps whose callee is running
+
+    for index, step in enumerate(struct_logs):
+        frame = frames[-1]
+        following = struct_logs[index + 1] if index + 1 < len(struct_logs) else None
+
+        if following is not None and following["depth"] > step["depth"]:
+            # Entering a callee (CREATE's new contract has no address yet)
+            target = _call_target(step) if step["op"] in CALL_OPS else None
+            calls.append(step)
+            frames.append(_Frame(
+                target or "(create)",
+                source_maps.get(target),
+                result._locate(frame, step)[0],
+            ))
+            continue
+
+        if following is not None and following["depth"] == step["depth"]:
+            gas = step["gas"] - following["gas"]
+        else:
+            gas = step["gasCost"]  # Last step of a frame
+        frame.gas_inside += gas
+        result._charge(frame, step, gas)
+
+        if following is not None and following["depth"] < step["depth"]:
+            # Back in the caller
+            callee = frames.pop()
+            call = calls.pop()
+            overhead = call["gas"] - following["gas"] - callee.gas_inside
+            frames[-1].gas_inside += callee.gas_inside + overhead
+            result._charge(frames[-1], call, overhead)
+
+    intrinsic = gas_used - frames[0].gas_inside
+    if intrinsic:
+        root_map = frames[0].source_map
+        label = f"{root_map.name}.{frames[0].entry or DISPATCH}" if root_map else root
+        result.stacks[(label, INTRINSIC)] += intrinsic
+        result.functions[INTRINSIC] += intrinsic
+    return result
@@ -0,0 +1,297 @@
+"""
+Load generation against a local node
+
+Transactions are signed before the clock starts, so signing speed does not
+cap the offered load. ``LoadRunner`` then submits them at a target arrival
+rate from a pool of sender threads while a watcher thread follows new blocks
+and records when each transaction was included, its gas and its status.
+
+All transactions of one sender go through the same thread, in nonce order:
+nodes without a transaction pool (the local test provider) reject a nonce
+that arrives ahead of its predecessor.
+"""
+import math
+import random
+import threading
+import time
+from queue import Queue
+from dataclasses import dataclass
+
+from ape import chain
+from eth_account import Account
+from eth_utils import keccak, to_hex
+
+from scripts._rpc import RPCError, batch_request, quantity
+
+
+@dataclass
+class TxRecord:
+    """Timeline of one load-test transaction"""
+
+    wave: int
+    submitted_at: float | None = None
+    included_at: float | None = None
+    block: int | None = None
+    gas_used: int | None = None
+    status: int | None = None
+    error: str | None = None
+
+
+# ========== Accounts and signing ==========
+
+def load_accounts(count, seed=0):
+    """Deterministic throwaway accounts, so reruns with a seed reuse funded keys"""
+    return [Account.from_key(keccak(text=f"load-test:{seed}:{index}")) for index in range(count)]
+
+
+def current_fees(multiplier=2):
+    provider = chain.provider
+    priority_fee = provider.priority_fee
+    return {"maxPriorityFeePerGas": priority_fee,
+            "maxFeePerGas": provider.base_fee * multiplier + priority_fee}
+
+
+def next_nonces(addresses):
+    """Pending nonce of every address, read in one batch"""
+    counts = batch_request([("eth_getTransactionCount", [address, "pending"]) for address in addresses])
+    nonces = {}
+    for address, count in zip(addresses, counts):
+        if isinstance(count, RPCError):
+            raise count
+        nonces[address] = quantity(count)
+
+    return nonces
+
+
+def sign(account, nonce, to, gas, fees, value=0, data=b""):
+    """Sign an EIP-1559 transaction; return ``(sender, hash, raw)``"""
+    signed = account.sign_transaction({
+        "type": 2,
+        "chainId": chain.chain_id,
+        "nonce": nonce,
+        "to": to,
+        "value": value,
+        "data": data,
+        "gas": gas,
+        **fees,
+    })
+    return account.address, to_hex(signed.hash), to_hex(signed.raw_transaction)
+
+
+def sign_with_ape(account, nonce, to, gas, fees, value=0, data=b""):
+    """Same as ``sign`` for an ape account (e.g. the funder)"""
+    txn = chain.provider.network.ecosystem.create_transaction(
+        chain_id=chain.chain_id,
+        type=2,
+        sender=account.address,
+        receiver=to,
+        value=value,
+        data=data,
+        nonce=nonce,
+        gas=gas,
+        max_fee=fees["maxFeePerGas"],
+        max_priority_fee=fees["maxPriorityFeePerGas"],
+    )
+    signed = account.sign_transaction(txn)
+    if signed is None:
+        raise RuntimeError("Signing was declined")
+
+    return account.address, to_hex(signed.txn_hash), to_hex(signed.serialize_transaction())
+
+
+# ========== Running ==========
+
+class LoadRunner:
+    """Submit pre-signed transactions at a target rate and time their inclusion"""
+
+    def __init__(self, rate=0, concurrency=8, arrival="constant", poll_interval=0.1,
+                 inclusion_timeout=120, seed=0):
+        """
+        @param rate Target submissions per second (0 submits as fast as possible)
+        @param concurrency Sender threads, i.e. maximum submissions in flight
+            (one sender's transactions are never in flight together)
+        @param arrival "constant" spacing or "poisson" (exponential gaps)
+        @param poll_interval Seconds between checks for a new block
+        @param inclusion_timeout Seconds to wait for a wave's stragglers before giving up
+        @param seed Seed for Poisson arrivals
+        """
+        self.rate = rate
+        self.concurrency = concurrency
+        self.arrival = arrival
+        self.poll_interval = poll_interval
+        self.inclusion_timeout = inclusion_timeout
+        self._rng = random.Random(seed)
+
+        self.records = {}  # txn hash -> TxRecord
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._included = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self.started_at = None
+        self.finished_at = None
+
+    def _gap(self):
+        if not self.rate:
+            return 0
+        if self.arrival == "poisson":
+            return self._rng.expovariate(self.rate)
+        return 1 / self.rate
+
+    def _submit(self, txn_hash, raw):
+        record = self.records[txn_hash]
+        record.submitted_at = time.monotonic()
+        try:
+            chain.provider.web3.eth.send_raw_transaction(raw)
+        except Exception as err:
+            with self._lock:
+                record.error = str(err)
+                self._pending.discard(txn_hash)
+                self._included.notify_all()
+
+    def _send_loop(self, lane):
+        while (item := lane.get()) is not None:
+            self._submit(*item)
+
+    # ========== Inclusion ==========
+
+    def _watch(self):
+        last_block = chain.blocks.height
+        while not self._stop.is_set():
+            head = chain.blocks.height
+            if head > last_block:
+                self._scan_blocks(range(last_block + 1, head + 1))
+                last_block = head
+
+            self._stop.wait(self.poll_interval)
+
+    def _scan_blocks(self, numbers):
+        seen_at = time.monotonic()
+        blocks = batch_request([("eth_getBlockByNumber", [hex(number), False]) for number in numbers])
+
+        ours = []
+        with self._lock:
+            for number, block in zip(numbers, blocks):
+                if not block or isinstance(block, RPCError):
+                    continue
+                for txn_hash in block["transactions"]:
+                    txn_hash = to_hex(txn_hash) if isinstance(txn_hash, bytes) else txn_hash.lower()
+                    if txn_hash in self._pending:
+                        record = self.records[txn_hash]
+                        record.included_at = seen_at
+                        record.block = number
+                        ours.append(txn_hash)
+
+        receipts = batch_request([("eth_getTransactionReceipt", [txn_hash]) for txn_hash in ours])
+        with self._lock:
+            for txn_hash, receipt in zip(ours, receipts):
+                record = self.records[txn_hash]
+                if receipt and not isinstance(receipt, RPCError):
+                    record.gas_used = quantity(receipt["gasUsed"])
+                    record.status = quantity(receipt["status"])
+                self._pending.discard(txn_hash)
+
+            if ours:
+                self.finished_at = seen_at
+            self._included.notify_all()
+
+    # ========== Run ==========
+
+    def _wait_for_wave(self, submitted, total, on_progress):
+        deadline = time.monotonic() + self.inclusion_timeout
+        with self._lock:
+            while self._pending and time.monotonic() < deadline:
+                self._included.wait(self.poll_interval)
+                if on_progress:
+                    on_progress(submitted, submitted - len(self._pending), total)
+
+            for txn_hash in self._pending:
+                self.records[txn_hash].error = "not included"
+            self._pending.clear()
+
+    def run(self, waves, on_progress=None):
+        """
+        Submit each wave of ``(sender, hash, raw)`` transactions in turn
+
+        A wave only starts once every transaction of the previous one is
+        included, so later waves may depend on earlier ones.
+
+        @param on_progress Optional callback(submitted, included, total)
+        @return ``self.records``
+        """
+        total = sum(len(wave) for wave in waves)
+        for wave_number, wave in enumerate(waves):
+            for _, txn_hash, _ in wave:
+                self.records[txn_hash.lower()] = TxRecord(wave=wave_number)
+
+        lanes = [Queue() for _ in range(self.concurrency)]
+        senders = [threading.Thread(target=self._send_loop, args=(lane,), daemon=True) for lane in lanes]
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        for thread in (watcher, *senders):
+            thread.start()
+
+        lane_of = {}
+        self.started_at = time.monotonic()
+        submitted = 0
+        try:
+            for wave in waves:
+                next_at = time.monotonic()
+                for sender, txn_hash, raw in wave:
+                    delay = next_at - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_at += self._gap()
+
+                    with self._lock:
+                        self._pending.add(txn_hash.lower())
+                    lane = lane_of.setdefault(sender, lanes[len(lane_of) % len(lanes)])
+                    lane.put((txn_hash.lower(), raw))
+                    submitted += 1
+
+                self._wait_for_wave(submitted, total, on_progress)
+        finally:
+            for lane in lanes:
+                lane.put(None)
+            for thread in senders:
+                thread.join()
+            self._stop.set()
+            watcher.join()
+
+        return self.records
+
+
+# ========== Reporting ==========
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(round(fraction * len(ordered), 9)) - 1))
+    return ordered[index]
+
+
+def summarize(runner):
+    """Throughput, latency, gas and revert statistics of a finished run"""
+    records = list(runner.records.values())
+    included = [record for record in records if record.included_at is not None]
+    reverted = [record for record in included if record.status == 0]
+    latencies = [record.included_at - record.submitted_at for record in included]
+    gas = [record.gas_used for record in included if record.gas_used is not None]
+
+    duration = (runner.finished_at or runner.started_at) - runner.started_at
+    summary = {
+        "total": len(records),
+        "included": len(included),
+        "reverted": len(reverted),
+        "submit_errors": sum(1 for record in records if record.error),
+        "duration": duration,
+        "tps": len(included) / duration if duration > 0 else 0.0,
+        "revert_rate": len(reverted) / len(included) if included else 0.0,
+    }
+    if latencies:
+        summary["latency"] = {
+            name: percentile(latencies, fraction)
+            for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+        }
+    if gas:
+        summary["gas"] = {"mean": sum(gas) / len(gas), "p50": percentile(gas, 0.5), "max": max(gas)}
+
+    return summary
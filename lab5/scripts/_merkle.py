@@ -0,0 +1,328 @@
+"""
+Merkle allowlists for MyCollectibleNFT claims and CrowdSaleToken purchases
+
+An allowlist is a list of ``(address, cap)`` entries. Its leaves are
+``keccak256(keccak256(abi_encode(address, cap)))``, every parent hashes its
+two children in ascending order, and an odd node moves up a level unchanged.
+That is what ``claim`` and ``buyAllowlisted`` verify, and the leaves match
+OpenZeppelin's ``StandardMerkleTree``.
+
+``build_tree`` hashes whole levels at once with a Keccak-f[1600] written over
+NumPy arrays, one lane per message, so a million entries take seconds instead
+of one Python call per hash. ``write_proof_file`` stores the sorted addresses,
+their caps and every level of the tree in one file. ``ProofFile`` memory-maps
+that file and reads a proof as one sibling per level, after a binary search
+for the address.
+"""
+import csv
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+
+# ========== Keccak-256 over NumPy arrays ==========
+
+ROUND_CONSTANTS = np.array([
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+], dtype=np.uint64)
+
+# Rotation of lane (x, y)
+ROTATIONS = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+
+# Rho and pi together: lane x + 5y rotates into lane y + 5(2x + 3y)
+RHO_PI = [
+    (x + 5 * y, y + 5 * ((2 * x + 3 * y) % 5), ROTATIONS[x][y])
+    for x in range(5) for y in range(5)
+]
+
+RATE = 136  # Bytes absorbed per block by Keccak-256
+
+# Messages hashed per pass; large enough to amortize NumPy's per-call cost,
+# small enough for the 25 lanes to stay in cache
+HASH_CHUNK_SIZE = 8192
+
+_SHIFTS = [np.uint64(n) for n in range(65)]
+
+
+def _keccak_f(state):
+    """Keccak-f[1600] in place on a (25, n) uint64 state, lane x + 5y in row x + 5y"""
+    n = state.shape[1]
+    lanes = state.reshape(5, 5, n)  # [y, x]
+    parity = np.empty((5, n), np.uint64)
+    theta = np.empty((5, n), np.uint64)
+    moved = np.empty((25, n), np.uint64)
+    moved_lanes = moved.reshape(5, 5, n)
+    scratch = np.empty(n, np.uint64)
+
+    # Views are set up once; the rounds only run in-place ufuncs on them
+    theta_inputs = [(parity[(x + 1) % 5], parity[(x - 1) % 5], theta[x]) for x in range(5)]
+    rho_pi = [(state[source], moved[target], _SHIFTS[r], _SHIFTS[64 - r]) for source, target, r in RHO_PI]
+    chi = [(lanes[:, x], moved_lanes[:, (x + 1) % 5], moved_lanes[:, (x + 2) % 5], moved_lanes[:, x])
+           for x in range(5)]
+
+    for constant in ROUND_CONSTANTS:
+        np.bitwise_xor.reduce(lanes, axis=0, out=parity)
+        for right, left, out in theta_inputs:
+            np.left_shift(right, _SHIFTS[1], out=out)
+            np.right_shift(right, _SHIFTS[63], out=scratch)
+            out |= scratch
+            out ^= left
+        lanes ^= theta
+
+        for source, target, left, right in rho_pi:
+            if left:
+                np.left_shift(source, left, out=target)
+                np.right_shift(source, right, out=scratch)
+                target |= scratch
+            else:
+                target[:] = source
+
+        for out, next_lane, after_next, lane in chi:
+            np.invert(next_lane, out=out)
+            out &= after_next
+            out ^= lane
+
+        state[0] ^= constant
+
+
+def keccak256_batch(messages):
+    """
+    Keccak-256 of every row of ``messages``
+
+    @param messages (n, length) uint8 array; all rows have the same length, under 136 bytes
+    @return (n, 32) uint8 array of digests
+    """
+    count, length = messages.shape
+    if length >= RATE:
+        raise ValueError(f"Messages must be shorter than {RATE} bytes")
+
+    digests = np.empty((count, 32), np.uint8)
+    for start in range(0, count, HASH_CHUNK_SIZE):
+        chunk = messages[start:start + HASH_CHUNK_SIZE]
+        block = np.zeros((len(chunk), RATE), np.uint8)
+        block[:, :length] = chunk
+        block[:, length] ^= 0x01  # Keccak padding, not SHA-3's 0x06
+        block[:, RATE - 1] ^= 0x80
+
+        state = np.zeros((25, len(chunk)), np.uint64)
+        state[:RATE // 8] = block.view("<u8").T
+        _keccak_f(state)
+        digests[start:start + len(chunk)] = np.ascontiguousarray(state[:4].T).view(np.uint8)
+    return digests
+
+
+# ========== Trees ==========
+
+def leaf_hashes(addresses, caps):
+    """
+    @param addresses (n, 20) uint8 array
+    @param caps (n, 32) uint8 array of big-endian uint256 caps
+    @return (n, 32) leaves, keccak256(keccak256(abi_encode(address, cap)))
+    """
+    encoded = np.zeros((len(addresses), 64), np.uint8)
+    encoded[:, 12:32] = addresses
+    encoded[:, 32:] = caps
+    return keccak256_batch(keccak256_batch(encoded))
+
+
+def _parents(level):
+    """The next level up: keccak256 of each sorted pair, plus the odd node as is"""
+    pairs = len(level) // 2
+    left, right = level[0:2 * pairs:2], level[1:2 * pairs:2]
+
+    # Compare the pairs as 256-bit big-endian numbers, word by word
+    left_words, right_words = left.view(">u8"), right.view(">u8")
+    differs = left_words != right_words
+    first = differs.argmax(axis=1)
+    rows = np.arange(pairs)
+    swap = left_words[rows, first] > right_words[rows, first]
+
+    joined = np.empty((pairs, 64), np.uint8)
+    joined[:, :32] = np.where(swap[:, None], right, left)
+    joined[:, 32:] = np.where(swap[:, None], left, right)
+    parents = keccak256_batch(joined)
+    if len(level) % 2:
+        parents = np.concatenate([parents, level[-1:]])
+    return parents
+
+
+def build_tree(leaves):
+    """
+    @param leaves (n, 32) uint8 array, n >= 1
+    @return Levels from the leaves up to the one-node root level
+    """
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        levels.append(_parents(levels[-1]))
+    return levels
+
+
+def level_sizes(count):
+    sizes = [count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def proof_from_levels(levels, index):
+    """Sibling hashes of leaf ``index``, bottom up, as ``bytes``"""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(bytes(level[sibling]))
+        index //= 2
+    return proof
+
+
+def verify_proof(root, leaf, proof):
+    """What the contracts compute, in Python"""
+    node = bytes(leaf)
+    for sibling in proof:
+        node = keccak(node + sibling if node < sibling else sibling + node)
+    return node == bytes(root)
+
+
+def leaf_hash(address, cap):
+    """Leaf of one entry, for checking a proof by hand"""
+    return bytes(leaf_hashes(
+        np.frombuffer(HexBytes(address), np.uint8)[None, :],
+        np.frombuffer(cap.to_bytes(32, "big"), np.uint8)[None, :],
+    )[0])
+
+
+# ========== Allowlist files ==========
+
+def _parse_entry(line, record):
+    address = record.get("address")
+    cap = record.get("cap")
+    if not address or cap in (None, ""):
+        raise ValueError(f"Line {line}: an entry needs 'address' and 'cap'")
+    try:
+        raw = bytes.fromhex(address[2:]) if address[:2] in ("0x", "0X") else b""
+        cap = int(cap)
+        cap_bytes = cap.to_bytes(32, "big")
+    except (ValueError, OverflowError):
+        raw = cap_bytes = None
+    if raw is None or len(raw) != 20 or cap < 0:
+        raise ValueError(f"Line {line}: bad address or cap")
+    return raw, cap_bytes
+
+
+def read_allowlist(path):
+    """
+    ``(address, cap)`` entries from a CSV (``address,cap`` header) or JSONL manifest
+
+    @return ``(addresses, caps)``: (n, 20) and (n, 32) uint8 arrays in file order
+    """
+    path = Path(path)
+    addresses, caps = bytearray(), bytearray()
+    with path.open(newline="", encoding="utf8") as manifest:
+        if path.suffix.lower() == ".csv":
+            rows = enumerate(csv.DictReader(manifest), start=2)
+        else:
+            rows = ((line, json.loads(text)) for line, text in enumerate(manifest, start=1) if text.strip())
+        for line, record in rows:
+            raw, cap = _parse_entry(line, record)
+            addresses += raw
+            caps += cap
+
+    if not addresses:
+        raise ValueError(f"{path} has no entries")
+    return (np.frombuffer(bytes(addresses), np.uint8).reshape(-1, 20),
+            np.frombuffer(bytes(caps), np.uint8).reshape(-1, 32))
+
+
+# Header: magic, entry count, then the root
+MAGIC = b"ALLOWLST"
+HEADER = struct.Struct("<8sQ32s")
+
+
+def write_proof_file(path, addresses, caps):
+    """
+    Build the tree and write it with the entries, sorted by address
+
+    Every level is kept (about 64 bytes per entry in total) rather than a
+    proof per entry, which would take ``32 * log2(n)`` bytes each; a proof is
+    then one read per level.
+
+    @return The root as ``bytes``
+    @raise ValueError If an address appears twice
+    """
+    order = np.argsort(addresses.view("S20").ravel(), kind="stable")
+    addresses, caps = addresses[order], caps[order]
+    duplicate = np.flatnonzero((addresses[1:] == addresses[:-1]).all(axis=1))
+    if len(duplicate):
+        raise ValueError(f"0x{bytes(addresses[duplicate[0]]).hex()} is listed more than once")
+
+    levels = build_tree(leaf_hashes(addresses, caps))
+    root = bytes(levels[-1][0])
+    with open(path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, len(addresses), root))
+        out.write(addresses.tobytes())
+        out.write(caps.tobytes())
+        for level in levels:
+            out.write(level.tobytes())
+    return root
+
+
+class ProofFile:
+    """Read-only, memory-mapped view of a file written by ``write_proof_file``"""
+
+    def __init__(self, path):
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not an allowlist file")
+        magic, count, root = HEADER.unpack(data[:HEADER.size].tobytes())
+        sizes = level_sizes(count)
+        if magic != MAGIC or len(data) != HEADER.size + 52 * count + 32 * sum(sizes):
+            raise ValueError(f"{path} is not an allowlist file")
+
+        self.root = root
+        self.count = count
+        offset = HEADER.size
+        self.addresses = data[offset:offset + 20 * count].reshape(count, 20)
+        self._keys = self.addresses.view("S20").ravel()
+        offset += 20 * count
+        self.caps = data[offset:offset + 32 * count].reshape(count, 32)
+        offset += 32 * count
+        self.levels = []
+        for size in sizes:
+            self.levels.append(data[offset:offset + 32 * size].reshape(size, 32))
+            offset += 32 * size
+
+    def __len__(self):
+        return self.count
+
+    def index(self, address):
+        """Position of ``address`` among the sorted entries, or ``None``"""
+        raw = bytes(HexBytes(address))
+        position = int(np.searchsorted(self._keys, raw))
+        if position < self.count and self.addresses[position].tobytes() == raw:
+            return position
+        return None
+
+    def lookup(self, address):
+        """
+        @return ``(cap, proof)`` for ``address``, or ``None`` if it is not listed
+        """
+        position = self.index(address)
+        if position is None:
+            return None
+        cap = int.from_bytes(self.caps[position].tobytes(), "big")
+        return cap, proof_from_levels(self.levels, position)
@@ -0,0 +1,288 @@
+"""
+Event-fed token metadata, served over HTTP without touching the node
+
+``MetadataStore`` keeps each live token's metadata JSON in a table next to
+the ``OwnerIndex`` database. ``sync`` catches the index up with the chain and
+then reads the character fields once for every newly minted token, in one
+batch; content-addressed tokens are resolved from the ``ContentStore``
+instead. Burned tokens lose their row. An in-memory LRU sits in front of the
+table, and exactly the tokens a sync touched are invalidated.
+
+``MetadataServer`` answers ``/metadata/{tokenId}`` and ``/collection`` from
+the store alone, with an ETag on every response so clients can revalidate
+with ``If-None-Match``.
+"""
+import json
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_utils import to_hex
+
+from scripts._content_store import (
+    ContentStore,
+    canonical_metadata,
+    content_hash,
+    is_content_addressed,
+)
+from scripts._nft_index import OwnerIndex
+from scripts._rpc import RPCError, ReadBatch
+
+
+DEFAULT_CACHE_SIZE = 10_000
+
+# Tokens whose metadata is read per batch
+READ_BATCH_SIZE = 100
+
+METADATA_FIELDS = ("contentHash", "characterName", "characterDescription", "characterImageURI")
+
+METADATA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    token_id TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    etag TEXT NOT NULL
+);
+"""
+
+MINT_EVENTS = ("Minted", "MintedWithContentHash")
+
+COLLECTION = "collection"
+
+
+class LRUCache:
+    """Thread-safe least recently used map"""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._generation = 0  # Bumped by every invalidation
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, load):
+        """Cached value for ``key``, or ``load()`` stored under it"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = load()
+        with self._lock:
+            # A value loaded before an invalidation may already be stale
+            if generation == self._generation:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+def _etag(body):
+    return f'"{to_hex(content_hash(body))}"'
+
+
+class MetadataStore:
+    """Token metadata JSON kept in sync with the chain by the ownership index"""
+
+    def __init__(self, contract, db_path=None, store=None, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        @param contract MyCollectibleNFT contract instance
+        @param db_path Index database (defaults to the project's .cache folder)
+        @param store ContentStore holding content-addressed metadata
+        @param cache_size Responses kept in memory
+        """
+        self.contract = contract
+        self.store = store or ContentStore()
+        self.index = OwnerIndex(contract, db_path, store=self.store)
+        self.index.db.execute("PRAGMA journal_mode=WAL")  # Readers never wait on a sync
+        self.index.db.executescript(METADATA_SCHEMA)
+        self.cache = LRUCache(cache_size)
+        self.name = contract.name()
+        self.symbol = contract.symbol()
+
+        self._readers = threading.local()
+
+    def close(self):
+        self.index.close()
+
+    # ========== Syncing ==========
+
+    def sync(self):
+        """
+        Catch up with the chain; call it from the thread that created the store
+
+        @return Token IDs whose metadata changed
+        """
+        minted = set()
+
+        def on_page(_start, _stop, logs):
+            minted.update(str(log._tokenId) for log in logs if log.event_name in MINT_EVENTS)
+
+        applied = self.index.sync(on_page=on_page)
+        db = self.index.db
+
+        # Burned tokens (also ones a reorg undid), and re-minted ones whose row is stale
+        gone = {row[0] for row in db.execute(
+            "SELECT token_id FROM metadata WHERE token_id NOT IN (SELECT token_id FROM tokens)"
+        )}
+        stale = gone | minted
+        db.executemany("DELETE FROM metadata WHERE token_id = ?", [(token_id,) for token_id in stale])
+
+        missing = [row[0] for row in db.execute(
+            "SELECT token_id FROM tokens WHERE token_id NOT IN (SELECT token_id FROM metadata)"
+        )]
+        added = self._fetch(missing)
+        db.commit()
+
+        changed = stale | added
+        if changed or applied:
+            # Any transfer changes the collection's owner list
+            self.cache.invalidate(COLLECTION, *(int(token_id) for token_id in changed))
+        return changed
+
+    def _fetch(self, token_ids):
+        """Read and store the metadata of ``token_ids``; the IDs that got a row"""
+        added = set()
+        for start in range(0, len(token_ids), READ_BATCH_SIZE):
+            page = token_ids[start:start + READ_BATCH_SIZE]
+            batch = ReadBatch()
+            for token_id in page:
+                for field in METADATA_FIELDS:
+                    batch.add(getattr(self.contract, field), int(token_id))
+            results = batch.execute()
+
+            width = len(METADATA_FIELDS)
+            for position, token_id in enumerate(page):
+                body = self._body(results[position * width:(position + 1) * width])
+                if body is not None:
+                    self.index.db.execute(
+                        "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?)",
+                        (token_id, body, _etag(body)),
+                    )
+                    added.add(token_id)
+
+        return added
+
+    def _body(self, fields):
+        if any(isinstance(field, RPCError) for field in fields):
+            return None  # Retried on the next sync
+
+        digest, name, description, image_uri = fields
+        if is_content_addressed(digest):
+            # The file may not be in the store yet; retried on the next sync
+            metadata = self.store.get(digest)
+            if metadata is None:
+                return None
+            return canonical_metadata(metadata["name"], metadata["description"], metadata["image"])
+
+        # What tokenURI builds on-chain, except that quotes and backslashes are escaped
+        return canonical_metadata(name, description, image_uri)
+
+    # ========== Reads (any thread) ==========
+
+    def _reader(self):
+        db = getattr(self._readers, "db", None)
+        if db is None:
+            db = sqlite3.connect(f"file:{self.index.db_path}?mode=ro", uri=True)
+            self._readers.db = db
+        return db
+
+    def metadata(self, token_id):
+        """``(body, etag)`` of a live token, or ``None``"""
+        def load():
+            return self._reader().execute(
+                "SELECT body, etag FROM metadata WHERE token_id = ?", (str(token_id),)
+            ).fetchone()
+
+        return self.cache.get(token_id, load)
+
+    def collection(self):
+        """``(body, etag)`` of the collection summary"""
+        def load():
+            rows = self._reader().execute("SELECT token_id, owner, name FROM tokens").fetchall()
+            tokens = sorted(
+                ({"tokenId": int(token_id), "owner": owner, "name": name}
+                 for token_id, owner, name in rows),
+                key=lambda token: token["tokenId"],
+            )
+            body = json.dumps({
+                "name": self.name,
+                "symbol": self.symbol,
+                "totalSupply": len(tokens),
+                "tokens": tokens,
+            }, separators=(",", ":"), ensure_ascii=False).encode("utf8")
+            return body, _etag(body)
+
+        return self.cache.get(COLLECTION, load)
+
+
+class _MetadataHandler(BaseHTTPRequestHandler):
+    server_version = "nft-metadata"
+    protocol_version = "HTTP/1.1"  # Keep-alive; every response has a length
+    disable_nagle_algorithm = True  # Headers and body are separate writes
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        match = re.fullmatch(r"/metadata/(\d+)", path)
+        if match:
+            entry = self.server.store.metadata(int(match.group(1)))
+        elif path == "/collection":
+            entry = self.server.store.collection()
+        else:
+            return self._send_error(HTTPStatus.NOT_FOUND, "Unknown path")
+
+        if entry is None:
+            return self._send_error(HTTPStatus.NOT_FOUND, "Token does not exist")
+
+        body, etag = entry
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")  # Revalidate with If-None-Match
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        body = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+
+class MetadataServer(ThreadingHTTPServer):
+    """HTTP front of a ``MetadataStore``; one thread per connection"""
+
+    daemon_threads = True
+
+    def __init__(self, address, store, verbose=False):
+        self.store = store
+        self.verbose = verbose
+        super().__init__(address, _MetadataHandler)
@@ -0,0 +1,294 @@
+"""
+Persistent, event-sourced ownership index for MyCollectibleNFT
+
+The index replays the contract's ``Transfer``, ``Minted`` and
+``MintedWithContentHash`` logs into a
+SQLite database once and then only catches up from the last processed block,
+so "which tokens does this address own?" is a local query with no upper bound
+on token IDs.
+
+The hash of every indexed block within ``reorg_depth`` of the head is kept.
+Before catching up, the index compares the hash of its last block with the
+chain's; if they differ it rewinds to the newest kept block that is still on
+the chain and replays from there. Blocks whose hash was not kept are never
+trusted, so a reorg deeper than ``reorg_depth`` rebuilds the index from the
+start.
+"""
+import sqlite3
+from pathlib import Path
+
+from ape import chain, project
+from hexbytes import HexBytes
+
+from scripts._content_store import ContentStore
+from scripts._events import DEFAULT_PAGE_SIZE, ZERO_ADDRESS, block_ranges, contract_logs, creation_block
+from scripts._rpc import RPCError, batch_request
+
+
+# Deepest reorg the index recovers from by rewinding, rather than rebuilding;
+# about as far back as a proof-of-stake chain can reorganize before finality
+DEFAULT_REORG_DEPTH = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transfers (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    token_id TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    receiver TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE TABLE IF NOT EXISTS mints (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    token_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    token_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS transfers_token ON transfers (token_id);
+CREATE INDEX IF NOT EXISTS mints_token ON mints (token_id);
+CREATE INDEX IF NOT EXISTS tokens_owner ON tokens (owner);
+"""
+
+
+def default_index_path(contract):
+    """Location of the index database for a deployment"""
+    return project.path / ".cache" / "nft_index" / f"{chain.chain_id}-{contract.address}.sqlite"
+
+
+class OwnerIndex:
+    """SQLite-backed index of token ownership built from contract events"""
+
+    def __init__(self, contract, db_path=None, reorg_depth=DEFAULT_REORG_DEPTH,
+                 page_size=DEFAULT_PAGE_SIZE, start_block=None, store=None):
+        """
+        @param contract MyCollectibleNFT contract instance
+        @param db_path Database file (defaults to the project's .cache folder)
+        @param reorg_depth Blocks below the head whose hashes are kept to detect reorgs
+        @param page_size Blocks per eth_getLogs request
+        @param start_block First block to scan (defaults to the deployment block)
+        @param store ContentStore that names content-addressed tokens
+        """
+        self.contract = contract
+        self.store = store or ContentStore()
+        self.reorg_depth = reorg_depth
+        self.page_size = page_size
+        self.db_path = Path(db_path) if db_path else default_index_path(contract)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.db = sqlite3.connect(str(self.db_path))
+        self.db.executescript(SCHEMA)
+
+        if self._get_meta("start") is None:
+            first_block = creation_block(contract) if start_block is None else start_block
+            self._set_meta("start", first_block)
+            if self._get_meta("cursor") is None:
+                self._set_meta("cursor", first_block - 1)
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ========== Metadata ==========
+
+    def _get_meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+        )
+
+    @property
+    def cursor(self):
+        """Last block whose logs are fully applied to the index"""
+        return int(self._get_meta("cursor"))
+
+    @property
+    def start_block(self):
+        """First block the index scans"""
+        return int(self._get_meta("start"))
+
+    # ========== Syncing ==========
+
+    def sync(self, stop_block=None, on_page=None):
+        """
+        Catch up with the chain
+
+        @param stop_block Last block to index (defaults to the chain head)
+        @param on_page Optional callback(page_start, page_stop, logs) after each page
+        @return Number of logs applied
+        """
+        head = chain.blocks.height if stop_block is None else stop_block
+        self._handle_reorg(head)
+
+        applied = 0
+        for page_start, page_stop in block_ranges(self.cursor + 1, head, self.page_size):
+            # Hashes are read before the logs: after a reorg in between, the
+            # next sync finds the hashes stale and replays the page
+            recent = self._block_hashes(range(max(page_start, head - self.reorg_depth + 1), page_stop + 1))
+            logs = contract_logs(self.contract, page_start, page_stop, "Transfer", "Minted",
+                                 "MintedWithContentHash")
+            self._apply(logs)
+            self.db.executemany(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?)",
+                [(number, block_hash) for number, block_hash in recent.items() if block_hash],
+            )
+            self._set_meta("cursor", page_stop)
+            self.db.commit()
+
+            applied += len(logs)
+            if on_page:
+                on_page(page_start, page_stop, logs)
+
+        self._prune_blocks()
+        self.db.commit()
+        return applied
+
+    def _apply(self, logs):
+        touched = set()
+        for log in logs:
+            args = log.event_arguments
+            token_id = str(args["_tokenId"])
+            if log.event_name == "Transfer":
+                self.db.execute(
+                    "INSERT OR REPLACE INTO transfers VALUES (?, ?, ?, ?, ?)",
+                    (log.block_number, log.log_index, token_id,
+                     args["_from"].lower(), args["_to"].lower()),
+                )
+            else:
+                if log.event_name == "Minted":
+                    name = args["_name"]
+                else:
+                    metadata = self.store.get(args["_contentHash"]) or {}
+                    name = metadata.get("name", "")
+
+                self.db.execute(
+                    "INSERT OR REPLACE INTO mints VALUES (?, ?, ?, ?)",
+                    (log.block_number, log.log_index, token_id, name),
+                )
+
+            touched.add(token_id)
+
+        self._rebuild_tokens(touched)
+
+    def _rebuild_tokens(self, token_ids):
+        """Recompute the current owner and name of each token from its events"""
+        for token_id in token_ids:
+            last_transfer = self.db.execute(
+                "SELECT receiver FROM transfers WHERE token_id = ? "
+                "ORDER BY block_number DESC, log_index DESC LIMIT 1",
+                (token_id,),
+            ).fetchone()
+
+            if last_transfer is None or last_transfer[0] == ZERO_ADDRESS:
+                self.db.execute("DELETE FROM tokens WHERE token_id = ?", (token_id,))
+                continue
+
+            last_mint = self.db.execute(
+                "SELECT name FROM mints WHERE token_id = ? "
+                "ORDER BY block_number DESC, log_index DESC LIMIT 1",
+                (token_id,),
+            ).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO tokens (token_id, owner, name) VALUES (?, ?, ?)",
+                (token_id, last_transfer[0], last_mint[0] if last_mint else ""),
+            )
+
+    # ========== Reorg handling ==========
+
+    @staticmethod
+    def _block_hashes(numbers):
+        """
+        @return ``{number: hash}`` as the chain has them now, ``None`` for blocks it does not have
+        """
+        numbers = list(numbers)
+        results = batch_request([("eth_getBlockByNumber", [hex(number), False]) for number in numbers])
+        return {
+            number: HexBytes(block["hash"]).hex() if block and not isinstance(block, RPCError) else None
+            for number, block in zip(numbers, results)
+        }
+
+    def _prune_blocks(self):
+        keep_from = self.cursor - self.reorg_depth + 1
+        self.db.execute("DELETE FROM blocks WHERE number < ?", (keep_from,))
+
+    def _handle_reorg(self, head):
+        """Rewind to the newest block that was indexed and is still on the chain"""
+        cursor = self.cursor
+        if cursor < self.start_block:
+            return
+
+        recorded = self.db.execute(
+            "SELECT number, hash FROM blocks WHERE number <= ? ORDER BY number DESC", (min(cursor, head),)
+        ).fetchall()
+        # Each block hash covers its parent's, so a matching last block vouches for all before it
+        if recorded and recorded[0][0] == cursor and self._block_hashes([cursor])[cursor] == recorded[0][1]:
+            return
+
+        current = self._block_hashes(number for number, _ in recorded)
+        ancestor = next(
+            (number for number, block_hash in recorded if current[number] == block_hash),
+            self.start_block - 1,  # Deeper than the kept hashes: rebuild
+        )
+        self._rewind(ancestor)
+
+    def _rewind(self, cursor):
+        """Drop everything indexed after ``cursor`` and recompute affected tokens"""
+        touched = {
+            row[0] for row in self.db.execute(
+                "SELECT token_id FROM transfers WHERE block_number > ? "
+                "UNION SELECT token_id FROM mints WHERE block_number > ?",
+                (cursor, cursor),
+            )
+        }
+        self.db.execute("DELETE FROM transfers WHERE block_number > ?", (cursor,))
+        self.db.execute("DELETE FROM mints WHERE block_number > ?", (cursor,))
+        self.db.execute("DELETE FROM blocks WHERE number > ?", (cursor,))
+        self._rebuild_tokens(touched)
+        self._set_meta("cursor", cursor)
+        self.db.commit()
+
+    # ========== Queries ==========
+
+    def tokens_of(self, owner):
+        """Return ``[(token_id, name), ...]`` owned by ``owner``, sorted by token ID"""
+        rows = self.db.execute(
+            "SELECT token_id, name FROM tokens WHERE owner = ?", (str(owner).lower(),)
+        ).fetchall()
+        return sorted((int(token_id), name) for token_id, name in rows)
+
+    def owner_of(self, token_id):
+        """Return the indexed owner of ``token_id`` or ``None`` if it does not exist"""
+        row = self.db.execute(
+            "SELECT owner FROM tokens WHERE token_id = ?", (str(token_id),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def all_tokens(self):
+        """Iterate ``(token_id, owner, name)`` for every live token"""
+        for token_id, owner, name in self.db.execute("SELECT token_id, owner, name FROM tokens"):
+            yield int(token_id), owner, name
+
+    def token_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
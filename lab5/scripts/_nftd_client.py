@@ -0,0 +1,96 @@
+"""
+Client side of the nftd session daemon (standard library only)
+
+nftd keeps the provider connection, the unlocked signer and the contract
+handles of one ape process alive behind a Unix socket. Each request is one
+JSON line ``{"op", "contract", "args"}`` answered by one JSON line holding
+either ``result`` or ``error``. Bytes travel as ``{"$bytes": "<hex>"}``.
+
+Nothing here imports ape, so a client that only talks to the daemon starts in
+milliseconds.
+"""
+import json
+import os
+import socket
+import tempfile
+
+
+def default_socket_path():
+    """``$NFTD_SOCKET``, or a per-user socket in the temp directory"""
+    return os.environ.get("NFTD_SOCKET") or os.path.join(
+        tempfile.gettempdir(), f"nftd-{os.getuid()}.sock"
+    )
+
+
+class DaemonError(Exception):
+    """The daemon ran the operation and it failed"""
+
+
+# ========== Wire format ==========
+
+def encode(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {"$bytes": bytes(value).hex()}
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    return value
+
+
+def decode(value):
+    if isinstance(value, dict):
+        if set(value) == {"$bytes"}:
+            return bytes.fromhex(value["$bytes"])
+        return {key: decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    return value
+
+
+# ========== Client ==========
+
+class DaemonClient:
+    """Sends operations to a running nftd; one short-lived connection per request"""
+
+    def __init__(self, path=None, timeout=None):
+        """
+        @param path Socket path (defaults to ``default_socket_path()``)
+        @param timeout Seconds to wait for an answer; ``None`` waits for mined transactions
+        """
+        self.path = path or default_socket_path()
+        self.timeout = timeout
+
+    def request(self, op, *args, contract=None, timeout=None):
+        """
+        Run ``op(*args)`` in the daemon, on the session for ``contract`` if given
+
+        @return The decoded result
+        @raise DaemonError If the operation failed in the daemon
+        @raise OSError If no daemon is listening
+        """
+        line = json.dumps({"op": op, "contract": contract, "args": encode(list(args))})
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout or self.timeout)
+            sock.connect(self.path)
+            sock.sendall(line.encode() + b"\n")
+            with sock.makefile("rb") as reader:
+                answer = reader.readline()
+
+        if not answer:
+            raise DaemonError("Daemon closed the connection without answering")
+
+        response = json.loads(answer)
+        if "error" in response:
+            raise DaemonError(response["error"])
+        return decode(response["result"])
+
+    def info(self):
+        """Signer, network and chain ID of the daemon, or ``None`` if none is running"""
+        try:
+            return self.request("info", timeout=2)
+        except (OSError, ValueError):
+            return None
+
+    def stop(self):
+        self.request("shutdown", timeout=2)
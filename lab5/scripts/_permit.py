@@ -0,0 +1,108 @@
+"""
+Signed approvals (EIP-712 permits) for MyCollectibleNFT
+
+The owner signs a ``Permit`` (one token) or ``PermitForAll`` (operator) off
+chain and hands the file to the spender, who submits it together with the
+transfer: each transaction is simulated against the pending block, which
+already holds the ones sent before it, and broadcast with the next nonce, so
+the transfer does not wait for the approval to confirm.
+"""
+import json
+import sys
+from functools import partial
+from pathlib import Path
+
+from ape import chain
+from eth_account.messages import encode_typed_data
+from eth_utils import to_hex
+from hexbytes import HexBytes
+
+from scripts._preflight import NonceSource, submit_checked
+
+# The EIP-712 domain (also imported by _vouchers from here) and back-to-back
+# sending are shared with lab4 through testkit/ at the repository root
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from testkit import send  # noqa: E402
+from testkit.eip712 import EIP712_DOMAIN, build_typed_data  # noqa: E402, F401
+
+
+PERMIT = [
+    {"name": "spender", "type": "address"},
+    {"name": "tokenId", "type": "uint256"},
+    {"name": "nonce", "type": "uint256"},
+    {"name": "deadline", "type": "uint256"},
+]
+PERMIT_FOR_ALL = [
+    {"name": "owner", "type": "address"},
+    {"name": "operator", "type": "address"},
+    {"name": "approved", "type": "bool"},
+    {"name": "nonce", "type": "uint256"},
+    {"name": "deadline", "type": "uint256"},
+]
+
+
+def deadline_in(seconds):
+    """Deadline ``seconds`` after the chain's next block time"""
+    return chain.pending_timestamp + seconds
+
+
+def permit_data(contract, spender, token_id, deadline):
+    """EIP-712 data for ``permit(spender, tokenId, deadline, sig)`` at the token's current nonce"""
+    return build_typed_data(contract, "Permit", PERMIT, {
+        "spender": spender,
+        "tokenId": token_id,
+        "nonce": contract.nonces(token_id),
+        "deadline": deadline,
+    })
+
+
+def permit_for_all_data(contract, owner, operator, approved, deadline):
+    """EIP-712 data for ``permitForAll(owner, operator, approved, deadline, sig)``"""
+    return build_typed_data(contract, "PermitForAll", PERMIT_FOR_ALL, {
+        "owner": owner,
+        "operator": operator,
+        "approved": approved,
+        "nonce": contract.operatorNonces(owner),
+        "deadline": deadline,
+    })
+
+
+def sign_typed_data(account, typed_data):
+    """65-byte r || s || v signature, or ``None`` if signing was declined"""
+    signature = account.sign_message(encode_typed_data(full_message=typed_data))
+    return signature.encode_rsv() if signature else None
+
+
+def save_permit(path, typed_data, signature):
+    Path(path).write_text(json.dumps({"typedData": typed_data, "signature": to_hex(signature)}, indent=2))
+
+
+def load_permit(path):
+    """``(typed_data, signature)`` from a file written by ``save_permit``"""
+    permit = json.loads(Path(path).read_text())
+    return permit["typedData"], HexBytes(permit["signature"])
+
+
+def permit_call(contract, typed_data, signature):
+    """``(method, args)`` that submits a saved permit"""
+    message = typed_data["message"]
+    if typed_data["primaryType"] == "Permit":
+        return contract.permit, (message["spender"], message["tokenId"], message["deadline"], signature)
+
+    return contract.permitForAll, (
+        message["owner"], message["operator"], message["approved"], message["deadline"], signature
+    )
+
+
+def send_together(account, calls):
+    """
+    Send ``(method, args)`` calls from ``account`` with consecutive nonces,
+    without waiting for one to confirm before sending the next
+
+    Each call is simulated against the pending block, so a call that depends
+    on an earlier one in ``calls`` is checked, and priced, with it in place.
+
+    @return Receipts in call order
+    @raise PreflightError If a call would revert; the calls before it were already sent
+    """
+    return send.send_together(account, calls, partial(submit_checked, nonces=NonceSource(account.address)))
@@ -0,0 +1,196 @@
+"""
+Dry-run state-changing transactions before they are sent
+
+``simulate`` runs the exact transaction (same sender, contract, calldata) with
+``eth_call`` against the pending block, batched with ``eth_estimateGas`` so
+the check costs one round trip. A revert comes back with the contract's own
+reason ("Not authorized", "Token does not exist", ...), which replaces the
+scripts' Python copies of the contract's checks. A transaction that passes is
+sent with the estimated gas, plus a margin, instead of being estimated a
+second time.
+
+Nonces come from a ``NonceSource`` shared by everything that sends from one
+account in this process, so concurrent submissions never pick the same one.
+"""
+import math
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from ape import chain
+from eth_utils import to_hex
+
+from scripts._rpc import (
+    REVERT_PREFIX,
+    RPCError,
+    batch_request,
+    decode_revert_reason,
+    encode_call,
+    quantity,
+    to_block_param,
+)
+
+
+# Headroom over the estimate: it holds for the state the simulation saw, and
+# paths such as refundBatch or batchTransferFrom near their caps can cost more
+# by the time the transaction runs. The network's gas multiplier wins if larger.
+GAS_MARGIN = 1.2
+
+
+@dataclass(frozen=True)
+class Preflight:
+    """Outcome of a simulated transaction; ``gas`` is ``None`` if the node could not estimate it"""
+
+    gas: int | None = None
+    revert_reason: str | None = None
+
+    @property
+    def ok(self):
+        return self.revert_reason is None
+
+
+class PreflightError(Exception):
+    """The transaction would revert; it was not sent"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _is_revert(error):
+    return decode_revert_reason(error.data) is not None or error.message.startswith(REVERT_PREFIX)
+
+
+def simulate(method, *args, sender, block_id="pending", value=0):
+    """
+    Simulate ``method(*args)`` sent by ``sender``
+
+    @param method Contract method handle, e.g. ``contract.burn``
+    @param sender Address the transaction would come from
+    @param block_id Block to simulate on top of
+    @param value Wei sent along (payable methods)
+    """
+    address, _, calldata = encode_call(method, *args)
+    txn = {"from": str(sender), "to": address, "data": to_hex(calldata)}
+    if value:
+        txn["value"] = hex(value)
+    block = to_block_param(block_id)
+
+    # The block argument of eth_estimateGas is optional and not accepted everywhere;
+    # nodes default to their pending (or latest) state
+    call, estimate = batch_request([("eth_call", [txn, block]), ("eth_estimateGas", [txn])])
+    if isinstance(call, RPCError):
+        return Preflight(revert_reason=call.revert_reason)
+    if isinstance(estimate, RPCError):
+        # e.g. out of gas only under estimation; other errors just leave the estimate to ape
+        if _is_revert(estimate):
+            return Preflight(revert_reason=estimate.revert_reason)
+        return Preflight()
+
+    return Preflight(gas=quantity(estimate))
+
+
+def gas_limit(estimate):
+    """Gas limit for a transaction estimated at ``estimate``"""
+    return math.ceil(estimate * max(GAS_MARGIN, chain.provider.network.auto_gas_multiplier))
+
+
+def _options(check, fees):
+    options = {"gas": gas_limit(check.gas)} if check.gas is not None else {}
+    if fees is not None:
+        options.update(fees.quote().options())
+    return options
+
+
+class NonceSource:
+    """
+    Consecutive nonces of one account, read from the node's pending count once
+
+    A nonce is held while its transaction is signed and broadcast, and only
+    used up once the node accepted it: transactions reach the node in nonce
+    order (nodes without a transaction pool, like the test chain, refuse
+    gaps) and one that was never sent leaves no gap. After a failed send the
+    pending count is read again, in case the nonce was taken from elsewhere.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self._next = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def reserve(self):
+        """``with nonces.reserve() as nonce:`` sign and send; the nonce is used up if the block succeeds"""
+        with self._lock:
+            if self._next is None:
+                self._next = chain.provider.web3.eth.get_transaction_count(self.address, "pending")
+            try:
+                yield self._next
+            except BaseException:
+                self._next = None
+                raise
+            self._next += 1
+
+    def reset(self):
+        """Read the pending count again next time, e.g. after transactions sent from elsewhere"""
+        with self._lock:
+            self._next = None
+
+
+def _broadcast(method, args, sender, nonces, options):
+    """Sign and send ``method(*args)`` at the next nonce; ``(txn, txn_hash)``"""
+    with nonces.reserve() as nonce:
+        txn = method.as_transaction(*args, sender=sender, nonce=nonce, **options)
+        signed = sender.sign_transaction(txn)
+        if signed is None:
+            raise RuntimeError("Signing was declined")
+        txn_hash = to_hex(chain.provider.web3.eth.send_raw_transaction(signed.serialize_transaction()))
+    return txn, txn_hash
+
+
+def send_checked(method, *args, sender, fees=None, value=0, nonces=None):
+    """
+    Send ``method(*args)`` from ``sender`` only if its simulation succeeds
+
+    @param fees ``FeeEngine`` pricing the transaction (ape's defaults if ``None``)
+    @param value Wei sent along (payable methods)
+    @param nonces ``NonceSource`` of ``sender`` (ape picks the nonce if ``None``)
+    @return The receipt
+    @raise PreflightError If the simulation reverts
+    """
+    check = simulate(method, *args, sender=sender.address, value=value)
+    if not check.ok:
+        raise PreflightError(check.revert_reason)
+
+    options = _options(check, fees)
+    if value:
+        options["value"] = value
+    if nonces is None:
+        return method(*args, sender=sender, **options)
+
+    # Waited for once the nonce is released, so other senders are not held up
+    _, txn_hash = _broadcast(method, args, sender, nonces, options)
+    receipt = chain.provider.get_receipt(txn_hash)
+    receipt.raise_for_status()
+    return receipt
+
+
+def submit_checked(method, *args, sender, nonces, fees=None):
+    """
+    Sign and broadcast ``method(*args)`` from ``sender`` if its simulation
+    succeeds, without waiting for it to be mined
+
+    @param nonces ``NonceSource`` of ``sender``, so several submissions can
+                  follow each other before any of them is mined
+    @param fees ``FeeEngine`` pricing the transaction; it also keeps it for replacement
+    @return The transaction hash
+    @raise PreflightError If the simulation reverts
+    """
+    check = simulate(method, *args, sender=sender.address)
+    if not check.ok:
+        raise PreflightError(check.revert_reason)
+
+    txn, txn_hash = _broadcast(method, args, sender, nonces, _options(check, fees))
+    if fees is not None:
+        fees.record(txn_hash, txn)
+    return txn_hash
@@ -0,0 +1,198 @@
+"""
+Client-side cache of MyCollectibleNFT view calls, invalidated by events
+
+Reads are pinned to the block of the last refresh, and every cached value is
+tagged with the parts of contract state it depends on: a token, an owner's
+balance, an owner/operator pair or the total supply. ``refresh`` reads the contract's logs since the last refresh and drops only
+the entries whose tags those events touched. Values that the contract never
+changes after deployment (name, symbol, baseURI, minter) are kept until they
+fall out of the LRU.
+"""
+from collections import OrderedDict
+
+from ape import chain
+
+from scripts._events import ZERO_ADDRESS, contract_logs
+from scripts._token_snapshot import fetch_token_snapshot
+
+
+DEFAULT_MAX_ENTRIES = 1024
+
+# Only set in the constructor
+IMMUTABLE_VIEWS = {"name", "symbol", "baseURI", "minter", "supportsInterface"}
+
+# Views whose result only depends on the token passed as the first argument
+TOKEN_VIEWS = {
+    "ownerOf", "getApproved", "tokenURI", "contentHash",
+    "characterName", "characterDescription", "characterImageURI",
+}
+
+INVALIDATING_EVENTS = (
+    "Transfer", "Approval", "ApprovalForAll", "Minted", "MintedWithContentHash",
+)
+
+
+def _normalize(value):
+    # Addresses may arrive checksummed, lowercase or as an account
+    value = getattr(value, "address", value)
+    return value.lower() if isinstance(value, str) else value
+
+
+def _view_tags(function_name, args):
+    """State a view call depends on, as invalidation tags"""
+    if function_name in IMMUTABLE_VIEWS:
+        return ()
+    if function_name in TOKEN_VIEWS:
+        return (("token", args[0]),)
+    if function_name == "balanceOf":
+        return (("owner", args[0]),)
+    if function_name == "isApprovedForAll":
+        return (("operator", args[0], args[1]),)
+    if function_name == "totalSupply":
+        return (("supply",),)
+
+    raise ValueError(f"Don't know how to invalidate '{function_name}'")
+
+
+def _event_tags(log):
+    """Tags made stale by one contract event"""
+    args = log.event_arguments
+    if log.event_name == "Transfer":
+        sender, receiver = _normalize(args["_from"]), _normalize(args["_to"])
+        tags = [("token", args["_tokenId"]), ("owner", sender), ("owner", receiver)]
+        if ZERO_ADDRESS in (sender, receiver):
+            tags.append(("supply",))
+        return tags
+    if log.event_name == "ApprovalForAll":
+        return [("operator", _normalize(args["_owner"]), _normalize(args["_operator"]))]
+
+    # Approval, Minted and MintedWithContentHash only touch their token
+    return [("token", args["_tokenId"])]
+
+
+class ReadCache:
+    """LRU cache of view calls on one contract"""
+
+    def __init__(self, contract, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        @param contract MyCollectibleNFT contract instance
+        @param max_entries Least recently used entries are evicted past this size
+        """
+        self.contract = contract
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()  # key -> (value, tags)
+        self._by_tag = {}              # tag -> set of keys
+        self._block = self._head()
+
+    # ========== Entries ==========
+
+    def _get(self, key):
+        value, _ = self._entries[key]
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _put(self, key, value, tags):
+        self.misses += 1
+        self._entries[key] = (value, tags)
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+        return value
+
+    def _drop(self, key):
+        _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self, *tags):
+        """Drop every entry that depends on any of ``tags``"""
+        dropped = 0
+        for tag in tags:
+            for key in self._by_tag.get(tag, set()).copy():
+                self._drop(key)
+                dropped += 1
+
+        return dropped
+
+    def clear(self):
+        self._entries.clear()
+        self._by_tag.clear()
+
+    # ========== Reads ==========
+
+    def call(self, function_name, *args):
+        """Call a view function, answering from the cache when possible"""
+        args = tuple(_normalize(arg) for arg in args)
+        key = (function_name, args)
+        if key in self._entries:
+            return self._get(key)
+
+        tags = _view_tags(function_name, args)
+        value = getattr(self.contract, function_name)(*args, block_id=self.block_number)
+        return self._put(key, value, tags)
+
+    def token_snapshot(self, token_id):
+        """Cached ``fetch_token_snapshot`` for ``token_id`` (without an account)"""
+        key = ("snapshot", (token_id,))
+        if key in self._entries:
+            return self._get(key)
+
+        snapshot = fetch_token_snapshot(self.contract, token_id, block_id=self.block_number)
+        tags = [("token", token_id), ("supply",)]
+        if snapshot.exists:
+            # The snapshot includes the owner's balance
+            tags.append(("owner", _normalize(snapshot.owner)))
+
+        return self._put(key, snapshot, tags)
+
+    # ========== Invalidation ==========
+
+    @property
+    def block_number(self):
+        """Block that every cached value was read at"""
+        return self._block[0]
+
+    def _head(self):
+        block = chain.provider.get_block("latest")
+        return block.number, block.hash
+
+    def refresh(self):
+        """
+        Apply the contract's events since the last refresh
+
+        Costs one request when no block was mined, otherwise a getLogs call as
+        well. If the block the cache was read at was reorganized away,
+        everything is dropped.
+
+        @return Number of entries invalidated
+        """
+        last_number, last_hash = self._block
+        head = self._head()
+        if head == self._block:
+            return 0
+
+        self._block = head
+        if head[0] < last_number or chain.provider.get_block(last_number).hash != last_hash:
+            dropped = len(self._entries)
+            self.clear()
+            return dropped
+
+        tags = set()
+        for log in contract_logs(self.contract, last_number + 1, head[0], *INVALIDATING_EVENTS):
+            tags.update(_event_tags(log))
+
+        return self.invalidate(*tags)
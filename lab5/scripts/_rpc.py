@@ -0,0 +1,155 @@
+"""
+Batched JSON-RPC helpers
+
+Every read the scripts make is a full round trip to the node. These helpers
+send many requests in one JSON-RPC batch instead, and fall back to one request
+at a time on providers that cannot batch (such as the in-memory test chain).
+"""
+from eth_abi import decode
+from eth_utils import to_hex
+from hexbytes import HexBytes
+
+from ape import chain
+
+
+# Selector of the standard ``Error(string)`` revert payload
+ERROR_STRING_SELECTOR = HexBytes("0x08c379a0")
+
+# Prefix nodes put in front of the reason in revert error messages
+REVERT_PREFIX = "execution reverted: "
+
+
+class RPCError(Exception):
+    """A single request inside a batch failed"""
+
+    def __init__(self, message, data=None):
+        super().__init__(message)
+        self.message = message
+        self.data = data
+
+    @property
+    def revert_reason(self):
+        """Decoded ``assert ..., "reason"`` message, if the node returned one"""
+        return decode_revert_reason(self.data) or self.message.removeprefix(REVERT_PREFIX)
+
+
+def decode_revert_reason(data):
+    """Decode an ``Error(string)`` revert payload, or return ``None``"""
+    if not data or not isinstance(data, (str, bytes)):
+        return None
+
+    data = HexBytes(data)
+    if data[:4] != ERROR_STRING_SELECTOR:
+        return None
+
+    try:
+        return decode(["string"], data[4:])[0]
+    except Exception:
+        return None
+
+
+def to_block_param(block_id):
+    """Convert a block number (or tag) into a JSON-RPC block parameter"""
+    return hex(block_id) if isinstance(block_id, int) else block_id
+
+
+def quantity(value):
+    """Read a JSON-RPC quantity that may be hex-encoded or already an int"""
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+def encode_call(method, *args):
+    """
+    Prepare ``method(*args)`` for a raw ``eth_call``
+
+    @return ``(address, abi, calldata)``
+    """
+    abi = next(abi for abi in method.abis if len(abi.inputs) == len(args))
+    return method.contract.address, abi, method.encode_input(*args)
+
+
+def decode_call_result(abi, result):
+    """Decode raw ``eth_call`` output, unwrapping single return values"""
+    decoded = chain.provider.network.ecosystem.decode_returndata(abi, HexBytes(result))
+    if isinstance(decoded, (list, tuple)) and len(decoded) == 1:
+        decoded = decoded[0]
+
+    return decoded
+
+
+def _unpack(response):
+    if "error" in response:
+        error = response["error"]
+        if isinstance(error, dict):
+            return RPCError(error.get("message", str(error)), error.get("data"))
+
+        return RPCError(str(error))
+
+    return response.get("result")
+
+
+def batch_request(requests):
+    """
+    Send ``[(method, params), ...]`` as one JSON-RPC batch
+
+    @return A list with one entry per request: the result, or an ``RPCError``
+    """
+    if not requests:
+        return []
+
+    make_batch_request = getattr(chain.provider.web3.provider, "make_batch_request", None)
+    try:
+        if make_batch_request is None:
+            raise NotImplementedError
+        responses = make_batch_request(list(requests))
+    except NotImplementedError:
+        return [_single_request(method, params) for method, params in requests]
+
+    if not isinstance(responses, list):
+        # The node rejected the whole batch
+        error = _unpack(responses)
+        return [error if isinstance(error, RPCError) else RPCError(str(error))] * len(requests)
+
+    return [_unpack(response) for response in responses]
+
+
+def _single_request(method, params):
+    try:
+        return chain.provider.web3.manager.request_blocking(method, params)
+    except Exception as err:
+        return RPCError(str(err), getattr(err, "data", None))
+
+
+class ReadBatch:
+    """Collects contract view calls and executes them in one round trip"""
+
+    def __init__(self, block_id="latest"):
+        self.block_id = block_id
+        self._calls = []
+
+    def add(self, method, *args):
+        """
+        Queue ``method(*args)``, e.g. ``batch.add(contract.ownerOf, 1)``
+
+        @return Position of the result in the list returned by ``execute``
+        """
+        self._calls.append(encode_call(method, *args))
+        return len(self._calls) - 1
+
+    def execute(self):
+        """Run the queued calls; failed calls are returned as ``RPCError``"""
+        block = to_block_param(self.block_id)
+        requests = [
+            ("eth_call", [{"to": address, "data": to_hex(calldata)}, block])
+            for address, _, calldata in self._calls
+        ]
+
+        results = []
+        for (_, abi, _), result in zip(self._calls, batch_request(requests)):
+            if isinstance(result, RPCError):
+                results.append(result)
+            else:
+                results.append(decode_call_result(abi, result))
+
+        self._calls = []
+        return results
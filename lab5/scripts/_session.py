@@ -0,0 +1,302 @@
+"""
+Operations the interactive scripts run against one MyCollectibleNFT deployment
+
+``LocalSession`` runs them in this process, loading the signer and the
+contract on first use. ``SessionServer`` (started by ``ape run nftd``) keeps
+one ``LocalSession`` per contract alive behind a Unix socket, with the signer
+unlocked once, and ``RemoteSession`` forwards the same calls to it.
+``open_session`` picks the daemon when one is running on the same chain, so
+the scripts work the same either way.
+"""
+import json
+import os
+import socketserver
+from collections import namedtuple
+from dataclasses import asdict, is_dataclass
+
+from ape import accounts, chain, project
+
+from scripts._batch_transfer import chunk_size, split_by_owner
+from scripts._fees import FeeEngine, default_policy
+from scripts._nft_index import OwnerIndex
+from scripts._nftd_client import DaemonClient, decode, encode
+from scripts._permit import deadline_in, permit_data, sign_typed_data
+from scripts._preflight import NonceSource, Preflight, send_checked, simulate, submit_checked
+from scripts._read_cache import ReadCache
+from scripts._token_snapshot import TokenSnapshot, fetch_token_snapshot
+from scripts._tracker import ConfirmationTracker
+
+
+TxResult = namedtuple("TxResult", "txn_hash gas_used block_number")
+
+
+class LocalSession:
+    """Operations on one deployment, run in this process"""
+
+    # Methods a daemon client may call
+    OPERATIONS = frozenset({
+        "call", "preflight", "submit", "transact", "replace", "fee_metrics", "snapshot", "cached_call",
+        "cached_snapshot", "refresh", "cache_stats", "tokens_of", "split_by_owner", "chunk_size",
+        "sign_permit",
+    })
+
+    def __init__(self, contract_address, account_alias="dev", account=None, fees=None):
+        """
+        @param contract_address MyCollectibleNFT address
+        @param account_alias Signer loaded on the first operation that needs one
+        @param account Already loaded signer to use instead
+        @param fees ``FeeEngine`` pricing every transaction (one with the default policy if ``None``)
+        """
+        self.contract = project.MyCollectibleNFT.at(contract_address)
+        self.account_alias = account_alias
+        self._account = account
+        self._nonces = None
+        self._cache = None
+        self.fees = fees or FeeEngine(default_policy())
+
+    @property
+    def address(self):
+        return self.contract.address
+
+    @property
+    def account(self):
+        if self._account is None:
+            self._account = accounts.load(self.account_alias)
+        return self._account
+
+    @property
+    def signer(self):
+        return self.account.address
+
+    @property
+    def nonces(self):
+        """``NonceSource`` of the signer, shared by every transaction of the session"""
+        if self._nonces is None:
+            self._nonces = NonceSource(self.signer)
+        return self._nonces
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = ReadCache(self.contract)
+        return self._cache
+
+    # ========== Reads ==========
+
+    def call(self, function_name, *args):
+        """Call a view function at the latest block"""
+        return getattr(self.contract, function_name)(*args)
+
+    def snapshot(self, token_id, account=None):
+        return fetch_token_snapshot(self.contract, token_id, account=account)
+
+    def cached_call(self, function_name, *args):
+        return self.cache.call(function_name, *args)
+
+    def cached_snapshot(self, token_id):
+        return self.cache.token_snapshot(token_id)
+
+    def refresh(self):
+        """Invalidate cached reads touched by new events"""
+        return self.cache.refresh()
+
+    def cache_stats(self):
+        """``(hits, misses)`` of the read cache"""
+        return self.cache.hits, self.cache.misses
+
+    def tokens_of(self, owner):
+        """
+        Sync the ownership index and list ``owner``'s tokens
+
+        @return ``(new_logs, indexed_block, [(token_id, name), ...])``
+        """
+        with OwnerIndex(self.contract) as index:
+            new_logs = index.sync()
+            return new_logs, index.cursor, index.tokens_of(owner)
+
+    def split_by_owner(self, token_ids):
+        """``(owned_by_signer, [(token_id, owner_or_None), ...])``"""
+        owned, others = split_by_owner(self.contract, token_ids, self.signer)
+        return owned, list(others.items())
+
+    def chunk_size(self, receiver, token_ids):
+        """Tokens per batchTransferFrom that fit the block gas limit"""
+        return chunk_size(self.contract, self.account, receiver, token_ids)
+
+    # ========== Transactions ==========
+
+    def preflight(self, function_name, *args):
+        """Simulate a transaction from the signer without sending it"""
+        return simulate(getattr(self.contract, function_name), *args, sender=self.signer)
+
+    def submit(self, function_name, *args):
+        """
+        Send a transaction from the signer without waiting for it
+
+        @return The transaction hash; follow it with ``confirmation_tracker``
+        @raise PreflightError If the transaction would revert; nothing is sent
+        """
+        method = getattr(self.contract, function_name)
+        return submit_checked(method, *args, sender=self.account, nonces=self.nonces, fees=self.fees)
+
+    def transact(self, function_name, *args):
+        """
+        Send a transaction from the signer and wait for it
+
+        @raise PreflightError If the transaction would revert; nothing is sent
+        """
+        method = getattr(self.contract, function_name)
+        receipt = send_checked(method, *args, sender=self.account, fees=self.fees, nonces=self.nonces)
+        return TxResult(receipt.txn_hash, receipt.gas_used, receipt.block_number)
+
+    def replace(self, txn_hash):
+        """Re-send a submitted transaction with bumped fees; the new hash or ``None``"""
+        return self.fees.replace(self.account, txn_hash)
+
+    def fee_metrics(self):
+        return self.fees.metrics()
+
+    def sign_permit(self, spender, token_id, expires):
+        """
+        Sign an EIP-712 permit for ``token_id`` valid for ``expires`` seconds
+
+        @return ``(typed_data, signature)``; the signature is ``None`` if signing was declined
+        """
+        typed_data = permit_data(self.contract, spender, token_id, deadline_in(expires))
+        return typed_data, sign_typed_data(self.account, typed_data)
+
+
+class RemoteSession:
+    """``LocalSession`` operations served by a running nftd"""
+
+    # Rebuild the types LocalSession returns from their wire form
+    RESULT_TYPES = {
+        "transact": lambda result: TxResult(**result),
+        "preflight": lambda result: Preflight(**result),
+        "snapshot": lambda result: TokenSnapshot(**result),
+        "cached_snapshot": lambda result: TokenSnapshot(**result),
+    }
+
+    def __init__(self, client, contract_address, info):
+        self.client = client
+        self.address = contract_address
+        self.signer = info["signer"]
+
+    def __getattr__(self, name):
+        if name not in LocalSession.OPERATIONS:
+            raise AttributeError(name)
+
+        def operation(*args):
+            result = self.client.request(name, *args, contract=self.address)
+            return self.RESULT_TYPES.get(name, lambda value: value)(result)
+
+        return operation
+
+
+def open_session(contract_address, account_alias="dev", socket_path=None):
+    """Session on the running nftd if it serves this chain, otherwise a local one"""
+    client = DaemonClient(socket_path)
+    info = client.info()
+    if info is not None and info["chain_id"] == chain.chain_id:
+        print(f"⚡ Using nftd at {client.path} (signer {info['signer']})")
+        return RemoteSession(client, contract_address, info)
+
+    return LocalSession(contract_address, account_alias)
+
+
+def confirmation_tracker(session, confirmations=1, poll_interval=0.5, stuck_blocks=3):
+    """Tracker that decodes the events of the session's contract and re-prices stuck submissions"""
+    return ConfirmationTracker(
+        confirmations, poll_interval, session.address, project.MyCollectibleNFT.contract_type.events,
+        on_stuck=session.replace, stuck_blocks=stuck_blocks,
+    )
+
+
+def wait_confirmed(session, *txn_hashes, confirmations=1):
+    """Wait for ``txn_hashes`` with one shared tracker; ``Confirmation``s in the same order"""
+    with confirmation_tracker(session, confirmations) as tracker:
+        futures = [tracker.track(txn_hash) for txn_hash in txn_hashes]
+        return [future.result() for future in futures]
+
+
+# ========== Daemon ==========
+
+def to_wire(value):
+    """Plain JSON-ready form of operation results"""
+    if is_dataclass(value):
+        return to_wire(asdict(value))
+    if hasattr(value, "_asdict"):
+        return to_wire(value._asdict())
+    if isinstance(value, dict):
+        return {key: to_wire(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_wire(item) for item in value]
+    return encode(value)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if line:
+            self.wfile.write(json.dumps(self.server.dispatch(line)).encode() + b"\n")
+
+
+class SessionServer(socketserver.UnixStreamServer):
+    """
+    Serves ``LocalSession`` operations for any number of contracts
+
+    Requests are handled one at a time, which keeps the signer's transactions
+    in nonce order without any locking.
+    """
+
+    def __init__(self, path, account, fees=None):
+        self.account = account
+        self.fees = fees or FeeEngine(default_policy())
+        self.sessions = {}
+        self.running = True
+
+        # Owner-only socket: whoever can connect can sign with the account
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, _RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def session(self, contract_address):
+        key = str(contract_address).lower()
+        if key not in self.sessions:
+            self.sessions[key] = LocalSession(contract_address, account=self.account, fees=self.fees)
+        return self.sessions[key]
+
+    def info(self):
+        return {
+            "signer": self.account.address,
+            "network": chain.provider.network_choice,
+            "chain_id": chain.chain_id,
+            "fee_policy": self.fees.policy,
+            "contracts": [session.address for session in self.sessions.values()],
+        }
+
+    def dispatch(self, line):
+        """Run one request line; return the response object"""
+        try:
+            request = json.loads(line)
+            op, args = request["op"], decode(request.get("args", []))
+            if op == "info":
+                result = self.info()
+            elif op == "shutdown":
+                self.running = False
+                result = None
+            elif op in LocalSession.OPERATIONS and request.get("contract"):
+                result = getattr(self.session(request["contract"]), op)(*args)
+            else:
+                raise ValueError(f"Unknown operation '{op}'")
+        except Exception as err:
+            return {"error": f"{type(err).__name__}: {err}"}
+
+        return {"result": to_wire(result)}
+
+    def serve(self):
+        """Handle requests until a client sends ``shutdown``"""
+        while self.running:
+            self.handle_request()
@@ -0,0 +1,139 @@
+"""
+Consistent, batched snapshot of a single token's state
+
+The detail views used to call ownerOf, characterName, characterDescription,
+characterImageURI, tokenURI, getApproved, totalSupply, balanceOf and
+isApprovedForAll one after another. ``fetch_token_snapshot`` sends them as
+JSON-RPC batches pinned to one block, so the values always belong together.
+"""
+from dataclasses import dataclass
+
+from ape import chain
+
+from scripts._content_store import ContentStore, is_content_addressed
+from scripts._events import ZERO_ADDRESS
+from scripts._rpc import ReadBatch, RPCError
+
+
+@dataclass(frozen=True)
+class TokenSnapshot:
+    """State of one token (and optionally one account) at ``block_number``"""
+
+    token_id: int
+    block_number: int
+    total_supply: int
+    owner: str | None = None
+    name: str = ""
+    description: str = ""
+    image_uri: str = ""
+    token_uri: str | None = None
+    content_hash: bytes | None = None
+    approved: str | None = None
+    owner_balance: int | None = None
+    account: str | None = None
+    account_balance: int | None = None
+    account_is_operator: bool = False
+    error: str | None = None
+
+    @property
+    def exists(self):
+        return self.owner is not None
+
+    @property
+    def content_addressed(self):
+        """True for tokens minted with ``mintWithContentHash``"""
+        return is_content_addressed(self.content_hash)
+
+    def is_owner(self, address):
+        return self.exists and self.owner.lower() == str(address).lower()
+
+    def is_authorized(self, address):
+        """Mirror of the contract's owner / approved / operator check"""
+        if not self.exists:
+            return False
+
+        address = str(address).lower()
+        is_account = self.account is not None and self.account.lower() == address
+        return (
+            self.is_owner(address)
+            or (self.approved or ZERO_ADDRESS).lower() == address
+            or (is_account and self.account_is_operator)
+        )
+
+
+def _value(result, default=None):
+    return default if isinstance(result, RPCError) else result
+
+
+def fetch_token_snapshot(contract, token_id, account=None, block_id=None, store=None):
+    """
+    Read everything the scripts show about ``token_id`` in at most two batches
+
+    The first batch reads the token itself; the second reads values that
+    depend on its owner (owner balance, operator approval for ``account``).
+    Both are pinned to the same block. Metadata of content-addressed tokens is
+    resolved from the local content store.
+
+    @param contract MyCollectibleNFT contract instance
+    @param token_id Token to read
+    @param account Optional address whose balance and operator status to include
+    @param block_id Block to read at (defaults to the current head)
+    @param store ContentStore used for content-addressed tokens
+    """
+    block_number = chain.blocks.height if block_id is None else block_id
+    batch = ReadBatch(block_number)
+
+    batch.add(contract.ownerOf, token_id)
+    batch.add(contract.characterName, token_id)
+    batch.add(contract.characterDescription, token_id)
+    batch.add(contract.characterImageURI, token_id)
+    batch.add(contract.tokenURI, token_id)
+    batch.add(contract.getApproved, token_id)
+    batch.add(contract.totalSupply)
+    batch.add(contract.contentHash, token_id)
+    if account is not None:
+        batch.add(contract.balanceOf, account)
+
+    results = batch.execute()
+    owner, name, description, image_uri, token_uri, approved, total_supply, digest = results[:8]
+    account_balance = _value(results[8]) if account is not None else None
+
+    if isinstance(owner, RPCError):
+        return TokenSnapshot(
+            token_id=token_id,
+            block_number=block_number,
+            total_supply=_value(total_supply, 0),
+            account=str(account) if account is not None else None,
+            account_balance=account_balance,
+            error=owner.revert_reason,
+        )
+
+    batch.add(contract.balanceOf, owner)
+    if account is not None:
+        batch.add(contract.isApprovedForAll, owner, account)
+
+    owner_results = batch.execute()
+
+    digest = _value(digest)
+    if is_content_addressed(digest):
+        metadata = (store or ContentStore()).get(digest) or {}
+        name = metadata.get("name", "")
+        description = metadata.get("description", "")
+        image_uri = metadata.get("image", "")
+
+    return TokenSnapshot(
+        token_id=token_id,
+        block_number=block_number,
+        total_supply=_value(total_supply, 0),
+        owner=owner,
+        name=_value(name, ""),
+        description=_value(description, ""),
+        image_uri=_value(image_uri, ""),
+        token_uri=_value(token_uri),
+        content_hash=digest,
+        approved=_value(approved),
+        owner_balance=_value(owner_results[0]),
+        account=str(account) if account is not None else None,
+        account_balance=account_balance,
+        account_is_operator=bool(_value(owner_results[1], False)) if account is not None else False,
+    )
@@ -0,0 +1,243 @@
+"""
+Shared watcher for submitted transactions
+
+``ConfirmationTracker`` follows any number of transaction hashes from one
+background thread: it polls the block height once per interval and, when a
+block arrives (or a new hash is added), fetches every receipt it still needs
+in a single JSON-RPC batch. Each tracked hash gets a ``Future`` that resolves
+to a ``Confirmation`` once the receipt is ``confirmations`` blocks deep, with
+the tracked contract's events already decoded. Callers can submit more work
+while they wait and collect results with ``concurrent.futures.as_completed``.
+
+A hash still without a receipt ``stuck_blocks`` blocks after it was tracked is
+handed to ``on_stuck`` (e.g. ``FeeEngine.replace``); if that returns a
+replacement hash, the same future resolves with whichever of the two is mined.
+
+A poll that fails (the node dropped the connection, a batch timed out) is
+logged and retried on the next tick. After ``max_failures`` failed polls in a
+row every pending future fails with the last error, so nothing waiting on the
+tracker blocks forever.
+"""
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from ape import chain
+from ape.logging import logger
+
+from scripts._rpc import RPCError, batch_request, quantity
+
+
+@dataclass(frozen=True)
+class Confirmation:
+    """A mined transaction that reached the requested depth"""
+
+    txn_hash: str
+    block_number: int
+    status: int
+    gas_used: int
+    events: tuple = ()
+
+    @property
+    def failed(self):
+        return self.status != 1
+
+
+class ConfirmationTracker:
+    """Resolve futures for many pending transactions from one block poll"""
+
+    def __init__(self, confirmations=1, poll_interval=1.0, address=None, events=(),
+                 on_stuck=None, stuck_blocks=3, max_failures=5):
+        """
+        @param confirmations Blocks (including the receipt's own) before a transaction is done
+        @param poll_interval Seconds between block height polls
+        @param address Only logs emitted by this contract are decoded
+        @param events Event ABIs to decode logs with
+        @param on_stuck Called with a hash that is not mined in time; may return a replacement hash
+        @param stuck_blocks New blocks without a receipt before ``on_stuck`` is called
+        @param max_failures Failed polls in a row before the pending futures fail with the error
+        """
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.address = address.lower() if address else None
+        self.events = list(events)
+        self.on_stuck = on_stuck
+        self.stuck_blocks = stuck_blocks
+        self.max_failures = max_failures
+
+        self._pending = {}  # txn hash -> Future (a replaced transaction shares its successor's)
+        self._mined = {}    # txn hash -> block the receipt was last seen in
+        self._since = {}    # txn hash -> block height when it was tracked or last replaced
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def running(self):
+        """Whether the watching thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop watching; futures that are still pending are cancelled"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in set(pending.values()):
+            future.cancel()
+
+    def track(self, txn_hash, callback=None):
+        """
+        Watch ``txn_hash``
+
+        @param callback Called with the ``Confirmation`` (on the tracker's thread); not
+                        called if the future is cancelled or fails
+        @return Future resolving to the ``Confirmation``
+        """
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(
+                lambda done: done.cancelled() or done.exception() is not None or callback(done.result())
+            )
+
+        with self._lock:
+            self._pending[txn_hash] = future
+        self.start()
+        self._wakeup.set()
+        return future
+
+    # ========== Watching ==========
+
+    def _run(self):
+        last_head = None
+        failures = 0
+        while not self._stop.is_set():
+            fresh = self._wakeup.is_set()
+            self._wakeup.clear()
+
+            try:
+                with self._lock:
+                    hashes = list(self._pending)
+                if hashes:
+                    head = chain.blocks.height
+                    if head != last_head or fresh:
+                        self._check(hashes, head)
+                        last_head = head
+                failures = 0
+            except Exception as err:
+                # Checked again on the next tick, even if no block arrives
+                last_head = None
+                failures += 1
+                logger.warning(f"Receipt poll failed ({failures}/{self.max_failures}): {err}")
+                if failures >= self.max_failures:
+                    self._fail_pending(err)
+                    failures = 0
+
+            self._wakeup.wait(self.poll_interval)
+
+    def _fail_pending(self, error):
+        """Fail every pending future with ``error``; hashes tracked later are watched as usual"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._mined.clear()
+            self._since.clear()
+        for future in set(pending.values()):
+            if not future.done():
+                future.set_exception(error)
+
+    def _due(self, txn_hash, head):
+        # Receipts already seen are only fetched again once deep enough,
+        # which also catches a reorg that moved or dropped them
+        block = self._mined.get(txn_hash)
+        return block is None or head - block + 1 >= self.confirmations
+
+    def _check(self, hashes, head):
+        due = [txn_hash for txn_hash in hashes if self._due(txn_hash, head)]
+        if not due:
+            return
+
+        receipts = batch_request([("eth_getTransactionReceipt", [txn_hash]) for txn_hash in due])
+        done, stuck = [], []
+        for txn_hash, receipt in zip(due, receipts):
+            if not receipt or isinstance(receipt, RPCError):
+                self._mined.pop(txn_hash, None)
+                since = self._since.setdefault(txn_hash, head)
+                if self.on_stuck is not None and head - since >= self.stuck_blocks:
+                    stuck.append(txn_hash)
+                continue
+
+            block = quantity(receipt["blockNumber"])
+            self._mined[txn_hash] = block
+            if head - block + 1 >= self.confirmations:
+                done.append(Confirmation(
+                    txn_hash=txn_hash,
+                    block_number=block,
+                    status=quantity(receipt["status"]),
+                    gas_used=quantity(receipt["gasUsed"]),
+                    events=self._decode(receipt["logs"]),
+                ))
+
+        with self._lock:
+            futures = [(self._pending.get(item.txn_hash), item) for item in done]
+            # Drop every hash of a resolved future: the mined one and those it replaced or was replaced by
+            resolved = {id(future) for future, _ in futures if future is not None}
+            finished = [txn_hash for txn_hash, future in self._pending.items() if id(future) in resolved]
+            for txn_hash in finished:
+                del self._pending[txn_hash]
+                self._mined.pop(txn_hash, None)
+                self._since.pop(txn_hash, None)
+        for future, confirmation in futures:
+            if future is not None and not future.done():
+                future.set_result(confirmation)
+
+        for txn_hash in stuck:
+            self._replace(txn_hash, head)
+
+    def _replace(self, txn_hash, head):
+        with self._lock:
+            if txn_hash not in self._pending:
+                return
+        self._since[txn_hash] = head
+        try:
+            new_hash = self.on_stuck(txn_hash)
+        except Exception as err:
+            # The original is still watched; it is retried after another ``stuck_blocks``
+            logger.warning(f"Replacing {txn_hash} failed: {err}")
+            return
+        if not new_hash:
+            return
+
+        with self._lock:
+            future = self._pending.get(txn_hash)
+            if future is not None:
+                # Keep watching the original too: it may still be mined first
+                self._pending[new_hash] = future
+                self._since[new_hash] = head
+
+    def _decode(self, logs):
+        if not self.events:
+            return ()
+
+        logs = [log for log in logs if not self.address or log["address"].lower() == self.address]
+        return tuple(chain.provider.network.ecosystem.decode_logs(logs, *self.events))
@@ -0,0 +1,266 @@
+"""
+Lazy-mint vouchers for MyCollectibleNFT
+
+The minter signs ``MintVoucher(recipient, tokenId, contentHash, expiry)``
+EIP-712 messages off chain and hands each voucher to its recipient, who mints
+the token with ``redeem`` and pays for it. Signing is then the minter's only
+per-token work, so ``sign_vouchers`` builds the EIP-712 digests from fixed
+32-byte words instead of generic typed-data encoding and spreads the batch
+over worker processes. With ``coincurve`` (libsecp256k1) installed, a 100,000
+voucher drop is signed in seconds; the pure Python fallback is about 50x slower.
+"""
+import csv
+import json
+import os
+from dataclasses import dataclass
+from multiprocessing import Pool
+from pathlib import Path
+
+from eth_hash.auto import keccak as keccak256
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+
+from scripts._content_store import ContentStore
+from scripts._permit import EIP712_DOMAIN
+
+
+MINT_VOUCHER = [
+    {"name": "recipient", "type": "address"},
+    {"name": "tokenId", "type": "uint256"},
+    {"name": "contentHash", "type": "bytes32"},
+    {"name": "expiry", "type": "uint256"},
+]
+
+EIP712_DOMAIN_TYPEHASH = keccak(
+    text="EIP712Domain(" + ",".join(f"{field['type']} {field['name']}" for field in EIP712_DOMAIN) + ")"
+)
+MINT_VOUCHER_TYPEHASH = keccak(
+    text="MintVoucher(" + ",".join(f"{field['type']} {field['name']}" for field in MINT_VOUCHER) + ")"
+)
+
+# Vouchers handed to a worker process at a time
+SIGN_CHUNK_SIZE = 2_000
+
+
+@dataclass(frozen=True)
+class Voucher:
+    """A ``MintVoucher`` message and, once signed, its r || s || v signature"""
+
+    recipient: str  # Lowercase hex; checksumming costs as much as signing
+    token_id: int
+    content_hash: bytes
+    expiry: int
+    signature: bytes | None = None
+
+    def redeem_args(self):
+        """Arguments of ``redeem`` in order"""
+        return self.recipient, self.token_id, self.content_hash, self.expiry, self.signature
+
+
+def domain_separator(name, chain_id, contract_address):
+    """The contract's ``DOMAIN_SEPARATOR()``, computed without a node"""
+    return keccak(
+        EIP712_DOMAIN_TYPEHASH
+        + keccak(text=name)
+        + keccak(text="1")
+        + chain_id.to_bytes(32, "big")
+        + HexBytes(contract_address).rjust(32, b"\x00")
+    )
+
+
+def voucher_digest(separator, recipient, token_id, content_hash, expiry):
+    """EIP-712 digest of one voucher: what the minter signs and ``redeem`` recovers"""
+    # Every field is one 32-byte word, so the struct is encoded by concatenation
+    struct_hash = keccak256(b"".join((
+        MINT_VOUCHER_TYPEHASH,
+        bytes(12) + bytes.fromhex(recipient[2:]),
+        token_id.to_bytes(32, "big"),
+        content_hash,
+        expiry.to_bytes(32, "big"),
+    )))
+    return keccak256(b"\x19\x01" + separator + struct_hash)
+
+
+# ========== Signing ==========
+
+def digest_signer(private_key):
+    """Function signing 32-byte digests with ``private_key`` into r || s || v"""
+    try:
+        import coincurve
+    except ImportError:
+        from eth_keys import keys
+
+        key = keys.PrivateKey(HexBytes(private_key))
+
+        def sign(digest):
+            signature = key.sign_msg_hash(digest)
+            return signature.r.to_bytes(32, "big") + signature.s.to_bytes(32, "big") + bytes([signature.v + 27])
+
+        return sign
+
+    key = coincurve.PrivateKey(HexBytes(private_key))
+
+    def sign(digest):
+        # libsecp256k1 signatures are already low-s, as the contract requires
+        signature = key.sign_recoverable(digest, hasher=None)
+        return signature[:64] + bytes([signature[64] + 27])
+
+    return sign
+
+
+_worker = {}
+
+
+def _init_worker(private_key, separator):
+    _worker["sign"] = digest_signer(private_key)
+    _worker["separator"] = separator
+
+
+def _sign_chunk(messages):
+    sign, separator = _worker["sign"], _worker["separator"]
+    return [sign(voucher_digest(separator, *message)) for message in messages]
+
+
+def _chunks(vouchers, size):
+    chunk = []
+    for voucher in vouchers:
+        chunk.append(voucher)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def sign_vouchers(private_key, separator, vouchers, processes=None):
+    """
+    Sign unsigned ``vouchers`` in worker processes
+
+    @param private_key The minter's key
+    @param separator ``domain_separator`` of the contract
+    @param vouchers Iterable of ``Voucher``; read lazily, a chunk at a time
+    @param processes Worker processes (one per CPU if ``None``; 1 signs in this process)
+    @return Generator of signed ``Voucher``s in input order
+    """
+    processes = processes or os.cpu_count() or 1
+    chunks = _chunks(vouchers, SIGN_CHUNK_SIZE)
+
+    def signed(chunk, signatures):
+        for voucher, signature in zip(chunk, signatures):
+            yield Voucher(voucher.recipient, voucher.token_id, voucher.content_hash, voucher.expiry, signature)
+
+    def messages(chunk):
+        return [(voucher.recipient, voucher.token_id, voucher.content_hash, voucher.expiry) for voucher in chunk]
+
+    if processes == 1:
+        _init_worker(private_key, separator)
+        for chunk in chunks:
+            yield from signed(chunk, _sign_chunk(messages(chunk)))
+        return
+
+    with Pool(processes, initializer=_init_worker, initargs=(private_key, separator)) as pool:
+        # Chunks are consumed once more are needed, so input and output both stream
+        pending = []
+        for chunk in chunks:
+            pending.append((chunk, pool.apply_async(_sign_chunk, (messages(chunk),))))
+            if len(pending) >= 2 * processes:
+                chunk, result = pending.pop(0)
+                yield from signed(chunk, result.get())
+        for chunk, result in pending:
+            yield from signed(chunk, result.get())
+
+
+# ========== Files ==========
+
+def _hex_word(line, name, value, size):
+    """``value`` as ``size`` bytes, from 0x-prefixed hex"""
+    try:
+        if value[:2] not in ("0x", "0X"):
+            raise ValueError
+        word = bytes.fromhex(value[2:])
+    except (TypeError, ValueError):
+        word = None
+    if word is None or len(word) != size:
+        raise ValueError(f"Line {line}: '{name}' must be {size} bytes of 0x-prefixed hex")
+    return word
+
+
+def _parse_row(line, record, store, expiry):
+    recipient = record.get("to")
+    token_id = record.get("tokenId")
+    if not recipient or token_id in (None, ""):
+        raise ValueError(f"Line {line}: a voucher needs 'to' and 'tokenId'")
+    _hex_word(line, "to", recipient, 20)
+
+    digest = record.get("contentHash")
+    if digest:
+        digest = _hex_word(line, "contentHash", digest, 32)
+    elif record.get("name"):
+        digest = bytes(store.put(record["name"], record.get("description", ""), record.get("imageURI", "")))
+    else:
+        raise ValueError(f"Line {line}: give 'contentHash' or the metadata ('name', ...)")
+
+    return Voucher(recipient.lower(), int(token_id), digest, expiry)
+
+
+def read_voucher_manifest(path, expiry, store=None):
+    """
+    Unsigned vouchers from a JSONL or CSV manifest
+
+    Each row has ``to`` and ``tokenId``, plus either ``contentHash`` or the
+    ``name``/``description``/``imageURI`` metadata, which is written to the
+    ``ContentStore`` and hashed like ``mint_nft.py --content-addressed``.
+    """
+    store = store or ContentStore()
+    path = Path(path)
+    with path.open(newline="", encoding="utf8") as manifest:
+        if path.suffix.lower() == ".csv":
+            for line, row in enumerate(csv.DictReader(manifest), start=2):
+                yield _parse_row(line, row, store, expiry)
+        else:
+            for line, text in enumerate(manifest, start=1):
+                if text.strip():
+                    yield _parse_row(line, json.loads(text), store, expiry)
+
+
+def write_vouchers(path, vouchers, contract_address, chain_id):
+    """
+    Write signed vouchers as JSONL, one self-contained voucher per line
+
+    @return Number of vouchers written
+    """
+    count = 0
+    with open(path, "w", encoding="utf8") as out:
+        for voucher in vouchers:
+            out.write(json.dumps({
+                "contract": contract_address,
+                "chainId": chain_id,
+                "recipient": voucher.recipient,
+                "tokenId": voucher.token_id,
+                "contentHash": "0x" + voucher.content_hash.hex(),
+                "expiry": voucher.expiry,
+                "signature": "0x" + voucher.signature.hex(),
+            }) + "\n")
+            count += 1
+    return count
+
+
+def find_voucher(path, token_id):
+    """
+    The voucher for ``token_id`` in a file written by ``write_vouchers``
+
+    @return ``(voucher, record)``, or ``None`` if the file has no voucher for it
+    """
+    with open(path, encoding="utf8") as vouchers:
+        for text in vouchers:
+            record = json.loads(text)
+            if record["tokenId"] == token_id:
+                voucher = Voucher(
+                    to_checksum_address(record["recipient"]),
+                    record["tokenId"],
+                    bytes(HexBytes(record["contentHash"])),
+                    record["expiry"],
+                    bytes(HexBytes(record["signature"])),
+                )
+                return voucher, record
+    return None
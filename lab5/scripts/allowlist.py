@@ -0,0 +1,155 @@
+"""
+Merkle allowlists: build the tree and proofs offline, set the root, and
+claim NFTs or buy crowdsale tokens with a proof
+"""
+import json
+import time
+
+import click
+from ape import Project, accounts, chain, convert, project
+from ape.cli import ConnectedProviderCommand
+from hexbytes import HexBytes
+
+from scripts._content_store import ContentStore
+from scripts._merkle import ProofFile, read_allowlist, write_proof_file
+from scripts._preflight import PreflightError, send_checked
+
+
+def load_account(alias):
+    account = accounts.load(alias)
+    if hasattr(account, "set_autosign"):
+        account.set_autosign(True)
+    return account
+
+
+def open_proofs(path):
+    try:
+        return ProofFile(path)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+
+
+def allowlist_contract(address):
+    """MyCollectibleNFT or (either variant of) lab4's CrowdSaleToken at ``address``, by its code"""
+    code = HexBytes(chain.provider.get_code(address))
+    lab4 = Project(project.path.parent / "lab4")
+    for container in (project.MyCollectibleNFT, lab4.CrowdSaleToken_22520542, lab4.CrowdSaleTokenOptimized):
+        runtime = HexBytes(container.contract_type.runtime_bytecode.bytecode)
+        if runtime and code.startswith(runtime):
+            return container.at(address)
+    raise click.ClickException(f"{address} is neither a MyCollectibleNFT nor a CrowdSaleToken")
+
+
+def member_proof(proofs, account, contract):
+    """``(cap, proof)`` of ``account``, checked against the root the contract holds"""
+    entry = proofs.lookup(account.address)
+    if entry is None:
+        raise click.ClickException(f"{account.address} is not on the allowlist")
+    if bytes(contract.allowlistRoot()) != proofs.root:
+        raise click.ClickException("The contract's allowlistRoot is not the root of this file")
+    return entry
+
+
+def send(method, *args, sender, **kwargs):
+    try:
+        return send_checked(method, *args, sender=sender, **kwargs)
+    except PreflightError as err:
+        raise click.ClickException(f"{method.abis[0].name} would revert: {err.reason or 'no reason given'}")
+
+
+@click.group()
+def cli():
+    """Merkle-root allowlists for MyCollectibleNFT claims and CrowdSaleToken purchases"""
+
+
+@cli.command()
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option("--output", default="allowlist.bin", show_default=True, help="Proof file to write")
+def build(manifest, output):
+    """Build the tree of MANIFEST (CSV or JSONL with address and cap) and write the proof file"""
+    started = time.perf_counter()
+    try:
+        addresses, caps = read_allowlist(manifest)
+        root = write_proof_file(output, addresses, caps)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+
+    print(f"✅ {len(addresses):,} entries written to {output} in {time.perf_counter() - started:.1f}s")
+    print(f"Root: 0x{root.hex()}")
+
+
+@cli.command()
+@click.argument("proof_file", type=click.Path(exists=True, dir_okay=False))
+@click.argument("address")
+def proof(proof_file, address):
+    """Print the cap and proof of ADDRESS as JSON"""
+    proofs = open_proofs(proof_file)
+    entry = proofs.lookup(address)
+    if entry is None:
+        raise click.ClickException(f"{address} is not on the allowlist")
+
+    cap, siblings = entry
+    print(json.dumps({
+        "root": "0x" + proofs.root.hex(),
+        "address": address,
+        "cap": cap,
+        "proof": ["0x" + sibling.hex() for sibling in siblings],
+    }, indent=2))
+
+
+@cli.command("set-root", cls=ConnectedProviderCommand)
+@click.argument("proof_file", required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option("--contract", "contract_address", required=True, help="MyCollectibleNFT or CrowdSaleToken address")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Minter (NFT) or beneficiary (crowdsale) account alias")
+@click.option("--clear", is_flag=True, help="Set the empty root instead (NFT: no claims; crowdsale: open sale)")
+def set_root(proof_file, contract_address, account_alias, clear):
+    """Set the contract's allowlistRoot to the root of PROOF_FILE"""
+    if clear == bool(proof_file):
+        raise click.UsageError("Give either PROOF_FILE or --clear")
+
+    contract = allowlist_contract(contract_address)
+    root = bytes(32) if clear else open_proofs(proof_file).root
+    receipt = send(contract.setAllowlistRoot, root, sender=load_account(account_alias))
+    print(f"✅ allowlistRoot set to 0x{root.hex()}")
+    print(f"Transaction: {receipt.txn_hash}")
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.argument("proof_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--contract", "contract_address", required=True, help="MyCollectibleNFT address")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Allowlisted account alias that claims")
+@click.option("--token-id", type=int, required=True, help="Token to mint")
+@click.option("--name", required=True, help="Character name")
+@click.option("--description", default="", help="Character description")
+@click.option("--image-uri", default="", help="Character image URI")
+def claim(proof_file, contract_address, account_alias, token_id, name, description, image_uri):
+    """Claim a content-addressed character as a member of the allowlist"""
+    contract = project.MyCollectibleNFT.at(contract_address)
+    claimer = load_account(account_alias)
+    cap, siblings = member_proof(open_proofs(proof_file), claimer, contract)
+
+    digest = ContentStore().put(name, description, image_uri)
+    receipt = send(contract.claim, token_id, digest, cap, siblings, sender=claimer)
+    print(f"✅ Token #{token_id} claimed by {claimer.address} "
+          f"({contract.allowlistClaimed(claimer)} of {cap})")
+    print(f"Transaction: {receipt.txn_hash}")
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.argument("proof_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--contract", "contract_address", required=True, help="CrowdSaleToken address")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Allowlisted account alias that buys")
+@click.option("--value", required=True, help="ETH to pay, e.g. '0.5 ether'")
+def buy(proof_file, contract_address, account_alias, value):
+    """Buy crowdsale tokens as a member of the allowlist"""
+    contract = allowlist_contract(contract_address)
+    buyer = load_account(account_alias)
+    cap, siblings = member_proof(open_proofs(proof_file), buyer, contract)
+
+    receipt = send(contract.buyAllowlisted, cap, siblings, sender=buyer, value=convert(value, int))
+    print(f"✅ {buyer.address} has paid {contract.ethBalances(buyer) / 10**18} of "
+          f"{cap / 10**18} ETH allowed")
+    print(f"Transaction: {receipt.txn_hash}")
@@ -1,17 +1,17 @@
 """
 Approve addresses to manage NFTs
 """
-from ape import accounts, project
+from scripts._permit import save_permit
+from scripts._session import open_session, wait_confirmed
 
 
 def main():
     """Approve an address to manage NFTs"""
-    # Load account
-    owner = accounts.load("dev")
-
     # Get contract address
     contract_address = input("Enter contract address: ")
-    contract = project.MyCollectibleNFT.at(contract_address)
+
+    # Signer and contract, from nftd when it is running
+    session = open_session(contract_address)
 
     print("\n" + "="*60)
     print("NFT Approval Menu")
@@ -19,39 +19,30 @@ def main():
     print("1. Approve single token")
     print("2. Approve all tokens (setApprovalForAll)")
     print("3. Revoke approval for all tokens")
+    print("4. Sign a permit for a single token (no transaction)")
     print("="*60)
 
-    choice = input("\nEnter your choice (1-3): ")
+    choice = input("\nEnter your choice (1-4): ")
 
     if choice == "1":
-        approve_single_token(contract, owner)
+        approve_single_token(session)
     elif choice == "2":
-        approve_all_tokens(contract, owner, True)
+        approve_all_tokens(session, True)
     elif choice == "3":
-        approve_all_tokens(contract, owner, False)
+        approve_all_tokens(session, False)
+    elif choice == "4":
+        sign_token_permit(session)
     else:
         print("Invalid choice!")
 
 
-def approve_single_token(contract, owner):
+def approve_single_token(session):
     """Approve an address for a single token"""
     token_id = int(input("\nEnter token ID: "))
 
-    # Verify ownership
-    try:
-        token_owner = contract.ownerOf(token_id)
-        if token_owner.lower() != owner.address.lower():
-            print(f"❌ Error: You don't own this token!")
-            print(f"Token owner: {token_owner}")
-            print(f"Your address: {owner.address}")
-            return
-    except Exception as e:
-        print(f"❌ Error: Token does not exist: {e}")
-        return
-
     # Get token info
     try:
-        name = contract.characterName(token_id)
+        name = session.call("characterName", token_id)
         print(f"\nToken: {name} (#{token_id})")
     except:
         print(f"\nToken ID: {token_id}")
@@ -59,9 +50,16 @@ def approve_single_token(contract, owner):
     # Get approved address
     approved_address = input("Enter address to approve: ")
 
+    # Dry-run the approval; the contract checks the token exists and who may approve it
+    check = session.preflight("approve", approved_address, token_id)
+    if not check.ok:
+        print(f"❌ Error: {check.revert_reason}")
+        print(f"Your address: {session.signer}")
+        return
+
     # Show current approval
     try:
-        current_approved = contract.getApproved(token_id)
+        current_approved = session.call("getApproved", token_id)
         print(f"\nCurrent approval: {current_approved}")
     except:
         pass
@@ -78,21 +76,24 @@ def approve_single_token(contract, owner):
 
     # Execute approval
     try:
-        tx = contract.approve(approved_address, token_id, sender=owner)
+        confirmation, = wait_confirmed(session, session.submit("approve", approved_address, token_id))
+        if confirmation.failed:
+            print(f"❌ Approval reverted in block {confirmation.block_number}")
+            return
         print(f"✅ Approval successful!")
-        print(f"Transaction: {tx.txn_hash}")
+        print(f"Transaction: {confirmation.txn_hash}")
         print(f"\n{approved_address} can now transfer token #{token_id}")
     except Exception as e:
         print(f"❌ Approval failed: {e}")
 
 
-def approve_all_tokens(contract, owner, approved):
+def approve_all_tokens(session, approved):
     """Set approval for all tokens"""
     operator_address = input("\nEnter operator address: ")
 
     # Show current status
     try:
-        current_status = contract.isApprovedForAll(owner.address, operator_address)
+        current_status = session.call("isApprovedForAll", session.signer, operator_address)
         print(f"\nCurrent status: {'Approved' if current_status else 'Not approved'}")
     except:
         pass
@@ -102,7 +103,7 @@ def approve_all_tokens(contract, owner, approved):
     print(f"\n📋 Approval Details:")
     print(f"Action: {action.capitalize()} all tokens")
     print(f"Operator: {operator_address}")
-    print(f"Owner: {owner.address}")
+    print(f"Owner: {session.signer}")
 
     confirm = input(f"\nConfirm {action}? (yes/no): ")
     if confirm.lower() != 'yes':
@@ -111,9 +112,12 @@ def approve_all_tokens(contract, owner, approved):
 
     # Execute
     try:
-        tx = contract.setApprovalForAll(operator_address, approved, sender=owner)
+        confirmation, = wait_confirmed(session, session.submit("setApprovalForAll", operator_address, approved))
+        if confirmation.failed:
+            print(f"❌ Action reverted in block {confirmation.block_number}")
+            return
         print(f"✅ {'Approval' if approved else 'Revocation'} successful!")
-        print(f"Transaction: {tx.txn_hash}")
+        print(f"Transaction: {confirmation.txn_hash}")
 
         if approved:
             print(f"\n{operator_address} can now manage all your tokens")
@@ -121,3 +125,21 @@ def approve_all_tokens(contract, owner, approved):
             print(f"\n{operator_address} can no longer manage your tokens")
     except Exception as e:
         print(f"❌ Action failed: {e}")
+
+
+def sign_token_permit(session):
+    """Sign an approval the spender submits along with their transfer"""
+    token_id = int(input("\nEnter token ID: "))
+    spender = input("Enter address to approve: ")
+    hours = float(input("Valid for how many hours? [1]: ") or 1)
+    output = input("Save permit to [permit.json]: ") or "permit.json"
+
+    typed_data, signature = session.sign_permit(spender, token_id, int(hours * 3600))
+    if signature is None:
+        print("Signing cancelled.")
+        return
+
+    save_permit(output, typed_data, signature)
+    print(f"✅ Permit saved to {output}")
+    print(f"\n{spender} can approve and transfer token #{token_id} in one go with:")
+    print(f"  ape run permit_nft submit {output} --contract {session.address} --to <recipient>")
@@ -0,0 +1,78 @@
+"""
+Run a manifest of mint / mintWithContentHash / transferFrom / approve /
+setApprovalForAll / burn operations without prompts, pipelining the transactions
+"""
+import click
+from ape import accounts, project
+from ape.cli import ConnectedProviderCommand
+
+from scripts._bulk import BulkExecutor, read_manifest
+from scripts._fees import FEE_POLICY_ENV, POLICIES, FeeEngine, format_metrics
+
+
+def parse_gas_limits(values):
+    """Turn ``("mint=500000", ...)`` into ``{"mint": 500000}``"""
+    limits = {}
+    for value in values:
+        op, _, limit = value.partition("=")
+        limits[op] = int(limit)
+
+    return limits
+
+
+@click.command(cls=ConnectedProviderCommand)
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option("--contract", "contract_address", required=True, help="MyCollectibleNFT address")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Account alias that signs every transaction")
+@click.option("--checkpoint", default=None,
+              help="Checkpoint journal (defaults to <manifest>.checkpoint.jsonl)")
+@click.option("--confirmations", default=1, show_default=True,
+              help="Blocks required on top of each receipt")
+@click.option("--max-in-flight", default=500, show_default=True,
+              help="Maximum unconfirmed transactions at once")
+@click.option("--gas-limit", "gas_limits", multiple=True,
+              help="Override a gas limit, e.g. --gas-limit mint=500000")
+@click.option("--fee-policy", type=click.Choice(list(POLICIES)), envvar=FEE_POLICY_ENV,
+              default="normal", show_default=True, help="EIP-1559 fee policy")
+@click.option("--stuck-blocks", default=3, show_default=True,
+              help="Blocks without a receipt before a transaction is re-sent with bumped fees")
+def cli(manifest, contract_address, account_alias, checkpoint, confirmations,
+        max_in_flight, gas_limits, fee_policy, stuck_blocks):
+    """Execute every operation in MANIFEST (JSONL or CSV)"""
+    operations = read_manifest(manifest)
+    print(f"Loaded {len(operations)} operation(s) from {manifest}")
+
+    sender = accounts.load(account_alias)
+    if hasattr(sender, "set_autosign"):
+        # Unlock once instead of prompting for every transaction
+        sender.set_autosign(True)
+
+    contract = project.MyCollectibleNFT.at(contract_address)
+    executor = BulkExecutor(
+        contract,
+        sender,
+        checkpoint or f"{manifest}.checkpoint.jsonl",
+        gas_limits=parse_gas_limits(gas_limits),
+        max_in_flight=max_in_flight,
+        confirmations=confirmations,
+        fees=FeeEngine(fee_policy),
+        stuck_blocks=stuck_blocks,
+    )
+
+    def progress(submitted, confirmed, total):
+        print(f"\rSubmitted: {submitted}  Confirmed: {confirmed}/{total}", end="", flush=True)
+
+    summary = executor.run(operations, on_progress=progress)
+
+    print(f"\n\n📊 Bulk Run Summary:")
+    print(f"Operations: {summary['total']}")
+    print(f"Submitted this run: {summary['submitted']}")
+    print(f"Confirmed: {summary['confirmed']}")
+    print(f"Time: {summary['seconds']:.1f}s")
+    print(format_metrics(summary["fees"]))
+
+    if summary["failed"]:
+        print(f"❌ Reverted manifest lines: {', '.join(map(str, summary['failed']))}")
+    else:
+        print("✅ All operations succeeded")
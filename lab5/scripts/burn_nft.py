@@ -1,61 +1,49 @@
 """
 Burn (destroy) an NFT
 """
-from ape import accounts, project
+from scripts._events import state_changes
+from scripts._fees import format_metrics
+from scripts._session import open_session, wait_confirmed
 
 
 def main():
     """Burn an NFT"""
-    # Load account
-    burner = accounts.load("dev")
-
     # Get contract address
     contract_address = input("Enter contract address: ")
-    contract = project.MyCollectibleNFT.at(contract_address)
+
+    # Signer and contract, from nftd when it is running
+    session = open_session(contract_address)
+    burner = session.signer
 
     # Get token ID
     token_id = int(input("Enter token ID to burn: "))
 
-    # Verify ownership and get token info
-    try:
-        owner = contract.ownerOf(token_id)
-        print(f"\nCurrent owner: {owner}")
-
-        if owner.lower() != burner.address.lower():
-            # Check if burner is approved
-            approved = contract.getApproved(token_id)
-            approved_for_all = contract.isApprovedForAll(owner, burner.address)
-
-            if approved.lower() != burner.address.lower() and not approved_for_all:
-                print(f"❌ Error: You are not authorized to burn this token!")
-                print(f"Token owner: {owner}")
-                print(f"Your address: {burner.address}")
-                return
-    except Exception as e:
-        print(f"❌ Error: Token does not exist or error checking ownership: {e}")
+    # Read owner, metadata and stats in one consistent snapshot
+    snapshot = session.snapshot(token_id)
+    if not snapshot.exists:
+        print(f"❌ Error: Token does not exist or error checking ownership: {snapshot.error}")
         return
 
-    # Get token metadata
-    try:
-        name = contract.characterName(token_id)
-        description = contract.characterDescription(token_id)
-        image_uri = contract.characterImageURI(token_id)
+    owner = snapshot.owner
+    print(f"\nCurrent owner: {owner}")
 
-        print(f"\n🔥 Token to Burn:")
-        print(f"Token ID: {token_id}")
-        print(f"Name: {name}")
-        print(f"Description: {description}")
-        print(f"Image URI: {image_uri}")
-    except:
-        print(f"\n🔥 Token ID: {token_id}")
+    # Dry-run the burn; the contract decides who may burn
+    check = session.preflight("burn", token_id)
+    if not check.ok:
+        print(f"❌ Error: {check.revert_reason}")
+        print(f"Token owner: {owner}")
+        print(f"Your address: {burner}")
+        return
 
-    # Get current stats
-    total_supply = contract.totalSupply()
-    owner_balance = contract.balanceOf(owner)
+    print(f"\n🔥 Token to Burn:")
+    print(f"Token ID: {token_id}")
+    print(f"Name: {snapshot.name}")
+    print(f"Description: {snapshot.description}")
+    print(f"Image URI: {snapshot.image_uri}")
 
     print(f"\n📊 Current Stats:")
-    print(f"Total Supply: {total_supply}")
-    print(f"Owner Balance: {owner_balance}")
+    print(f"Total Supply: {snapshot.total_supply}")
+    print(f"Owner Balance: {snapshot.owner_balance}")
 
     # Confirm burn
     print(f"\n⚠️  WARNING: This action is irreversible!")
@@ -67,20 +55,24 @@ def main():
     # Execute burn
     print("\nBurning token...")
     try:
-        tx = contract.burn(token_id, sender=burner)
+        confirmation, = wait_confirmed(session, session.submit("burn", token_id))
+        if confirmation.failed:
+            print(f"❌ Burn reverted: {confirmation.txn_hash}")
+            return
         print(f"✅ Token burned successfully!")
-        print(f"Transaction: {tx.txn_hash}")
+        print(f"Transaction: {confirmation.txn_hash}")
 
-        # Display updated stats
+        # Display updated stats, from the snapshot plus the burn's events
+        changes = state_changes(confirmation.events)
         print(f"\n📊 Updated Stats:")
-        print(f"Total Supply: {contract.totalSupply()}")
-        print(f"Owner Balance: {contract.balanceOf(owner)}")
+        print(f"Total Supply: {snapshot.total_supply + changes.supply_delta}")
+        print(f"Owner Balance: {snapshot.owner_balance + changes.balance_delta(owner)}")
 
         # Verify token is gone
-        try:
-            contract.ownerOf(token_id)
+        if changes.owners.get(token_id, owner) is not None:
             print("⚠️  Warning: Token still exists (unexpected)")
-        except:
+        else:
             print("✅ Token successfully destroyed")
+        print(format_metrics(session.fee_metrics()))
     except Exception as e:
         print(f"❌ Burn failed: {e}")
@@ -3,6 +3,8 @@ Deploy MyCollectibleNFT contract
 """
 from ape import accounts, project
 
+from scripts._fees import FeeEngine, default_policy, format_metrics
+
 
 def main():
     """Deploy the NFT contract"""
@@ -12,17 +14,22 @@ def main():
     print(f"Deploying from account: {deployer.address}")
     print(f"Account balance: {deployer.balance / 1e18} ETH")
 
+    # Price the deployment from recent blocks ($NFT_FEE_POLICY: cheap / normal / fast)
+    fees = FeeEngine(default_policy())
+
     # Deploy contract
     print("\nDeploying MyCollectibleNFT contract...")
     contract = deployer.deploy(
         project.MyCollectibleNFT,
         "Digital Character Collection",  # name
         "DCC",                           # symbol
-        "https://school.edu.vn/nft-assets/"  # baseURI
+        "https://school.edu.vn/nft-assets/",  # baseURI
+        **fees.quote().options(),
     )
 
     print(f"\n✅ Contract deployed successfully!")
     print(f"Contract address: {contract.address}")
+    print(format_metrics(fees.metrics()))
     print(f"Contract name: {contract.name()}")
     print(f"Contract symbol: {contract.symbol()}")
     print(f"Base URI: {contract.baseURI()}")
@@ -0,0 +1,85 @@
+"""
+Export a collection's (or a crowdsale token's) state to chunked JSONL or Parquet files
+"""
+import time
+
+import click
+from ape import Project, project
+from ape.cli import ConnectedProviderCommand
+
+from scripts._events import DEFAULT_PAGE_SIZE
+from scripts._export import (
+    DEFAULT_CHUNK_ROWS,
+    WRITERS,
+    BalancesModel,
+    CollectionModel,
+    Exporter,
+)
+
+
+def export_options(command):
+    """Options shared by every export"""
+    command = click.option("--full", is_flag=True,
+                           help="Write every row, not only those changed since the last run")(command)
+    command = click.option("--confirmations", default=0, show_default=True,
+                           help="Blocks behind the head to stop at")(command)
+    command = click.option("--page-size", default=DEFAULT_PAGE_SIZE, show_default=True,
+                           help="Blocks per eth_getLogs request and per checkpoint")(command)
+    command = click.option("--chunk-rows", default=DEFAULT_CHUNK_ROWS, show_default=True,
+                           help="Rows per output file")(command)
+    command = click.option("--format", "output_format", type=click.Choice(list(WRITERS)),
+                           default="jsonl", show_default=True, help="Output file format")(command)
+    command = click.option("--out", "out_dir", required=True,
+                           help="Export directory (re-run with the same one to continue)")(command)
+    command = click.option("--contract", "contract_address", required=True,
+                           help="Contract address")(command)
+    return command
+
+
+def run_export(model, out_dir, output_format, chunk_rows, page_size, confirmations, full):
+    def progress(page_start, page_stop, log_count):
+        click.echo(f"\rBlocks {page_start}-{page_stop}: {log_count} log(s)", err=True, nl=False)
+
+    started = time.time()
+    try:
+        exporter = Exporter(model, out_dir, output_format, page_size, chunk_rows, confirmations)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+
+    with exporter:
+        resumed_from = exporter.cursor + 1
+        applied, entry = exporter.run(full=full, on_page=progress)
+        cursor = exporter.cursor
+
+    if cursor >= resumed_from:
+        click.echo(f"\n📦 Applied {applied} log(s) from block {resumed_from} to {cursor} "
+                   f"in {time.time() - started:.1f}s", err=True)
+    if entry is None:
+        click.echo("Nothing changed since the last export", err=True)
+        return
+
+    click.echo(f"Partition {entry['name']}:", err=True)
+    for dataset, written in entry["datasets"].items():
+        click.echo(f"  {dataset}: {written['rows']} row(s) in {len(written['files'])} file(s)", err=True)
+
+
+@click.group()
+def cli():
+    """Stream contract state rebuilt from logs into resumable, incremental exports"""
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@export_options
+def collection(contract_address, out_dir, output_format, chunk_rows, page_size, confirmations, full):
+    """Every MyCollectibleNFT token (owner, approval, metadata) and operator approval"""
+    model = CollectionModel(project.MyCollectibleNFT.at(contract_address))
+    run_export(model, out_dir, output_format, chunk_rows, page_size, confirmations, full)
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@export_options
+def balances(contract_address, out_dir, output_format, chunk_rows, page_size, confirmations, full):
+    """Holder balances of a lab4 CrowdSaleToken"""
+    lab4 = Project(project.path.parent / "lab4")
+    model = BalancesModel(lab4.CrowdSaleToken_22520542.at(contract_address))
+    run_export(model, out_dir, output_format, chunk_rows, page_size, confirmations, full)
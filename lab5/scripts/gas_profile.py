@@ -0,0 +1,175 @@
+"""
+Per-line and per-function gas profiles of MyCollectibleNFT and CrowdSaleToken
+
+Needs a node with debug traces (e.g. anvil or geth --dev behind
+``ethereum:local:node``); the in-memory test chain cannot trace.
+"""
+import click
+from ape import Project, accounts, chain, project
+from ape.cli import ConnectedProviderCommand
+from eth_utils import to_hex
+
+from scripts._gas_profile import (
+    INTRINSIC,
+    SourceMap,
+    TraceError,
+    called_addresses,
+    identify,
+    profile,
+    trace_call,
+    trace_transaction,
+)
+
+
+def contract_containers():
+    """The contracts a profile can map back to source: this project's NFT and lab4's token"""
+    lab4 = Project(project.path.parent / "lab4")
+    return [(project.MyCollectibleNFT, project.path), (lab4.CrowdSaleToken_22520542, lab4.path)]
+
+
+def source_maps():
+    maps = {}
+    for container, root in contract_containers():
+        contract_type = container.contract_type
+        maps[contract_type.name] = SourceMap(contract_type, root / contract_type.source_id)
+    return maps
+
+
+def profile_options(command):
+    """Options shared by every command"""
+    command = click.option("--collapsed", "collapsed_path", default=None,
+                           type=click.Path(dir_okay=False),
+                           help="Write collapsed stacks here (flamegraph.pl or speedscope input)")(command)
+    command = click.option("--top", default=20, show_default=True,
+                           help="Lines shown in the per-line table")(command)
+    return command
+
+
+def parse_args(args):
+    """Numbers and booleans from the command line as ABI values; everything else as given"""
+    parsed = []
+    for arg in args:
+        if arg.lower() in ("true", "false"):
+            parsed.append(arg.lower() == "true")
+        else:
+            try:
+                parsed.append(int(arg, 0))
+            except ValueError:
+                parsed.append(arg)
+    return parsed
+
+
+def contract_at(address, maps):
+    """Contract instance typed by the code at ``address``"""
+    source_map = identify([address], maps.values())[address.lower()]
+    if source_map is None:
+        raise click.ClickException(f"{address} is neither a MyCollectibleNFT nor a CrowdSaleToken")
+
+    container = next(container for container, _ in contract_containers()
+                     if container.contract_type.name == source_map.name)
+    return container.at(address)
+
+
+# ========== Report ==========
+
+def report(result, top, collapsed_path):
+    total = result.gas_used or 1
+    status = " (reverted)" if result.failed else ""
+    click.echo(f"\n⛽ {result.gas_used:,} gas{status}")
+
+    click.echo(f"\n{'Function':<52} {'Gas':>10} {'Share':>7}")
+    for function, gas in result.top_functions():
+        click.echo(f"{function:<52} {gas:>10,} {gas / total:>7.1%}")
+
+    click.echo(f"\n{'Line':<28} {'Gas':>10} {'Share':>7} {'Ops':>6} {'Storage':>7}  Source")
+    for source_map, line, stats in result.top_lines(top):
+        location = f"{source_map.file_name}:{line}"
+        click.echo(
+            f"{location:<28} {stats.gas:>10,} {stats.gas / total:>7.1%} {stats.steps:>6} "
+            f"{stats.storage_ops:>7}  {source_map.text(line)[:60]}"
+        )
+    if result.functions.get(INTRINSIC):
+        click.echo(f"{INTRINSIC:<28} {result.functions[INTRINSIC]:>10,}   "
+                   "(base cost and calldata, less storage refunds)")
+
+    if collapsed_path:
+        result.write_collapsed(collapsed_path)
+        click.echo(f"\n🔥 Collapsed stacks written to {collapsed_path} "
+                   f"(flamegraph.pl {collapsed_path} > gas.svg)")
+
+
+def run_profile(struct_logs, gas_used, failed, to_address, maps, top, collapsed_path, block_id="latest"):
+    addresses = identify(called_addresses(struct_logs, to_address), maps.values(), block_id)
+    report(profile(struct_logs, gas_used, to_address, addresses, failed), top, collapsed_path)
+
+
+@click.group()
+def cli():
+    """Profile the gas of a transaction or call line by line (needs debug traces)"""
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.argument("txn_hash")
+@profile_options
+def tx(txn_hash, top, collapsed_path):
+    """Profile a mined transaction"""
+    receipt = chain.provider.get_receipt(txn_hash)
+    if not receipt.receiver:
+        raise click.ClickException("Deployments are not profiled; pick a call to a contract")
+
+    try:
+        struct_logs, gas_used, failed = trace_transaction(txn_hash)
+    except TraceError as err:
+        raise click.ClickException(str(err))
+    run_profile(struct_logs, gas_used, failed, receipt.receiver, source_maps(), top, collapsed_path,
+                block_id=receipt.block_number)
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.argument("function_name")
+@click.argument("args", nargs=-1)
+@click.option("--contract", "contract_address", required=True,
+              help="MyCollectibleNFT or CrowdSaleToken address")
+@click.option("--sender", default=None, help="Address the call comes from")
+@click.option("--value", default=0, show_default=True, help="Wei sent with the call")
+@profile_options
+def call(function_name, args, contract_address, sender, value, top, collapsed_path):
+    """Profile a call (e.g. tokenURI 1) on the latest block without sending anything"""
+    maps = source_maps()
+    contract = contract_at(contract_address, maps)
+    method = getattr(contract, function_name)
+    data = method.encode_input(*parse_args(args))
+    txn = {"to": contract.address, "data": to_hex(data), "value": hex(value)}
+    if sender:
+        txn["from"] = sender
+
+    try:
+        struct_logs, gas_used, failed = trace_call(txn)
+    except TraceError as err:
+        raise click.ClickException(str(err))
+    run_profile(struct_logs, gas_used, failed, contract.address, maps, top, collapsed_path)
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.argument("function_name")
+@click.argument("args", nargs=-1)
+@click.option("--contract", "contract_address", required=True,
+              help="MyCollectibleNFT or CrowdSaleToken address")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Signer of the transaction")
+@click.option("--value", default=0, show_default=True, help="Wei sent with the transaction")
+@profile_options
+def send(function_name, args, contract_address, account_alias, value, top, collapsed_path):
+    """Send a transaction (e.g. burn 3) and profile it once mined"""
+    maps = source_maps()
+    contract = contract_at(contract_address, maps)
+    sender = accounts.load(account_alias)
+    receipt = getattr(contract, function_name)(*parse_args(args), sender=sender, value=value)
+    click.echo(f"📝 {function_name} mined in block {receipt.block_number}: {receipt.txn_hash}")
+
+    try:
+        struct_logs, gas_used, failed = trace_transaction(receipt.txn_hash)
+    except TraceError as err:
+        raise click.ClickException(str(err))
+    run_profile(struct_logs, gas_used, failed, contract.address, maps, top, collapsed_path,
+                block_id=receipt.block_number)
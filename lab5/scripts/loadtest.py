@@ -0,0 +1,209 @@
+"""
+Load-test the local node with crowdsale purchases or NFT transfer storms
+"""
+import math
+import random
+
+import click
+from ape import Project, project
+from ape.cli import ConnectedProviderCommand, account_option
+
+from scripts._load import (
+    LoadRunner,
+    current_fees,
+    load_accounts,
+    next_nonces,
+    sign,
+    sign_with_ape,
+    summarize,
+)
+
+
+# Fixed limits instead of estimates: throwaway accounts cannot estimate before
+# they are funded, and a reverted purchase should still be mined and counted
+PURCHASE_GAS = 150_000
+TRANSFER_GAS = 150_000
+MINT_GAS = 300_000
+VALUE_TRANSFER_GAS = 21_000
+
+
+def runner_options(command):
+    """Options shared by every scenario"""
+    command = click.option("--seed", default=0, show_default=True,
+                           help="Seed for throwaway accounts and random choices")(command)
+    command = click.option("--arrival", type=click.Choice(["constant", "poisson"]),
+                           default="constant", show_default=True,
+                           help="Spacing between submissions")(command)
+    command = click.option("--concurrency", default=8, show_default=True,
+                           help="Submissions in flight at once")(command)
+    command = click.option("--rate", default=0.0, show_default=True,
+                           help="Target transactions per second (0 = as fast as possible)")(command)
+    command = click.option("--accounts", "account_count", default=50, show_default=True,
+                           help="Number of throwaway sender accounts")(command)
+    command = account_option()(command)
+    return command
+
+
+def make_runner(rate, concurrency, arrival, seed):
+    return LoadRunner(rate=rate, concurrency=concurrency, arrival=arrival, seed=seed)
+
+
+def progress(submitted, included, total):
+    print(f"\rSubmitted: {submitted}  Included: {included}/{total}", end="", flush=True)
+
+
+def print_summary(title, summary, rate):
+    print(f"\n\n📊 {title}:")
+    print(f"Transactions: {summary['total']}  Included: {summary['included']}  "
+          f"Reverted: {summary['reverted']} ({summary['revert_rate']:.1%})  "
+          f"Submit errors: {summary['submit_errors']}")
+    print(f"Offered rate: {f'{rate:g} tx/s' if rate else 'unlimited'}  "
+          f"Achieved: {summary['tps']:.1f} tx/s over {summary['duration']:.1f}s")
+    if "latency" in summary:
+        latency = summary["latency"]
+        print("Submit → inclusion: " + "  ".join(
+            f"{name} {seconds * 1000:.0f}ms" for name, seconds in latency.items()
+        ))
+    if "gas" in summary:
+        gas = summary["gas"]
+        print(f"Gas per tx: mean {gas['mean']:,.0f}  p50 {gas['p50']:,}  max {gas['max']:,}")
+
+
+def prepare(account, accounts, value_per_account, fees, extra_txs=()):
+    """
+    Fund the throwaway accounts from ``account`` and send any extra setup
+    transactions ``(to, gas, data)`` from it, all pipelined
+    """
+    if hasattr(account, "set_autosign"):
+        account.set_autosign(True)
+
+    nonce = next_nonces([account.address])[account.address]
+    setup = []
+    for sender in accounts:
+        setup.append(sign_with_ape(account, nonce, sender.address, VALUE_TRANSFER_GAS, fees,
+                                   value=value_per_account))
+        nonce += 1
+    for to, gas, data in extra_txs:
+        setup.append(sign_with_ape(account, nonce, to, gas, fees, data=data))
+        nonce += 1
+
+    print(f"Setting up {len(accounts)} account(s) and {len(extra_txs)} extra transaction(s)...")
+    runner = LoadRunner(concurrency=8)
+    runner.run([setup], on_progress=progress)
+    summary = summarize(runner)
+    if summary["reverted"] or summary["submit_errors"]:
+        raise click.ClickException("Setup transactions failed; check the funding account balance")
+
+    print()
+
+
+@click.group()
+def cli():
+    """Generate sustained transaction load against the local node"""
+
+
+# ========== Crowdsale purchases ==========
+
+@cli.command(cls=ConnectedProviderCommand)
+@runner_options
+@click.option("--contract", "contract_address", default=None,
+              help="Existing CrowdSaleToken address (deploys a new one if omitted)")
+@click.option("--amount", default=0.01, show_default=True, help="ETH sent per purchase")
+@click.option("--count", type=int, default=None,
+              help="Purchases to send (defaults to exactly filling maxFundingGoal)")
+def crowdsale(account, account_count, rate, concurrency, arrival, seed, contract_address,
+              amount, count):
+    """Many buyers paying into CrowdSaleToken until the funding cap is hit"""
+    lab4 = Project(project.path.parent / "lab4")
+    if contract_address:
+        contract = lab4.CrowdSaleToken_22520542.at(contract_address)
+    else:
+        contract = account.deploy(lab4.CrowdSaleToken_22520542, "CrowdSale", "CS", 18, 1000)
+
+    value = int(amount * 10**18)
+    remaining = contract.maxFundingGoal() - contract.amountRaised()
+    if count is None:
+        count = math.ceil(remaining / value)
+    print(f"{count} purchase(s) of {amount} ETH; {remaining / 1e18} ETH left before the cap")
+
+    buyers = load_accounts(account_count, seed)
+    per_buyer = math.ceil(count / account_count)
+    fees = current_fees()
+    prepare(account, buyers, per_buyer * (value + PURCHASE_GAS * fees["maxFeePerGas"]), fees)
+
+    nonces = next_nonces([buyer.address for buyer in buyers])
+    purchases = []
+    for index in range(count):
+        buyer = buyers[index % account_count]
+        purchases.append(sign(buyer, nonces[buyer.address], contract.address, PURCHASE_GAS, fees,
+                              value=value))
+        nonces[buyer.address] += 1
+
+    runner = make_runner(rate, concurrency, arrival, seed)
+    runner.run([purchases], on_progress=progress)
+    print_summary("Crowdsale Load Results", summarize(runner), rate)
+    print(f"Amount raised: {contract.amountRaised() / 1e18} / {contract.maxFundingGoal() / 1e18} ETH")
+
+
+# ========== NFT transfer storm ==========
+
+@cli.command(cls=ConnectedProviderCommand)
+@runner_options
+@click.option("--contract", "contract_address", default=None,
+              help="Existing MyCollectibleNFT the account can mint on (deploys one if omitted)")
+@click.option("--tokens-per-account", default=2, show_default=True,
+              help="Tokens minted to each throwaway account before the storm")
+@click.option("--waves", default=5, show_default=True,
+              help="Rounds in which every holder passes one token on")
+@click.option("--first-token-id", default=1_000_000, show_default=True,
+              help="Token IDs minted for the test start here")
+def transfers(account, account_count, rate, concurrency, arrival, seed, contract_address,
+              tokens_per_account, waves, first_token_id):
+    """Accounts passing MyCollectibleNFT tokens around with transferFrom"""
+    if contract_address:
+        contract = project.MyCollectibleNFT.at(contract_address)
+    else:
+        contract = account.deploy(
+            project.MyCollectibleNFT, "Load Test Collection", "LOAD", "https://school.edu.vn/nft-assets/"
+        )
+
+    holders = load_accounts(account_count, seed)
+    owned = {index: [] for index in range(account_count)}
+    mints = []
+    token_id = first_token_id
+    for index, holder in enumerate(holders):
+        for _ in range(tokens_per_account):
+            mints.append((contract.address, MINT_GAS,
+                          contract.mintWithContentHash.encode_input(holder.address, token_id, b"\x01" * 32)))
+            owned[index].append(token_id)
+            token_id += 1
+
+    fees = current_fees()
+    prepare(account, holders, waves * TRANSFER_GAS * fees["maxFeePerGas"], fees, mints)
+
+    # Plan every wave up front; a token received in one wave is passed on in a later one
+    rng = random.Random(seed)
+    nonces = next_nonces([holder.address for holder in holders])
+    planned = []
+    for _ in range(waves):
+        wave, received = [], []
+        for index in rng.sample(range(account_count), account_count):
+            if not owned[index]:
+                continue
+
+            token = owned[index].pop(0)
+            receiver = rng.choice([other for other in range(account_count) if other != index])
+            sender = holders[index]
+            data = contract.transferFrom.encode_input(sender.address, holders[receiver].address, token)
+            wave.append(sign(sender, nonces[sender.address], contract.address, TRANSFER_GAS, fees,
+                             data=data))
+            nonces[sender.address] += 1
+            received.append((receiver, token))
+
+        for receiver, token in received:
+            owned[receiver].append(token)
+        planned.append(wave)
+
+    runner = make_runner(rate, concurrency, arrival, seed)
+    runner.run(planned, on_progress=progress)
+    print_summary("Transfer Storm Results", summarize(runner), rate)
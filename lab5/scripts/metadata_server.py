@@ -0,0 +1,52 @@
+"""
+Serve token metadata over HTTP from an event-fed local store
+"""
+import threading
+import time
+
+import click
+from ape import project
+from ape.cli import ConnectedProviderCommand
+
+from scripts._metadata_store import DEFAULT_CACHE_SIZE, MetadataServer, MetadataStore
+
+
+@click.command(cls=ConnectedProviderCommand)
+@click.option("--contract", "contract_address", required=True, help="MyCollectibleNFT address")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Interface to listen on")
+@click.option("--port", default=8000, show_default=True, help="HTTP port")
+@click.option("--sync-interval", default=2.0, show_default=True,
+              help="Seconds between catching up with the chain")
+@click.option("--cache-size", default=DEFAULT_CACHE_SIZE, show_default=True,
+              help="Responses kept in memory")
+@click.option("--verbose", is_flag=True, help="Log every request")
+def cli(contract_address, host, port, sync_interval, cache_size, verbose):
+    """Serve /metadata/{tokenId} and /collection without per-request node calls"""
+    contract = project.MyCollectibleNFT.at(contract_address)
+    store = MetadataStore(contract, cache_size=cache_size)
+
+    started = time.time()
+    changed = store.sync()
+    print(f"📇 Indexed {store.index.token_count()} token(s) up to block {store.index.cursor} "
+          f"({len(changed)} metadata read(s), {time.time() - started:.1f}s)")
+
+    server = MetadataServer((host, port), store, verbose=verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🌐 Serving http://{host}:{server.server_port}/metadata/<tokenId> and /collection")
+    print("Stop with Ctrl+C")
+
+    # The node is only used here; requests are answered from the store
+    try:
+        while True:
+            time.sleep(sync_interval)
+            changed = store.sync()
+            if changed:
+                print(f"🔄 Block {store.index.cursor}: {len(changed)} token(s) updated")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        store.close()
+        hits, misses = store.cache.hits, store.cache.misses
+        print(f"\nmetadata server stopped ({hits} cache hit(s), {misses} miss(es))")
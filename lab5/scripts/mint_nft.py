@@ -1,7 +1,12 @@
 """
 Mint new NFT characters
 """
-from ape import accounts, project
+from concurrent.futures import as_completed
+
+from scripts._content_store import ContentStore
+from scripts._events import state_changes
+from scripts._fees import format_metrics
+from scripts._session import confirmation_tracker, open_session
 
 
 # Sample character data
@@ -33,21 +38,41 @@ CHARACTERS = [
 ]
 
 
+def submit_mint(session, recipient, char, store=None):
+    """Submit one character's mint, either with on-chain strings or by content hash"""
+    print(f"\nMinting {char['name']}...")
+    if store is None:
+        txn_hash = session.submit(
+            "mint",
+            recipient,
+            char["tokenId"],
+            char["name"],
+            char["description"],
+            char["imageURI"],
+        )
+    else:
+        digest = store.put(char["name"], char["description"], char["imageURI"])
+        print(f"Content hash: {digest.hex()}")
+        txn_hash = session.submit("mintWithContentHash", recipient, char["tokenId"], digest)
+
+    print(f"Transaction: {txn_hash}")
+    return txn_hash
+
+
 def main():
     """Mint NFT characters"""
-    # Load accounts
-    minter = accounts.load("dev")
-
     # Get contract address (you need to update this after deployment)
     contract_address = input("Enter contract address: ")
-    contract = project.MyCollectibleNFT.at(contract_address)
+
+    # Signer and contract, from nftd when it is running
+    session = open_session(contract_address)
 
     # Get recipient address
     recipient = input("Enter recipient address (or press Enter to use minter): ")
     if not recipient:
-        recipient = minter.address
+        recipient = session.signer
 
-    print(f"\nMinting from: {minter.address}")
+    print(f"\nMinting from: {session.signer}")
     print(f"Minting to: {recipient}")
 
     # Choose which character to mint
@@ -57,41 +82,51 @@ def main():
 
     choice = input("\nEnter character number (or 'all' to mint all): ")
 
+    # Content-addressed mints keep only a 32-byte hash on-chain
+    store = None
+    if input("Store metadata off-chain by content hash? (y/N): ").lower() == 'y':
+        store = ContentStore()
+
     if choice.lower() == 'all':
         # Mint all characters
-        for char in CHARACTERS:
-            print(f"\nMinting {char['name']}...")
-            tx = contract.mint(
-                recipient,
-                char["tokenId"],
-                char["name"],
-                char["description"],
-                char["imageURI"],
-                sender=minter
-            )
-            print(f"✅ Minted token #{char['tokenId']}: {char['name']}")
-            print(f"Transaction: {tx.txn_hash}")
+        chars = CHARACTERS
     else:
         # Mint single character
         idx = int(choice) - 1
-        if 0 <= idx < len(CHARACTERS):
-            char = CHARACTERS[idx]
-            print(f"\nMinting {char['name']}...")
-            tx = contract.mint(
-                recipient,
-                char["tokenId"],
-                char["name"],
-                char["description"],
-                char["imageURI"],
-                sender=minter
-            )
-            print(f"✅ Minted token #{char['tokenId']}: {char['name']}")
-            print(f"Transaction: {tx.txn_hash}")
-        else:
+        if not 0 <= idx < len(CHARACTERS):
             print("Invalid choice!")
             return
+        chars = [CHARACTERS[idx]]
+
+    # Stats before minting; the mints' events give the rest
+    total_supply = session.call("totalSupply")
+    recipient_balance = session.call("balanceOf", recipient)
+
+    # Send every mint back to back, then report them as they confirm
+    events = []
+    with confirmation_tracker(session) as tracker:
+        pending = {}
+        for char in chars:
+            try:
+                pending[tracker.track(submit_mint(session, recipient, char, store))] = char
+            except Exception as e:
+                print(f"❌ Mint of token #{char['tokenId']} failed: {e}")
+
+        for future in as_completed(pending):
+            char = pending[future]
+            if future.exception() is not None:
+                print(f"❌ Mint of token #{char['tokenId']} was not confirmed: {future.exception()}")
+                continue
+            confirmation = future.result()
+            if confirmation.failed:
+                print(f"❌ Mint of token #{char['tokenId']} reverted: {confirmation.txn_hash}")
+                continue
+            print(f"✅ Minted token #{char['tokenId']}: {char['name']} (block {confirmation.block_number})")
+            events.extend(confirmation.events)
 
     # Display updated stats
+    changes = state_changes(events)
     print(f"\n📊 Contract Stats:")
-    print(f"Total Supply: {contract.totalSupply()}")
-    print(f"Recipient Balance: {contract.balanceOf(recipient)}")
+    print(f"Total Supply: {total_supply + changes.supply_delta}")
+    print(f"Recipient Balance: {recipient_balance + changes.balance_delta(recipient)}")
+    print(format_metrics(session.fee_metrics()))
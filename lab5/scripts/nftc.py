@@ -0,0 +1,142 @@
+"""
+Millisecond-start client for a running nftd
+
+Run it with plain Python so the ape stack is never loaded:
+
+    python scripts/nftc.py --contract 0x... mint 0xRECIPIENT 7 "Cyber Warrior"
+"""
+import click
+
+try:
+    from scripts._nftd_client import DaemonClient, DaemonError
+except ImportError:  # python scripts/nftc.py
+    from _nftd_client import DaemonClient, DaemonError
+
+
+def print_tx(result):
+    print(f"✅ {result['txn_hash']} (block {result['block_number']}, gas {result['gas_used']:,})")
+
+
+@click.group()
+@click.option("--contract", envvar="NFT_CONTRACT", default=None,
+              help="MyCollectibleNFT address [env: NFT_CONTRACT]")
+@click.option("--socket", "socket_path", default=None, help="nftd socket path")
+@click.pass_context
+def cli(ctx, contract, socket_path):
+    """Send NFT operations to nftd (start it with `ape run nftd`)"""
+    ctx.obj = (DaemonClient(socket_path), contract)
+
+
+def run(ctx, op, *args):
+    client, contract = ctx.obj
+    if contract is None:
+        raise click.UsageError("Give --contract or set NFT_CONTRACT")
+    try:
+        return client.request(op, *args, contract=contract)
+    except DaemonError as err:
+        raise click.ClickException(str(err))
+    except OSError:
+        raise click.ClickException(f"nftd is not running at {client.path}")
+
+
+def signer(ctx):
+    info = ctx.obj[0].info()
+    if info is None:
+        raise click.ClickException(f"nftd is not running at {ctx.obj[0].path}")
+    return info["signer"]
+
+
+@cli.command()
+@click.pass_context
+def status(ctx):
+    """Show the daemon's signer, network and loaded contracts"""
+    info = ctx.obj[0].info()
+    if info is None:
+        raise click.ClickException(f"nftd is not running at {ctx.obj[0].path}")
+    print(f"Signer: {info['signer']}")
+    print(f"Network: {info['network']} (chain {info['chain_id']})")
+    print(f"Fee policy: {info['fee_policy']}")
+    for address in info["contracts"]:
+        print(f"Contract: {address}")
+
+
+@cli.command()
+@click.pass_context
+def stop(ctx):
+    """Stop the daemon"""
+    ctx.obj[0].stop()
+    print("nftd stopping")
+
+
+@cli.command()
+@click.argument("token_id", type=int)
+@click.pass_context
+def token(ctx, token_id):
+    """Show a token's owner and metadata"""
+    snapshot = run(ctx, "snapshot", token_id)
+    if snapshot["owner"] is None:
+        raise click.ClickException(f"Token does not exist: {snapshot['error']}")
+    print(f"Token #{token_id} (block {snapshot['block_number']})")
+    print(f"Owner: {snapshot['owner']}  Approved: {snapshot['approved']}")
+    print(f"Name: {snapshot['name']}")
+    print(f"Description: {snapshot['description']}")
+    print(f"Image URI: {snapshot['image_uri']}")
+
+
+@cli.command()
+@click.argument("owner")
+@click.pass_context
+def balance(ctx, owner):
+    """Show an address's token balance"""
+    print(run(ctx, "call", "balanceOf", owner))
+
+
+@cli.command()
+@click.argument("recipient")
+@click.argument("token_id", type=int)
+@click.argument("name")
+@click.option("--description", default="", help="Character description")
+@click.option("--image", "image_uri", default="", help="Character image URI")
+@click.pass_context
+def mint(ctx, recipient, token_id, name, description, image_uri):
+    """Mint a character with on-chain metadata"""
+    print_tx(run(ctx, "transact", "mint", recipient, token_id, name, description, image_uri))
+
+
+@cli.command()
+@click.argument("recipient")
+@click.argument("token_ids", type=int, nargs=-1, required=True)
+@click.pass_context
+def transfer(ctx, recipient, token_ids):
+    """Transfer the signer's tokens, batching several into gas-sized chunks"""
+    sender = signer(ctx)
+    if len(token_ids) == 1:
+        print_tx(run(ctx, "transact", "transferFrom", sender, recipient, token_ids[0]))
+        return
+
+    token_ids = list(token_ids)
+    size = run(ctx, "chunk_size", recipient, token_ids)
+    for start in range(0, len(token_ids), size):
+        print_tx(run(ctx, "transact", "batchTransferFrom", sender, recipient,
+                     token_ids[start:start + size]))
+
+
+@cli.command()
+@click.argument("token_id", type=int)
+@click.pass_context
+def burn(ctx, token_id):
+    """Burn a token"""
+    print_tx(run(ctx, "transact", "burn", token_id))
+
+
+@cli.command()
+@click.argument("spender")
+@click.argument("token_id", type=int)
+@click.pass_context
+def approve(ctx, spender, token_id):
+    """Approve SPENDER for one token"""
+    print_tx(run(ctx, "transact", "approve", spender, token_id))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,46 @@
+"""
+Keep a warm session for the NFT scripts: provider, unlocked signer and contract handles
+"""
+import os
+
+import click
+from ape import accounts
+from ape.cli import ConnectedProviderCommand
+
+from scripts._fees import FEE_POLICY_ENV, POLICIES, FeeEngine
+from scripts._nftd_client import DaemonClient, default_socket_path
+from scripts._session import SessionServer
+
+
+@click.command(cls=ConnectedProviderCommand)
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Account alias that signs every transaction")
+@click.option("--socket", "socket_path", default=None,
+              help="Unix socket to listen on [default: $NFTD_SOCKET or a per-user temp file]")
+@click.option("--fee-policy", type=click.Choice(list(POLICIES)), envvar=FEE_POLICY_ENV,
+              default="normal", show_default=True, help="EIP-1559 fee policy for every transaction")
+def cli(account_alias, socket_path, fee_policy):
+    """Serve mint/burn/transfer/approve/query operations over a Unix socket"""
+    socket_path = socket_path or default_socket_path()
+    if os.path.exists(socket_path):
+        if DaemonClient(socket_path).info() is not None:
+            raise click.ClickException(f"nftd is already running at {socket_path}")
+        os.unlink(socket_path)
+
+    # Decrypt the key once; the scripts no longer prompt per transaction
+    account = accounts.load(account_alias)
+    if hasattr(account, "set_autosign"):
+        account.set_autosign(True)
+
+    server = SessionServer(socket_path, account, FeeEngine(fee_policy))
+    print(f"🔌 nftd listening on {socket_path}")
+    print(f"Signer: {account.address}  Network: {server.info()['network']}  Fees: {fee_policy}")
+    print("Stop with Ctrl+C or `python scripts/nftc.py stop`")
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+        print("\nnftd stopped")
@@ -0,0 +1,93 @@
+"""
+Sign NFT approvals off-chain and submit them together with the transfer
+"""
+import click
+from ape import accounts, project
+from ape.cli import ConnectedProviderCommand
+
+from scripts._permit import (
+    deadline_in,
+    load_permit,
+    permit_call,
+    permit_data,
+    permit_for_all_data,
+    save_permit,
+    send_together,
+    sign_typed_data,
+)
+from scripts._preflight import PreflightError
+
+
+def load_account(alias):
+    account = accounts.load(alias)
+    if hasattr(account, "set_autosign"):
+        account.set_autosign(True)
+    return account
+
+
+@click.group()
+def cli():
+    """Gasless approvals for MyCollectibleNFT (EIP-4494 permits)"""
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.option("--contract", "contract_address", required=True, help="MyCollectibleNFT address")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Owner (or operator) account alias that signs")
+@click.option("--spender", required=True, help="Address being approved")
+@click.option("--token-id", type=int, default=None, help="Token to approve")
+@click.option("--all", "for_all", is_flag=True, help="Approve SPENDER as operator for all tokens")
+@click.option("--revoke", is_flag=True, help="With --all, revoke the operator instead")
+@click.option("--expires", default=3600, show_default=True, help="Seconds until the permit expires")
+@click.option("--output", default="permit.json", show_default=True, help="File to write the permit to")
+def sign(contract_address, account_alias, spender, token_id, for_all, revoke, expires, output):
+    """Sign a permit; no transaction is sent"""
+    if for_all == (token_id is not None):
+        raise click.UsageError("Give either --token-id or --all")
+
+    contract = project.MyCollectibleNFT.at(contract_address)
+    signer = load_account(account_alias)
+    deadline = deadline_in(expires)
+    if for_all:
+        typed_data = permit_for_all_data(contract, signer.address, spender, not revoke, deadline)
+    else:
+        typed_data = permit_data(contract, spender, token_id, deadline)
+
+    signature = sign_typed_data(signer, typed_data)
+    if signature is None:
+        raise click.ClickException("Signing was declined")
+
+    save_permit(output, typed_data, signature)
+    print(f"✅ Permit written to {output}")
+    print(f"Nonce: {typed_data['message']['nonce']}  Deadline: {deadline}")
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.argument("permit", type=click.Path(exists=True, dir_okay=False))
+@click.option("--contract", "contract_address", required=True, help="MyCollectibleNFT address")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Spender account alias that submits")
+@click.option("--to", "recipient", default=None, help="Also transfer the token(s) to this address")
+@click.option("--token-id", "token_ids", type=int, multiple=True,
+              help="Tokens to transfer with an operator permit (repeatable)")
+def submit(permit, contract_address, account_alias, recipient, token_ids):
+    """Submit PERMIT, followed by the transfer when --to is given"""
+    contract = project.MyCollectibleNFT.at(contract_address)
+    spender = load_account(account_alias)
+    typed_data, signature = load_permit(permit)
+    message = typed_data["message"]
+
+    calls = [permit_call(contract, typed_data, signature)]
+    if recipient:
+        if typed_data["primaryType"] == "Permit":
+            token_ids = [message["tokenId"]]
+        for token_id in token_ids:
+            calls.append((contract.transferFrom, (contract.ownerOf(token_id), recipient, token_id)))
+
+    try:
+        receipts = send_together(spender, calls)
+    except PreflightError as err:
+        raise click.ClickException(f"Stopped before a call that would revert: {err.reason or 'no reason given'}")
+    for (method, _), receipt in zip(calls, receipts):
+        status = "✅" if not receipt.failed else "❌"
+        print(f"{status} {method.abis[0].name}: {receipt.txn_hash} (gas {receipt.gas_used:,})")
@@ -1,17 +1,20 @@
 """
 Query NFT information
 """
-from ape import project, Contract
 import json
 
+from scripts._session import open_session
+
 
 def main():
     """Query NFT contract and token information"""
     # Get contract address
     contract_address = input("Enter contract address: ")
 
+    # Repeated queries are answered from a cache that new events invalidate;
+    # with nftd running, the cache and ownership index stay warm between runs
     try:
-        contract = project.MyCollectibleNFT.at(contract_address)
+        session = open_session(contract_address)
     except Exception as e:
         print(f"❌ Error loading contract: {e}")
         return
@@ -29,93 +32,99 @@ def main():
         print("="*60)
 
         choice = input("\nEnter your choice (1-6): ")
+        session.refresh()
 
         if choice == "1":
-            query_contract_info(contract)
+            query_contract_info(session)
         elif choice == "2":
-            query_token_info(contract)
+            query_token_info(session)
         elif choice == "3":
-            query_owner_info(contract)
+            query_owner_info(session)
         elif choice == "4":
-            query_approvals(contract)
+            query_approvals(session)
         elif choice == "5":
-            list_owner_tokens(contract)
+            list_owner_tokens(session)
         elif choice == "6":
+            hits, misses = session.cache_stats()
+            print(f"Cache: {hits} hit(s), {misses} miss(es)")
             print("Goodbye!")
             break
         else:
             print("Invalid choice!")
 
 
-def query_contract_info(contract):
+def query_contract_info(session):
     """Display contract information"""
     print("\n📋 Contract Information:")
-    print(f"Address: {contract.address}")
-    print(f"Name: {contract.name()}")
-    print(f"Symbol: {contract.symbol()}")
-    print(f"Base URI: {contract.baseURI()}")
-    print(f"Minter: {contract.minter()}")
-    print(f"Total Supply: {contract.totalSupply()}")
+    print(f"Address: {session.address}")
+    print(f"Name: {session.cached_call('name')}")
+    print(f"Symbol: {session.cached_call('symbol')}")
+    print(f"Base URI: {session.cached_call('baseURI')}")
+    print(f"Minter: {session.cached_call('minter')}")
+    print(f"Total Supply: {session.cached_call('totalSupply')}")
 
     # Check ERC-165 support
     try:
         erc721_interface = bytes.fromhex("80ac58cd")
-        supports_erc721 = contract.supportsInterface(erc721_interface)
+        supports_erc721 = session.cached_call("supportsInterface", erc721_interface)
         print(f"Supports ERC-721: {supports_erc721}")
     except:
         pass
 
 
-def query_token_info(contract):
+def query_token_info(session):
     """Display token information"""
     token_id = int(input("\nEnter token ID: "))
 
-    try:
-        owner = contract.ownerOf(token_id)
-        name = contract.characterName(token_id)
-        description = contract.characterDescription(token_id)
-        image_uri = contract.characterImageURI(token_id)
-
-        print(f"\n🎨 Token #{token_id} Information:")
-        print(f"Owner: {owner}")
-        print(f"Name: {name}")
-        print(f"Description: {description}")
-        print(f"Image URI: {image_uri}")
-
-        # Get metadata JSON
-        try:
-            metadata_json = contract.tokenURI(token_id)
-            print(f"\n📄 Metadata JSON:")
-            # Try to pretty print if it's valid JSON
-            try:
-                metadata_dict = json.loads(metadata_json)
-                print(json.dumps(metadata_dict, indent=2))
-            except:
-                print(metadata_json)
-        except Exception as e:
-            print(f"Could not retrieve metadata: {e}")
+    snapshot = session.cached_snapshot(token_id)
+    if not snapshot.exists:
+        print(f"❌ Error: Token does not exist or error retrieving info: {snapshot.error}")
+        return
 
-    except Exception as e:
-        print(f"❌ Error: Token does not exist or error retrieving info: {e}")
+    print(f"\n🎨 Token #{token_id} Information (block {snapshot.block_number}):")
+    print(f"Owner: {snapshot.owner}")
+    print(f"Name: {snapshot.name}")
+    print(f"Description: {snapshot.description}")
+    print(f"Image URI: {snapshot.image_uri}")
+
+    if snapshot.content_addressed:
+        print(f"Content Hash: {snapshot.content_hash.hex()}")
+        print(f"Metadata URL: {snapshot.token_uri}")
+        if not snapshot.name:
+            print("⚠️  Metadata not found in the local content store")
+        return
 
+    # Show metadata JSON
+    if snapshot.token_uri is None:
+        print("Could not retrieve metadata")
+        return
+
+    print(f"\n📄 Metadata JSON:")
+    # Try to pretty print if it's valid JSON
+    try:
+        metadata_dict = json.loads(snapshot.token_uri)
+        print(json.dumps(metadata_dict, indent=2))
+    except:
+        print(snapshot.token_uri)
 
-def query_owner_info(contract):
+
+def query_owner_info(session):
     """Display owner information"""
     owner_address = input("\nEnter owner address: ")
 
     try:
-        balance = contract.balanceOf(owner_address)
+        balance = session.cached_call("balanceOf", owner_address)
         print(f"\n👤 Owner Information:")
         print(f"Address: {owner_address}")
         print(f"Token Balance: {balance}")
 
-        is_minter = contract.minter().lower() == owner_address.lower()
+        is_minter = session.cached_call("minter").lower() == owner_address.lower()
         print(f"Is Minter: {is_minter}")
     except Exception as e:
         print(f"❌ Error: {e}")
 
 
-def query_approvals(contract):
+def query_approvals(session):
     """Check approval status"""
     print("\nCheck Approval:")
     print("1. Check single token approval")
@@ -126,8 +135,8 @@ def query_approvals(contract):
     if choice == "1":
         token_id = int(input("Enter token ID: "))
         try:
-            approved = contract.getApproved(token_id)
-            owner = contract.ownerOf(token_id)
+            approved = session.cached_call("getApproved", token_id)
+            owner = session.cached_call("ownerOf", token_id)
             print(f"\n✅ Token #{token_id}:")
             print(f"Owner: {owner}")
             print(f"Approved: {approved}")
@@ -142,7 +151,7 @@ def query_approvals(contract):
         owner = input("Enter owner address: ")
         operator = input("Enter operator address: ")
         try:
-            is_approved = contract.isApprovedForAll(owner, operator)
+            is_approved = session.cached_call("isApprovedForAll", owner, operator)
             print(f"\n✅ Approval Status:")
             print(f"Owner: {owner}")
             print(f"Operator: {operator}")
@@ -151,13 +160,12 @@ def query_approvals(contract):
             print(f"❌ Error: {e}")
 
 
-def list_owner_tokens(contract):
+def list_owner_tokens(session):
     """List all tokens owned by an address"""
     owner_address = input("\nEnter owner address: ")
 
     try:
-        balance = contract.balanceOf(owner_address)
-        total_supply = contract.totalSupply()
+        balance = session.cached_call("balanceOf", owner_address)
 
         print(f"\n📦 Tokens owned by {owner_address}:")
         print(f"Balance: {balance}")
@@ -166,26 +174,19 @@ def list_owner_tokens(contract):
             print("No tokens owned.")
             return
 
-        print("\nSearching for tokens...")
-        owned_tokens = []
-
-        # Search through possible token IDs (this is inefficient but works for small collections)
-        # In production, you'd want to use events or maintain an index
-        for token_id in range(1, 1000):  # Check first 1000 token IDs
-            try:
-                token_owner = contract.ownerOf(token_id)
-                if token_owner.lower() == owner_address.lower():
-                    name = contract.characterName(token_id)
-                    owned_tokens.append((token_id, name))
-            except:
-                continue
+        print("\nSyncing ownership index...")
+        new_logs, indexed_block, owned_tokens = session.tokens_of(owner_address)
+        print(f"Indexed up to block {indexed_block} ({new_logs} new event(s))")
 
         if owned_tokens:
             print(f"\nFound {len(owned_tokens)} token(s):")
             for token_id, name in owned_tokens:
                 print(f"  • Token #{token_id}: {name}")
         else:
-            print("No tokens found (search range may be insufficient)")
+            print("No tokens found in the index")
+
+        if len(owned_tokens) != balance:
+            print(f"⚠️  Warning: index found {len(owned_tokens)} token(s) but balanceOf is {balance}")
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -0,0 +1,179 @@
+"""
+Collection-wide scans using concurrent, batched reads
+"""
+import asyncio
+import json
+import time
+
+import click
+from ape import chain, project
+from ape.cli import ConnectedProviderCommand
+from eth_utils import to_hex
+
+from scripts._async_query import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RETRIES,
+    AsyncQueryEngine,
+)
+from scripts._content_store import ContentStore, is_content_addressed
+from scripts._nft_index import OwnerIndex
+from scripts._rpc import RPCError, encode_call
+
+
+TOKEN_FIELDS = ("ownerOf", "tokenURI", "contentHash")
+
+
+def engine_options(command):
+    """Options shared by every scan"""
+    command = click.option("--retries", default=DEFAULT_RETRIES, show_default=True,
+                           help="Retries per call on rate limits and network errors")(command)
+    command = click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True,
+                           help="Calls per JSON-RPC batch")(command)
+    command = click.option("--concurrency", default=DEFAULT_CONCURRENCY, show_default=True,
+                           help="Batches in flight at once")(command)
+    command = click.option("--contract", "contract_address", required=True,
+                           help="MyCollectibleNFT address")(command)
+    return command
+
+
+def create_engine(concurrency, batch_size, retries):
+    uri = getattr(chain.provider, "http_uri", None)
+    if not uri:
+        raise click.UsageError("Scans need an HTTP node, e.g. --network ethereum:local:node")
+
+    return AsyncQueryEngine(uri, concurrency=concurrency, batch_size=batch_size, retries=retries)
+
+
+def report(count, label, started, failed):
+    click.echo(f"\n📊 {count} {label} in {time.time() - started:.1f}s", err=True)
+    if failed:
+        click.echo(f"⚠️  {failed} call(s) failed after retries", err=True)
+
+
+@click.group()
+def cli():
+    """Scan a whole collection with concurrent reads"""
+
+
+# ========== Metadata ==========
+
+def token_record(token_id, fields, store):
+    record = {"tokenId": token_id, "owner": fields["ownerOf"], "tokenURI": fields["tokenURI"]}
+    digest = fields["contentHash"]
+    if is_content_addressed(digest):
+        record["contentHash"] = to_hex(digest)
+        record["metadata"] = store.get(digest)
+    else:
+        try:
+            record["metadata"] = json.loads(fields["tokenURI"])
+        except (TypeError, ValueError):
+            record["metadata"] = None
+
+    return record
+
+
+async def dump_metadata_async(engine, contract, token_ids, block, output):
+    store = ContentStore()
+    calls = [
+        ((token_id, field), encode_call(getattr(contract, field), token_id))
+        for token_id in token_ids
+        for field in TOKEN_FIELDS
+    ]
+
+    partial = {}
+    written = failed = 0
+    async with engine:
+        async for (token_id, field), result in engine.stream_calls(calls, block):
+            fields = partial.setdefault(token_id, {})
+            fields[field] = result
+            if len(fields) < len(TOKEN_FIELDS):
+                continue
+
+            del partial[token_id]
+            if isinstance(fields["ownerOf"], RPCError):
+                continue  # Not minted (or burned) at this block
+
+            errors = [value for value in fields.values() if isinstance(value, RPCError)]
+            if errors:
+                failed += len(errors)
+                continue
+
+            output.write(json.dumps(token_record(token_id, fields, store), ensure_ascii=False) + "\n")
+            written += 1
+
+    return written, failed
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@engine_options
+@click.option("--output", type=click.File("w", encoding="utf8"), default="-",
+              help="JSONL file to write (defaults to stdout)")
+@click.option("--max-token-id", type=int, default=None,
+              help="Probe token IDs 1..N instead of reading the ownership index")
+def dump_metadata(contract_address, concurrency, batch_size, retries, output, max_token_id):
+    """Write owner and metadata of every token as JSON lines"""
+    contract = project.MyCollectibleNFT.at(contract_address)
+    engine = create_engine(concurrency, batch_size, retries)
+    block = chain.blocks.height
+
+    if max_token_id is None:
+        with OwnerIndex(contract) as index:
+            index.sync(stop_block=block)
+            token_ids = [token_id for token_id, _, _ in index.all_tokens()]
+    else:
+        token_ids = range(1, max_token_id + 1)
+
+    click.echo(f"Reading {len(token_ids)} token(s) at block {block}...", err=True)
+    started = time.time()
+    written, failed = asyncio.run(dump_metadata_async(engine, contract, token_ids, block, output))
+    report(written, "token(s) written", started, failed)
+
+
+# ========== Balances ==========
+
+def read_addresses(path):
+    """One address per line; extra CSV columns, headers and comments are skipped"""
+    addresses = []
+    with open(path, encoding="utf8") as lines:
+        for line in lines:
+            address = line.split(",")[0].strip()
+            if address.startswith("0x"):
+                addresses.append(address)
+
+    return addresses
+
+
+async def balances_async(engine, contract, addresses, block, output):
+    calls = [(address, encode_call(contract.balanceOf, address)) for address in addresses]
+
+    written = failed = 0
+    async with engine:
+        async for address, balance in engine.stream_calls(calls, block):
+            if isinstance(balance, RPCError):
+                failed += 1
+                continue
+
+            output.write(f"{address},{balance}\n")
+            written += 1
+
+    return written, failed
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@engine_options
+@click.argument("addresses", type=click.Path(exists=True, dir_okay=False))
+@click.option("--output", type=click.File("w", encoding="utf8"), default="-",
+              help="CSV file to write (defaults to stdout)")
+def balances(contract_address, concurrency, batch_size, retries, addresses, output):
+    """Write balanceOf for every address in ADDRESSES as CSV"""
+    contract = project.MyCollectibleNFT.at(contract_address)
+    engine = create_engine(concurrency, batch_size, retries)
+    block = chain.blocks.height
+    address_list = read_addresses(addresses)
+
+    click.echo(f"Reading {len(address_list)} balance(s) at block {block}...", err=True)
+    started = time.time()
+    output.write("address,balance\n")
+    written, failed = asyncio.run(balances_async(engine, contract, address_list, block, output))
+    report(written, "balance(s) written", started, failed)
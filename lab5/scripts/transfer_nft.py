@@ -1,51 +1,112 @@
 """
 Transfer NFT between accounts
 """
-from ape import accounts, project
+from concurrent.futures import as_completed
+
+from scripts._batch_transfer import chunked, parse_token_ids
+from scripts._events import state_changes
+from scripts._fees import format_metrics
+from scripts._session import confirmation_tracker, open_session, wait_confirmed
+
+
+def transfer_many(session, token_ids):
+    """Move several tokens with batchTransferFrom, in chunks that fit the block gas limit"""
+    owned, others = session.split_by_owner(token_ids)
+    for token_id, owner in others:
+        reason = "does not exist" if owner is None else f"is owned by {owner}"
+        print(f"⚠️  Skipping token {token_id}: it {reason}")
+    if not owned:
+        print("❌ Error: You don't own any of these tokens!")
+        return
+
+    recipient = input("\nEnter recipient address: ")
+    size = session.chunk_size(recipient, owned)
+    chunks = chunked(owned, size)
+
+    print(f"\n📦 Transfer Details:")
+    print(f"From: {session.signer}")
+    print(f"To: {recipient}")
+    print(f"Tokens: {len(owned)} in {len(chunks)} transaction(s) of up to {size}")
+
+    confirm = input("\nConfirm transfer? (yes/no): ")
+    if confirm.lower() != 'yes':
+        print("Transfer cancelled.")
+        return
+
+    sender_balance = session.call("balanceOf", session.signer)
+    recipient_balance = session.call("balanceOf", recipient)
+
+    # Send every chunk back to back, then report them as they confirm
+    print("\nTransferring...")
+    events = []
+    with confirmation_tracker(session) as tracker:
+        pending = {}
+        for chunk in chunks:
+            try:
+                txn_hash = session.submit("batchTransferFrom", session.signer, recipient, chunk)
+            except Exception as e:
+                print(f"❌ Transfer of tokens {chunk[0]}..{chunk[-1]} failed: {e}")
+                break
+            pending[tracker.track(txn_hash)] = chunk
+
+        for future in as_completed(pending):
+            chunk = pending[future]
+            if future.exception() is not None:
+                print(f"❌ {len(chunk)} token(s) not confirmed: {future.exception()}")
+                continue
+            confirmation = future.result()
+            status = "❌" if confirmation.failed else "✅"
+            print(f"{status} {len(chunk)} token(s): {confirmation.txn_hash} (gas {confirmation.gas_used:,})")
+            events.extend(confirmation.events)
+
+    changes = state_changes(events)
+    print(f"\n📊 Updated Balances:")
+    print(f"Sender balance: {sender_balance + changes.balance_delta(session.signer)}")
+    print(f"Recipient balance: {recipient_balance + changes.balance_delta(recipient)}")
+    print(format_metrics(session.fee_metrics()))
 
 
 def main():
     """Transfer an NFT"""
-    # Load sender account
-    sender = accounts.load("dev")
-
     # Get contract address
     contract_address = input("Enter contract address: ")
-    contract = project.MyCollectibleNFT.at(contract_address)
 
-    # Get token ID
-    token_id = int(input("Enter token ID to transfer: "))
+    # Signer and contract, from nftd when it is running
+    session = open_session(contract_address)
+    sender = session.signer
 
-    # Verify ownership
-    try:
-        owner = contract.ownerOf(token_id)
-        print(f"\nCurrent owner: {owner}")
+    # Get token ID(s)
+    token_ids = parse_token_ids(input("Enter token ID(s) to transfer (e.g. 5 or 1,3,10-20): "))
+    if len(token_ids) > 1:
+        transfer_many(session, token_ids)
+        return
+    token_id = token_ids[0]
 
-        if owner.lower() != sender.address.lower():
-            print(f"❌ Error: You don't own this token!")
-            print(f"Token owner: {owner}")
-            print(f"Your address: {sender.address}")
-            return
-    except Exception as e:
-        print(f"❌ Error: Token does not exist or error checking ownership: {e}")
+    # Read owner and metadata in one consistent snapshot
+    snapshot = session.snapshot(token_id)
+    if not snapshot.exists:
+        print(f"❌ Error: Token does not exist or error checking ownership: {snapshot.error}")
         return
 
-    # Get token metadata
-    try:
-        name = contract.characterName(token_id)
-        description = contract.characterDescription(token_id)
-        print(f"\nToken Info:")
-        print(f"Name: {name}")
-        print(f"Description: {description}")
-    except:
-        pass
+    print(f"\nCurrent owner: {snapshot.owner}")
+    print(f"\nToken Info:")
+    print(f"Name: {snapshot.name}")
+    print(f"Description: {snapshot.description}")
 
     # Get recipient address
     recipient = input("\nEnter recipient address: ")
 
+    # Dry-run the transfer; the contract decides whether it may go through
+    check = session.preflight("transferFrom", sender, recipient, token_id)
+    if not check.ok:
+        print(f"❌ Error: {check.revert_reason}")
+        print(f"Token owner: {snapshot.owner}")
+        print(f"Your address: {sender}")
+        return
+
     # Confirm transfer
     print(f"\n📦 Transfer Details:")
-    print(f"From: {sender.address}")
+    print(f"From: {sender}")
     print(f"To: {recipient}")
     print(f"Token ID: {token_id}")
 
@@ -54,22 +115,31 @@ def main():
         print("Transfer cancelled.")
         return
 
+    # The transfer's events give the new balances from this one read
+    recipient_balance = session.call("balanceOf", recipient)
+
     # Execute transfer
     print("\nTransferring...")
     try:
-        tx = contract.transferFrom(
-            sender.address,
+        txn_hash = session.submit(
+            "transferFrom",
+            sender,
             recipient,
             token_id,
-            sender=sender
         )
+        confirmation, = wait_confirmed(session, txn_hash)
+        if confirmation.failed:
+            print(f"❌ Transfer reverted: {confirmation.txn_hash}")
+            return
         print(f"✅ Transfer successful!")
-        print(f"Transaction: {tx.txn_hash}")
+        print(f"Transaction: {confirmation.txn_hash}")
 
         # Display updated balances
+        changes = state_changes(confirmation.events)
         print(f"\n📊 Updated Balances:")
-        print(f"Sender balance: {contract.balanceOf(sender.address)}")
-        print(f"Recipient balance: {contract.balanceOf(recipient)}")
-        print(f"New owner: {contract.ownerOf(token_id)}")
+        print(f"Sender balance: {snapshot.owner_balance + changes.balance_delta(sender)}")
+        print(f"Recipient balance: {recipient_balance + changes.balance_delta(recipient)}")
+        print(f"New owner: {changes.owners.get(token_id, snapshot.owner)}")
+        print(format_metrics(session.fee_metrics()))
     except Exception as e:
         print(f"❌ Transfer failed: {e}")
@@ -0,0 +1,100 @@
+"""
+Sign lazy-mint vouchers in bulk and redeem them on-chain
+"""
+import time
+
+import click
+from ape import accounts, chain, project
+from ape.cli import ConnectedProviderCommand
+from eth_account import Account as EthAccount
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+
+from scripts._permit import deadline_in
+from scripts._preflight import PreflightError, send_checked
+from scripts._vouchers import (
+    domain_separator,
+    find_voucher,
+    read_voucher_manifest,
+    sign_vouchers,
+    write_vouchers,
+)
+
+
+def signing_key(account):
+    """Private key of a test account, or of a keyfile account after its passphrase"""
+    if hasattr(account, "private_key"):
+        return bytes(HexBytes(account.private_key))
+    passphrase = click.prompt(f"Passphrase for '{account.alias}'", hide_input=True)
+    try:
+        return bytes(EthAccount.decrypt(account.keyfile, passphrase))
+    except ValueError:
+        raise click.ClickException("Wrong passphrase")
+
+
+@click.group()
+def cli():
+    """Lazy minting for MyCollectibleNFT: the minter signs, holders redeem"""
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option("--contract", "contract_address", required=True, help="MyCollectibleNFT address")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Minter account alias that signs")
+@click.option("--expires", default=30 * 24 * 3600, show_default=True,
+              help="Seconds until the vouchers expire")
+@click.option("--output", default="vouchers.jsonl", show_default=True, help="File to write the vouchers to")
+@click.option("--processes", type=int, default=None, help="Signing processes (default: one per CPU)")
+def sign(manifest, contract_address, account_alias, expires, output, processes):
+    """Sign a voucher for every row of MANIFEST (JSONL or CSV); no transaction is sent"""
+    contract = project.MyCollectibleNFT.at(contract_address)
+    signer = accounts.load(account_alias)
+    if signer.address != contract.minter():
+        raise click.ClickException(f"{signer.address} is not the minter; redeem would reject its vouchers")
+
+    key = signing_key(signer)
+    chain_id = chain.chain_id
+    separator = domain_separator(contract.name(), chain_id, contract.address)
+    if separator != bytes(contract.DOMAIN_SEPARATOR()):
+        raise click.ClickException("The contract's DOMAIN_SEPARATOR does not match; is it a MyCollectibleNFT?")
+
+    if EthAccount.from_key(key).address != signer.address:
+        raise click.ClickException("The key does not belong to the minter")
+
+    expiry = deadline_in(expires)
+    started = time.perf_counter()
+    try:
+        vouchers = sign_vouchers(key, separator, read_voucher_manifest(manifest, expiry), processes)
+        count = write_vouchers(output, vouchers, contract.address, chain_id)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ {count:,} vouchers written to {output} in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f}/s)")
+    print(f"Expiry: {expiry}")
+
+
+@cli.command(cls=ConnectedProviderCommand)
+@click.argument("vouchers", type=click.Path(exists=True, dir_okay=False))
+@click.option("--token-id", type=int, required=True, help="Token whose voucher is redeemed")
+@click.option("--account", "account_alias", default="dev", show_default=True,
+              help="Account alias that sends (and pays for) the redemption")
+def redeem(vouchers, token_id, account_alias):
+    """Mint a token from its voucher in VOUCHERS; anyone can send it"""
+    found = find_voucher(vouchers, token_id)
+    if found is None:
+        raise click.ClickException(f"No voucher for token #{token_id} in {vouchers}")
+    voucher, record = found
+    if record["chainId"] != chain.chain_id:
+        raise click.ClickException(f"The voucher is for chain {record['chainId']}, not {chain.chain_id}")
+
+    contract = project.MyCollectibleNFT.at(to_checksum_address(record["contract"]))
+    sender = accounts.load(account_alias)
+    try:
+        receipt = send_checked(contract.redeem, *voucher.redeem_args(), sender=sender)
+    except PreflightError as err:
+        raise click.ClickException(f"redeem would revert: {err.reason}")
+
+    print(f"✅ Token #{token_id} minted to {voucher.recipient}")
+    print(f"Transaction: {receipt.txn_hash}")
@@ -0,0 +1,170 @@
+"""
+Shared fixtures for the MyCollectibleNFT test suites
+
+Deployment and pre-minted state are session-scoped. Ape snapshots the chain
+after session fixtures are set up and reverts to that snapshot after every
+test, so tests stay isolated without redeploying the contract each time.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+
+# The tests of the scripts' helpers import them as ``scripts._<name>``, like ``ape run`` does;
+# helpers shared with lab4's suite live in testkit/ at the repository root
+sys.path.insert(0, str(Path(__file__).parents[1]))
+sys.path.insert(0, str(Path(__file__).parents[2]))
+from testkit.eip712 import sign_typed_data  # noqa: E402
+from testkit.gas_baseline import GasBaseline  # noqa: E402
+from testkit.merkle import allowlist  # noqa: E402
+
+# Gas regression baseline (see test_gas.py and testkit/gas_baseline.py)
+GAS_BASELINE_FILE = Path(__file__).parent / "gas_baseline.json"
+
+
+@pytest.fixture(scope="session")
+def deployer(accounts):
+    """Deployer account (minter)"""
+    return accounts[0]
+
+
+@pytest.fixture(scope="session")
+def user1(accounts):
+    """First user account"""
+    return accounts[1]
+
+
+@pytest.fixture(scope="session")
+def user2(accounts):
+    """Second user account"""
+    return accounts[2]
+
+
+@pytest.fixture(scope="session")
+def contract(deployer, project):
+    """Deploy the MyCollectibleNFT contract"""
+    return deployer.deploy(
+        project.MyCollectibleNFT,
+        "Digital Character Collection",
+        "DCC",
+        "https://school.edu.vn/nft-assets/"
+    )
+
+
+@pytest.fixture(scope="session")
+def sample_characters():
+    """Sample character data for testing"""
+    return [
+        {
+            "tokenId": 1,
+            "name": "Cyber Warrior",
+            "description": "Một chiến binh số có khả năng phá mã CRY128",
+            "imageURI": "https://school.edu.vn/nft-assets/1.png"
+        },
+        {
+            "tokenId": 2,
+            "name": "Data Wizard",
+            "description": "Pháp sư dữ liệu với khả năng phân tích siêu việt",
+            "imageURI": "https://school.edu.vn/nft-assets/2.png"
+        },
+        {
+            "tokenId": 3,
+            "name": "AI Explorer",
+            "description": "Nhà thám hiểm AI khám phá thế giới trí tuệ nhân tạo",
+            "imageURI": "https://school.edu.vn/nft-assets/3.png"
+        },
+        {
+            "tokenId": 4,
+            "name": "Blockchain Guardian",
+            "description": "Người bảo vệ blockchain với sức mạnh mã hóa",
+            "imageURI": "https://school.edu.vn/nft-assets/4.png"
+        }
+    ]
+
+
+@pytest.fixture(scope="session")
+def minted_contract(deployer, user1, project, sample_characters):
+    """A second deployment with every sample character minted to user1"""
+    contract = deployer.deploy(
+        project.MyCollectibleNFT,
+        "Digital Character Collection",
+        "DCC",
+        "https://school.edu.vn/nft-assets/"
+    )
+    for char in sample_characters:
+        contract.mint(
+            user1,
+            char["tokenId"],
+            char["name"],
+            char["description"],
+            char["imageURI"],
+            sender=deployer
+        )
+
+    return contract
+
+
+
+@pytest.fixture(scope="session")
+def gas_baseline():
+    """Session-wide gas recorder; set GAS_BASELINE_UPDATE=1 to rewrite the baseline"""
+    baseline = GasBaseline(GAS_BASELINE_FILE)
+    yield baseline
+    baseline.save()
+
+
+# EIP-712 types of MyCollectibleNFT's permit, permitForAll and redeem
+PERMIT_TYPES = {
+    "Permit": [
+        {"name": "spender", "type": "address"},
+        {"name": "tokenId", "type": "uint256"},
+        {"name": "nonce", "type": "uint256"},
+        {"name": "deadline", "type": "uint256"},
+    ],
+    "PermitForAll": [
+        {"name": "owner", "type": "address"},
+        {"name": "operator", "type": "address"},
+        {"name": "approved", "type": "bool"},
+        {"name": "nonce", "type": "uint256"},
+        {"name": "deadline", "type": "uint256"},
+    ],
+    "MintVoucher": [
+        {"name": "recipient", "type": "address"},
+        {"name": "tokenId", "type": "uint256"},
+        {"name": "contentHash", "type": "bytes32"},
+        {"name": "expiry", "type": "uint256"},
+    ],
+}
+
+
+@pytest.fixture(scope="session")
+def sign_permit():
+    """sign(contract, signer, primary_type, **message) -> r || s || v signature"""
+
+    def sign(contract, signer, primary_type, **message):
+        return sign_typed_data(contract, signer, primary_type, PERMIT_TYPES[primary_type], message).encode_rsv()
+
+    return sign
+
+
+@pytest.fixture(scope="session")
+def merkle_allowlist():
+    """allowlist([(address, cap), ...]) -> (root, {address: proof}), built the way claim verifies it"""
+    return allowlist
+
+
+@pytest.fixture
+def reorg_snapshot(chain):
+    """
+    reorg_snapshot() -> ID of a snapshot to reorganize the chain from with ``chain.restore``
+
+    Snapshot IDs on the test node are block hashes, so one taken in the block
+    of the per-test snapshot would discard that one when restored.
+    """
+
+    def take():
+        chain.mine(1)
+        return chain.snapshot()
+
+    return take
@@ -0,0 +1,252 @@
+"""
+Pure-Python reference model of MyCollectibleNFT
+
+Mirrors the contract's state machine (ownership, balances, approvals,
+operators, metadata and the enumeration lists with their swap-and-pop order)
+and raises ``ModelRevert`` with the contract's reason string wherever the
+contract would revert. Addresses are small ints with ``ZERO`` standing in for
+the zero address, which keeps a step to a few dict operations so random
+sequences can be run in bulk before a sample is replayed on the real contract.
+"""
+import random
+
+
+ZERO = 0
+ZERO_HASH = b"\x00" * 32
+
+
+class ModelRevert(Exception):
+    """The contract would revert with this reason"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def require(condition, reason):
+    if not condition:
+        raise ModelRevert(reason)
+
+
+class NFTModel:
+    """In-memory MyCollectibleNFT"""
+
+    __slots__ = (
+        "minter", "total_supply", "owner_of", "balance_of", "approved", "operators",
+        "names", "descriptions", "images", "content_hash",
+        "owned_tokens", "owned_index", "all_tokens", "all_index",
+    )
+
+    def __init__(self, minter):
+        self.minter = minter
+        self.total_supply = 0
+        self.owner_of = {}       # token -> owner
+        self.balance_of = {}     # owner -> count
+        self.approved = {}       # token -> approved address
+        self.operators = set()   # (owner, operator)
+        self.names = {}
+        self.descriptions = {}
+        self.images = {}
+        self.content_hash = {}
+        self.owned_tokens = {}   # owner -> [token, ...]
+        self.owned_index = {}    # token -> position in its owner's list
+        self.all_tokens = []
+        self.all_index = {}      # token -> position in all_tokens
+
+    # ========== Enumeration ==========
+
+    def _add_to_owner(self, owner, token_id):
+        tokens = self.owned_tokens.setdefault(owner, [])
+        self.owned_index[token_id] = len(tokens)
+        tokens.append(token_id)
+
+    def _remove_from_owner(self, owner, token_id):
+        tokens = self.owned_tokens[owner]
+        index = self.owned_index.pop(token_id)
+        last = tokens.pop()
+        if last != token_id:
+            tokens[index] = last
+            self.owned_index[last] = index
+
+    def _add_to_all(self, token_id):
+        self.all_index[token_id] = len(self.all_tokens)
+        self.all_tokens.append(token_id)
+
+    def _remove_from_all(self, token_id):
+        index = self.all_index.pop(token_id)
+        last = self.all_tokens.pop()
+        if last != token_id:
+            self.all_tokens[index] = last
+            self.all_index[last] = index
+
+    # ========== Views ==========
+
+    def is_authorized(self, owner, token_id, sender):
+        return (
+            sender == owner
+            or self.approved.get(token_id, ZERO) == sender
+            or (owner, sender) in self.operators
+        )
+
+    def token_uri(self, token_id):
+        require(token_id in self.owner_of, "Token does not exist")
+        return (
+            '{"name":"' + self.names.get(token_id, "")
+            + '","description":"' + self.descriptions.get(token_id, "")
+            + '","image":"' + self.images.get(token_id, "") + '"}'
+        )
+
+    # ========== Mutations ==========
+
+    def _mint(self, sender, to, token_id):
+        require(sender == self.minter, "Only minter can mint")
+        require(token_id not in self.owner_of, "Token already exists")
+        require(to != ZERO, "Cannot mint to zero address")
+
+    def _take(self, to, token_id):
+        self._add_to_owner(to, token_id)
+        self._add_to_all(token_id)
+        self.owner_of[token_id] = to
+        self.balance_of[to] = self.balance_of.get(to, 0) + 1
+        self.total_supply += 1
+
+    def mint(self, sender, to, token_id, name, description, image_uri):
+        self._mint(sender, to, token_id)
+        self._take(to, token_id)
+        self.names[token_id] = name
+        self.descriptions[token_id] = description
+        self.images[token_id] = image_uri
+
+    def mintWithContentHash(self, sender, to, token_id, content_hash):
+        self._mint(sender, to, token_id)
+        require(content_hash != ZERO_HASH, "Content hash required")
+        self._take(to, token_id)
+        self.content_hash[token_id] = content_hash
+
+    def burn(self, sender, token_id):
+        owner = self.owner_of.get(token_id, ZERO)
+        require(owner != ZERO, "Token does not exist")
+        require(self.is_authorized(owner, token_id, sender), "Not authorized")
+
+        self.approved.pop(token_id, None)
+        self._remove_from_owner(owner, token_id)
+        self._remove_from_all(token_id)
+        self.balance_of[owner] -= 1
+        del self.owner_of[token_id]
+        self.total_supply -= 1
+
+        if self.content_hash.pop(token_id, None) is None:
+            self.names.pop(token_id, None)
+            self.descriptions.pop(token_id, None)
+            self.images.pop(token_id, None)
+
+    def approve(self, sender, approved, token_id):
+        owner = self.owner_of.get(token_id, ZERO)
+        require(owner != ZERO, "Token does not exist")
+        require(sender == owner or (owner, sender) in self.operators, "Not authorized")
+
+        if approved == ZERO:
+            self.approved.pop(token_id, None)
+        else:
+            self.approved[token_id] = approved
+
+    def setApprovalForAll(self, sender, operator, approved):
+        if approved:
+            self.operators.add((sender, operator))
+        else:
+            self.operators.discard((sender, operator))
+
+    def transferFrom(self, sender, from_, to, token_id):
+        require(self.owner_of.get(token_id, ZERO) == from_, "Token not owned by from address")
+        require(to != ZERO, "Cannot transfer to zero address")
+        require(self.is_authorized(from_, token_id, sender), "Not authorized")
+
+        self.approved.pop(token_id, None)
+        self.owner_of[token_id] = to
+        self._remove_from_owner(from_, token_id)
+        self.balance_of[from_] -= 1
+        self._add_to_owner(to, token_id)
+        self.balance_of[to] = self.balance_of.get(to, 0) + 1
+
+    def safeTransferFrom(self, sender, from_, to, token_id, data=b""):
+        self.transferFrom(sender, from_, to, token_id)
+
+    def batchTransferFrom(self, sender, from_, to, token_ids):
+        require(to != ZERO, "Cannot transfer to zero address")
+
+        # The contract reverts the whole batch, so check every step before changing anything
+        owners, cleared = {}, set()
+        for token_id in token_ids:
+            owner = owners.get(token_id, self.owner_of.get(token_id, ZERO))
+            require(owner == from_, "Token not owned by from address")
+            approved = ZERO if token_id in cleared else self.approved.get(token_id, ZERO)
+            require(sender == from_ or approved == sender or (from_, sender) in self.operators,
+                    "Not authorized")
+            owners[token_id] = to
+            cleared.add(token_id)
+
+        for token_id in token_ids:
+            self.transferFrom(from_, from_, to, token_id)
+
+    def apply(self, op):
+        """
+        Run one ``(name, sender, *args)`` operation
+
+        @return ``None`` on success, otherwise the revert reason
+        """
+        name, sender, *args = op
+        try:
+            getattr(self, name)(sender, *args)
+        except ModelRevert as revert:
+            return revert.reason
+
+        return None
+
+
+# ========== Random sequences ==========
+
+NAMES = ("", "Cyber Warrior", "Data Wizard")
+CONTENT_HASHES = (ZERO_HASH, b"\x01" * 32, b"\xab" * 32)
+
+
+def random_op(rng, actors, token_ids, minter):
+    """
+    One random operation; ``actors`` are the possible senders
+
+    The minter sends most mints and ``ZERO`` shows up as a target often enough
+    to exercise every revert path.
+    """
+    targets = (ZERO, *actors)
+    token_id = rng.choice(token_ids)
+    kind = rng.random()
+
+    if kind < 0.25:
+        sender = minter if rng.random() < 0.9 else rng.choice(actors)
+        if rng.random() < 0.5:
+            return ("mint", sender, rng.choice(targets), token_id,
+                    rng.choice(NAMES), rng.choice(NAMES), rng.choice(NAMES))
+        return ("mintWithContentHash", sender, rng.choice(targets), token_id,
+                rng.choice(CONTENT_HASHES))
+    if kind < 0.55:
+        name = "transferFrom" if rng.random() < 0.7 else "safeTransferFrom"
+        return (name, rng.choice(actors), rng.choice(targets), rng.choice(targets), token_id)
+    if kind < 0.62:
+        batch = [rng.choice(token_ids) for _ in range(rng.randint(0, 3))]
+        return ("batchTransferFrom", rng.choice(actors), rng.choice(targets), rng.choice(targets), batch)
+    if kind < 0.75:
+        return ("approve", rng.choice(actors), rng.choice(targets), token_id)
+    if kind < 0.85:
+        return ("setApprovalForAll", rng.choice(actors), rng.choice(targets), rng.random() < 0.7)
+
+    return ("burn", rng.choice(actors), token_id)
+
+
+def random_sequence(seed, steps, actors=(1, 2, 3, 4), token_ids=tuple(range(1, 9)), minter=1):
+    rng = random.Random(seed)
+    return [random_op(rng, actors, token_ids, minter) for _ in range(steps)]
+
+
+def run_sequence(ops, minter=1):
+    """Run ``ops`` on a fresh model; return it and the revert reason of every step"""
+    model = NFTModel(minter)
+    return model, [model.apply(op) for op in ops]
@@ -3,68 +3,11 @@ Comprehensive test suite for MyCollectibleNFT contract
 Tests all functionality including mint, burn, transfer, approve, and metadata
 """
 
-import pytest
-from ape import accounts, project
-
-
-@pytest.fixture
-def deployer(accounts):
-    """Deployer account (minter)"""
-    return accounts[0]
-
-
-@pytest.fixture
-def user1(accounts):
-    """First user account"""
-    return accounts[1]
-
-
-@pytest.fixture
-def user2(accounts):
-    """Second user account"""
-    return accounts[2]
-
-
-@pytest.fixture
-def contract(deployer, project):
-    """Deploy the MyCollectibleNFT contract"""
-    return deployer.deploy(
-        project.MyCollectibleNFT,
-        "Digital Character Collection",
-        "DCC",
-        "https://school.edu.vn/nft-assets/"
-    )
+import json
 
-
-@pytest.fixture
-def sample_characters():
-    """Sample character data for testing"""
-    return [
-        {
-            "tokenId": 1,
-            "name": "Cyber Warrior",
-            "description": "Một chiến binh số có khả năng phá mã CRY128",
-            "imageURI": "https://school.edu.vn/nft-assets/1.png"
-        },
-        {
-            "tokenId": 2,
-            "name": "Data Wizard",
-            "description": "Pháp sư dữ liệu với khả năng phân tích siêu việt",
-            "imageURI": "https://school.edu.vn/nft-assets/2.png"
-        },
-        {
-            "tokenId": 3,
-            "name": "AI Explorer",
-            "description": "Nhà thám hiểm AI khám phá thế giới trí tuệ nhân tạo",
-            "imageURI": "https://school.edu.vn/nft-assets/3.png"
-        },
-        {
-            "tokenId": 4,
-            "name": "Blockchain Guardian",
-            "description": "Người bảo vệ blockchain với sức mạnh mã hóa",
-            "imageURI": "https://school.edu.vn/nft-assets/4.png"
-        }
-    ]
+import pytest
+from ape import accounts, chain, project
+from eth_utils import keccak
 
 
 # ========== Initialization Tests ==========
@@ -184,20 +127,11 @@ def test_mint_to_zero_address(contract, deployer, sample_characters):
 
 # ========== Metadata Tests ==========
 
-def test_tokenURI(contract, deployer, user1, sample_characters):
+def test_tokenURI(minted_contract, sample_characters):
     """Test tokenURI returns correct JSON metadata"""
     char = sample_characters[0]
 
-    contract.mint(
-        user1,
-        char["tokenId"],
-        char["name"],
-        char["description"],
-        char["imageURI"],
-        sender=deployer
-    )
-
-    metadata = contract.tokenURI(char["tokenId"])
+    metadata = minted_contract.tokenURI(char["tokenId"])
 
     # Verify JSON structure contains the character data
     assert char["name"] in metadata
@@ -232,219 +166,205 @@ def test_tokenURI_nonexistent_token(contract):
 
 
 # ========== Transfer Tests ==========
+# These start from minted_contract: every sample character is owned by user1
 
-def test_transferFrom(contract, deployer, user1, user2, sample_characters):
+def test_transferFrom(minted_contract, user1, user2, sample_characters):
     """Test transferring NFT from one user to another"""
     char = sample_characters[0]
 
-    # Mint to user1
-    contract.mint(
-        user1,
-        char["tokenId"],
-        char["name"],
-        char["description"],
-        char["imageURI"],
-        sender=deployer
-    )
-
     # Transfer from user1 to user2
-    contract.transferFrom(user1, user2, char["tokenId"], sender=user1)
+    minted_contract.transferFrom(user1, user2, char["tokenId"], sender=user1)
 
     # Verify ownership changed
-    assert contract.ownerOf(char["tokenId"]) == user2
-    assert contract.balanceOf(user1) == 0
-    assert contract.balanceOf(user2) == 1
+    assert minted_contract.ownerOf(char["tokenId"]) == user2
+    assert minted_contract.balanceOf(user1) == len(sample_characters) - 1
+    assert minted_contract.balanceOf(user2) == 1
 
 
-def test_transferFrom_unauthorized(contract, deployer, user1, user2, sample_characters):
+def test_transferFrom_unauthorized(minted_contract, user1, user2, sample_characters):
     """Test that unauthorized transfer fails"""
     char = sample_characters[0]
 
-    # Mint to user1
-    contract.mint(
-        user1,
-        char["tokenId"],
-        char["name"],
-        char["description"],
-        char["imageURI"],
-        sender=deployer
-    )
-
     # Try to transfer without authorization
     with pytest.raises(Exception):
-        contract.transferFrom(user1, user2, char["tokenId"], sender=user2)
+        minted_contract.transferFrom(user1, user2, char["tokenId"], sender=user2)
 
 
-def test_transferFrom_to_zero_address(contract, deployer, user1, sample_characters):
+def test_transferFrom_to_zero_address(minted_contract, user1, sample_characters):
     """Test that transferring to zero address fails"""
     char = sample_characters[0]
     zero_address = "0x0000000000000000000000000000000000000000"
 
-    contract.mint(
-        user1,
-        char["tokenId"],
-        char["name"],
-        char["description"],
-        char["imageURI"],
-        sender=deployer
-    )
-
     with pytest.raises(Exception):
-        contract.transferFrom(user1, zero_address, char["tokenId"], sender=user1)
+        minted_contract.transferFrom(user1, zero_address, char["tokenId"], sender=user1)
 
 
-def test_safeTransferFrom(contract, deployer, user1, user2, sample_characters):
+def test_safeTransferFrom(minted_contract, user1, user2, sample_characters):
     """Test safeTransferFrom function"""
     char = sample_characters[0]
 
-    contract.mint(
-        user1,
-        char["tokenId"],
-        char["name"],
-        char["description"],
-        char["imageURI"],
-        sender=deployer
-    )
+    minted_contract.safeTransferFrom(user1, user2, char["tokenId"], b"", sender=user1)
 
-    contract.safeTransferFrom(user1, user2, char["tokenId"], b"", sender=user1)
-
-    assert contract.ownerOf(char["tokenId"]) == user2
-    assert contract.balanceOf(user2) == 1
+    assert minted_contract.ownerOf(char["tokenId"]) == user2
+    assert minted_contract.balanceOf(user2) == 1
 
 
 # ========== Approval Tests ==========
 
-def test_approve(contract, deployer, user1, user2, sample_characters):
+def test_approve(minted_contract, user1, user2, sample_characters):
     """Test approving an address to transfer a token"""
     char = sample_characters[0]
 
-    contract.mint(
-        user1,
-        char["tokenId"],
-        char["name"],
-        char["description"],
-        char["imageURI"],
-        sender=deployer
-    )
-
     # User1 approves user2
-    contract.approve(user2, char["tokenId"], sender=user1)
+    minted_contract.approve(user2, char["tokenId"], sender=user1)
 
-    assert contract.getApproved(char["tokenId"]) == user2
+    assert minted_contract.getApproved(char["tokenId"]) == user2
 
     # User2 can now transfer
-    contract.transferFrom(user1, user2, char["tokenId"], sender=user2)
-    assert contract.ownerOf(char["tokenId"]) == user2
+    minted_contract.transferFrom(user1, user2, char["tokenId"], sender=user2)
+    assert minted_contract.ownerOf(char["tokenId"]) == user2
 
 
-def test_approve_unauthorized(contract, deployer, user1, user2, sample_characters):
+def test_approve_unauthorized(minted_contract, user2, sample_characters):
     """Test that non-owner cannot approve"""
     char = sample_characters[0]
 
-    contract.mint(
-        user1,
-        char["tokenId"],
-        char["name"],
-        char["description"],
-        char["imageURI"],
-        sender=deployer
-    )
-
     # User2 tries to approve themselves (should fail)
     with pytest.raises(Exception):
-        contract.approve(user2, char["tokenId"], sender=user2)
+        minted_contract.approve(user2, char["tokenId"], sender=user2)
 
 
-def test_setApprovalForAll(contract, deployer, user1, user2, sample_characters):
+def test_setApprovalForAll(minted_contract, user1, user2, sample_characters):
     """Test setting approval for all tokens"""
-    # Mint multiple tokens to user1
-    for char in sample_characters[:2]:
-        contract.mint(
-            user1,
-            char["tokenId"],
-            char["name"],
-            char["description"],
-            char["imageURI"],
-            sender=deployer
-        )
-
     # User1 approves user2 for all tokens
-    contract.setApprovalForAll(user2, True, sender=user1)
-    assert contract.isApprovedForAll(user1, user2) == True
+    minted_contract.setApprovalForAll(user2, True, sender=user1)
+    assert minted_contract.isApprovedForAll(user1, user2) == True
 
     # User2 can transfer both tokens
-    contract.transferFrom(user1, user2, sample_characters[0]["tokenId"], sender=user2)
-    contract.transferFrom(user1, user2, sample_characters[1]["tokenId"], sender=user2)
+    minted_contract.transferFrom(user1, user2, sample_characters[0]["tokenId"], sender=user2)
+    minted_contract.transferFrom(user1, user2, sample_characters[1]["tokenId"], sender=user2)
 
-    assert contract.ownerOf(sample_characters[0]["tokenId"]) == user2
-    assert contract.ownerOf(sample_characters[1]["tokenId"]) == user2
+    assert minted_contract.ownerOf(sample_characters[0]["tokenId"]) == user2
+    assert minted_contract.ownerOf(sample_characters[1]["tokenId"]) == user2
 
 
-def test_revoke_approvalForAll(contract, deployer, user1, user2, sample_characters):
+def test_revoke_approvalForAll(minted_contract, user1, user2, sample_characters):
     """Test revoking approval for all tokens"""
     char = sample_characters[0]
 
-    contract.mint(
-        user1,
-        char["tokenId"],
-        char["name"],
-        char["description"],
-        char["imageURI"],
-        sender=deployer
-    )
-
     # Approve
-    contract.setApprovalForAll(user2, True, sender=user1)
-    assert contract.isApprovedForAll(user1, user2) == True
+    minted_contract.setApprovalForAll(user2, True, sender=user1)
+    assert minted_contract.isApprovedForAll(user1, user2) == True
 
     # Revoke
-    contract.setApprovalForAll(user2, False, sender=user1)
-    assert contract.isApprovedForAll(user1, user2) == False
+    minted_contract.setApprovalForAll(user2, False, sender=user1)
+    assert minted_contract.isApprovedForAll(user1, user2) == False
 
     # Now user2 cannot transfer
     with pytest.raises(Exception):
-        contract.transferFrom(user1, user2, char["tokenId"], sender=user2)
+        minted_contract.transferFrom(user1, user2, char["tokenId"], sender=user2)
 
 
 # ========== Burn Tests ==========
 
-def test_burn(contract, deployer, user1, sample_characters):
+def test_burn(minted_contract, user1, sample_characters):
     """Test burning an NFT"""
     char = sample_characters[0]
 
-    contract.mint(
-        user1,
-        char["tokenId"],
-        char["name"],
-        char["description"],
-        char["imageURI"],
-        sender=deployer
-    )
-
-    initial_balance = contract.balanceOf(user1)
-    initial_supply = contract.totalSupply()
+    initial_balance = minted_contract.balanceOf(user1)
+    initial_supply = minted_contract.totalSupply()
 
     # Burn the token
-    contract.burn(char["tokenId"], sender=user1)
+    minted_contract.burn(char["tokenId"], sender=user1)
 
     # Verify token is burned
-    assert contract.balanceOf(user1) == initial_balance - 1
-    assert contract.totalSupply() == initial_supply - 1
+    assert minted_contract.balanceOf(user1) == initial_balance - 1
+    assert minted_contract.totalSupply() == initial_supply - 1
 
     # Verify metadata is cleared
-    assert contract.characterName(char["tokenId"]) == ""
-    assert contract.characterDescription(char["tokenId"]) == ""
-    assert contract.characterImageURI(char["tokenId"]) == ""
+    assert minted_contract.characterName(char["tokenId"]) == ""
+    assert minted_contract.characterDescription(char["tokenId"]) == ""
+    assert minted_contract.characterImageURI(char["tokenId"]) == ""
 
     # Verify token no longer exists
     with pytest.raises(Exception):
-        contract.ownerOf(char["tokenId"])
+        minted_contract.ownerOf(char["tokenId"])
 
 
-def test_burn_unauthorized(contract, deployer, user1, user2, sample_characters):
+def test_burn_unauthorized(minted_contract, user2, sample_characters):
     """Test that non-owner cannot burn"""
     char = sample_characters[0]
 
+    # User2 tries to burn user1's token
+    with pytest.raises(Exception):
+        minted_contract.burn(char["tokenId"], sender=user2)
+
+
+def test_burn_with_approval(minted_contract, user1, user2, sample_characters):
+    """Test that approved address can burn"""
+    char = sample_characters[0]
+
+    # User1 approves user2
+    minted_contract.approve(user2, char["tokenId"], sender=user1)
+
+    # User2 can burn
+    minted_contract.burn(char["tokenId"], sender=user2)
+
+    # Verify token is burned
+    with pytest.raises(Exception):
+        minted_contract.ownerOf(char["tokenId"])
+
+
+def test_burn_nonexistent_token(contract, user1):
+    """Test burning non-existent token fails"""
+    with pytest.raises(Exception):
+        contract.burn(999, sender=user1)
+
+
+# ========== Content-Addressed Metadata Tests ==========
+
+def content_hash_of(char):
+    """keccak256 of a character's metadata, as the mint script computes it"""
+    metadata = {"name": char["name"], "description": char["description"], "image": char["imageURI"]}
+    return keccak(text=json.dumps(metadata, separators=(",", ":"), ensure_ascii=False))
+
+
+def test_mintWithContentHash(contract, deployer, user1, sample_characters):
+    """Test minting a character whose metadata is stored off-chain"""
+    char = sample_characters[0]
+    digest = content_hash_of(char)
+
+    contract.mintWithContentHash(user1, char["tokenId"], digest, sender=deployer)
+
+    assert contract.ownerOf(char["tokenId"]) == user1
+    assert contract.balanceOf(user1) == 1
+    assert contract.totalSupply() == 1
+    assert contract.contentHash(char["tokenId"]) == digest
+
+    # No per-token strings are written
+    assert contract.characterName(char["tokenId"]) == ""
+
+    # tokenURI points at the off-chain metadata
+    assert contract.tokenURI(char["tokenId"]) == f"https://school.edu.vn/nft-assets/{char['tokenId']}"
+
+
+def test_mintWithContentHash_only_by_minter(contract, user1, sample_characters):
+    """Test that only minter can mint by content hash"""
+    char = sample_characters[0]
+
+    with pytest.raises(Exception):
+        contract.mintWithContentHash(user1, char["tokenId"], content_hash_of(char), sender=user1)
+
+
+def test_mintWithContentHash_requires_hash(contract, deployer, user1):
+    """Test that an empty content hash is rejected"""
+    with pytest.raises(Exception):
+        contract.mintWithContentHash(user1, 1, b"\x00" * 32, sender=deployer)
+
+
+def test_mintWithContentHash_duplicate_token_id(contract, deployer, user1, sample_characters):
+    """Test that content-addressed mints cannot reuse a token ID"""
+    char = sample_characters[0]
     contract.mint(
         user1,
         char["tokenId"],
@@ -454,15 +374,21 @@ def test_burn_unauthorized(contract, deployer, user1, user2, sample_characters):
         sender=deployer
     )
 
-    # User2 tries to burn user1's token
     with pytest.raises(Exception):
-        contract.burn(char["tokenId"], sender=user2)
+        contract.mintWithContentHash(user1, char["tokenId"], content_hash_of(char), sender=deployer)
 
 
-def test_burn_with_approval(contract, deployer, user1, user2, sample_characters):
-    """Test that approved address can burn"""
+def test_burn_content_addressed(contract, deployer, user1, sample_characters):
+    """Test that burning clears the content hash"""
     char = sample_characters[0]
+    contract.mintWithContentHash(user1, char["tokenId"], content_hash_of(char), sender=deployer)
 
+    contract.burn(char["tokenId"], sender=user1)
+
+    assert contract.contentHash(char["tokenId"]) == b"\x00" * 32
+    assert contract.totalSupply() == 0
+
+    # The token ID can be minted again with on-chain metadata
     contract.mint(
         user1,
         char["tokenId"],
@@ -471,22 +397,432 @@ def test_burn_with_approval(contract, deployer, user1, user2, sample_characters)
         char["imageURI"],
         sender=deployer
     )
+    assert char["name"] in contract.tokenURI(char["tokenId"])
 
-    # User1 approves user2
-    contract.approve(user2, char["tokenId"], sender=user1)
 
-    # User2 can burn
-    contract.burn(char["tokenId"], sender=user2)
+# ========== Enumeration Tests ==========
+
+def mint_ids(contract, deployer, owner, token_ids):
+    for token_id in token_ids:
+        contract.mint(owner, token_id, f"Character {token_id}", "", "", sender=deployer)
+
+
+def owner_tokens(contract, owner):
+    """Read an owner's list through tokenOfOwnerByIndex"""
+    return [contract.tokenOfOwnerByIndex(owner, i) for i in range(contract.balanceOf(owner))]
+
+
+def all_tokens(contract):
+    """Read the global list through tokenByIndex"""
+    return [contract.tokenByIndex(i) for i in range(contract.totalSupply())]
+
+
+def test_supports_enumerable_interface(contract):
+    """Test ERC-165 reports the ERC-721 Enumerable interface"""
+    assert contract.supportsInterface(bytes.fromhex("780e9d63"))
+
+
+def test_enumeration_after_mint(contract, deployer, user1, user2):
+    """Test minted tokens are appended to the owner and global lists"""
+    mint_ids(contract, deployer, user1, [10, 20, 30])
+    contract.mintWithContentHash(user2, 40, b"\x01" * 32, sender=deployer)
+
+    assert owner_tokens(contract, user1) == [10, 20, 30]
+    assert owner_tokens(contract, user2) == [40]
+    assert all_tokens(contract) == [10, 20, 30, 40]
+
+
+def test_enumeration_after_transfer(contract, deployer, user1, user2):
+    """Test transferring moves the sender's last token into the gap"""
+    mint_ids(contract, deployer, user1, [1, 2, 3])
+    mint_ids(contract, deployer, user2, [4])
+
+    contract.transferFrom(user1, user2, 1, sender=user1)
+
+    assert owner_tokens(contract, user1) == [3, 2]
+    assert owner_tokens(contract, user2) == [4, 1]
+    assert all_tokens(contract) == [1, 2, 3, 4]
+
+    contract.safeTransferFrom(user2, user1, 4, b"", sender=user2)
+
+    assert owner_tokens(contract, user1) == [3, 2, 4]
+    assert owner_tokens(contract, user2) == [1]
+
+
+def test_enumeration_self_transfer(contract, deployer, user1):
+    """Test transferring a token to its owner keeps the list intact"""
+    mint_ids(contract, deployer, user1, [1, 2, 3])
+
+    contract.transferFrom(user1, user1, 1, sender=user1)
+
+    assert sorted(owner_tokens(contract, user1)) == [1, 2, 3]
+    assert contract.balanceOf(user1) == 3
+
+
+def test_enumeration_after_burn(contract, deployer, user1, user2):
+    """Test burning removes the token from both lists"""
+    mint_ids(contract, deployer, user1, [1, 2, 3])
+    mint_ids(contract, deployer, user2, [4])
+
+    contract.burn(2, sender=user1)
+
+    assert owner_tokens(contract, user1) == [1, 3]
+    assert all_tokens(contract) == [1, 4, 3]
+
+    contract.burn(4, sender=user2)
+
+    assert owner_tokens(contract, user2) == []
+    assert all_tokens(contract) == [1, 3]
+
+
+def test_enumeration_out_of_bounds(contract, deployer, user1):
+    """Test indexes past the end of a list revert"""
+    mint_ids(contract, deployer, user1, [1])
 
-    # Verify token is burned
     with pytest.raises(Exception):
-        contract.ownerOf(char["tokenId"])
+        contract.tokenOfOwnerByIndex(user1, 1)
 
+    with pytest.raises(Exception):
+        contract.tokenByIndex(1)
 
-def test_burn_nonexistent_token(contract, user1):
-    """Test burning non-existent token fails"""
+
+def test_tokensOfOwner_pagination(contract, deployer, user1, user2):
+    """Test listing an owner's tokens page by page"""
+    mint_ids(contract, deployer, user1, range(1, 8))
+
+    assert contract.tokensOfOwner(user1, 0, 3) == [1, 2, 3]
+    assert contract.tokensOfOwner(user1, 3, 3) == [4, 5, 6]
+    assert contract.tokensOfOwner(user1, 6, 3) == [7]
+    assert contract.tokensOfOwner(user1, 7, 3) == []
+    assert contract.tokensOfOwner(user1, 0, 100) == list(range(1, 8))
+    assert contract.tokensOfOwner(user2, 0, 10) == []
+
+
+def test_allTokens_pagination(contract, deployer, user1, user2):
+    """Test listing all tokens page by page"""
+    mint_ids(contract, deployer, user1, [1, 2])
+    mint_ids(contract, deployer, user2, [3])
+
+    assert contract.allTokens(0, 2) == [1, 2]
+    assert contract.allTokens(2, 2) == [3]
+    assert contract.allTokens(3, 2) == []
+
+    # Huge offsets and limits must not overflow
+    assert contract.allTokens(2**256 - 1, 2**256 - 1) == []
+    assert contract.allTokens(1, 2**256 - 1) == [2, 3]
+
+
+def test_batchTransferFrom(contract, deployer, user1, user2):
+    """Test a batch leaves the same lists as one transferFrom per token"""
+    mint_ids(contract, deployer, user1, [1, 2, 3, 4, 5])
+    mint_ids(contract, deployer, user2, [6])
+
+    receipt = contract.batchTransferFrom(user1, user2, [2, 5, 1], sender=user1)
+
+    assert [log._tokenId for log in receipt.events] == [2, 5, 1]
+    assert owner_tokens(contract, user1) == [3, 4]
+    assert owner_tokens(contract, user2) == [6, 2, 5, 1]
+    assert contract.balanceOf(user1) == 2
+    assert contract.balanceOf(user2) == 4
+
+
+def test_batchTransferFrom_self(contract, deployer, user1):
+    """Test a batch to the sender moves each token to the end of its list"""
+    mint_ids(contract, deployer, user1, [1, 2, 3])
+
+    contract.batchTransferFrom(user1, user1, [1, 2], sender=user1)
+
+    assert owner_tokens(contract, user1) == [3, 1, 2]
+    assert contract.balanceOf(user1) == 3
+
+
+def test_batchTransferFrom_authorization(contract, deployer, user1, user2, accounts):
+    """Test approved spenders need an approval for every token; operators do not"""
+    mint_ids(contract, deployer, user1, [1, 2, 3])
+    contract.approve(user2, 1, sender=user1)
+
+    # Token 2 is not approved, so the whole batch reverts
     with pytest.raises(Exception):
-        contract.burn(999, sender=user1)
+        contract.batchTransferFrom(user1, user2, [1, 2], sender=user2)
+    assert contract.ownerOf(1) == user1
+
+    contract.batchTransferFrom(user1, user2, [1], sender=user2)
+    assert contract.getApproved(1) == "0x0000000000000000000000000000000000000000"
+
+    contract.setApprovalForAll(accounts[3], True, sender=user1)
+    contract.batchTransferFrom(user1, accounts[3], [3, 2], sender=accounts[3])
+    assert owner_tokens(contract, accounts[3]) == [3, 2]
+
+
+def test_batchTransferFrom_reverts(contract, deployer, user1, user2):
+    """Test zero receivers, foreign tokens and duplicates revert"""
+    mint_ids(contract, deployer, user1, [1, 2])
+    mint_ids(contract, deployer, user2, [3])
+    zero_address = "0x0000000000000000000000000000000000000000"
+
+    with pytest.raises(Exception):
+        contract.batchTransferFrom(user1, zero_address, [1], sender=user1)
+    with pytest.raises(Exception):
+        contract.batchTransferFrom(user1, user2, [1, 3], sender=user1)
+    with pytest.raises(Exception):
+        contract.batchTransferFrom(user1, user2, [1, 1], sender=user1)
+
+    assert contract.balanceOf(user1) == 2
+
+
+# ========== Permit Tests ==========
+
+def token_permit(sign_permit, contract, signer, spender, token_id, deadline=None):
+    deadline = deadline or chain.pending_timestamp + 3600
+    signature = sign_permit(contract, signer, "Permit", spender=spender.address, tokenId=token_id,
+                            nonce=contract.nonces(token_id), deadline=deadline)
+    return spender, token_id, deadline, signature
+
+
+def test_supports_permit_interface(contract):
+    """Test ERC-165 reports the EIP-4494 permit interface"""
+    assert contract.supportsInterface(bytes.fromhex("5604e225"))
+
+
+def test_permit(minted_contract, sign_permit, user1, user2, sample_characters):
+    """Test a spender submits the owner's signed approval, then transfers"""
+    token_id = sample_characters[0]["tokenId"]
+    minted_contract.permit(*token_permit(sign_permit, minted_contract, user1, user2, token_id), sender=user2)
+
+    assert minted_contract.getApproved(token_id) == user2.address
+    assert minted_contract.nonces(token_id) == 1
+
+    minted_contract.transferFrom(user1, user2, token_id, sender=user2)
+    assert minted_contract.ownerOf(token_id) == user2.address
+
+
+def test_permit_replay(minted_contract, sign_permit, user1, user2, sample_characters):
+    """Test a permit can only be used once"""
+    args = token_permit(sign_permit, minted_contract, user1, user2, sample_characters[0]["tokenId"])
+    minted_contract.permit(*args, sender=user2)
+
+    with pytest.raises(Exception, match="Invalid signature"):
+        minted_contract.permit(*args, sender=user2)
+
+
+def test_permit_invalidated_by_transfer(minted_contract, sign_permit, user1, user2, accounts, sample_characters):
+    """Test an unused permit stops working once the token moves, even if it comes back"""
+    token_id = sample_characters[0]["tokenId"]
+    args = token_permit(sign_permit, minted_contract, user1, accounts[3], token_id)
+
+    minted_contract.transferFrom(user1, user2, token_id, sender=user1)
+    minted_contract.transferFrom(user2, user1, token_id, sender=user2)
+    assert minted_contract.ownerOf(token_id) == user1.address
+    assert minted_contract.nonces(token_id) == 2
+
+    with pytest.raises(Exception, match="Invalid signature"):
+        minted_contract.permit(*args, sender=accounts[3])
+
+
+@pytest.mark.parametrize("transfer", ["safeTransferFrom", "batchTransferFrom"])
+def test_permit_invalidated_by_other_transfers(minted_contract, sign_permit, user1, user2, accounts,
+                                               sample_characters, transfer):
+    """Test safe and batch transfers advance the token's nonce too"""
+    token_id = sample_characters[0]["tokenId"]
+    args = token_permit(sign_permit, minted_contract, user1, accounts[3], token_id)
+
+    for sender, receiver in ((user1, user2), (user2, user1)):
+        if transfer == "safeTransferFrom":
+            minted_contract.safeTransferFrom(sender, receiver, token_id, b"", sender=sender)
+        else:
+            minted_contract.batchTransferFrom(sender, receiver, [token_id], sender=sender)
+
+    with pytest.raises(Exception, match="Invalid signature"):
+        minted_contract.permit(*args, sender=accounts[3])
+
+
+def test_permit_invalidated_by_burn(contract, sign_permit, deployer, user1, user2, sample_characters):
+    """Test a permit for a burned token does not apply to a token re-minted with its ID"""
+    char = sample_characters[0]
+    contract.mint(user1, char["tokenId"], char["name"], char["description"], char["imageURI"], sender=deployer)
+    args = token_permit(sign_permit, contract, user1, user2, char["tokenId"])
+
+    contract.burn(char["tokenId"], sender=user1)
+    contract.mint(user1, char["tokenId"], char["name"], char["description"], char["imageURI"], sender=deployer)
+
+    with pytest.raises(Exception, match="Invalid signature"):
+        contract.permit(*args, sender=user2)
+
+
+def test_permit_expired(minted_contract, sign_permit, user1, user2, sample_characters):
+    """Test permits past their deadline are rejected"""
+    deadline = chain.pending_timestamp + 60
+    args = token_permit(sign_permit, minted_contract, user1, user2, sample_characters[0]["tokenId"], deadline)
+    chain.pending_timestamp += 120
+
+    with pytest.raises(Exception, match="Permit expired"):
+        minted_contract.permit(*args, sender=user2)
+
+
+def test_permit_wrong_signer(minted_contract, sign_permit, user2, sample_characters):
+    """Test a permit signed by someone other than the owner is rejected"""
+    args = token_permit(sign_permit, minted_contract, user2, user2, sample_characters[0]["tokenId"])
+
+    with pytest.raises(Exception, match="Invalid signature"):
+        minted_contract.permit(*args, sender=user2)
+
+
+def test_permit_by_operator(minted_contract, sign_permit, user1, user2, accounts, sample_characters):
+    """Test an operator of the owner can sign permits too"""
+    token_id = sample_characters[0]["tokenId"]
+    minted_contract.setApprovalForAll(user2, True, sender=user1)
+
+    minted_contract.permit(*token_permit(sign_permit, minted_contract, user2, accounts[3], token_id), sender=accounts[3])
+    assert minted_contract.getApproved(token_id) == accounts[3].address
+
+
+def test_permitForAll(minted_contract, sign_permit, user1, user2):
+    """Test operator approval and revocation from signatures"""
+    for approved in (True, False):
+        deadline = chain.pending_timestamp + 3600
+        signature = sign_permit(minted_contract, user1, "PermitForAll", owner=user1.address,
+                                operator=user2.address, approved=approved,
+                                nonce=minted_contract.operatorNonces(user1), deadline=deadline)
+        minted_contract.permitForAll(user1, user2, approved, deadline, signature, sender=user2)
+        assert minted_contract.isApprovedForAll(user1, user2) == approved
+
+    assert minted_contract.operatorNonces(user1) == 2
+
+    with pytest.raises(Exception, match="Invalid signature"):
+        minted_contract.permitForAll(user1, user2, True, deadline, signature, sender=user2)
+
+
+# ========== Lazy Minting Tests ==========
+
+def voucher(sign_permit, contract, signer, recipient, char, expiry=None):
+    expiry = expiry or chain.pending_timestamp + 3600
+    digest = content_hash_of(char)
+    signature = sign_permit(contract, signer, "MintVoucher", recipient=recipient.address,
+                            tokenId=char["tokenId"], contentHash=digest, expiry=expiry)
+    return recipient, char["tokenId"], digest, expiry, signature
+
+
+def test_redeem(contract, sign_permit, deployer, user1, sample_characters):
+    """Test a holder mints their own token from the minter's voucher"""
+    char = sample_characters[0]
+    args = voucher(sign_permit, contract, deployer, user1, char)
+    receipt = contract.redeem(*args, sender=user1)
+
+    assert contract.ownerOf(char["tokenId"]) == user1.address
+    assert contract.contentHash(char["tokenId"]) == content_hash_of(char)
+    assert contract.totalSupply() == 1
+    assert [log.event_name for log in receipt.events] == ["Transfer", "MintedWithContentHash"]
+
+
+def test_redeem_by_relayer(contract, sign_permit, deployer, user1, user2, sample_characters):
+    """Test anyone can submit a voucher; the token still goes to its recipient"""
+    args = voucher(sign_permit, contract, deployer, user1, sample_characters[0])
+    contract.redeem(*args, sender=user2)
+
+    assert contract.ownerOf(sample_characters[0]["tokenId"]) == user1.address
+
+
+def test_redeem_replay(contract, sign_permit, deployer, user1, sample_characters):
+    """Test a voucher mints once, even after its token is burned"""
+    char = sample_characters[0]
+    args = voucher(sign_permit, contract, deployer, user1, char)
+    contract.redeem(*args, sender=user1)
+
+    with pytest.raises(Exception, match="Voucher already redeemed"):
+        contract.redeem(*args, sender=user1)
+
+    contract.burn(char["tokenId"], sender=user1)
+    with pytest.raises(Exception, match="Voucher already redeemed"):
+        contract.redeem(*args, sender=user1)
+
+
+def test_redeem_expired(contract, sign_permit, deployer, user1, sample_characters):
+    """Test vouchers past their expiry are rejected"""
+    args = voucher(sign_permit, contract, deployer, user1, sample_characters[0], chain.pending_timestamp + 60)
+    chain.pending_timestamp += 120
+
+    with pytest.raises(Exception, match="Voucher expired"):
+        contract.redeem(*args, sender=user1)
+
+
+def test_redeem_not_signed_by_minter(contract, sign_permit, user1, sample_characters):
+    """Test vouchers signed by anyone but the minter are rejected"""
+    args = voucher(sign_permit, contract, user1, user1, sample_characters[0])
+
+    with pytest.raises(Exception, match="Invalid signature"):
+        contract.redeem(*args, sender=user1)
+
+
+def test_redeem_tampered(contract, sign_permit, deployer, user1, user2, sample_characters):
+    """Test changing any signed field invalidates the voucher"""
+    recipient, token_id, digest, expiry, signature = voucher(
+        sign_permit, contract, deployer, user1, sample_characters[0]
+    )
+
+    for args in [
+        (user2, token_id, digest, expiry, signature),
+        (recipient, token_id + 1, digest, expiry, signature),
+        (recipient, token_id, b"\x22" * 32, expiry, signature),
+        (recipient, token_id, digest, expiry + 1, signature),
+    ]:
+        with pytest.raises(Exception, match="Invalid signature"):
+            contract.redeem(*args, sender=user2)
+
+
+def test_redeem_existing_token(contract, sign_permit, deployer, user1, sample_characters):
+    """Test a voucher cannot mint over a token that already exists"""
+    char = sample_characters[0]
+    contract.mintWithContentHash(user1, char["tokenId"], content_hash_of(char), sender=deployer)
+
+    with pytest.raises(Exception, match="Token already exists"):
+        contract.redeem(*voucher(sign_permit, contract, deployer, user1, char), sender=user1)
+
+
+# ========== Allowlist Claim Tests ==========
+
+def test_claim(contract, merkle_allowlist, deployer, user1, user2, accounts, sample_characters):
+    """Test allowlisted addresses claim up to their cap with a proof"""
+    root, proofs = merkle_allowlist([(user1.address, 2), (user2.address, 1), (accounts[4].address, 1)])
+    contract.setAllowlistRoot(root, sender=deployer)
+    assert contract.allowlistRoot() == root
+
+    for char in sample_characters[:2]:
+        contract.claim(char["tokenId"], content_hash_of(char), 2, proofs[user1.address], sender=user1)
+    assert contract.balanceOf(user1) == 2
+    assert contract.allowlistClaimed(user1) == 2
+    assert contract.contentHash(sample_characters[1]["tokenId"]) == content_hash_of(sample_characters[1])
+
+    char = sample_characters[2]
+    with pytest.raises(Exception, match="Claim limit reached"):
+        contract.claim(char["tokenId"], content_hash_of(char), 2, proofs[user1.address], sender=user1)
+
+
+def test_claim_rejects_bad_proofs(contract, merkle_allowlist, deployer, user1, user2, sample_characters):
+    """Test proofs only work for their own address and cap"""
+    root, proofs = merkle_allowlist([(user1.address, 1), (deployer.address, 1)])
+    contract.setAllowlistRoot(root, sender=deployer)
+    char = sample_characters[0]
+    digest = content_hash_of(char)
+
+    for cap, proof, sender in [(1, proofs[user1.address], user2), (5, proofs[user1.address], user1), (1, [], user2)]:
+        with pytest.raises(Exception, match="Not on the allowlist"):
+            contract.claim(char["tokenId"], digest, cap, proof, sender=sender)
+
+
+def test_claim_root_restrictions(contract, merkle_allowlist, deployer, user1, sample_characters):
+    """Test only the minter sets the root, and nothing can be claimed without one"""
+    root, proofs = merkle_allowlist([(user1.address, 1)])
+    char = sample_characters[0]
+
+    # A single-leaf tree: the root is the leaf and the proof is empty
+    with pytest.raises(Exception, match="Allowlist not set"):
+        contract.claim(char["tokenId"], content_hash_of(char), 1, proofs[user1.address], sender=user1)
+    with pytest.raises(Exception, match="Only minter can set the allowlist"):
+        contract.setAllowlistRoot(root, sender=user1)
+
+    contract.setAllowlistRoot(root, sender=deployer)
+    contract.claim(char["tokenId"], content_hash_of(char), 1, proofs[user1.address], sender=user1)
+    assert contract.ownerOf(char["tokenId"]) == user1.address
 
 
 # ========== Integration Tests ==========
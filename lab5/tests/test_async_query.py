@@ -0,0 +1,151 @@
+"""
+AsyncQueryEngine over HTTP: contract reads relayed to the test chain, and
+retries and limits against a stand-in node that rate-limits and fails
+"""
+import asyncio
+import contextlib
+
+import pytest
+from aiohttp import web
+from ape import accounts, chain
+from scripts._async_query import AsyncQueryEngine
+from scripts._rpc import RPCError, encode_call
+
+
+@contextlib.asynccontextmanager
+async def serve(handle):
+    """Serve ``handle(payload)`` on a local port and yield its URI"""
+    async def post(request):
+        return await handle(await request.json())
+
+    app = web.Application()
+    app.router.add_post("/", post)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        yield "http://127.0.0.1:%d" % site._server.sockets[0].getsockname()[1]
+    finally:
+        await runner.cleanup()
+
+
+async def relay_to_chain(payload):
+    """The test chain runs in-process, so answer its JSON-RPC as a node would"""
+    provider = chain.provider.web3.provider
+    responses = []
+    for item in payload:
+        method, params = item["method"], item["params"]
+        if method == "eth_call":
+            # eth-tester wants a sender and an integer block number
+            call, block = params
+            params = [{"from": accounts.test_accounts[0].address, **call},
+                      int(block, 16) if block.startswith("0x") else block]
+        try:
+            responses.append({**provider.make_request(method, params), "id": item["id"]})
+        except Exception as err:
+            responses.append({"jsonrpc": "2.0", "id": item["id"], "error": {"code": 3, "message": str(err)}})
+    return web.json_response(responses)
+
+
+def read(calls, block_id="latest", **options):
+    async def stream():
+        async with serve(relay_to_chain) as uri, AsyncQueryEngine(uri, **options) as engine:
+            return {key: result async for key, result in engine.stream_calls(calls, block_id)}
+
+    return asyncio.run(stream())
+
+
+class StandInNode:
+    """Answers batches with the chain id after playing back scripted failures"""
+
+    def __init__(self, failures=(), delay=0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.posts = 0
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    async def handle(self, payload):
+        self.posts += 1
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            failure = self.failures.pop(0) if self.failures else None
+            if isinstance(failure, int):
+                return web.Response(status=failure)
+
+            return web.json_response([
+                {"jsonrpc": "2.0", "id": item["id"], "error": {"code": -32005, "message": "limit exceeded"}}
+                if failure == "rate limit" and position == 0 else
+                {"jsonrpc": "2.0", "id": item["id"], "result": hex(1337)}
+                for position, item in enumerate(payload)
+            ])
+        finally:
+            self.in_flight -= 1
+
+    def batch(self, requests, copies=1, **options):
+        async def send():
+            async with serve(self.handle) as uri, AsyncQueryEngine(uri, backoff=0.001, **options) as engine:
+                return await asyncio.gather(*(engine.batch(requests) for _ in range(copies)))
+
+        return asyncio.run(send())
+
+
+CHAIN_ID = [("eth_chainId", [])] * 3
+
+
+# ========== Contract Reads ==========
+
+def test_stream_calls_reads_every_token(minted_contract, user1, user2):
+    minted_contract.transferFrom(user1, user2, 3, sender=user1)
+    calls = [((token_id, "owner"), encode_call(minted_contract.ownerOf, token_id)) for token_id in range(1, 7)]
+    calls += [((token_id, "name"), encode_call(minted_contract.characterName, token_id)) for token_id in (1, 2)]
+
+    results = read(calls, concurrency=2, batch_size=3)
+
+    assert len(results) == len(calls)
+    assert [results[token_id, "owner"] for token_id in range(1, 5)] == [user1, user1, user2, user1]
+    for token_id in (5, 6):
+        assert isinstance(results[token_id, "owner"], RPCError)
+        assert results[token_id, "owner"].revert_reason == "Token does not exist"
+    assert results[2, "name"] == minted_contract.characterName(2)
+
+
+def test_stream_calls_pins_the_block(minted_contract, user1, user2):
+    before = chain.blocks.height
+    minted_contract.transferFrom(user1, user2, 1, sender=user1)
+
+    assert read([("owner", encode_call(minted_contract.ownerOf, 1))], block_id=before) == {"owner": user1}
+    assert read([("owner", encode_call(minted_contract.ownerOf, 1))]) == {"owner": user2}
+
+
+# ========== Retries and Limits ==========
+
+def test_batch_retries_rate_limits():
+    node = StandInNode(failures=[429, "rate limit"])
+
+    results, = node.batch(CHAIN_ID)
+
+    assert results == [hex(1337)] * 3
+    assert node.posts == 3  # The second retry only resends the limited request
+
+
+def test_batch_gives_up_after_its_retries():
+    node = StandInNode(failures=[503] * 10)
+
+    results, = node.batch(CHAIN_ID, retries=2)
+
+    assert node.posts == 3
+    assert all(isinstance(result, RPCError) and result.message == "HTTP 503" for result in results)
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_requests_in_flight_are_bounded(concurrency):
+    node = StandInNode(delay=0.02)
+
+    results = node.batch(CHAIN_ID, copies=8, concurrency=concurrency)
+
+    assert results == [[hex(1337)] * 3] * 8
+    assert node.most_in_flight == concurrency
@@ -0,0 +1,120 @@
+"""
+BulkExecutor against the test chain: an interrupted run resumes from its
+checkpoint without sending any operation twice
+"""
+import json
+
+import pytest
+from scripts import _tracker
+from scripts._bulk import BulkExecutor, Checkpoint, read_manifest
+
+
+TOKEN_IDS = (1, 2, 3)
+
+
+class Crash(Exception):
+    """Stands in for a kill or Ctrl-C in the middle of a run"""
+
+
+@pytest.fixture
+def manifest(tmp_path, user1):
+    path = tmp_path / "mints.jsonl"
+    path.write_text("".join(
+        json.dumps({"op": "mintWithContentHash", "to": user1.address, "tokenId": token_id,
+                    "contentHash": "0x" + f"{token_id:064x}"}) + "\n"
+        for token_id in TOKEN_IDS
+    ))
+    return read_manifest(path)
+
+
+def executor(contract, deployer, checkpoint):
+    return BulkExecutor(contract, deployer, checkpoint, confirmations=1, poll_interval=0.01)
+
+
+def crash_on_send(run, after_sending):
+    """Make the second broadcast of ``run`` crash, before or after the node gets it"""
+    send = run._send
+    sends = []
+
+    def crashing(raw):
+        sends.append(raw)
+        if len(sends) == 2:
+            if after_sending:
+                send(raw)
+            raise Crash()
+        return send(raw)
+
+    run._send = crashing
+
+
+@pytest.mark.parametrize("after_sending", [False, True], ids=["before broadcast", "after broadcast"])
+def test_resume_does_not_resend(contract, deployer, user1, manifest, tmp_path, after_sending):
+    checkpoint = tmp_path / "mints.checkpoint.jsonl"
+    nonce = deployer.nonce
+
+    interrupted = executor(contract, deployer, checkpoint)
+    crash_on_send(interrupted, after_sending)
+    with pytest.raises(Crash):
+        interrupted.run(manifest)
+
+    # The operation was journaled before it was broadcast
+    journal = Checkpoint(checkpoint)
+    assert sorted(journal.submitted) == [1, 2]
+    journal.close()
+
+    summary = executor(contract, deployer, checkpoint).run(manifest)
+
+    assert summary["confirmed"] == len(TOKEN_IDS)
+    assert summary["failed"] == []
+    # One transaction per operation: nothing was minted (or attempted) twice
+    assert deployer.nonce == nonce + len(TOKEN_IDS)
+    assert contract.balanceOf(user1) == len(TOKEN_IDS)
+    for token_id in TOKEN_IDS:
+        assert contract.contentHash(token_id) == token_id.to_bytes(32, "big")
+
+
+def test_resume_after_nonce_was_taken(contract, deployer, user1, user2, manifest, tmp_path):
+    """An unsent operation whose nonce another transaction used is signed again"""
+    checkpoint = tmp_path / "mints.checkpoint.jsonl"
+    nonce = deployer.nonce
+
+    interrupted = executor(contract, deployer, checkpoint)
+    crash_on_send(interrupted, after_sending=False)
+    with pytest.raises(Crash):
+        interrupted.run(manifest)
+    deployer.transfer(user2, 1)  # Takes the nonce of the unsent mint
+
+    summary = executor(contract, deployer, checkpoint).run(manifest)
+
+    assert summary["failed"] == []
+    assert deployer.nonce == nonce + len(TOKEN_IDS) + 1
+    assert contract.balanceOf(user1) == len(TOKEN_IDS)
+
+
+def test_finished_checkpoint_sends_nothing(contract, deployer, manifest, tmp_path):
+    checkpoint = tmp_path / "mints.checkpoint.jsonl"
+    executor(contract, deployer, checkpoint).run(manifest)
+    nonce = deployer.nonce
+
+    summary = executor(contract, deployer, checkpoint).run(manifest)
+
+    assert summary["submitted"] == 0
+    assert summary["confirmed"] == len(TOKEN_IDS)
+    assert deployer.nonce == nonce
+
+
+def test_run_stops_when_confirmations_stop(monkeypatch, contract, deployer, manifest, tmp_path):
+    def unreachable(requests):
+        raise ConnectionError("node unreachable")
+
+    monkeypatch.setattr(_tracker, "batch_request", unreachable)
+    run = executor(contract, deployer, tmp_path / "mints.checkpoint.jsonl")
+
+    with pytest.raises(RuntimeError, match="node unreachable"):
+        run.run(manifest)
+
+    # Everything sent stays journaled for a later resume
+    journal = Checkpoint(tmp_path / "mints.checkpoint.jsonl")
+    assert sorted(journal.submitted) == [1, 2, 3]
+    assert journal.finished == {}
+    journal.close()
@@ -0,0 +1,141 @@
+"""
+Exporter against the test chain: partitions add up to the contract's state,
+and an export interrupted while syncing or publishing resumes without losing
+or repeating rows
+"""
+import json
+
+import pytest
+from ape import Project, project
+from scripts._export import BalancesModel, CollectionModel, Exporter
+
+
+class Crash(Exception):
+    """Stands in for a kill or Ctrl-C in the middle of an export"""
+
+
+def crash(*args):
+    raise Crash
+
+
+def exporter(contract, out_dir, **options):
+    return Exporter(CollectionModel(contract), out_dir, page_size=1, **options)
+
+
+def exported_state(out_dir, dataset, key):
+    """Last row per key across the partitions, in manifest order"""
+    manifest = json.loads((out_dir / "manifest.json").read_text(encoding="utf8"))
+    rows = {}
+    for partition in manifest["partitions"]:
+        for name in partition["datasets"][dataset]["files"]:
+            for line in (out_dir / partition["name"] / name).read_text(encoding="utf8").splitlines():
+                row = json.loads(line)
+                rows[row[key]] = row
+    return rows
+
+
+def owners(out_dir):
+    return {token_id: row["owner"] for token_id, row in exported_state(out_dir, "tokens", "tokenId").items()
+            if not row["burned"]}
+
+
+# ========== Partitions ==========
+
+def test_export_writes_the_collection(tmp_path, minted_contract, user1, user2, sample_characters):
+    minted_contract.setApprovalForAll(user2, True, sender=user1)
+    with exporter(minted_contract, tmp_path, chunk_rows=3) as export:
+        _, entry = export.run()
+
+    assert entry["datasets"]["tokens"] == {"files": ["tokens-00000.jsonl", "tokens-00001.jsonl"], "rows": 4}
+    tokens = exported_state(tmp_path, "tokens", "tokenId")
+    for char in sample_characters:
+        row = tokens[char["tokenId"]]
+        assert row["owner"] == user1.address.lower()
+        assert (row["name"], row["description"], row["image"]) == (
+            char["name"], char["description"], char["imageURI"])
+    operators = exported_state(tmp_path, "operators", "owner")
+    assert operators[user1.address.lower()]["operator"] == user2.address.lower()
+
+
+def test_export_only_writes_changes(tmp_path, minted_contract, user1, user2):
+    with exporter(minted_contract, tmp_path) as export:
+        export.run()
+        minted_contract.transferFrom(user1, user2, 2, sender=user1)
+        minted_contract.burn(3, sender=user1)
+        applied, entry = export.run()
+        assert export.run() == (0, None)
+
+    assert applied == 2
+    assert entry["datasets"]["tokens"]["rows"] == 2
+    assert owners(tmp_path) == {1: user1.address.lower(), 2: user2.address.lower(), 4: user1.address.lower()}
+
+
+def test_export_rejects_another_target(tmp_path, minted_contract, contract):
+    exporter(minted_contract, tmp_path).close()
+
+    with pytest.raises(ValueError, match="holds an export of"):
+        exporter(contract, tmp_path)
+
+
+# ========== Resuming ==========
+
+def test_export_resumes_after_an_interrupted_sync(tmp_path, minted_contract, user1, user2):
+    minted_contract.transferFrom(user1, user2, 1, sender=user1)
+    pages = []
+
+    def crash_after_two_pages(page_start, page_stop, log_count):
+        pages.append((page_start, log_count))
+        if len(pages) == 2:
+            raise Crash
+
+    with exporter(minted_contract, tmp_path) as export, pytest.raises(Crash):
+        export.run(on_page=crash_after_two_pages)
+
+    with exporter(minted_contract, tmp_path) as export:
+        assert export.cursor == pages[1][0]
+        export.run(on_page=lambda page_start, page_stop, log_count: pages.append((page_start, log_count)))
+
+    starts = [page_start for page_start, _ in pages]
+    assert starts == sorted(set(starts))  # No page applied twice
+    assert sum(log_count for _, log_count in pages) == 9  # Four mints (Transfer + Minted) and the transfer
+    assert owners(tmp_path) == {1: user2.address.lower(), 2: user1.address.lower(),
+                                3: user1.address.lower(), 4: user1.address.lower()}
+
+
+def test_export_resumes_after_publishing(monkeypatch, tmp_path, minted_contract, user1, user2):
+    """A partition published before its rows were marked exported is not written again"""
+    with exporter(minted_contract, tmp_path) as export:
+        export.run()
+    minted_contract.transferFrom(user1, user2, 4, sender=user1)
+
+    with exporter(minted_contract, tmp_path) as export:
+        with monkeypatch.context() as patch:
+            patch.setattr(Exporter, "_finish_partition", crash)
+            with pytest.raises(Crash):
+                export.run()
+
+    (tmp_path / "blocks-999999998-999999999.tmp").mkdir()  # Never published
+    with exporter(minted_contract, tmp_path) as export:
+        assert export.exported == export.cursor
+        assert export.run() == (0, None)
+
+    assert not list(tmp_path.glob("*.tmp"))
+    assert len(json.loads((tmp_path / "manifest.json").read_text(encoding="utf8"))["partitions"]) == 2
+    assert owners(tmp_path)[4] == user2.address.lower()
+
+
+# ========== Balances ==========
+
+def test_export_balances(tmp_path, deployer, user1, user2):
+    lab4 = Project(project.path.parent / "lab4")
+    sale = deployer.deploy(lab4.CrowdSaleToken_22520542, "CrowdSale", "CS", 18, 1000)
+    user1.transfer(sale.address, 10**18)
+    user2.transfer(sale.address, 2 * 10**18)
+    sale.transfer(user2, 30, sender=user1)
+
+    with Exporter(BalancesModel(sale), tmp_path) as export:
+        export.run()
+
+    balances = exported_state(tmp_path, "balances", "address")
+    assert balances[user1.address.lower()]["balance"] == sale.balanceOf(user1) == 70
+    assert balances[user2.address.lower()]["balance"] == sale.balanceOf(user2) == 230
@@ -0,0 +1,248 @@
+"""
+Gas regression benchmarks for MyCollectibleNFT
+
+Each test records the gas used by one function for one parameter size and
+compares it against tests/gas_baseline.json. A test fails when gas grows by
+more than GAS_REGRESSION_THRESHOLD percent (default 5). Run with
+GAS_BASELINE_UPDATE=1 to accept new numbers after an intended change.
+"""
+
+import json
+
+import pytest
+
+from scripts._bulk import DEFAULT_GAS_LIMITS
+from testkit.gas_baseline import GAS_REGRESSION_THRESHOLD, GasBaseline
+
+
+# String sizes: empty, a typical character, and the maximum the contract accepts
+METADATA_SIZES = {
+    "empty": ("", "", ""),
+    "sample": (
+        "Cyber Warrior",
+        "Một chiến binh số có khả năng phá mã CRY128",
+        "https://school.edu.vn/nft-assets/1.png",
+    ),
+    "max": ("N" * 100, "D" * 500, "I" * 200),
+}
+
+
+CONTENT_HASH = b"\x11" * 32
+
+
+def mint(contract, deployer, receiver, token_id, size="sample"):
+    if size == "content":
+        return contract.mintWithContentHash(receiver, token_id, CONTENT_HASH, sender=deployer)
+
+    name, description, image_uri = METADATA_SIZES[size]
+    return contract.mint(receiver, token_id, name, description, image_uri, sender=deployer)
+
+
+# ========== Mint ==========
+
+@pytest.mark.parametrize("size", METADATA_SIZES)
+def test_gas_mint_first_for_holder(contract, deployer, user1, gas_baseline, size):
+    """Mint into an address that holds no tokens yet"""
+    receipt = mint(contract, deployer, user1, 1, size)
+    gas_baseline.check(f"mint[first,{size}]", receipt.gas_used)
+
+
+@pytest.mark.parametrize("size", METADATA_SIZES)
+def test_gas_mint_nth_for_holder(contract, deployer, user1, gas_baseline, size):
+    """Mint into an address that already holds tokens"""
+    for token_id in range(1, 6):
+        mint(contract, deployer, user1, token_id)
+
+    receipt = mint(contract, deployer, user1, 6, size)
+    gas_baseline.check(f"mint[nth,{size}]", receipt.gas_used)
+
+
+@pytest.mark.parametrize("holder", ["first", "nth"])
+def test_gas_mintWithContentHash(contract, deployer, user1, gas_baseline, holder):
+    """Content-addressed mint stores a single hash instead of three strings"""
+    if holder == "nth":
+        for token_id in range(1, 6):
+            mint(contract, deployer, user1, token_id, "content")
+
+    receipt = mint(contract, deployer, user1, 6, "content")
+    gas_baseline.check(f"mintWithContentHash[{holder}]", receipt.gas_used)
+
+
+def test_gas_redeem(contract, deployer, user1, chain, sign_permit, gas_baseline):
+    """Lazy mint: mintWithContentHash[first] plus the voucher check, paid by the holder"""
+    expiry = chain.pending_timestamp + 3600
+    signature = sign_permit(contract, deployer, "MintVoucher", recipient=user1.address, tokenId=1,
+                            contentHash=CONTENT_HASH, expiry=expiry)
+    receipt = contract.redeem(user1, 1, CONTENT_HASH, expiry, signature, sender=user1)
+    gas_baseline.check("redeem", receipt.gas_used)
+
+
+@pytest.mark.parametrize("members", [8, 1024])
+def test_gas_claim(contract, deployer, user1, merkle_allowlist, gas_baseline, members):
+    """Allowlist claim: mintWithContentHash[first] plus a proof of log2(members) hashes"""
+    entries = [(user1.address, 1)] + [("0x" + (i + 1).to_bytes(20, "big").hex(), 1) for i in range(members - 1)]
+    root, proofs = merkle_allowlist(entries)
+    contract.setAllowlistRoot(root, sender=deployer)
+    receipt = contract.claim(1, CONTENT_HASH, 1, proofs[user1.address], sender=user1)
+    gas_baseline.check(f"claim[{members} members]", receipt.gas_used)
+
+
+# ========== Burn ==========
+
+@pytest.mark.parametrize("size", [*METADATA_SIZES, "content"])
+def test_gas_burn(contract, deployer, user1, gas_baseline, size):
+    mint(contract, deployer, user1, 1, size)
+    receipt = contract.burn(1, sender=user1)
+    gas_baseline.check(f"burn[{size}]", receipt.gas_used)
+
+
+def test_gas_burn_from_middle(contract, deployer, user1, gas_baseline):
+    """Burning a token that is not last in the lists moves the last one into its slot"""
+    for token_id in range(1, 4):
+        mint(contract, deployer, user1, token_id)
+
+    receipt = contract.burn(1, sender=user1)
+    gas_baseline.check("burn[from middle]", receipt.gas_used)
+
+
+def test_gas_burn_with_approval(contract, deployer, user1, user2, gas_baseline):
+    mint(contract, deployer, user1, 1)
+    contract.approve(user2, 1, sender=user1)
+    receipt = contract.burn(1, sender=user2)
+    gas_baseline.check("burn[approved]", receipt.gas_used)
+
+
+# ========== Transfers ==========
+
+def test_gas_transferFrom_new_holder(contract, deployer, user1, user2, gas_baseline):
+    mint(contract, deployer, user1, 1)
+    receipt = contract.transferFrom(user1, user2, 1, sender=user1)
+    gas_baseline.check("transferFrom[new holder]", receipt.gas_used)
+
+
+def test_gas_transferFrom_existing_holder(contract, deployer, user1, user2, gas_baseline):
+    mint(contract, deployer, user1, 1)
+    mint(contract, deployer, user1, 2)
+    mint(contract, deployer, user2, 3)
+    receipt = contract.transferFrom(user1, user2, 1, sender=user1)
+    gas_baseline.check("transferFrom[existing holder]", receipt.gas_used)
+
+
+def test_gas_transferFrom_approved(contract, deployer, user1, user2, gas_baseline):
+    mint(contract, deployer, user1, 1)
+    contract.approve(user2, 1, sender=user1)
+    receipt = contract.transferFrom(user1, user2, 1, sender=user2)
+    gas_baseline.check("transferFrom[approved]", receipt.gas_used)
+
+
+@pytest.mark.parametrize("data_size", [0, 1024])
+def test_gas_safeTransferFrom(contract, deployer, user1, user2, gas_baseline, data_size):
+    mint(contract, deployer, user1, 1)
+    receipt = contract.safeTransferFrom(user1, user2, 1, b"\x01" * data_size, sender=user1)
+    gas_baseline.check(f"safeTransferFrom[data={data_size}]", receipt.gas_used)
+
+
+@pytest.mark.parametrize("count", [1, 10])
+def test_gas_batchTransferFrom(contract, deployer, user1, user2, gas_baseline, count):
+    """Compare with ``count`` x transferFrom[existing holder]"""
+    for token_id in range(1, count + 2):
+        mint(contract, deployer, user1, token_id, "empty")
+    mint(contract, deployer, user2, 100, "empty")
+
+    receipt = contract.batchTransferFrom(user1, user2, list(range(1, count + 1)), sender=user1)
+    gas_baseline.check(f"batchTransferFrom[{count}]", receipt.gas_used)
+
+
+# ========== Approvals ==========
+
+def test_gas_approve(contract, deployer, user1, user2, gas_baseline):
+    mint(contract, deployer, user1, 1)
+    receipt = contract.approve(user2, 1, sender=user1)
+    gas_baseline.check("approve", receipt.gas_used)
+
+
+def test_gas_permit(contract, deployer, user1, user2, chain, sign_permit, gas_baseline):
+    """Signed approval of one token (first use of its nonce)"""
+    mint(contract, deployer, user1, 1)
+    deadline = chain.pending_timestamp + 3600
+    signature = sign_permit(contract, user1, "Permit", spender=user2.address, tokenId=1,
+                            nonce=0, deadline=deadline)
+    receipt = contract.permit(user2, 1, deadline, signature, sender=user2)
+    gas_baseline.check("permit", receipt.gas_used)
+
+
+def test_gas_permitForAll(contract, user1, user2, chain, sign_permit, gas_baseline):
+    deadline = chain.pending_timestamp + 3600
+    signature = sign_permit(contract, user1, "PermitForAll", owner=user1.address,
+                            operator=user2.address, approved=True, nonce=0, deadline=deadline)
+    receipt = contract.permitForAll(user1, user2, True, deadline, signature, sender=user2)
+    gas_baseline.check("permitForAll", receipt.gas_used)
+
+
+def test_gas_setApprovalForAll(contract, user1, user2, gas_baseline):
+    receipt = contract.setApprovalForAll(user2, True, sender=user1)
+    gas_baseline.check("setApprovalForAll[grant]", receipt.gas_used)
+
+    receipt = contract.setApprovalForAll(user2, False, sender=user1)
+    gas_baseline.check("setApprovalForAll[revoke]", receipt.gas_used)
+
+
+# ========== Views ==========
+
+@pytest.mark.parametrize("size", [*METADATA_SIZES, "content"])
+def test_gas_tokenURI(contract, deployer, user1, gas_baseline, size):
+    """tokenURI is free off-chain but costs gas when another contract calls it"""
+    mint(contract, deployer, user1, 1, size)
+    gas = contract.tokenURI.estimate_gas_cost(1)
+    gas_baseline.check(f"tokenURI[{size}]", gas)
+
+
+@pytest.mark.parametrize("page_size", [10, 100])
+def test_gas_tokensOfOwner(contract, deployer, user1, gas_baseline, page_size):
+    """Cost of listing one page of holdings when called from another contract"""
+    for token_id in range(1, page_size + 1):
+        mint(contract, deployer, user1, token_id, "empty")
+
+    gas = contract.tokensOfOwner.estimate_gas_cost(user1, 0, page_size)
+    gas_baseline.check(f"tokensOfOwner[{page_size}]", gas)
+
+
+# ========== Baseline File ==========
+
+def test_baseline_requires_a_recorded_value(tmp_path):
+    path = tmp_path / "gas_baseline.json"
+    path.write_text('{"mint": 1000}\n')
+    baseline = GasBaseline(path, threshold=5, update=False)
+
+    baseline.check("mint", 1050)
+    with pytest.raises(AssertionError, match="exceeds baseline"):
+        baseline.check("mint", 1051)
+    with pytest.raises(AssertionError, match="no gas baseline"):
+        baseline.check("burn", 500)
+
+    baseline.save()
+    assert path.read_text() == '{"mint": 1000}\n'
+
+
+def test_baseline_update_merges_measurements(tmp_path):
+    path = tmp_path / "gas_baseline.json"
+    path.write_text('{"burn": 700, "mint": 1000}\n')
+    baseline = GasBaseline(path, threshold=5, update=True)
+
+    baseline.check("mint", 2000)
+    baseline.check("approve", 300)
+    baseline.save()
+
+    assert json.loads(path.read_text()) == {"approve": 300, "burn": 700, "mint": 2000}
+
+
+@pytest.mark.parametrize("operation", DEFAULT_GAS_LIMITS)
+def test_bulk_gas_limits_cover_the_baseline(gas_baseline, operation):
+    """BulkExecutor sends without estimating, so its fixed limit must fit the worst recorded case"""
+    recorded = [gas for name, gas in gas_baseline.baseline.items() if name.split("[")[0] == operation]
+    assert recorded, f"{operation}: no gas baseline"
+
+    worst = max(recorded) * (1 + GAS_REGRESSION_THRESHOLD / 100)
+    assert DEFAULT_GAS_LIMITS[operation] >= worst, (
+        f"{operation}: bulk gas limit {DEFAULT_GAS_LIMITS[operation]} is below the worst baseline {max(recorded)}"
+    )
@@ -0,0 +1,153 @@
+"""
+Gas profiler: source maps of the compiled contract, and attribution of
+structLogs traces to its lines and functions
+
+The in-memory test chain has no debug_ namespace, so profiles are built from
+traces written here, with program counters taken from the real pc map.
+"""
+import pytest
+from ape import project
+from scripts._gas_profile import (
+    INTRINSIC,
+    SourceMap,
+    TraceError,
+    called_addresses,
+    identify,
+    profile,
+    trace_transaction,
+)
+
+CALLEE = "0x" + "ab" * 20
+
+
+@pytest.fixture(scope="module")
+def source_map():
+    contract_type = project.MyCollectibleNFT.contract_type
+    return SourceMap(contract_type, project.path / contract_type.source_id)
+
+
+def line_of(source_map, function, statement):
+    return next(number for number, text in enumerate(source_map.lines, 1)
+                if text.strip() == statement and source_map.function(number) == function)
+
+
+def pc_of(source_map, line):
+    return min(pc for pc, mapped in source_map.pc_lines.items() if mapped == line)
+
+
+def step(pc, op, gas, depth=1, cost=3, stack=None):
+    return {"pc": pc, "op": op, "gas": gas, "gasCost": cost, "depth": depth, "stack": stack or []}
+
+
+# ========== Source Maps ==========
+
+def test_source_map_finds_functions(source_map):
+    burn = line_of(source_map, "burn", "self.totalSupply -= 1")
+
+    definition = source_map.lines.index("def burn(_tokenId: uint256):") + 1
+
+    assert source_map.function(definition + 5) == "burn"
+    assert source_map.text(definition + 5) == "owner: address = self._ownerOf[_tokenId]"
+    assert source_map.function(1) is None
+    assert {"burn", "mint", "minter", "__default__"} <= source_map.external  # minter is a public variable
+    assert "_removeTokenFromAllTokensEnumeration" not in source_map.external
+    assert source_map.line(pc_of(source_map, burn)) == burn
+    assert source_map.text(burn) == "self.totalSupply -= 1"
+
+
+def test_identify_matches_deployed_code(source_map, minted_contract, user1):
+    found = identify([minted_contract.address, user1.address], [source_map])
+
+    assert found == {minted_contract.address.lower(): source_map, user1.address.lower(): None}
+
+
+def test_tracing_needs_a_debug_node(minted_contract, user1):
+    receipt = minted_contract.burn(1, sender=user1)
+
+    with pytest.raises(TraceError, match="debug_traceTransaction"):
+        trace_transaction(receipt.txn_hash)
+
+
+# ========== Profiles ==========
+
+@pytest.fixture
+def lines(source_map):
+    """Source lines the trace runs through"""
+    return {
+        "entry": line_of(source_map, "burn", "owner: address = self._ownerOf[_tokenId]"),
+        "internal": line_of(source_map, "_removeTokenFromAllTokensEnumeration",
+                            "self._allTokensIndex[_tokenId] = 0"),
+        "last": line_of(source_map, "burn", "self.totalSupply -= 1"),
+    }
+
+
+@pytest.fixture
+def struct_logs(source_map, lines):
+    """
+    burn: a line, an SLOAD, an internal function, then a call into an unknown contract
+
+    Gas left counts down from 100,000; the call's own overhead is 894 and the
+    callee spends 3. The last two steps are compiler-generated code.
+    """
+    entry, internal, last = (pc_of(source_map, lines[name]) for name in ("entry", "internal", "last"))
+    generated = max(source_map.pc_lines) + 1
+    return [
+        step(entry, "PUSH1", 100_000),
+        step(entry, "SLOAD", 99_997, cost=2100),
+        step(internal, "SSTORE", 97_897, cost=2900),
+        step(last, "CALL", 94_997, cost=700, stack=[hex(int(CALLEE, 16)), "0x5208"]),
+        step(0, "PUSH1", 60_000, depth=2),
+        step(2, "STOP", 59_997, depth=2, cost=0),
+        step(generated, "SSTORE", 94_100, cost=5000),
+        step(generated + 1, "STOP", 89_100, cost=0),
+    ]
+
+
+def test_profile_charges_lines_and_functions(struct_logs, lines, source_map, minted_contract):
+    address = minted_contract.address
+
+    result = profile(struct_logs, 21_000 + 10_900, address, {address.lower(): source_map})
+
+    assert dict(result.functions) == {
+        "MyCollectibleNFT.burn": 3 + 2100 + 894 + 5000,
+        "MyCollectibleNFT._removeTokenFromAllTokensEnumeration": 2900,
+        CALLEE: 3,
+        INTRINSIC: 21_000,
+    }
+    assert sum(result.stacks.values()) == result.gas_used
+    stats = {line: line_stats for _, line, line_stats in result.top_lines()}
+    entry = stats[lines["entry"]]
+    assert (entry.gas, entry.steps, entry.storage_ops) == (2103, 2, 1)
+    assert stats[lines["last"]].gas == 894 + 5000  # Compiler-generated steps stay on the last line
+    assert result.top_lines(1)[0][1] == lines["last"]
+    assert result.top_functions(2) == [(INTRINSIC, 21_000), ("MyCollectibleNFT.burn", 7997)]
+
+    burn = "MyCollectibleNFT.burn"
+    assert result.stacks[(burn, "MyCollectibleNFT._removeTokenFromAllTokensEnumeration",
+                          f"MyCollectibleNFT.vy:{lines['internal']}")] == 2900
+    assert result.stacks[(burn, f"MyCollectibleNFT.vy:{lines['last']}", CALLEE)] == 3
+    assert result.stacks[(burn, INTRINSIC)] == 21_000
+
+
+def test_called_addresses(struct_logs, minted_contract):
+    assert called_addresses(struct_logs, minted_contract.address) == {minted_contract.address.lower(), CALLEE}
+
+
+def test_collapsed_stacks(tmp_path, struct_logs, lines, source_map, minted_contract):
+    address = minted_contract.address
+    result = profile(struct_logs, 31_900, address, {address.lower(): source_map})
+
+    result.write_collapsed(tmp_path / "burn.folded")
+
+    folded = (tmp_path / "burn.folded").read_text().splitlines()
+    assert folded == sorted(folded)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in folded) == 31_900
+    assert f"MyCollectibleNFT.burn;MyCollectibleNFT.vy:{lines['last']};{CALLEE} 3" in folded
+
+
+def test_profile_of_unknown_code(struct_logs, minted_contract):
+    result = profile(struct_logs, 31_900, minted_contract.address, {})
+
+    assert not result.lines
+    assert result.functions[minted_contract.address.lower()] == 10_900 - 3
+    assert result.stacks[(minted_contract.address.lower(), INTRINSIC)] == 21_000
@@ -0,0 +1,128 @@
+"""
+Load harness against the test chain: throwaway accounts are funded and then
+spend in a later wave, and every transaction is timed, measured and counted
+"""
+import threading
+
+import pytest
+from ape import chain
+from scripts._load import (
+    LoadRunner,
+    current_fees,
+    load_accounts,
+    next_nonces,
+    percentile,
+    sign,
+    sign_with_ape,
+    summarize,
+)
+
+TRANSFER_GAS = 150_000
+
+
+@pytest.fixture(autouse=True)
+def serialized_node(monkeypatch):
+    """The in-process chain is not thread-safe; a real node handles one request at a time for us"""
+    manager = chain.provider.web3.manager
+    lock = threading.RLock()
+    for name in ("_make_request", "_make_batch_request"):
+        request = getattr(manager, name)
+        monkeypatch.setattr(manager, name, lambda *args, _request=request: locked(lock, _request, args))
+
+
+def locked(lock, request, args):
+    with lock:
+        return request(*args)
+
+
+@pytest.fixture
+def fees():
+    return current_fees()
+
+
+def funding(funder, accounts, value, fees):
+    """Sign one value transfer from ``funder`` to each account"""
+    nonce = next_nonces([funder.address])[funder.address]
+    return [sign_with_ape(funder, nonce + index, account.address, 21_000, fees, value=value)
+            for index, account in enumerate(accounts)]
+
+
+def run(waves, **options):
+    runner = LoadRunner(poll_interval=0.01, inclusion_timeout=30, **options)
+    runner.run(waves)
+    return runner
+
+
+# ========== Accounts and Signing ==========
+
+def test_load_accounts_are_deterministic():
+    first = load_accounts(3)
+
+    assert [account.address for account in load_accounts(3)] == [account.address for account in first]
+    assert len({account.address for account in first}) == 3
+    assert not {account.address for account in first} & {account.address for account in load_accounts(3, seed=1)}
+
+
+def test_next_nonces_reads_pending_counts(deployer, user1, user2):
+    user1.transfer(user2, 1)
+
+    assert next_nonces([deployer.address, user1.address]) == {
+        deployer.address: deployer.nonce, user1.address: user1.nonce}
+
+
+# ========== Running ==========
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_runner_records_every_wave(deployer, fees, concurrency):
+    senders = load_accounts(4, seed=concurrency)
+    receiver = load_accounts(1, seed=99)[0]
+    spends = [sign(sender, nonce, receiver.address, 21_000, fees, value=10)
+              for sender in senders for nonce in (0, 1)]
+
+    runner = run([funding(deployer, senders, 10**18, fees), spends], concurrency=concurrency)
+
+    assert chain.provider.get_balance(receiver.address) == 80
+    assert len(runner.records) == 12
+    for txn_hash, record in runner.records.items():
+        assert record.status == 1 and record.gas_used == 21_000 and not record.error
+        assert record.block == chain.provider.web3.eth.get_transaction(txn_hash)["blockNumber"]
+        assert record.included_at >= record.submitted_at
+    assert max(record.block for record in runner.records.values() if record.wave == 0) \
+        < min(record.block for record in runner.records.values() if record.wave == 1)
+
+
+def test_runner_counts_reverts_and_submit_errors(deployer, minted_contract, user1, fees):
+    sender = load_accounts(1, seed=7)[0]
+    data = minted_contract.transferFrom.encode_input(user1.address, sender.address, 1)  # Not approved
+    reverting = sign(sender, 0, minted_contract.address, TRANSFER_GAS, fees, data=data)
+    unfunded = sign(load_accounts(1, seed=8)[0], 0, user1.address, 21_000, fees, value=1)
+
+    runner = run([funding(deployer, [sender], 10**18, fees), [reverting, unfunded]])
+    summary = summarize(runner)
+
+    assert runner.records[reverting[1]].status == 0
+    assert runner.records[unfunded[1]].error
+    assert (summary["total"], summary["included"], summary["reverted"], summary["submit_errors"]) == (3, 2, 1, 1)
+    assert summary["revert_rate"] == 0.5
+    assert summary["gas"]["max"] == runner.records[reverting[1]].gas_used
+    assert set(summary["latency"]) == {"p50", "p90", "p99", "max"}
+    assert minted_contract.ownerOf(1) == user1
+
+
+def test_runner_paces_submissions(deployer, fees):
+    receivers = load_accounts(5, seed=3)
+
+    runner = run([funding(deployer, receivers, 1, fees)], rate=50)
+
+    submitted = sorted(record.submitted_at for record in runner.records.values())
+    assert submitted[-1] - submitted[0] >= 4 / 50 * 0.9
+
+
+# ========== Reporting ==========
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+
+    assert [percentile(values, fraction) for fraction in (0.5, 0.9, 0.99, 1.0)] == [50, 90, 99, 100]
+    assert percentile(values, 0.07) == 7  # Not 0.07 * 100 = 7.000000000000001
+    assert percentile([7], 0.5) == 7
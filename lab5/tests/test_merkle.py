@@ -0,0 +1,175 @@
+"""
+The vectorized Keccak and tree builder in scripts/_merkle.py: digests match
+eth_utils.keccak, trees match the one-hash-at-a-time reference, and proofs
+read back from a proof file are accepted by claim and buyAllowlisted
+"""
+import random
+
+import numpy as np
+import pytest
+from ape import Project, project
+from eth_utils import keccak
+from scripts import _merkle
+from scripts._merkle import (
+    ProofFile,
+    build_tree,
+    keccak256_batch,
+    leaf_hash,
+    leaf_hashes,
+    proof_from_levels,
+    read_allowlist,
+    verify_proof,
+    write_proof_file,
+)
+from testkit.merkle import allowlist, leaf
+
+
+def random_entries(count, seed=0):
+    rng = random.Random(seed)
+    return [("0x" + rng.randbytes(20).hex(), rng.randrange(1, 10**20)) for _ in range(count)]
+
+
+def as_arrays(entries):
+    addresses = np.frombuffer(b"".join(bytes.fromhex(address[2:]) for address, _ in entries), np.uint8)
+    caps = np.frombuffer(b"".join(cap.to_bytes(32, "big") for _, cap in entries), np.uint8)
+    return addresses.reshape(-1, 20), caps.reshape(-1, 32)
+
+
+def write_manifest(path, entries):
+    path.write_text("address,cap\n" + "".join(f"{address},{cap}\n" for address, cap in entries))
+    return path
+
+
+# ========== Keccak-256 ==========
+
+@pytest.mark.parametrize("length", [0, 1, 7, 8, 31, 32, 33, 63, 64, 65, 127, 134, 135])
+def test_keccak_matches_eth_utils(length):
+    rng = np.random.default_rng(length)
+    messages = rng.integers(0, 256, size=(50, length), dtype=np.uint8)
+    # Edge patterns: all zero bits and all one bits
+    messages[0] = 0
+    messages[1] = 0xFF
+
+    digests = keccak256_batch(messages)
+
+    assert digests.shape == (50, 32)
+    assert [bytes(digest) for digest in digests] == [keccak(bytes(message)) for message in messages]
+
+
+def test_keccak_known_digests():
+    assert bytes(keccak256_batch(np.zeros((1, 0), np.uint8))[0]).hex() == (
+        "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    )
+    assert bytes(keccak256_batch(np.frombuffer(b"abc", np.uint8)[None, :])[0]).hex() == (
+        "4e03657aea45a94fc7d47ba826c8d667c0d1e6e33a64a036ec44f58fa12d6c45"
+    )
+
+
+def test_keccak_across_chunks(monkeypatch):
+    """Rows in a partial last chunk hash the same as in a full one"""
+    monkeypatch.setattr(_merkle, "HASH_CHUNK_SIZE", 16)
+    messages = np.random.default_rng(1).integers(0, 256, size=(37, 64), dtype=np.uint8)
+
+    assert [bytes(digest) for digest in keccak256_batch(messages)] == [keccak(bytes(m)) for m in messages]
+
+
+def test_keccak_rejects_long_messages():
+    with pytest.raises(ValueError, match="shorter than 136"):
+        keccak256_batch(np.zeros((1, 136), np.uint8))
+
+
+# ========== Trees ==========
+
+def test_leaves_match_reference():
+    entries = random_entries(20)
+    leaves = leaf_hashes(*as_arrays(entries))
+
+    assert [bytes(item) for item in leaves] == [leaf(address, cap) for address, cap in entries]
+    assert leaf_hash(*entries[3]) == leaf(*entries[3])
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 5, 7, 8, 9, 16, 17, 100])
+def test_tree_matches_reference(count):
+    entries = random_entries(count, seed=count)
+    levels = build_tree(leaf_hashes(*as_arrays(entries)))
+    root, proofs = allowlist(entries)
+
+    assert bytes(levels[-1][0]) == root
+    for index, (address, cap) in enumerate(entries):
+        proof = proof_from_levels(levels, index)
+        assert proof == proofs[address]
+        assert verify_proof(root, leaf(address, cap), proof)
+
+
+def test_pairs_sort_by_every_word():
+    """Siblings that share their first words are still ordered by the later ones"""
+    left = np.zeros((1, 32), np.uint8)
+    right = np.zeros((1, 32), np.uint8)
+    left[0, 31], right[0, 31] = 2, 1
+
+    parent = bytes(build_tree(np.concatenate([left, right]))[-1][0])
+
+    assert parent == keccak(bytes(right[0]) + bytes(left[0]))
+
+
+# ========== Proof Files ==========
+
+def test_proof_file_round_trip(tmp_path):
+    entries = random_entries(300)
+    root = write_proof_file(tmp_path / "allowlist.bin", *read_allowlist(write_manifest(tmp_path / "a.csv", entries)))
+    proofs = ProofFile(tmp_path / "allowlist.bin")
+
+    assert proofs.root == root == allowlist(sorted(entries))[0]
+    assert len(proofs) == len(entries)
+    for address, cap in entries:
+        found_cap, proof = proofs.lookup(address)
+        assert found_cap == cap
+        assert verify_proof(root, leaf(address, cap), proof)
+    assert proofs.lookup("0x" + "00" * 20) is None
+    assert proofs.lookup("0x" + "ff" * 20) is None
+
+
+def test_proof_file_rejects_duplicates(tmp_path):
+    entries = random_entries(3)
+    with pytest.raises(ValueError, match="listed more than once"):
+        write_proof_file(tmp_path / "allowlist.bin", *as_arrays(entries + entries[1:2]))
+
+
+def test_proof_file_rejects_other_files(tmp_path):
+    write_proof_file(tmp_path / "allowlist.bin", *as_arrays(random_entries(5)))
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes((tmp_path / "allowlist.bin").read_bytes()[:-1])
+
+    with pytest.raises(ValueError, match="not an allowlist file"):
+        ProofFile(truncated)
+
+
+# ========== On Chain ==========
+
+@pytest.fixture
+def proof_file(tmp_path, accounts, user1, user2):
+    """Two test accounts among random addresses, written and read back as the script does"""
+    entries = random_entries(40) + [(user1.address, 2), (user2.address, 3 * 10**18), (accounts[4].address, 1)]
+    manifest = write_manifest(tmp_path / "allowlist.csv", entries)
+    write_proof_file(tmp_path / "allowlist.bin", *read_allowlist(manifest))
+    return ProofFile(tmp_path / "allowlist.bin")
+
+
+def test_claim_with_script_proofs(contract, deployer, user1, proof_file):
+    contract.setAllowlistRoot(proof_file.root, sender=deployer)
+
+    cap, proof = proof_file.lookup(user1.address)
+    for token_id in (1, 2):
+        contract.claim(token_id, keccak(text=str(token_id)), cap, proof, sender=user1)
+    assert contract.allowlistClaimed(user1) == 2
+
+
+@pytest.mark.parametrize("variant", ["CrowdSaleToken_22520542", "CrowdSaleTokenOptimized"])
+def test_buy_allowlisted_with_script_proofs(deployer, user2, proof_file, variant):
+    lab4 = Project(project.path.parent / "lab4")
+    sale = deployer.deploy(getattr(lab4, variant), "CrowdSale", "CS", 18, 1000)
+    sale.setAllowlistRoot(proof_file.root, sender=deployer)
+
+    cap, proof = proof_file.lookup(user2.address)
+    sale.buyAllowlisted(cap, proof, sender=user2, value=10**18)
+    assert sale.ethBalances(user2) == 10**18
@@ -0,0 +1,162 @@
+"""
+Metadata server against the test chain: the store follows mints, transfers
+and burns, its LRU drops exactly what a sync touched, and HTTP clients
+revalidate with ETags
+"""
+import http.client
+import json
+import threading
+
+import pytest
+from scripts._content_store import ContentStore
+from scripts._metadata_store import LRUCache, MetadataServer, MetadataStore
+
+
+@pytest.fixture
+def store(tmp_path, minted_contract):
+    store = MetadataStore(minted_contract, tmp_path / "index.db", store=ContentStore(tmp_path / "metadata"))
+    store.sync()
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def server(store):
+    server = MetadataServer(("127.0.0.1", 0), store)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path, etag=None):
+    """``(status, etag, body)`` of one request"""
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    try:
+        connection.request("GET", path, headers={"If-None-Match": etag} if etag else {})
+        response = connection.getresponse()
+        return response.status, response.getheader("ETag"), response.read()
+    finally:
+        connection.close()
+
+
+# ========== LRU ==========
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.get(1, lambda: "one")
+    cache.get(2, lambda: "two")
+    cache.get(1, lambda: "unused")  # 2 is now the oldest
+    cache.get(3, lambda: "three")
+
+    assert len(cache) == 2
+    assert cache.get(1, lambda: "reloaded") == "one"
+    assert cache.get(2, lambda: "reloaded") == "reloaded"
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_lru_drops_values_loaded_across_an_invalidation():
+    cache = LRUCache()
+
+    def load():
+        cache.invalidate(1)  # A sync lands while the value is being read
+        return "stale"
+
+    assert cache.get(1, load) == "stale"
+    assert cache.get(1, lambda: "fresh") == "fresh"
+    assert cache.get(1, lambda: "unused") == "fresh"
+
+
+# ========== Store ==========
+
+def test_store_serves_the_on_chain_metadata(store, minted_contract, sample_characters):
+    for char in sample_characters:
+        body, etag = store.metadata(char["tokenId"])
+        assert body.decode() == minted_contract.tokenURI(char["tokenId"])
+        assert etag.startswith('"0x')
+
+    assert store.metadata(99) is None
+
+
+def test_sync_invalidates_what_changed(store, minted_contract, deployer, user1, user2):
+    body, etag = store.metadata(1)
+    collection = store.collection()
+    assert store.metadata(1) == (body, etag)
+    hits = store.cache.hits
+
+    minted_contract.transferFrom(user1, user2, 1, sender=user1)
+    assert store.sync() == set()  # No metadata changed, only an owner
+    assert store.metadata(1) == (body, etag)
+    assert store.cache.hits == hits + 1
+    assert store.collection() != collection
+
+    minted_contract.burn(2, sender=user1)
+    minted_contract.mint(user2, 9, "New", "", "", sender=deployer)
+    assert store.sync() == {"2", "9"}
+    assert store.metadata(2) is None
+    assert json.loads(store.metadata(9)[0])["name"] == "New"
+    tokens = json.loads(store.collection()[0])["tokens"]
+    assert [(token["tokenId"], token["owner"]) for token in tokens] == [
+        (1, user2.address.lower()), (3, user1.address.lower()), (4, user1.address.lower()),
+        (9, user2.address.lower())]
+
+
+def test_store_resolves_content_addressed_tokens(store, contract, deployer, user1):
+    """A token whose file is not in the content store yet is picked up by a later sync"""
+    metadata_store = MetadataStore(contract, store.index.db_path.parent / "other.db", store=store.store)
+    digest = store.store.put("Stored", "Off chain", "ipfs://image")
+    stored = store.store.path_for(digest)
+    stored.rename(stored.with_name("aside"))
+    contract.mintWithContentHash(user1, 7, digest, sender=deployer)
+
+    metadata_store.sync()
+    assert metadata_store.metadata(7) is None
+
+    stored.with_name("aside").rename(stored)
+    assert metadata_store.sync() == {"7"}
+    assert json.loads(metadata_store.metadata(7)[0])["image"] == "ipfs://image"
+    metadata_store.close()
+
+
+# ========== HTTP ==========
+
+def test_http_metadata_and_etags(server, minted_contract):
+    status, etag, body = get(server, "/metadata/1")
+    assert status == 200
+    assert body.decode() == minted_contract.tokenURI(1)
+
+    assert get(server, "/metadata/1", etag) == (304, etag, b"")
+    assert get(server, "/metadata/1/", f'"0xother", {etag}')[0] == 304
+    assert get(server, "/metadata/1", '"0xother"')[0] == 200
+
+
+def test_http_collection(server, store, minted_contract, user1, user2):
+    status, etag, body = get(server, "/collection")
+    assert status == 200
+    assert json.loads(body)["totalSupply"] == 4
+
+    minted_contract.transferFrom(user1, user2, 4, sender=user1)
+    store.sync()
+    status, new_etag, body = get(server, "/collection", etag)
+    assert status == 200 and new_etag != etag
+    assert json.loads(body)["tokens"][3]["owner"] == user2.address.lower()
+
+
+def test_http_not_found(server):
+    for path in ("/metadata/99", "/metadata/abc", "/tokens"):
+        status, _, body = get(server, path)
+        assert status == 404
+        assert "error" in json.loads(body)
+
+
+def test_http_serves_concurrent_clients(server, store):
+    statuses = []
+    threads = [threading.Thread(target=lambda token_id=token_id: statuses.append(
+        get(server, f"/metadata/{token_id}")[0])) for token_id in (1, 2, 3, 4) * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [200] * 16
+    assert store.cache.misses + store.cache.hits == 16
@@ -0,0 +1,109 @@
+"""
+OwnerIndex against the test chain: catching up page by page, and rewinding
+after the chain is reverted to a snapshot and rebuilt with other blocks
+"""
+import pytest
+from ape import chain
+from scripts._content_store import ContentStore
+from scripts._nft_index import OwnerIndex
+
+
+@pytest.fixture
+def open_index(tmp_path, contract):
+    indexes = []
+
+    def open_index(**options):
+        index = OwnerIndex(contract, tmp_path / "index.sqlite", store=ContentStore(tmp_path), **options)
+        indexes.append(index)
+        return index
+
+    yield open_index
+    for index in indexes:
+        index.close()
+
+
+def mint(contract, deployer, owner, token_id):
+    contract.mint(owner, token_id, f"Character {token_id}", "", "", sender=deployer)
+
+
+# ========== Syncing ==========
+
+def test_index_follows_transfers_and_burns(open_index, contract, deployer, user1, user2):
+    for token_id in (1, 2, 3):
+        mint(contract, deployer, user1, token_id)
+    index = open_index(page_size=1)
+
+    assert index.sync() == 6  # A Transfer and a Minted per token
+    assert index.cursor == chain.blocks.height
+    assert index.tokens_of(user1) == [(1, "Character 1"), (2, "Character 2"), (3, "Character 3")]
+
+    contract.transferFrom(user1, user2, 2, sender=user1)
+    contract.burn(3, sender=user1)
+    assert index.sync() == 2
+    assert index.tokens_of(user1) == [(1, "Character 1")]
+    assert index.owner_of(2) == user2.address.lower()
+    assert index.owner_of(3) is None
+    assert index.token_count() == 2
+
+
+def test_index_resumes_from_its_cursor(open_index, contract, deployer, user1):
+    mint(contract, deployer, user1, 1)
+    open_index().sync()
+    mint(contract, deployer, user1, 2)
+
+    index = open_index()
+    assert index.sync() == 2
+    assert index.tokens_of(user1) == [(1, "Character 1"), (2, "Character 2")]
+
+
+def test_index_keeps_recent_block_hashes(open_index, contract, deployer, user1):
+    mint(contract, deployer, user1, 1)
+    chain.mine(10)
+    index = open_index(reorg_depth=4)
+    index.sync()
+
+    kept = [number for number, in index.db.execute("SELECT number FROM blocks ORDER BY number")]
+    assert kept == list(range(index.cursor - 3, index.cursor + 1))
+
+
+# ========== Reorgs ==========
+
+@pytest.mark.parametrize("blocks_after", [0, 10])
+@pytest.mark.parametrize("new_chain", ["shorter", "longer"])
+def test_index_rewinds_after_reorg(open_index, reorg_snapshot, contract, deployer, user1, user2,
+                                   blocks_after, new_chain):
+    """A reorg anywhere below the head, also deeper than one page, replays only what changed"""
+    mint(contract, deployer, user1, 1)
+    reorg_from = reorg_snapshot()
+    mint(contract, deployer, user1, 2)
+    chain.mine(blocks_after)
+    index = open_index(page_size=1000)
+    index.sync()
+    assert index.owner_of(2) == user1.address.lower()
+
+    chain.restore(reorg_from)
+    mint(contract, deployer, user2, 3)
+    chain.mine(blocks_after + 2 if new_chain == "longer" else 0)
+    index.sync()
+
+    assert index.tokens_of(user1) == [(1, "Character 1")]
+    assert index.tokens_of(user2) == [(3, "Character 3")]
+    assert index.owner_of(2) is None
+    assert index.cursor == chain.blocks.height
+
+
+def test_index_rebuilds_after_reorg_deeper_than_kept_hashes(open_index, reorg_snapshot, contract, deployer,
+                                                            user1, user2):
+    reorg_from = reorg_snapshot()
+    mint(contract, deployer, user1, 1)
+    chain.mine(5)
+    index = open_index(reorg_depth=2)
+    index.sync()
+
+    chain.restore(reorg_from)
+    mint(contract, deployer, user2, 2)
+    chain.mine(5)
+    index.sync()
+
+    assert index.tokens_of(user1) == []
+    assert index.tokens_of(user2) == [(2, "Character 2")]
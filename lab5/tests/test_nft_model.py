@@ -0,0 +1,131 @@
+"""
+Differential fuzzing of MyCollectibleNFT against the reference model
+
+Random operation sequences run on the pure-Python model in bulk (cheap), and a
+sample of them is replayed as real transactions. Every step must revert (or
+not) with the same reason on both sides, and the full state must match at the
+end. Scale it up with environment variables:
+
+    FUZZ_SEED=7 FUZZ_MODEL_SEQUENCES=100000 FUZZ_REPLAYED=20 FUZZ_STEPS=60 ape test tests/test_nft_model.py
+"""
+
+import os
+import random
+
+import pytest
+from ape.exceptions import ContractLogicError
+
+from nft_model import ZERO, random_sequence, run_sequence
+from scripts._events import ZERO_ADDRESS
+
+
+FUZZ_SEED = int(os.environ.get("FUZZ_SEED", "0"))
+FUZZ_MODEL_SEQUENCES = int(os.environ.get("FUZZ_MODEL_SEQUENCES", "2000"))
+FUZZ_REPLAYED = int(os.environ.get("FUZZ_REPLAYED", "4"))
+FUZZ_STEPS = int(os.environ.get("FUZZ_STEPS", "40"))
+
+TOKEN_IDS = tuple(range(1, 9))
+
+# Positions of address arguments (after the sender) for each operation
+ADDRESS_ARGS = {
+    "mint": (0,),
+    "mintWithContentHash": (0,),
+    "transferFrom": (0, 1),
+    "safeTransferFrom": (0, 1),
+    "batchTransferFrom": (0, 1),
+    "approve": (0,),
+    "setApprovalForAll": (0,),
+    "burn": (),
+}
+
+
+def sequence_seed(index):
+    return FUZZ_SEED * 1_000_003 + index
+
+
+def sampled_sequences():
+    """Which of the model-only sequences get replayed on the contract"""
+    rng = random.Random(FUZZ_SEED)
+    count = min(FUZZ_REPLAYED, FUZZ_MODEL_SEQUENCES)
+    return sorted(rng.sample(range(FUZZ_MODEL_SEQUENCES), count))
+
+
+def check_invariants(model):
+    assert sum(model.balance_of.values()) == model.total_supply == len(model.all_tokens)
+    assert sorted(model.all_tokens) == sorted(model.owner_of)
+    for owner, tokens in model.owned_tokens.items():
+        assert len(tokens) == model.balance_of.get(owner, 0)
+        for index, token_id in enumerate(tokens):
+            assert model.owner_of[token_id] == owner
+            assert model.owned_index[token_id] == index
+    for index, token_id in enumerate(model.all_tokens):
+        assert model.all_index[token_id] == index
+
+
+# ========== Model only ==========
+
+def test_model_sequences_keep_invariants():
+    """Run every sequence on the model alone and check its internal consistency"""
+    for index in range(FUZZ_MODEL_SEQUENCES):
+        model, _ = run_sequence(random_sequence(sequence_seed(index), FUZZ_STEPS))
+        check_invariants(model)
+
+
+# ========== Differential replay ==========
+
+@pytest.fixture
+def actors(deployer, user1, user2, accounts):
+    """Model address -> account; actor 1 is the minter"""
+    return {ZERO: ZERO_ADDRESS, 1: deployer, 2: user1, 3: user2, 4: accounts[3]}
+
+
+def replay(contract, actors, op):
+    """Send one model operation as a transaction; return the revert reason or None"""
+    name, sender, *args = op
+    args = [actors[arg] if i in ADDRESS_ARGS[name] else arg for i, arg in enumerate(args)]
+    if name == "safeTransferFrom":
+        args.append(b"")
+
+    try:
+        getattr(contract, name)(*args, sender=actors[sender])
+    except ContractLogicError as err:
+        return err.revert_message
+
+    return None
+
+
+def assert_same_state(contract, model, actors):
+    assert contract.totalSupply() == model.total_supply
+    assert contract.allTokens(0, 100) == model.all_tokens
+
+    for token_id in TOKEN_IDS:
+        owner = model.owner_of.get(token_id, ZERO)
+        assert contract.getApproved(token_id) == actors[model.approved.get(token_id, ZERO)]
+        assert contract.contentHash(token_id) == model.content_hash.get(token_id, b"\x00" * 32)
+        if owner == ZERO:
+            with pytest.raises(ContractLogicError):
+                contract.ownerOf(token_id)
+            continue
+
+        assert contract.ownerOf(token_id) == actors[owner]
+        if token_id not in model.content_hash:
+            assert contract.tokenURI(token_id) == model.token_uri(token_id)
+
+    for actor, account in actors.items():
+        assert contract.balanceOf(account) == model.balance_of.get(actor, 0)
+        assert contract.tokensOfOwner(account, 0, 100) == model.owned_tokens.get(actor, [])
+        for operator, operator_account in actors.items():
+            approved = (actor, operator) in model.operators
+            assert contract.isApprovedForAll(account, operator_account) == approved
+
+
+@pytest.mark.parametrize("index", sampled_sequences())
+def test_contract_matches_model(contract, actors, index):
+    """Replay a sampled sequence step by step on the contract"""
+    ops = random_sequence(sequence_seed(index), FUZZ_STEPS)
+    model, expected = run_sequence(ops)
+
+    for step, (op, reason) in enumerate(zip(ops, expected)):
+        assert replay(contract, actors, op) == reason, f"step {step}: {op}"
+
+    assert_same_state(contract, model, actors)
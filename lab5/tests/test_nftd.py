@@ -0,0 +1,141 @@
+"""
+nftd against the test chain: a SessionServer on a Unix socket, driven through
+DaemonClient, RemoteSession and the nftc command line
+"""
+import os
+import shutil
+import stat
+import tempfile
+import threading
+
+import pytest
+from ape import chain
+from click.testing import CliRunner
+from scripts import nftc
+from scripts._nftd_client import DaemonClient, DaemonError, decode, encode
+from scripts._preflight import Preflight
+from scripts._session import LocalSession, RemoteSession, SessionServer, TxResult, open_session
+from scripts._token_snapshot import TokenSnapshot
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to about 100 characters, too few for tmp_path
+    directory = tempfile.mkdtemp(prefix="nftd-")
+    yield os.path.join(directory, "nftd.sock")
+    shutil.rmtree(directory)
+
+
+@pytest.fixture
+def daemon(socket_path, deployer):
+    server = SessionServer(socket_path, deployer)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    yield server
+    if server.running:
+        DaemonClient(socket_path).stop()
+    thread.join(timeout=10)
+    server.server_close()
+
+
+@pytest.fixture
+def client(daemon, socket_path):
+    return DaemonClient(socket_path, timeout=30)
+
+
+def nftc_run(socket_path, contract, *args):
+    return CliRunner().invoke(nftc.cli, ["--socket", socket_path, "--contract", contract.address, *args])
+
+
+# ========== Wire Format ==========
+
+def test_bytes_survive_the_wire():
+    value = {"hash": b"\x00\xff", "nested": [b"\x01", ("text", 7)], "none": None}
+
+    assert encode(value)["nested"][0] == {"$bytes": "01"}
+    assert decode(encode(value)) == {"hash": b"\x00\xff", "nested": [b"\x01", ["text", 7]], "none": None}
+
+
+# ========== Daemon ==========
+
+def test_daemon_info(client, daemon, socket_path, deployer, minted_contract):
+    info = client.info()
+    assert (info["signer"], info["chain_id"], info["contracts"]) == (deployer.address, chain.chain_id, [])
+
+    client.request("call", "totalSupply", contract=minted_contract.address)
+    assert client.info()["contracts"] == [minted_contract.address]
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600  # Only the owner may sign through it
+
+
+def test_daemon_reports_errors(client, minted_contract):
+    with pytest.raises(DaemonError, match="Unknown operation 'selfdestruct'"):
+        client.request("selfdestruct", contract=minted_contract.address)
+    with pytest.raises(DaemonError, match="Unknown operation 'call'"):
+        client.request("call", "totalSupply")  # Without a contract
+    with pytest.raises(DaemonError, match="PreflightError: .*Not authorized"):
+        client.request("transact", "burn", 1, contract=minted_contract.address)  # Owned by user1
+
+    assert client.request("call", "totalSupply", contract=minted_contract.address) == 4  # Still serving
+
+
+def test_daemon_stops(client, daemon, socket_path):
+    client.stop()
+
+    assert not daemon.running
+    daemon.server_close()
+    assert DaemonClient(socket_path).info() is None
+
+
+# ========== Sessions ==========
+
+def test_remote_session_matches_local(client, socket_path, minted_contract, deployer, user1, user2):
+    session = open_session(minted_contract.address, socket_path=socket_path)
+    local = LocalSession(minted_contract.address, account=deployer)
+    assert isinstance(session, RemoteSession)
+    assert session.signer == deployer.address
+
+    assert session.call("balanceOf", user1.address) == 4
+    snapshot = session.snapshot(2, user2.address)
+    assert isinstance(snapshot, TokenSnapshot)
+    assert snapshot == local.snapshot(2, user2.address)
+
+    check = session.preflight("burn", 1)
+    assert isinstance(check, Preflight) and check.revert_reason == "Not authorized"
+
+    result = session.transact("mint", user2.address, 9, "Remote", "", "")
+    assert isinstance(result, TxResult)
+    assert result.block_number == chain.blocks.height
+    assert minted_contract.ownerOf(9) == user2
+    with pytest.raises(AttributeError):
+        session.shutdown
+
+
+def test_open_session_needs_a_daemon_on_this_chain(monkeypatch, client, socket_path, minted_contract, deployer):
+    assert isinstance(open_session(minted_contract.address, socket_path=socket_path + ".missing"), LocalSession)
+
+    monkeypatch.setattr(DaemonClient, "info", lambda self: {"chain_id": chain.chain_id + 1, "signer": ""})
+    assert isinstance(open_session(minted_contract.address, socket_path=socket_path), LocalSession)
+
+
+# ========== nftc ==========
+
+def test_nftc_commands(client, socket_path, contract, deployer, user1):
+    result = nftc_run(socket_path, contract, "status")
+    assert result.exit_code == 0 and deployer.address in result.output
+
+    for token_id in (1, 2, 3):
+        result = nftc_run(socket_path, contract, "mint", deployer.address, str(token_id), f"#{token_id}")
+        assert result.exit_code == 0, result.output
+    assert nftc_run(socket_path, contract, "transfer", user1.address, "1", "2").exit_code == 0
+    assert nftc_run(socket_path, contract, "burn", "3").exit_code == 0
+
+    assert nftc_run(socket_path, contract, "balance", user1.address).output.strip() == "2"
+    assert "Owner: " + user1.address in nftc_run(socket_path, contract, "token", "2").output
+    result = nftc_run(socket_path, contract, "burn", "1")
+    assert result.exit_code == 1 and "Not authorized" in result.output
+
+
+def test_nftc_without_a_daemon(socket_path, contract):
+    result = nftc_run(socket_path, contract, "balance", contract.address)
+    assert result.exit_code == 1
+    assert f"nftd is not running at {socket_path}" in result.output
@@ -0,0 +1,144 @@
+"""
+Preflight checks against the test chain: reverts are caught before sending,
+gas limits leave a margin over the estimate, and nonces come from one shared
+source
+"""
+import math
+import threading
+
+import pytest
+from ape import chain
+from scripts import _preflight
+from scripts._permit import deadline_in, permit_call, permit_data, send_together, sign_typed_data
+from scripts._preflight import NonceSource, PreflightError, gas_limit, send_checked, simulate, submit_checked
+
+
+def sent(txn_hash):
+    return chain.provider.web3.eth.get_transaction(txn_hash)
+
+
+# ========== Simulation ==========
+
+def test_simulate_returns_the_revert_reason(minted_contract, user2):
+    check = simulate(minted_contract.burn, 1, sender=user2.address)
+    assert not check.ok
+    assert check.revert_reason == "Not authorized"
+
+
+def test_simulate_estimates_gas(minted_contract, user1):
+    check = simulate(minted_contract.burn, 1, sender=user1.address)
+    assert check.ok
+    assert check.gas == minted_contract.burn.estimate_gas_cost(1, sender=user1)
+
+
+def test_reverting_transactions_are_not_sent(minted_contract, user2):
+    nonces = NonceSource(user2.address)
+    nonce = user2.nonce
+
+    with pytest.raises(PreflightError, match="Not authorized"):
+        submit_checked(minted_contract.burn, 1, sender=user2, nonces=nonces)
+    with pytest.raises(PreflightError, match="Not authorized"):
+        send_checked(minted_contract.burn, 1, sender=user2)
+    assert user2.nonce == nonce
+
+
+# ========== Gas ==========
+
+def test_gas_limit_has_a_margin(monkeypatch, minted_contract, user1):
+    estimate = simulate(minted_contract.burn, 1, sender=user1.address).gas
+    txn_hash = submit_checked(minted_contract.burn, 1, sender=user1, nonces=NonceSource(user1.address))
+
+    assert sent(txn_hash)["gas"] == math.ceil(estimate * _preflight.GAS_MARGIN)
+    monkeypatch.setitem(chain.provider.network.__dict__, "auto_gas_multiplier", 2.0)  # A cached property
+    assert gas_limit(estimate) == estimate * 2
+
+
+def test_send_checked_uses_the_margin(minted_contract, user1, user2):
+    estimate = simulate(minted_contract.transferFrom, user1, user2, 1, sender=user1.address).gas
+    receipt = send_checked(minted_contract.transferFrom, user1, user2, 1, sender=user1,
+                           nonces=NonceSource(user1.address))
+
+    assert sent(receipt.txn_hash)["gas"] == gas_limit(estimate) > receipt.gas_used
+
+
+# ========== Nonces ==========
+
+def test_concurrent_submissions_get_distinct_nonces(contract, deployer, user1):
+    nonces = NonceSource(deployer.address)
+    first = deployer.nonce
+    hashes, errors = [], []
+
+    def submit(token_id):
+        try:
+            hashes.append(submit_checked(contract.mint, user1, token_id, f"#{token_id}", "", "",
+                                         sender=deployer, nonces=nonces))
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=submit, args=(token_id,)) for token_id in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert sorted(sent(txn_hash)["nonce"] for txn_hash in hashes) == list(range(first, first + 8))
+    assert contract.totalSupply() == 8
+
+
+def test_nonce_source_counts_locally(monkeypatch, deployer):
+    """The pending count is read once, and again only after a failed send"""
+    reads = []
+    pending_count = chain.provider.web3.eth.get_transaction_count
+    monkeypatch.setattr(chain.provider.web3.eth, "get_transaction_count",
+                        lambda *args: reads.append(args) or pending_count(*args))
+    nonces = NonceSource(deployer.address)
+    first = deployer.nonce
+
+    for expected in (first, first + 1, first + 2):
+        with nonces.reserve() as nonce:
+            assert nonce == expected
+    assert len(reads) == 1
+
+    with pytest.raises(ValueError), nonces.reserve():
+        raise ValueError("nonce too low")
+    with nonces.reserve() as nonce:
+        assert nonce == first  # Nothing was actually sent
+    assert len(reads) == 2
+
+
+def test_unsent_transactions_release_their_nonce(monkeypatch, minted_contract, user1):
+    nonces = NonceSource(user1.address)
+    monkeypatch.setattr(type(user1), "sign_transaction", lambda *args, **kwargs: None)
+
+    with pytest.raises(RuntimeError, match="Signing was declined"):
+        submit_checked(minted_contract.burn, 1, sender=user1, nonces=nonces)
+    monkeypatch.undo()
+
+    txn_hash = submit_checked(minted_contract.burn, 1, sender=user1, nonces=nonces)
+    assert sent(txn_hash)["nonce"] == user1.nonce - 1
+
+
+# ========== Permits ==========
+
+def test_permit_and_transfer_sent_together(minted_contract, user1, user2, accounts):
+    """The transfer is simulated with the permit it depends on already pending"""
+    typed_data = permit_data(minted_contract, user2.address, 1, deadline_in(3600))
+    calls = [permit_call(minted_contract, typed_data, sign_typed_data(user1, typed_data)),
+             (minted_contract.transferFrom, (user1.address, accounts[3].address, 1))]
+    nonce = user2.nonce
+
+    receipts = send_together(user2, calls)
+
+    assert [sent(receipt.txn_hash)["nonce"] for receipt in receipts] == [nonce, nonce + 1]
+    assert not any(receipt.failed for receipt in receipts)
+    assert minted_contract.ownerOf(1) == accounts[3]
+
+
+def test_send_together_stops_before_a_revert(minted_contract, user1, user2):
+    calls = [(minted_contract.transferFrom, (user1.address, user2.address, 1))]  # Not approved yet
+    nonce = user2.nonce
+
+    with pytest.raises(PreflightError, match="Not authorized"):
+        send_together(user2, calls)
+    assert user2.nonce == nonce
@@ -0,0 +1,135 @@
+"""
+ReadCache against the test chain: events since the last refresh drop exactly
+the cached views they affect, and a reorg drops everything
+"""
+import pytest
+from ape import chain
+from scripts._read_cache import ReadCache
+
+
+@pytest.fixture
+def cache(minted_contract):
+    return ReadCache(minted_contract)
+
+
+def warm(cache, *calls):
+    for call in calls:
+        cache.call(*call)
+
+
+def cached(cache, *calls):
+    """Which of ``calls`` the cache answers without reading the contract"""
+    hits = []
+    for call in calls:
+        before = cache.hits
+        cache.call(*call)
+        hits.append(cache.hits > before)
+    return hits
+
+
+# ========== Reads ==========
+
+def test_cache_answers_repeated_reads(cache, user1):
+    assert cache.call("ownerOf", 1) == user1
+    assert cache.call("balanceOf", user1.address.lower()) == 4
+
+    assert cache.call("ownerOf", 1) == user1
+    assert cache.call("balanceOf", user1.address) == 4  # Checksummed or not, one entry
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_reads_are_pinned_to_the_refreshed_block(cache, minted_contract, user1, user2):
+    minted_contract.transferFrom(user1, user2, 1, sender=user1)
+
+    assert cache.call("ownerOf", 1) == user1
+    cache.refresh()
+    assert cache.call("ownerOf", 1) == user2
+
+
+def test_refresh_without_new_blocks(cache):
+    warm(cache, ("ownerOf", 1), ("totalSupply",))
+    assert cache.refresh() == 0
+    assert len(cache) == 2
+
+
+# ========== Invalidation ==========
+
+def test_transfer_drops_only_what_it_touched(cache, minted_contract, deployer, user1, user2):
+    calls = [
+        ("ownerOf", 1), ("balanceOf", user1), ("balanceOf", user2),
+        ("ownerOf", 2), ("balanceOf", deployer), ("totalSupply",), ("name",),
+    ]
+    warm(cache, *calls)
+
+    minted_contract.transferFrom(user1, user2, 1, sender=user1)
+    assert cache.refresh() == 3
+
+    assert cached(cache, *calls) == [False, False, False, True, True, True, True]
+    assert cache.call("ownerOf", 1) == user2
+    assert cache.call("balanceOf", user2) == 1
+
+
+def test_mint_and_burn_drop_the_supply(cache, minted_contract, deployer, user1, user2):
+    calls = [("totalSupply",), ("balanceOf", user2), ("ownerOf", 2)]
+    warm(cache, *calls)
+
+    minted_contract.mint(user2, 5, "New", "", "", sender=deployer)
+    minted_contract.burn(3, sender=user1)
+    cache.refresh()
+
+    assert cached(cache, *calls) == [False, False, True]
+    assert cache.call("totalSupply",) == 4
+
+
+def test_approvals_drop_their_views(cache, minted_contract, user1, user2):
+    calls = [("getApproved", 1), ("getApproved", 2), ("isApprovedForAll", user1, user2), ("ownerOf", 3)]
+    warm(cache, *calls)
+
+    minted_contract.approve(user2, 1, sender=user1)
+    minted_contract.setApprovalForAll(user2, True, sender=user1)
+    cache.refresh()
+
+    assert cached(cache, *calls) == [False, True, False, True]
+    assert cache.call("getApproved", 1) == user2
+    assert cache.call("isApprovedForAll", user1, user2)
+
+
+def test_transfer_drops_token_snapshots(cache, minted_contract, user1, user2):
+    assert cache.token_snapshot(2).owner == user1
+    minted_contract.transferFrom(user1, user2, 2, sender=user1)
+    cache.refresh()
+
+    snapshot = cache.token_snapshot(2)
+    assert snapshot.owner == user2
+    assert snapshot.block_number == cache.block_number
+
+
+def test_reorg_drops_everything(cache, reorg_snapshot, minted_contract, user1, user2):
+    reorg_from = reorg_snapshot()
+    minted_contract.transferFrom(user1, user2, 1, sender=user1)
+    cache.refresh()
+    warm(cache, ("ownerOf", 1), ("ownerOf", 2), ("name",))
+
+    chain.restore(reorg_from)
+    minted_contract.transferFrom(user1, user2, 2, sender=user1)
+    chain.mine(1)
+
+    assert cache.refresh() == 3
+    assert cache.call("ownerOf", 1) == user1
+    assert cache.call("ownerOf", 2) == user2
+
+
+# ========== Limits ==========
+
+def test_least_recently_used_entries_are_evicted(minted_contract):
+    cache = ReadCache(minted_contract, max_entries=2)
+    warm(cache, ("ownerOf", 1), ("ownerOf", 2), ("ownerOf", 1), ("ownerOf", 3))
+
+    assert len(cache) == 2
+    assert cached(cache, ("ownerOf", 1), ("ownerOf", 2)) == [True, False]
+
+
+def test_unknown_views_are_rejected(cache):
+    with pytest.raises(ValueError, match="invalidate 'tokenByIndex'"):
+        cache.call("tokenByIndex", 0)
+    assert cache.misses == 0
@@ -0,0 +1,118 @@
+"""
+Batched reads against the test chain: ReadBatch results and errors, with and
+without JSON-RPC batching, and token snapshots pinned to one block
+"""
+import pytest
+from ape import chain
+from scripts._content_store import ContentStore
+from scripts._rpc import RPCError, ReadBatch, decode_revert_reason
+from scripts._token_snapshot import fetch_token_snapshot
+
+
+@pytest.fixture(params=["batched", "one by one"])
+def batching(request, monkeypatch):
+    """Run with the node's JSON-RPC batches, and as on a provider that has none"""
+    if request.param == "one by one":
+        monkeypatch.setattr(chain.provider.web3.provider, "make_batch_request", None, raising=False)
+    return request.param
+
+
+# ========== ReadBatch ==========
+
+def test_read_batch_returns_results_in_order(batching, minted_contract, user1, sample_characters):
+    batch = ReadBatch()
+    positions = [batch.add(minted_contract.characterName, char["tokenId"]) for char in sample_characters]
+    positions.append(batch.add(minted_contract.balanceOf, user1))
+    batch.add(minted_contract.ownerOf, 99)
+
+    results = batch.execute()
+
+    assert positions == list(range(5))
+    assert results[:4] == [char["name"] for char in sample_characters]
+    assert results[4] == 4
+    assert isinstance(results[5], RPCError)
+    assert results[5].revert_reason == "Token does not exist"
+    assert batch.execute() == []  # The queue is emptied
+
+
+def test_read_batch_is_pinned_to_its_block(minted_contract, user1, user2):
+    before = chain.blocks.height
+    minted_contract.transferFrom(user1, user2, 1, sender=user1)
+
+    batch = ReadBatch(block_id=before)
+    batch.add(minted_contract.ownerOf, 1)
+    batch.add(minted_contract.balanceOf, user2)
+
+    assert batch.execute() == [user1, 0]
+
+
+def test_decode_revert_reason():
+    payload = bytes.fromhex(
+        "08c379a0"
+        "0000000000000000000000000000000000000000000000000000000000000020"
+        "0000000000000000000000000000000000000000000000000000000000000004"
+        "6f6f707300000000000000000000000000000000000000000000000000000000"
+    )
+    assert decode_revert_reason(payload) == "oops"
+    assert decode_revert_reason("0x" + payload.hex()) == "oops"
+    assert decode_revert_reason(b"\x12\x34") is None
+    assert decode_revert_reason(None) is None
+
+
+# ========== Token Snapshots ==========
+
+def test_snapshot_of_a_token(batching, minted_contract, user1, user2, sample_characters):
+    minted_contract.approve(user2, 2, sender=user1)
+    char = sample_characters[1]
+
+    snapshot = fetch_token_snapshot(minted_contract, 2, account=user2)
+
+    assert snapshot.exists and snapshot.owner == user1
+    assert (snapshot.name, snapshot.description, snapshot.image_uri) == (
+        char["name"], char["description"], char["imageURI"])
+    assert snapshot.token_uri == minted_contract.tokenURI(2)
+    assert snapshot.approved == user2
+    assert (snapshot.total_supply, snapshot.owner_balance, snapshot.account_balance) == (4, 4, 0)
+    assert not snapshot.account_is_operator
+    assert not snapshot.content_addressed
+    assert snapshot.block_number == chain.blocks.height
+    assert snapshot.is_owner(user1.address.lower())
+    assert snapshot.is_authorized(user2) and not snapshot.is_authorized(minted_contract.minter())
+
+
+def test_snapshot_sees_operators(minted_contract, user1, user2):
+    minted_contract.setApprovalForAll(user2, True, sender=user1)
+
+    snapshot = fetch_token_snapshot(minted_contract, 3, account=user2)
+    assert snapshot.account_is_operator
+    assert snapshot.is_authorized(user2)
+    assert not fetch_token_snapshot(minted_contract, 3).is_authorized(user2)  # Without the account
+
+
+def test_snapshot_of_a_missing_token(minted_contract, user1):
+    snapshot = fetch_token_snapshot(minted_contract, 99, account=user1)
+
+    assert not snapshot.exists
+    assert snapshot.error == "Token does not exist"
+    assert (snapshot.total_supply, snapshot.account_balance) == (4, 4)
+    assert not snapshot.is_authorized(user1)
+
+
+def test_snapshot_at_an_earlier_block(minted_contract, user1, user2):
+    before = chain.blocks.height
+    minted_contract.transferFrom(user1, user2, 1, sender=user1)
+    minted_contract.burn(2, sender=user1)
+
+    snapshot = fetch_token_snapshot(minted_contract, 1, block_id=before)
+    assert (snapshot.owner, snapshot.owner_balance, snapshot.total_supply) == (user1, 4, 4)
+    assert snapshot.block_number == before
+
+
+def test_snapshot_reads_content_addressed_metadata(tmp_path, contract, deployer, user1):
+    store = ContentStore(tmp_path)
+    digest = store.put("Stored", "Off chain", "ipfs://image")
+    contract.mintWithContentHash(user1, 7, digest, sender=deployer)
+
+    snapshot = fetch_token_snapshot(contract, 7, store=store)
+    assert snapshot.content_addressed
+    assert (snapshot.name, snapshot.description, snapshot.image_uri) == ("Stored", "Off chain", "ipfs://image")
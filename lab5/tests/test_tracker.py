@@ -0,0 +1,137 @@
+"""
+ConfirmationTracker against the test chain: confirmations, replacements of
+stuck transactions, and a node that stops answering
+"""
+import pytest
+from ape import chain
+from eth_utils import to_hex
+
+from scripts import _tracker
+from scripts._fees import FeeEngine
+from scripts._tracker import ConfirmationTracker
+
+
+UNKNOWN_HASH = "0x" + "ab" * 32
+
+
+def test_tracker_confirms_transactions(deployer, user1, user2):
+    receipts = [deployer.transfer(user, 1) for user in (user1, user2)]
+
+    with ConfirmationTracker(poll_interval=0.01) as tracker:
+        seen = []
+        futures = [tracker.track(receipt.txn_hash, callback=seen.append) for receipt in receipts]
+        confirmations = [future.result(timeout=10) for future in futures]
+
+    for receipt, confirmation in zip(receipts, confirmations):
+        assert confirmation.txn_hash == receipt.txn_hash
+        assert confirmation.block_number == receipt.block_number
+        assert confirmation.gas_used == receipt.gas_used
+        assert not confirmation.failed
+    assert sorted(item.txn_hash for item in seen) == sorted(receipt.txn_hash for receipt in receipts)
+
+
+def test_tracker_retries_a_failed_poll(monkeypatch, deployer, user1):
+    receipt = deployer.transfer(user1, 1)
+    batch_request = _tracker.batch_request
+    calls = []
+
+    def flaky(requests):
+        calls.append(requests)
+        if len(calls) == 1:
+            raise ConnectionError("connection reset")
+        return batch_request(requests)
+
+    monkeypatch.setattr(_tracker, "batch_request", flaky)
+
+    with ConfirmationTracker(poll_interval=0.01) as tracker:
+        confirmation = tracker.track(receipt.txn_hash).result(timeout=10)
+        assert tracker.running
+
+    assert confirmation.txn_hash == receipt.txn_hash
+    assert len(calls) >= 2
+
+
+def test_tracker_releases_waiters_when_the_node_is_gone(monkeypatch):
+    def unreachable(requests):
+        raise ConnectionError("node unreachable")
+
+    monkeypatch.setattr(_tracker, "batch_request", unreachable)
+
+    with ConfirmationTracker(poll_interval=0.01, max_failures=3) as tracker:
+        futures = [tracker.track(UNKNOWN_HASH), tracker.track("0x" + "cd" * 32)]
+        for future in futures:
+            with pytest.raises(ConnectionError, match="node unreachable"):
+                future.result(timeout=10)
+
+        # The thread survives and keeps serving new hashes
+        assert tracker.running
+        assert len(tracker) == 0
+
+
+def test_tracker_survives_a_failing_replacement(deployer, user1):
+    attempts = []
+
+    def on_stuck(txn_hash):
+        attempts.append(txn_hash)
+        raise RuntimeError("signer locked")
+
+    with ConfirmationTracker(poll_interval=0.01, on_stuck=on_stuck, stuck_blocks=0) as tracker:
+        stuck = tracker.track(UNKNOWN_HASH)
+        receipt = deployer.transfer(user1, 1)
+        confirmation = tracker.track(receipt.txn_hash).result(timeout=10)
+
+        assert attempts and attempts[0] == UNKNOWN_HASH
+        assert confirmation.txn_hash == receipt.txn_hash
+        assert not stuck.done()
+
+
+# ========== Replacement ==========
+
+def unsent_transfer(fees, sender, receiver):
+    """A transfer signed and recorded for replacement but never broadcast: stuck, as far as anyone can tell"""
+    txn = chain.provider.network.ecosystem.create_transaction(
+        chain_id=chain.chain_id,
+        type=2,
+        sender=sender.address,
+        receiver=receiver.address,
+        value=1,
+        nonce=sender.nonce,
+        gas=21000,
+        **fees.quote().options(),
+    )
+    signed = sender.sign_transaction(txn)
+    txn_hash = to_hex(signed.txn_hash)
+    fees.record(txn_hash, signed)
+    return txn_hash, signed
+
+
+def test_tracker_replaces_stuck_transactions(deployer, user1):
+    fees = FeeEngine()
+    stuck_hash, original = unsent_transfer(fees, deployer, user1)
+    replacements = []
+
+    def on_stuck(txn_hash):
+        replacements.append(fees.replace(deployer, txn_hash))
+        return replacements[-1]
+
+    with ConfirmationTracker(poll_interval=0.01, on_stuck=on_stuck, stuck_blocks=0) as tracker:
+        confirmation = tracker.track(stuck_hash).result(timeout=10)
+        assert len(tracker) == 0
+
+    assert replacements == [confirmation.txn_hash]
+    assert confirmation.txn_hash != stuck_hash
+    mined = chain.provider.web3.eth.get_transaction(confirmation.txn_hash)
+    assert mined["nonce"] == original.nonce
+    assert mined["maxPriorityFeePerGas"] >= original.max_priority_fee * 1.1
+    assert mined["maxFeePerGas"] >= original.max_fee * 1.1
+    assert fees.metrics()["replacements"] == 1
+
+
+def test_replacement_refused_once_the_original_is_mined(deployer, user1):
+    fees = FeeEngine()
+    txn_hash, original = unsent_transfer(fees, deployer, user1)
+    chain.provider.web3.eth.send_raw_transaction(original.serialize_transaction())
+
+    assert fees.replace(deployer, txn_hash) is None
+    assert fees.metrics()["replacements"] == 0
+    assert deployer.nonce == original.nonce + 1
@@ -0,0 +1,99 @@
+"""
+Voucher signing in scripts/_vouchers.py against the contract: vouchers read
+from a manifest, signed in bulk and written to a file are redeemed by redeem
+"""
+import json
+import sys
+
+import pytest
+from ape import chain
+from hexbytes import HexBytes
+from scripts._content_store import ContentStore
+from scripts._vouchers import (
+    Voucher,
+    digest_signer,
+    domain_separator,
+    find_voucher,
+    read_voucher_manifest,
+    sign_vouchers,
+    voucher_digest,
+    write_vouchers,
+)
+
+
+@pytest.fixture
+def separator(contract):
+    return domain_separator(contract.name(), chain.chain_id, contract.address)
+
+
+@pytest.fixture
+def manifest(tmp_path, user1, user2):
+    path = tmp_path / "drop.jsonl"
+    rows = [{"to": user1.address, "tokenId": 1, "name": "Cyber Warrior", "description": "", "imageURI": ""},
+            {"to": user2.address, "tokenId": 2, "contentHash": "0x" + "ab" * 32},
+            {"to": user1.address, "tokenId": 3, "contentHash": "0x" + "cd" * 32}]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return path
+
+
+def key_of(account):
+    return bytes(HexBytes(account.private_key))
+
+
+def test_domain_separator_matches_contract(contract, separator):
+    assert separator == bytes(contract.DOMAIN_SEPARATOR())
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_signed_vouchers_are_redeemed(tmp_path, contract, deployer, user1, user2, separator, manifest, processes):
+    store = ContentStore(tmp_path / "metadata")
+    expiry = chain.pending_timestamp + 3600
+    vouchers = sign_vouchers(key_of(deployer), separator, read_voucher_manifest(manifest, expiry, store), processes)
+    assert write_vouchers(tmp_path / "vouchers.jsonl", vouchers, contract.address, chain.chain_id) == 3
+
+    for token_id, holder in ((1, user1), (2, user2), (3, user1)):
+        voucher, record = find_voucher(tmp_path / "vouchers.jsonl", token_id)
+        assert record["contract"] == contract.address
+        contract.redeem(*voucher.redeem_args(), sender=holder)
+        assert contract.ownerOf(token_id) == holder
+        assert contract.contentHash(token_id) == voucher.content_hash
+
+    assert store.get(contract.contentHash(1))["name"] == "Cyber Warrior"
+    assert find_voucher(tmp_path / "vouchers.jsonl", 4) is None
+
+
+def test_vouchers_are_bound_to_their_fields(contract, deployer, user1, user2, separator):
+    expiry = chain.pending_timestamp + 3600
+    voucher, = sign_vouchers(key_of(deployer), separator,
+                             [Voucher(user1.address.lower(), 7, b"\x01" * 32, expiry)], processes=1)
+
+    recipient, token_id, content_hash, expiry, signature = voucher.redeem_args()
+    for args in [(user2, token_id, content_hash, expiry, signature),
+                 (recipient, 8, content_hash, expiry, signature),
+                 (recipient, token_id, content_hash, expiry + 1, signature)]:
+        with pytest.raises(Exception, match="Invalid signature"):
+            contract.redeem(*args, sender=user1)
+
+
+def test_vouchers_signed_by_others_are_rejected(contract, user1, separator):
+    voucher, = sign_vouchers(key_of(user1), separator,
+                             [Voucher(user1.address.lower(), 7, b"\x01" * 32, chain.pending_timestamp + 3600)],
+                             processes=1)
+    with pytest.raises(Exception, match="Invalid signature"):
+        contract.redeem(*voucher.redeem_args(), sender=user1)
+
+
+def test_fallback_signer_matches_coincurve(monkeypatch, deployer, user1, separator):
+    digest = voucher_digest(separator, user1.address.lower(), 1, b"\x02" * 32, 10**10)
+    signature = digest_signer(key_of(deployer))(digest)
+
+    monkeypatch.setitem(sys.modules, "coincurve", None)  # Import fails as if it were not installed
+    assert digest_signer(key_of(deployer))(digest) == signature
+
+
+def test_manifest_errors_name_the_line(tmp_path):
+    path = tmp_path / "drop.csv"
+    path.write_text("to,tokenId,contentHash\n0x" + "11" * 20 + ",1,0x1234\n")
+
+    with pytest.raises(ValueError, match="Line 2: 'contentHash' must be 32 bytes"):
+        list(read_voucher_manifest(path, 0, ContentStore(tmp_path)))
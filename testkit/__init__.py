@@ -0,0 +1,7 @@
+"""
+Helpers shared by the labs
+
+Each lab's ``tests/conftest.py`` puts the repository root on ``sys.path`` and
+wraps the test helpers in its own fixtures; the labs' ``scripts/_permit.py``
+do the same for the EIP-712 domain and back-to-back sending.
+"""
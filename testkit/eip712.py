@@ -0,0 +1,43 @@
+"""
+EIP-712 signatures for the contracts' permits and vouchers
+
+Every contract in the labs signs over the same domain: its ``name()``,
+version "1", the chain ID and its address.
+"""
+from ape import chain
+from eth_account.messages import encode_typed_data
+
+
+EIP712_DOMAIN = [
+    {"name": "name", "type": "string"},
+    {"name": "version", "type": "string"},
+    {"name": "chainId", "type": "uint256"},
+    {"name": "verifyingContract", "type": "address"},
+]
+
+
+def build_typed_data(contract, primary_type, fields, message):
+    """
+    EIP-712 data for ``message`` as the struct ``primary_type`` of ``contract``
+
+    @param fields The struct's fields, ``[{"name": ..., "type": ...}, ...]``
+    @return The ``full_message`` that ``encode_typed_data`` and the permit files take
+    """
+    return {
+        "types": {"EIP712Domain": EIP712_DOMAIN, primary_type: fields},
+        "primaryType": primary_type,
+        "domain": {"name": contract.name(), "version": "1", "chainId": chain.chain_id,
+                   "verifyingContract": contract.address},
+        "message": message,
+    }
+
+
+def sign_typed_data(contract, signer, primary_type, fields, message):
+    """
+    Sign ``message`` as the EIP-712 struct ``primary_type`` for ``contract``
+
+    @param fields The struct's fields, ``[{"name": ..., "type": ...}, ...]``
+    @return ape's ``MessageSignature`` (``v``, ``r``, ``s``, ``encode_rsv()``)
+    """
+    typed_data = build_typed_data(contract, primary_type, fields, message)
+    return signer.sign_message(encode_typed_data(full_message=typed_data))
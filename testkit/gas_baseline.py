@@ -0,0 +1,65 @@
+"""
+Gas regression baselines
+
+Each benchmark records its gas under a name and is compared with the lab's
+committed ``tests/gas_baseline.json``. A benchmark fails when its gas grows by
+more than ``GAS_REGRESSION_THRESHOLD`` percent (default 5), or when it has no
+baseline yet. The file is only written when ``GAS_BASELINE_UPDATE=1``, so a
+normal test run never changes it.
+"""
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: parallel updates are not serialized
+    fcntl = None
+
+
+GAS_REGRESSION_THRESHOLD = float(os.environ.get("GAS_REGRESSION_THRESHOLD", "5"))  # percent
+GAS_BASELINE_UPDATE = os.environ.get("GAS_BASELINE_UPDATE") == "1"
+
+
+class GasBaseline:
+    """Compares measured gas against a committed JSON baseline"""
+
+    def __init__(self, path, threshold=GAS_REGRESSION_THRESHOLD, update=GAS_BASELINE_UPDATE):
+        self.path = path
+        self.threshold = threshold
+        self.update = update
+        self.baseline = json.loads(path.read_text()) if path.exists() else {}
+        self.measured = {}
+
+    def check(self, name, gas):
+        """Record ``gas`` for ``name`` and fail if it has no baseline or regressed past the threshold"""
+        self.measured[name] = gas
+        if self.update:
+            return
+
+        expected = self.baseline.get(name)
+        assert expected is not None, (
+            f"{name}: no gas baseline (rerun with GAS_BASELINE_UPDATE=1 to record it)"
+        )
+        limit = expected * (1 + self.threshold / 100)
+        assert gas <= limit, (
+            f"{name}: {gas} gas exceeds baseline {expected} by more than {self.threshold}% "
+            f"(rerun with GAS_BASELINE_UPDATE=1 to accept)"
+        )
+
+    def save(self):
+        """With ``update`` set, write the measurements into the baseline file"""
+        if not self.update or not self.measured:
+            return
+
+        # Parallel workers (ape test -n) each merge their own results under the lock
+        with open(self.path, "a+", encoding="utf8") as out:
+            if fcntl is not None:
+                fcntl.flock(out, fcntl.LOCK_EX)
+            out.seek(0)
+            text = out.read()
+            baseline = json.loads(text) if text.strip() else {}
+            merged = {**baseline, **self.measured}
+            if merged != baseline:
+                out.seek(0)
+                out.truncate()
+                out.write(json.dumps(dict(sorted(merged.items())), indent=2) + "\n")
@@ -0,0 +1,39 @@
+"""
+Reference Merkle allowlist, built one hash at a time
+
+Leaves are keccak256(keccak256(abi_encode(address, cap))), parents hash their
+sorted children, and an odd node moves up a level unchanged: what
+CrowdSaleToken's buyAllowlisted and MyCollectibleNFT's claim verify. The
+suites build their allowlists with it and check lab5's vectorized builder
+(scripts/_merkle.py) against it.
+"""
+from eth_abi import encode
+from eth_utils import keccak
+
+
+def leaf(address, cap):
+    return keccak(keccak(encode(["address", "uint256"], [str(address), cap])))
+
+
+def allowlist(entries):
+    """
+    @param entries ``[(address, cap), ...]``
+    @return ``(root, {str(address): proof})``, each proof a list of sibling hashes from the leaf up
+    """
+    levels = [[leaf(address, cap) for address, cap in entries]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        levels.append([
+            keccak(b"".join(sorted(level[i:i + 2]))) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ])
+
+    proofs = {}
+    for index, (address, _) in enumerate(entries):
+        proof = []
+        for level in levels[:-1]:
+            if index ^ 1 < len(level):
+                proof.append(level[index ^ 1])
+            index //= 2
+        proofs[str(address)] = proof
+    return levels[-1][0], proofs
@@ -0,0 +1,45 @@
+"""
+Transactions sent back to back
+
+A permit and the transfers it enables are signed with consecutive nonces and
+broadcast without waiting for each other to confirm. Each one is checked
+against the pending block, which already holds the ones sent before it, so a
+transfer is estimated with its approval in place.
+"""
+import itertools
+
+from ape import chain
+from eth_utils import to_hex
+
+
+def send_together(sender, calls, submit=None):
+    """
+    Send ``(method, args)`` calls from ``sender`` in order, then wait for all of them
+
+    @param submit ``submit(method, *args, sender=sender)`` checks one call, signs and
+                  broadcasts it at the sender's next nonce and returns its transaction
+                  hash; by default the check is a gas estimate against the pending block
+    @return Receipts in call order
+    """
+    if submit is None:
+        submit = _estimated(chain.provider.web3.eth.get_transaction_count(sender.address, "pending"))
+
+    txn_hashes = [submit(method, *args, sender=sender) for method, args in calls]
+    return [chain.provider.get_receipt(txn_hash) for txn_hash in txn_hashes]
+
+
+def _estimated(first_nonce):
+    """``submit`` sending at consecutive nonces from ``first_nonce``; a call that would revert raises"""
+    nonces = itertools.count(first_nonce)
+
+    def submit(method, *args, sender):
+        web3 = chain.provider.web3
+        call = {"from": sender.address, "to": method.contract.address, "data": to_hex(method.encode_input(*args))}
+        # Without a block argument, which not every node accepts; nodes estimate on their pending state
+        gas = web3.eth.estimate_gas(call)
+        signed = sender.sign_transaction(method.as_transaction(*args, sender=sender, nonce=next(nonces), gas=gas))
+        if signed is None:
+            raise RuntimeError("Signing was declined")
+        return to_hex(web3.eth.send_raw_transaction(signed.serialize_transaction()))
+
+    return submit